@@ -0,0 +1,240 @@
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from metrics import metrics
+
+# 입장 제어 설정 (환경 변수로 조정 가능)
+ADMISSION_CONTROL = os.environ.get("ADMISSION_CONTROL", "1") != "0"
+# 클라이언트 IP별 노트 생성 요청 수 (분당)와 한 번에 몰아서 보낼 수 있는 요청 수
+CLIENT_REQUESTS_PER_MINUTE = float(os.environ.get("CLIENT_REQUESTS_PER_MINUTE", "10"))
+CLIENT_BURST = float(os.environ.get("CLIENT_BURST", "5"))
+# Gemini 할당량 (분당 요청 수 / 분당 입력 토큰 수)
+GEMINI_RPM = float(os.environ.get("GEMINI_RPM", "60"))
+GEMINI_TPM = float(os.environ.get("GEMINI_TPM", "1000000"))
+# 생성 전에 요청 하나 몫으로 미리 잡아두는 입력 토큰 수 (생성 후 실제 사용량으로 정산)
+ADMISSION_ESTIMATED_TOKENS = int(os.environ.get("ADMISSION_ESTIMATED_TOKENS", "8000"))
+# 예산이 이 시간(초) 안에 생기면 거절하지 않고 기다렸다가 처리
+ADMISSION_MAX_WAIT = float(os.environ.get("ADMISSION_MAX_WAIT", "3"))
+# 기억하는 클라이언트 버킷 수 (넘으면 가장 오래 쓰지 않은 것부터 삭제)
+ADMISSION_MAX_CLIENTS = int(os.environ.get("ADMISSION_MAX_CLIENTS", "10000"))
+# 앞단의 신뢰하는 프록시 수 (0이면 X-Forwarded-For/X-Real-IP를 무시하고 연결 주소 사용, Vercel에서는 기본 1)
+TRUSTED_PROXY_HOPS = int(os.environ.get("TRUSTED_PROXY_HOPS", "1" if os.environ.get("VERCEL") else "0"))
+
+class TokenBucket:
+    """초당 rate만큼 채워지고 capacity까지 쌓이는 토큰 버킷입니다.
+
+    take는 잔량이 모자라도 빼므로(음수 잔량) 기다리기로 한 요청이 앞으로 채워질 토큰을 먼저 예약합니다.
+    """
+
+    def __init__(self, rate, capacity, now=None):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic() if now is None else now
+
+    def _refill(self, now):
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def wait_time(self, amount, now):
+        """amount만큼 쓸 수 있을 때까지 기다려야 하는 시간(초)을 반환합니다."""
+        self._refill(now)
+        if self.tokens >= amount:
+            return 0.0
+        if self.rate <= 0:
+            return math.inf
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount, now):
+        """amount만큼 씁니다. 음수면 돌려받습니다 (capacity를 넘지 않음)."""
+        self._refill(now)
+        self.tokens = min(self.capacity, self.tokens - amount)
+
+class AdmissionRejected(Exception):
+    """예산이 ADMISSION_MAX_WAIT 안에 생기지 않아 요청을 거절할 때 발생합니다."""
+
+    MESSAGES = {
+        'client': "요청이 너무 잦습니다",
+        'requests': "AI 모델 분당 요청 한도에 도달했습니다",
+        'tokens': "AI 모델 분당 토큰 한도에 도달했습니다"
+    }
+
+    def __init__(self, reason, wait):
+        self.reason = reason
+        self.retry_after = max(1, math.ceil(wait)) if math.isfinite(wait) else 60
+        super().__init__(f"{self.MESSAGES[reason]}. {self.retry_after}초 후에 다시 시도해 주세요.")
+
+class Admission:
+    """입장 허가 (미리 잡아둔 토큰 수와 기다린 시간, 정산 여부)."""
+
+    def __init__(self, client_id, tokens, waited):
+        self.client_id = client_id
+        self.tokens = tokens
+        self.waited = waited
+        self.settled = False
+
+class AdmissionController:
+    """클라이언트 IP별 토큰 버킷과 Gemini 전체 분당 요청/토큰 예산으로 노트 생성 요청을 받을지 정합니다.
+
+    캐시에 없는 요청만 자막 조회 전에 검사하므로, 모델 호출에서 할당량 초과로 실패할 요청이 자막 조회를 낭비하지 않습니다.
+    예산이 max_wait 안에 생기면 잠시 기다렸다가 통과시키고, 아니면 Retry-After 초와 함께 바로 거절합니다.
+    값은 프로세스별로 관리됩니다.
+    """
+
+    def __init__(self, client_rate_per_minute=CLIENT_REQUESTS_PER_MINUTE, client_burst=CLIENT_BURST,
+                 gemini_rpm=GEMINI_RPM, gemini_tpm=GEMINI_TPM, max_wait=ADMISSION_MAX_WAIT,
+                 estimated_tokens=ADMISSION_ESTIMATED_TOKENS, max_clients=ADMISSION_MAX_CLIENTS,
+                 enabled=ADMISSION_CONTROL):
+        self.client_rate = client_rate_per_minute / 60
+        self.client_burst = client_burst
+        self.max_wait = max_wait
+        self.estimated_tokens = estimated_tokens
+        self.max_clients = max_clients
+        self.enabled = enabled
+        self.requests = TokenBucket(gemini_rpm / 60, gemini_rpm)
+        self.tokens = TokenBucket(gemini_tpm / 60, gemini_tpm)
+        self._clients = OrderedDict()
+        self._lock = threading.Lock()
+        self.admitted = 0
+        self.queued = 0
+        self.released = 0
+        self.rejected = {'client': 0, 'requests': 0, 'tokens': 0}
+
+    def _client_bucket(self, client_id, now):
+        bucket = self._clients.get(client_id)
+        if bucket is None:
+            bucket = self._clients[client_id] = TokenBucket(self.client_rate, self.client_burst, now)
+            while len(self._clients) > self.max_clients:
+                self._clients.popitem(last=False)
+        else:
+            self._clients.move_to_end(client_id)
+        return bucket
+
+    def _reserve(self, client_id, tokens, max_wait):
+        now = time.monotonic()
+        with self._lock:
+            client = self._client_bucket(client_id, now) if client_id else None
+            waits = {
+                'requests': self.requests.wait_time(1, now),
+                'tokens': self.tokens.wait_time(tokens, now)
+            }
+            if client is not None:
+                waits['client'] = client.wait_time(1, now)
+            reason = max(waits, key=waits.get)
+            wait = waits[reason]
+            if wait > max_wait:
+                self.rejected[reason] += 1
+                metrics.increment('note_admission_rejected_total', reason=reason)
+                raise AdmissionRejected(reason, wait)
+            # 모든 버킷에서 한꺼번에 예약 (하나라도 모자라면 위에서 거절)
+            if client is not None:
+                client.take(1, now)
+            self.requests.take(1, now)
+            self.tokens.take(tokens, now)
+            self.admitted += 1
+            if wait > 0:
+                self.queued += 1
+        return Admission(client_id, tokens, wait)
+
+    def _max_wait(self, deadline):
+        # 요청 마감 시간이 주어지면 남은 시간보다 오래 기다리지 않음
+        return self.max_wait if deadline is None else min(self.max_wait, deadline.remaining())
+
+    def admit(self, client_id=None, tokens=None, deadline=None):
+        """노트 생성 요청 하나를 받을지 정합니다.
+
+        client_id가 None이면(일괄 처리, 백그라운드 작업) Gemini 전체 예산만 검사합니다.
+        예산이 곧 생기면 그만큼 기다린 뒤 Admission을 반환하고, 아니면 AdmissionRejected를 발생시킵니다.
+        """
+        if not self.enabled:
+            return Admission(client_id, 0, 0.0)
+        admission = self._reserve(client_id, self.estimated_tokens if tokens is None else tokens,
+                                  self._max_wait(deadline))
+        if admission.waited > 0:
+            time.sleep(admission.waited)
+        return admission
+
+    async def admit_async(self, client_id=None, tokens=None, deadline=None):
+        """admit의 비동기 버전입니다 (기다리는 동안 이벤트 루프를 막지 않음)."""
+        import asyncio
+        if not self.enabled:
+            return Admission(client_id, 0, 0.0)
+        admission = self._reserve(client_id, self.estimated_tokens if tokens is None else tokens,
+                                  self._max_wait(deadline))
+        if admission.waited > 0:
+            await asyncio.sleep(admission.waited)
+        return admission
+
+    def settle(self, admission, processing_info):
+        """생성이 끝난 뒤 실제 입력 토큰 수(inputTokens)와 맵/공유 분석 호출 수로 예약분을 정산합니다.
+
+        처리 정보가 없으면(생성 실패) 예약분을 그대로 씁니다. 허가 하나는 한 번만 정산합니다.
+        """
+        if not self.enabled or admission is None or admission.settled:
+            return
+        admission.settled = True
+        if not processing_info:
+            return
+        input_tokens = processing_info.get('inputTokens')
+        chunk_count = processing_info.get('chunkCount') or 1
+        # 청크 요약(맵) 호출도 분당 요청 수에 포함
+        extra_requests = chunk_count if chunk_count > 1 else 0
+        if (processing_info.get('analysis') or {}).get('cache') == 'miss':
+            # 2단계 생성에서 이 요청이 실행한 공유 분석 호출
+            extra_requests += 1
+        now = time.monotonic()
+        with self._lock:
+            if input_tokens is not None:
+                self.tokens.take(input_tokens - admission.tokens, now)
+            if extra_requests:
+                self.requests.take(extra_requests, now)
+
+    def release(self, admission):
+        """Gemini를 호출하지 않고 끝난 요청의 예약분(요청 1회와 입력 토큰)을 돌려줍니다.
+
+        이미 정산했거나 돌려준 허가는 무시합니다. 클라이언트별 요청 수는 돌려주지 않습니다.
+        """
+        if not self.enabled or admission is None or admission.settled:
+            return
+        admission.settled = True
+        now = time.monotonic()
+        with self._lock:
+            self.requests.take(-1, now)
+            self.tokens.take(-admission.tokens, now)
+            self.released += 1
+
+    def stats(self):
+        """허가/대기/반납/거절 횟수와 현재 남은 Gemini 예산을 반환합니다."""
+        now = time.monotonic()
+        with self._lock:
+            self.requests._refill(now)
+            self.tokens._refill(now)
+            return {
+                'enabled': self.enabled,
+                'admitted': self.admitted,
+                'queued': self.queued,
+                'released': self.released,
+                'rejected': dict(self.rejected),
+                'clients': len(self._clients),
+                'requestsAvailable': round(self.requests.tokens, 1),
+                'tokensAvailable': round(self.tokens.tokens)
+            }
+
+# 프로세스 전역 입장 제어기
+admission = AdmissionController()
+
+def client_address(headers, remote_addr, trusted_hops=TRUSTED_PROXY_HOPS):
+    """클라이언트 ID로 쓸 주소를 반환합니다.
+
+    신뢰하는 프록시(Vercel 등) 뒤에서만 X-Forwarded-For를 쓰고, 클라이언트가 마음대로 넣을 수 있는 앞쪽 주소 대신
+    가장 바깥 프록시가 덧붙인 주소(뒤에서 trusted_hops번째)를 씁니다. 프록시가 없으면 연결 주소를 씁니다.
+    """
+    if trusted_hops <= 0 or headers is None:
+        return remote_addr
+    forwarded = [address.strip() for address in (headers.get('X-Forwarded-For') or '').split(',') if address.strip()]
+    if forwarded:
+        return forwarded[-min(trusted_hops, len(forwarded))]
+    return headers.get('X-Real-IP') or remote_addr
@@ -22,7 +22,7 @@ def api_endpoint():
         data = request.get_json()
         
         # 로그 기록
-        log_message(f"요청 데이터: {data}")
+        log_message("요청 데이터", level='debug', body=data)
         
         # 요청 데이터 검증
         if not data or 'inputType' not in data or 'inputValue' not in data:
@@ -57,7 +57,7 @@ def api_endpoint():
                 transcript_text = get_youtube_transcript(video_id)
             except Exception as e:
                 # 자막 가져오기 실패 시 사용자 친화적 오류 메시지
-                log_message(f"자막 가져오기 오류: {str(e)}")
+                log_message(f"자막 가져오기 오류: {str(e)}", level='warning')
                 return jsonify({'error': str(e)}), 400, headers
         else:  # input_type == 'text'
             # 사용자가 직접 입력한 스크립트 사용
@@ -77,7 +77,7 @@ def api_endpoint():
         
     except Exception as e:
         # 오류 로그
-        log_message(f"오류 발생: {str(e)}")
+        log_message(f"오류 발생: {str(e)}", level='error')
         
         # 오류 응답
         return jsonify({'error': str(e)}), 400, headers
\ No newline at end of file
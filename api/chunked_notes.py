@@ -0,0 +1,124 @@
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from token_budget import estimate_tokens
+from transcript_segments import TranscriptSegments, time_range_label
+
+# 맵리듀스 설정 (환경 변수로 조정 가능)
+MAP_REDUCE_ENABLED = os.environ.get("NOTES_MAP_REDUCE", "1") != "0"
+CHUNK_SIZE = int(os.environ.get("NOTES_CHUNK_SIZE", "12000"))
+CHUNK_OVERLAP = int(os.environ.get("NOTES_CHUNK_OVERLAP", "500"))
+MAP_CONCURRENCY = int(os.environ.get("NOTES_MAP_CONCURRENCY", "4"))
+
+# 문장 경계 (마침표/물음표/느낌표 뒤 공백, 또는 줄바꿈)
+_SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?。])\s+|\n+')
+
+# 부분 요약(맵 단계) 프롬프트
+MAP_PROMPT_TEMPLATE = """다음은 긴 강의 영상 스크립트의 {index}/{total}번째 부분{time_range}입니다.
+이 부분에 등장하는 핵심 개념, 정의, 사실, 예시, 전문 용어, 설명 순서를 빠짐없이 Markdown 글머리 기호로 정리해주세요.
+- 이후 전체 학습 노트를 만드는 데 사용되므로 내용을 생략하지 말고 간결하게 압축해주세요.
+- 앞뒤 부분과 겹치는 내용이 있어도 그대로 정리해주세요.
+
+---
+{chunk}
+---"""
+
+def split_transcript(text, chunk_size=CHUNK_SIZE, overlap=CHUNK_OVERLAP):
+    """스크립트를 문장 경계 기준으로 겹치는 청크들로 나눕니다.
+
+    타임스탬프가 있는 스크립트(TranscriptSegments)는 자막 조각 경계에서 나누므로 청크마다 영상 시간 구간이 남습니다.
+    """
+    if len(text) <= chunk_size:
+        return [text]
+    if isinstance(text, TranscriptSegments) and text.segment_count > 1:
+        return [chunk for chunk in text.split_chunks(chunk_size, overlap) if chunk.strip()]
+
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(start + chunk_size, len(text))
+        if end < len(text):
+            # 청크 뒷부분에서 가장 마지막 문장 경계를 찾아 자름
+            window_start = start + chunk_size // 2
+            last_boundary = None
+            for match in _SENTENCE_BOUNDARY.finditer(text, window_start, end):
+                last_boundary = match.end()
+            if last_boundary:
+                end = last_boundary
+        chunks.append(text[start:end].strip())
+        if end >= len(text):
+            break
+        start = max(end - overlap, start + 1)
+    return [chunk for chunk in chunks if chunk]
+
+def summarize_chunks(chunks, call_model, max_workers=MAP_CONCURRENCY):
+    """각 청크를 제한된 스레드 풀에서 동시에 요약하고 원래 순서대로 반환합니다."""
+    total = len(chunks)
+    prompts = [
+        MAP_PROMPT_TEMPLATE.format(index=index, total=total, time_range=time_range_label(chunk), chunk=chunk)
+        for index, chunk in enumerate(chunks, start=1)
+    ]
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, total)))
+    try:
+        return list(executor.map(call_model, prompts))
+    finally:
+        # 한 청크가 실패하거나 마감 시간이 지나면 아직 시작하지 않은 청크 요약은 취소
+        executor.shutdown(wait=False, cancel_futures=True)
+
+async def summarize_chunks_async(chunks, call_model, max_concurrency=MAP_CONCURRENCY):
+    """summarize_chunks의 비동기 버전입니다. 세마포어로 동시 호출 수를 제한합니다."""
+    import asyncio
+    total = len(chunks)
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def summarize(index, chunk):
+        async with semaphore:
+            return await call_model(MAP_PROMPT_TEMPLATE.format(index=index, total=total,
+                                                               time_range=time_range_label(chunk), chunk=chunk))
+
+    tasks = [asyncio.ensure_future(summarize(index, chunk)) for index, chunk in enumerate(chunks, start=1)]
+    try:
+        return await asyncio.gather(*tasks)
+    finally:
+        # 한 청크가 실패하거나 마감 시간이 지나면 아직 끝나지 않은 청크 요약은 취소
+        # (TaskGroup은 예외를 ExceptionGroup으로 감싸므로 호출자가 원래 예외를 받도록 직접 취소)
+        for task in tasks:
+            task.cancel()
+
+def build_reduce_input(summaries, chunks=None):
+    """부분 요약들을 최종 노트 생성(리듀스 단계)에 넣을 하나의 텍스트로 합칩니다.
+
+    chunks가 타임스탬프가 있는 청크이면 각 요약 머리에 영상 시간 구간을 붙여 노트에서 해당 구간을 가리킬 수 있게 합니다.
+    """
+    total = len(summaries)
+    chunks = chunks or [None] * total
+    sections = [
+        f"[부분 {index}/{total} 요약{time_range_label(chunk)}]\n{summary.strip()}"
+        for index, (summary, chunk) in enumerate(zip(summaries, chunks), start=1)
+    ]
+    header = f"(긴 영상이므로 전체 스크립트를 {total}개 부분으로 나누어 요약한 내용입니다.)\n\n"
+    return header + "\n\n".join(sections)
+
+def map_transcript(transcript_text, call_model, max_tokens, deadline=None):
+    """스크립트가 max_tokens(추정 토큰 수)를 넘으면 맵 단계를 실행해 리듀스 입력과 청크 수를 반환합니다.
+
+    맵리듀스가 꺼져 있거나 필요 없으면 원본 텍스트와 1을 반환합니다.
+    deadline이 주어지면 맵 단계를 시작하기 전에 마감 시간을 확인합니다.
+    """
+    if not MAP_REDUCE_ENABLED or estimate_tokens(transcript_text) <= max_tokens:
+        return transcript_text, 1
+    if deadline is not None:
+        deadline.check('map')
+    chunks = split_transcript(transcript_text)
+    summaries = summarize_chunks(chunks, call_model)
+    return build_reduce_input(summaries, chunks), len(chunks)
+
+async def map_transcript_async(transcript_text, call_model, max_tokens, deadline=None):
+    """map_transcript의 비동기 버전입니다. call_model은 코루틴 함수여야 합니다."""
+    if not MAP_REDUCE_ENABLED or estimate_tokens(transcript_text) <= max_tokens:
+        return transcript_text, 1
+    if deadline is not None:
+        deadline.check('map')
+    chunks = split_transcript(transcript_text)
+    summaries = await summarize_chunks_async(chunks, call_model)
+    return build_reduce_input(summaries, chunks), len(chunks)
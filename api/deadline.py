@@ -0,0 +1,55 @@
+import math
+import os
+import time
+
+# 요청 마감 시간 설정 (환경 변수로 조정 가능)
+# 브라우저(NoteForm.js)가 30초 뒤에 요청을 포기하므로 응답을 보낼 여유를 두고 28초를 기본값으로 사용
+REQUEST_DEADLINE_SECONDS = float(os.environ.get("REQUEST_DEADLINE_SECONDS", "28"))
+# 헤더로 요청할 수 있는 최대 마감 시간(초)
+REQUEST_DEADLINE_MAX = float(os.environ.get("REQUEST_DEADLINE_MAX", "120"))
+# 클라이언트가 남은 시간(초)을 알려주는 요청 헤더
+DEADLINE_HEADER = 'X-Request-Timeout'
+
+class DeadlineExceeded(Exception):
+    """요청 마감 시간이 지나 남은 단계를 진행하지 않을 때 발생합니다."""
+
+    def __init__(self, stage):
+        self.stage = stage
+        super().__init__(f"요청 처리 시간이 초과되었습니다 ({stage} 단계). 잠시 후 다시 시도해 주세요.")
+
+class Deadline:
+    """요청 입구에서 정한 마감 시각입니다. 각 단계는 남은 시간으로 타임아웃을 정하고, 시간이 다 되면 멈춥니다."""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self):
+        """남은 시간(초)을 반환합니다 (지났으면 0)."""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def check(self, stage):
+        """마감 시간이 지났으면 DeadlineExceeded를 발생시킵니다."""
+        if self.expired():
+            raise DeadlineExceeded(stage)
+
+    def timeout(self, stage, limit=None):
+        """stage 단계에 쓸 타임아웃(초)을 반환합니다. limit(단계 기본 타임아웃)보다 길게 주지 않습니다."""
+        self.check(stage)
+        remaining = self.remaining()
+        return remaining if limit is None else min(limit, remaining)
+
+# 요청 헤더로 마감 시간 만들기
+def deadline_from_headers(headers, default=REQUEST_DEADLINE_SECONDS):
+    """X-Request-Timeout 헤더(초)가 있으면 그 값으로, 없거나 잘못되었으면 기본값으로 마감 시간을 만듭니다."""
+    value = headers.get(DEADLINE_HEADER) if headers is not None else None
+    try:
+        seconds = float(value) if value else default
+    except ValueError:
+        seconds = default
+    if not math.isfinite(seconds):
+        seconds = default
+    return Deadline(min(max(seconds, 1.0), REQUEST_DEADLINE_MAX))
@@ -1,14 +1,33 @@
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+import asyncio
 import json
 import os
 import re
-import google.generativeai as genai
-from youtube_transcript_api import YouTubeTranscriptApi, _errors as yt_errors
-import requests
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
+from note_cache import get_note_cache, make_cache_key
+from log_writer import StructuredLogger
+from metrics import metrics, stage_timer, timed, record_deadline_exceeded, PROMETHEUS_CONTENT_TYPE
+from video_store import get_video_store
+from single_flight import transcript_flight, coalesce_generation_async, get_flight_stats
+from http_client import http_get, fetch_transcript_list, deadline_timeout, get_async_http_client, close_async_http_client
+from chunked_notes import map_transcript, map_transcript_async
+from streaming import format_sse, stream_with_fallback
+from job_queue import get_job_queue
+from model_health import call_with_fallback, call_with_fallback_async, model_health
+from token_budget import fit_prompt, transcript_token_budget
+from prompts import get_prompt_template, prepare_generation, generation_options, RENDER_PROMPT
+from shared_analysis import NOTES_TWO_PHASE, get_analysis, get_analysis_async, build_render_prompt
+from near_duplicate import find_similar_notes, remember_transcript, get_near_duplicate_index
+from note_search import index_notes, search_notes, get_note_search
+from note_export import register_export, export_note, get_note_exporter
+from transcript_cleaner import clean_transcript_segments, get_cleaning_stats
+from admission import admission, client_address, AdmissionRejected
+from deadline import Deadline, DeadlineExceeded, deadline_from_headers
 
 app = FastAPI()
 
@@ -19,19 +38,51 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # 429 응답의 Retry-After를 브라우저 코드에서 읽을 수 있게 노출
+    expose_headers=["Retry-After"],
 )
 
+# 요청 전체 처리 시간 기록 (스트리밍 응답은 응답 시작까지의 시간)
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    if request.method != "POST":
+        return await call_next(request)
+    with stage_timer('request', BACKEND_NAME):
+        return await call_next(request)
+
 # 환경 변수에서 API 키 가져오기
 GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
 
-# Gemini API 설정
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
+# Gemini SDK는 콜드 스타트를 줄이기 위해 처음 모델을 호출할 때 가져와 설정함 (genai_client.get_genai)
+
+# 학습 노트 프롬프트 템플릿 (PROMPT_VARIANT=full 또는 compact)
+NOTES_PROMPT = get_prompt_template(os.environ.get("PROMPT_VARIANT", "full"))
+
+# 캐시 키에 포함되는 프롬프트 버전과 기본 모델 (2단계 모드에서는 렌더링 템플릿 버전)
+PROMPT_VERSION = f"fastapi-{RENDER_PROMPT.version if NOTES_TWO_PHASE else NOTES_PROMPT.version}"
+MODEL_NAME = 'gemini-pro'
+# 모델 대체 순서 (앞 모델의 회로가 열려 있거나 실패하면 다음 모델 사용)
+GEMINI_MODELS = [MODEL_NAME, 'gemini-1.5-flash']
+
+# 자막 조회 전용 스레드 풀 (youtube_transcript_api는 블로킹 라이브러리)
+TRANSCRIPT_WORKERS = int(os.environ.get("TRANSCRIPT_WORKERS", "8"))
+transcript_executor = ThreadPoolExecutor(max_workers=TRANSCRIPT_WORKERS, thread_name_prefix="transcript")
 
-# 디버깅을 위한 로그 함수
-def log_message(message):
-    with open("/tmp/api_log.txt", "a") as f:
-        f.write(f"{message}\n")
+# 일괄 처리 설정 (조회 단계와 생성 단계의 동시 실행 수를 따로 제한)
+MAX_BATCH_ITEMS = int(os.environ.get("MAX_BATCH_ITEMS", "100"))
+BATCH_FETCH_CONCURRENCY = int(os.environ.get("BATCH_FETCH_CONCURRENCY", "8"))
+BATCH_GENERATE_CONCURRENCY = int(os.environ.get("BATCH_GENERATE_CONCURRENCY", "4"))
+# 일괄 처리 항목 하나의 마감 시간(초) (항목 처리를 시작할 때부터 잼)
+BATCH_ITEM_DEADLINE_SECONDS = float(os.environ.get("BATCH_ITEM_DEADLINE_SECONDS", "120"))
+
+# 로그/메트릭에 쓰는 백엔드 이름
+BACKEND_NAME = 'fastapi'
+
+# 디버깅을 위한 로그 함수 (백그라운드 스레드가 JSON 줄로 모아서 기록하므로 요청 처리를 막지 않음)
+logger = StructuredLogger(BACKEND_NAME, os.environ.get("API_LOG_PATH", "/tmp/api_log.txt"))
+
+def log_message(message, level='info', **fields):
+    logger.log(level, message, **fields)
 
 # 요청 모델 정의
 class NoteRequest(BaseModel):
@@ -39,7 +90,11 @@ class NoteRequest(BaseModel):
     inputValue: str
     learningLevel: Optional[str] = "beginner"
 
+class BatchNoteRequest(BaseModel):
+    items: List[NoteRequest]
+
 # 유튜브 비디오 ID 추출 함수
+@timed('extract_video_id', BACKEND_NAME)
 def extract_video_id(url):
     """유튜브 URL에서 비디오 ID를 추출합니다."""
     log_message(f"URL 분석 시작: {url}")
@@ -52,214 +107,282 @@ def extract_video_id(url):
     return None
 
 # 유튜브 비디오 정보 가져오기 함수
-def get_video_info(video_id):
+@timed('video_info', BACKEND_NAME)
+def get_video_info(video_id, deadline=None):
     """유튜브 비디오 ID로부터 제목과 설명을 가져옵니다."""
     log_message(f"비디오 정보 가져오기 시작: {video_id}")
+    cached = get_video_store().get_info(video_id)
+    if cached is not None:
+        return cached
+    # 요청 마감 시간이 있으면 남은 시간을 넘지 않는 타임아웃 사용
+    timeout = deadline_timeout(deadline, 'video_info')
     try:
         # YouTube Data API를 사용하려면 API 키가 필요하지만, 
         # 여기서는 간단하게 OEmbed API를 사용하여 제목을 가져오겠습니다.
         url = f"https://www.youtube.com/oembed?url=https://www.youtube.com/watch?v={video_id}&format=json"
-        response = requests.get(url)
+        response = http_get(url, timeout=timeout)
         
         if response.status_code == 200:
             data = response.json()
             title = data.get('title', f"Video_{video_id}")
             log_message(f"비디오 제목: {title}")
-            return {
+            video_info = {
                 'title': title,
                 'video_id': video_id
             }
+            get_video_store().put_info(video_id, video_info)
+            return video_info
         else:
-            log_message(f"OEmbed API 오류: {response.status_code}")
+            log_message(f"OEmbed API 오류: {response.status_code}", level='warning')
             return {
                 'title': f"Video_{video_id}",
                 'video_id': video_id
             }
     except Exception as e:
-        log_message(f"비디오 정보 가져오기 오류: {str(e)}")
+        log_message(f"비디오 정보 가져오기 오류: {str(e)}", level='warning')
         return {
             'title': f"Video_{video_id}",
             'video_id': video_id
         }
 
-# 유튜브 자막 가져오기 함수
-def get_youtube_transcript(video_id):
+# 비동기 유튜브 비디오 정보 가져오기 함수
+@timed('video_info', BACKEND_NAME)
+async def get_video_info_async(video_id, deadline=None):
+    """get_video_info의 비동기 버전입니다 (httpx 비동기 클라이언트 사용)."""
+    log_message(f"비디오 정보 비동기 가져오기 시작: {video_id}")
+    cached = get_video_store().get_info(video_id)
+    if cached is not None:
+        return cached
+    # 요청 마감 시간이 있으면 남은 시간을 넘지 않는 타임아웃 사용 (httpx는 None이면 타임아웃을 끄므로 없으면 넘기지 않음)
+    options = {'timeout': deadline.timeout('video_info')} if deadline is not None else {}
+    try:
+        url = f"https://www.youtube.com/oembed?url=https://www.youtube.com/watch?v={video_id}&format=json"
+        response = await get_async_http_client().get(url, **options)
+        
+        if response.status_code == 200:
+            data = response.json()
+            title = data.get('title', f"Video_{video_id}")
+            log_message(f"비디오 제목: {title}")
+            video_info = {
+                'title': title,
+                'video_id': video_id
+            }
+            get_video_store().put_info(video_id, video_info)
+            return video_info
+        log_message(f"OEmbed API 오류: {response.status_code}", level='warning')
+    except Exception as e:
+        log_message(f"비디오 정보 가져오기 오류: {str(e)}", level='warning')
+    return {
+        'title': f"Video_{video_id}",
+        'video_id': video_id
+    }
+
+# 유튜브 자막 조회 함수 (실제 조회, get_youtube_transcript를 통해 호출)
+def _fetch_youtube_transcript(video_id, deadline=None):
     """유튜브 비디오 ID를 통해 자막을 가져옵니다."""
+    # youtube_transcript_api는 실제로 자막을 조회할 때만 가져옴 (콜드 스타트 단축)
+    from youtube_transcript_api import _errors as yt_errors
     log_message(f"자막 가져오기 시작: {video_id}")
+    store = get_video_store()
+    cached = store.get_transcript(video_id)
+    if cached is not None:
+        log_message("자막 캐시 적중")
+        return cached
+    timeout = deadline_timeout(deadline, 'transcript')
     try:
-        transcript_list = YouTubeTranscriptApi.get_transcript(video_id, languages=['ko', 'en'])
-        transcript_text = ' '.join([item['text'] for item in transcript_list])
+        # 최근 실패한 영상은 YouTube에 다시 묻지 않고 같은 오류로 처리
+        failure = store.get_failure(video_id)
+        if failure:
+            raise getattr(yt_errors, failure)(video_id)
+        transcript_list = fetch_transcript_list(video_id, languages=['ko', 'en'], timeout=timeout)
+        # 롤링 캡션 중복, 소리 태그, 추임새, 공백을 정리해 입력 토큰을 줄임
+        transcript_text, report = clean_transcript_segments(transcript_list)
+        log_message(f"자막 정리: {report['removedChars']}자 (약 {report['removedTokens']}토큰) 제거")
         log_message(f"자막 가져오기 성공: {len(transcript_text)} 글자")
+        store.put_transcript(video_id, transcript_text)
         return transcript_text
     except yt_errors.NoTranscriptAvailable:
+        store.put_failure(video_id, 'NoTranscriptAvailable')
         log_message("자막이 제공되지 않는 비디오")
         raise HTTPException(status_code=400, detail="이 영상에는 자막이 제공되지 않습니다. 스크립트 직접 입력 방식을 이용해주세요.")
     except yt_errors.TranscriptsDisabled:
+        store.put_failure(video_id, 'TranscriptsDisabled')
         log_message("자막이 비활성화된 비디오")
         raise HTTPException(status_code=400, detail="이 영상의 자막이 비활성화되어 있습니다. 스크립트 직접 입력 방식을 이용해주세요.")
     except yt_errors.VideoUnavailable:
+        store.put_failure(video_id, 'VideoUnavailable')
         log_message("접근할 수 없는 비디오")
         raise HTTPException(status_code=400, detail="유효하지 않거나 접근할 수 없는 영상입니다.")
     except Exception as e:
-        log_message(f"자막 가져오기 중 오류: {str(e)}")
+        if deadline is not None and deadline.expired():
+            raise DeadlineExceeded('transcript') from e
+        log_message(f"자막 가져오기 중 오류: {str(e)}", level='error')
         raise HTTPException(status_code=500, detail=f"자막을 가져오는 중 오류가 발생했습니다: {str(e)}")
 
+
+# 유튜브 자막 가져오기 함수 (같은 영상에 대한 동시 조회는 하나로 합침)
+@timed('transcript', BACKEND_NAME)
+def get_youtube_transcript(video_id, deadline=None):
+    """유튜브 비디오 ID를 통해 자막을 가져옵니다. deadline이 주어지면 마감 시간까지만 기다립니다."""
+    timeout = deadline.remaining() if deadline is not None else None
+    return transcript_flight.do(video_id, _fetch_youtube_transcript, video_id, deadline, timeout=timeout)
+
+# 비동기 자막 가져오기 함수 (블로킹 라이브러리를 제한된 스레드 풀에서 실행)
+@timed('transcript', BACKEND_NAME)
+async def get_youtube_transcript_async(video_id, deadline=None):
+    """get_youtube_transcript를 전용 스레드 풀에서 실행해 이벤트 루프를 막지 않습니다."""
+    loop = asyncio.get_running_loop()
+    timeout = deadline.remaining() if deadline is not None else None
+    return await transcript_flight.do_async(video_id, loop.run_in_executor,
+                                            transcript_executor, _fetch_youtube_transcript, video_id, deadline,
+                                            timeout=timeout)
+
+# 단일 Gemini 모델 호출 함수
+def generate_with_model(model_name, prompt, timeout=None):
+    """지정한 Gemini 모델 하나로 텍스트를 생성합니다. timeout은 요청 마감 시간까지 남은 초입니다."""
+    log_message(f"{model_name} 모델 사용 시도")
+    model, contents = prepare_generation(model_name, prompt, log_message)
+    response = model.generate_content(contents, **generation_options(timeout))
+    log_message(f"{model_name} 모델 호출 성공")
+    return response.text
+
+# 단일 Gemini 모델 비동기 호출 함수
+async def generate_with_model_async(model_name, prompt, timeout=None):
+    """이벤트 루프를 막지 않고 지정한 Gemini 모델 하나로 텍스트를 생성합니다."""
+    log_message(f"{model_name} 모델 비동기 호출 시도")
+    model, contents = prepare_generation(model_name, prompt, log_message)
+    response = await model.generate_content_async(contents, **generation_options(timeout))
+    log_message(f"{model_name} 모델 비동기 호출 성공")
+    return response.text
+
+# Gemini 모델 호출 함수 (모델 상태에 따라 Pro → 1.5 Flash 순으로 대체)
+@timed('gemini', BACKEND_NAME)
+def call_gemini(prompt, processing_info=None, deadline=None):
+    """프롬프트로 Gemini 모델을 호출하고 생성된 텍스트를 반환합니다.
+
+    processing_info 딕셔너리가 주어지면 사용한 모델과 대체 사유를 기록합니다.
+    deadline이 주어지면 남은 시간 안에 끝나기 어려운 대체 모델은 건너뜁니다.
+    """
+    return call_with_fallback(GEMINI_MODELS, generate_with_model, prompt, processing_info, log_message, deadline)
+
+# 비동기 Gemini 모델 호출 함수 (모델 상태에 따라 Pro → 1.5 Flash 순으로 대체)
+@timed('gemini', BACKEND_NAME)
+async def call_gemini_async(prompt, processing_info=None, deadline=None):
+    """이벤트 루프를 막지 않고 Gemini 모델을 호출해 생성된 텍스트를 반환합니다."""
+    return await call_with_fallback_async(GEMINI_MODELS, generate_with_model_async, prompt,
+                                          processing_info, log_message, deadline)
+
+# 긴 스크립트 맵 단계 함수 (청크별 요약 후 요약본 반환)
+@timed('map', BACKEND_NAME)
+def map_long_transcript(transcript_text, processing_info, deadline=None):
+    """스크립트가 너무 길면 청크별로 동시에 요약해 리듀스 입력으로 바꿉니다."""
+    processing_info['chunkCount'] = 1
+    if not GEMINI_API_KEY:
+        return transcript_text
+    try:
+        transcript_text, chunk_count = map_transcript(transcript_text, partial(call_gemini, deadline=deadline),
+                                                      transcript_token_budget(MODEL_NAME), deadline)
+        processing_info['chunkCount'] = chunk_count
+        if chunk_count > 1:
+            log_message(f"청크 요약 완료: {chunk_count}개")
+    except DeadlineExceeded:
+        raise
+    except Exception as e:
+        log_message(f"청크 요약 실패, 잘라내기로 대체: {str(e)}")
+    return transcript_text
+
+@timed('map', BACKEND_NAME)
+async def map_long_transcript_async(transcript_text, processing_info, deadline=None):
+    """map_long_transcript의 비동기 버전입니다."""
+    processing_info['chunkCount'] = 1
+    if not GEMINI_API_KEY:
+        return transcript_text
+    try:
+        transcript_text, chunk_count = await map_transcript_async(transcript_text,
+                                                                 partial(call_gemini_async, deadline=deadline),
+                                                                 transcript_token_budget(MODEL_NAME), deadline)
+        processing_info['chunkCount'] = chunk_count
+        if chunk_count > 1:
+            log_message(f"청크 요약 완료: {chunk_count}개")
+    except DeadlineExceeded:
+        raise
+    except Exception as e:
+        log_message(f"청크 요약 실패, 잘라내기로 대체: {str(e)}")
+    return transcript_text
+
+# 학습 노트 생성 프롬프트 구성 함수
+@timed('prompt', BACKEND_NAME)
+def build_notes_prompt(transcript_text, video_info=None, learning_level='beginner', processing_info=None):
+    """자막으로 학습 노트 생성 프롬프트를 만듭니다.
+
+    스크립트는 모델 입력 토큰 예산에 맞게 문장 단위로 줄이며, processing_info에 사용한 토큰 수를 기록합니다.
+    """
+    def render_prompt(transcript_text):
+        return NOTES_PROMPT.render(transcript_text, video_info, learning_level)
+
+    return fit_prompt(render_prompt, transcript_text, MODEL_NAME, processing_info, log_message)
+
+# 2단계 모드 프롬프트 구성 함수 (영상별로 캐시된 공유 분석 결과 → 학습 레벨별 렌더링 프롬프트)
+def build_two_phase_prompt(transcript_text, video_info=None, learning_level='beginner', processing_info=None,
+                           deadline=None):
+    """공유 분석 결과(없으면 한 번 생성)로 학습 레벨에 맞는 노트 렌더링 프롬프트를 만듭니다."""
+    if processing_info is None:
+        processing_info = {}
+    analysis = get_analysis(transcript_text, video_info, MODEL_NAME, partial(call_gemini, deadline=deadline),
+                            partial(map_long_transcript, deadline=deadline), processing_info, deadline, log_message)
+    with stage_timer('prompt', BACKEND_NAME):
+        return build_render_prompt(analysis, video_info, learning_level, MODEL_NAME, processing_info, log_message)
+
+async def build_two_phase_prompt_async(transcript_text, video_info=None, learning_level='beginner', processing_info=None,
+                                       deadline=None):
+    """build_two_phase_prompt의 비동기 버전입니다."""
+    if processing_info is None:
+        processing_info = {}
+    analysis = await get_analysis_async(transcript_text, video_info, MODEL_NAME,
+                                        partial(call_gemini_async, deadline=deadline),
+                                        partial(map_long_transcript_async, deadline=deadline),
+                                        processing_info, deadline, log_message)
+    with stage_timer('prompt', BACKEND_NAME):
+        return build_render_prompt(analysis, video_info, learning_level, MODEL_NAME, processing_info, log_message)
+
+# 노트 생성 프롬프트 준비 함수 (2단계 모드면 공유 분석 → 렌더링, 아니면 맵 → 프롬프트)
+def prepare_notes_prompt(transcript_text, video_info=None, learning_level='beginner', processing_info=None,
+                         deadline=None):
+    """자막으로 노트 생성(또는 렌더링) 프롬프트를 만듭니다."""
+    if NOTES_TWO_PHASE and GEMINI_API_KEY:
+        return build_two_phase_prompt(transcript_text, video_info, learning_level, processing_info, deadline)
+    transcript_text = map_long_transcript(transcript_text, processing_info, deadline)
+    return build_notes_prompt(transcript_text, video_info, learning_level, processing_info)
+
+async def prepare_notes_prompt_async(transcript_text, video_info=None, learning_level='beginner', processing_info=None,
+                                     deadline=None):
+    """prepare_notes_prompt의 비동기 버전입니다."""
+    if NOTES_TWO_PHASE and GEMINI_API_KEY:
+        return await build_two_phase_prompt_async(transcript_text, video_info, learning_level, processing_info, deadline)
+    transcript_text = await map_long_transcript_async(transcript_text, processing_info, deadline)
+    return build_notes_prompt(transcript_text, video_info, learning_level, processing_info)
+
 # Gemini API를 사용하여 학습 노트 생성 함수
-def generate_notes_with_gemini(transcript_text, video_info=None, learning_level='beginner'):
-    """Gemini API를 사용하여 주어진 자막으로 학습 노트를 생성합니다."""
-    log_message("Gemini API 호출 시작")
-    
-    # 텍스트가 너무 길면 잘라내기 (API 한도 고려)
-    if len(transcript_text) > 30000:
-        transcript_text = transcript_text[:30000]
-        log_message("텍스트가 너무 길어 잘라냄")
-    
-    # 비디오 정보가 있으면 프롬프트에 추가
-    video_context = ""
-    if video_info:
-        video_context = f"""
-이 학습 노트는 다음 유튜브 영상을 기반으로 합니다:
-제목: {video_info.get('title', '알 수 없는 제목')}
-비디오 ID: {video_info.get('video_id', '알 수 없는 ID')}
-"""
+def generate_notes_with_gemini(transcript_text, video_info=None, learning_level='beginner', processing_info=None,
+                               deadline=None):
+    """Gemini API를 사용하여 주어진 자막으로 학습 노트를 생성합니다.
 
-    # 학습 레벨 설정
-    level_context = ""
-    if learning_level == 'advanced':
-        level_context = """
-이 학습 노트는 고급 학습자를 위해 작성됩니다. 다음 지침을 따라주세요:
-- 더 깊이 있는 개념 설명과 고급 이론을 포함해주세요
-- 실제 활용 사례와 응용 방법을 더 상세히 제시해주세요
-- 해당 분야의 전문 용어와 관련 학술적 개념을 적절히 포함해주세요
-- 자기 평가 질문은 비판적 사고와 분석적 능력을 측정할 수 있는 것으로 구성해주세요
-"""
-    else:  # beginner
-        level_context = """
-이 학습 노트는 초보 학습자를 위해 작성됩니다. 다음 지침을 따라주세요:
-- 기본 개념과 원리를 쉽게 이해할 수 있도록 설명해주세요
-- 복잡한 용어는 간단한 설명과 예시를 함께 제공해주세요
-- 실생활에서 쉽게 이해할 수 있는 예시를 포함해주세요
-- 자기 평가 질문은 기본 이해도를 측정할 수 있는 간단한 것으로 구성해주세요
-"""
-    
-    prompt = f"""# 유튜브 대본 티칭 머신
-
-## 역할: 적응형 교육 합성기
-귀하는 YouTube 원본 스크립트를 최적화된 학습 자료로 변환하는 전문 교육 콘텐츠 처리 전문가입니다. 고급 교육 프레임워크를 활용합니다.
-
-{video_context}
-
-{level_context}
-
-## 역량  
-1.  **콘텐츠 분석 및 추출**  
-    - 필사본에서 핵심 개념, 사실, 이론 및 방법론 추출  
-    - 개념적 계층과 지식 구조를 식별합니다.  
-    - 강사의 교육 접근 방식과 방법을 인식합니다.  
-    - 관련 없는 내용, 불필요한 단어, 반복을 걸러냅니다.  
-    - 검증을 위해 잠재적인 부정확성이나 뒷받침되지 않는 주장을 표시합니다.  
-2.  **교육 구조 조정**  
-    - 교육 모범 사례에 따라 콘텐츠를 구성합니다.  
-    - 콘텐츠에 기반한 명확한 학습 목표 개발  
-    - 논리적인 지식 진행(기초 → 고급)을 생성합니다.  
-    - 잠재적인 혼란 지점을 식별하고 명확히 합니다.  
-    - 복잡한 주제를 관리 가능한 학습 단위로 나누세요  
-3.  **학습 스타일 적응**  
-    - 다양한 인지적 접근 방식(분석적, 실용적, 창의적)에 적응  
-    - 다양한 지능 유형(논리, 언어, 공간 등)에 맞춰 조정 가능  
-    - 다양한 주의 지속 시간과 처리 속도에 맞게 조정  
-    - 도전적인 개념에 대한 대체 설명 제공
-
-## 프로세스  
-1.  **입력 분석**  
-    - 주제, 범위, 복잡성 및 구조를 파악하기 위해 대본을 검토합니다.  
-    - 교육 수준 및 선행 지식 확인  
-    - 영상에서 사용된 원래의 교육 방식을 평가합니다.  
-    - 원본 자료의 장점과 한계를 인식합니다.  
-    - 필사본 품질을 평가하고 차이점이나 모호한 부분을 해결합니다.  
-2.  **학습자 프로필 통합** (이 부분은 현재 MVP에서는 사용자 입력을 받지 않으므로, 일반적인 학습자 기준으로 처리해주세요.)  
-    - 학습자의 특정 요구 사항, 목표 및 선호도를 고려합니다.  
-    - 현재 지식 수준과 학습 맥락에 맞게 조정  
-    - 학습 가능한 시간과 리소스를 최적화합니다.  
-    - 언급된 경우 특정 학습 과제를 설명하십시오.  
-    - 인지 부하 기능에 맞춰 콘텐츠 복잡성 조정  
-3.  **콘텐츠 변환**  
-    - 교육 자료를 일관된 교육 구조로 재구성합니다.  
-    - 비유와 예를 통해 복잡한 개념을 단순화합니다.  
-    - 불분명하거나 충분히 설명되지 않은 사항에 대해 자세히 설명하십시오.  
-    - 새로운 정보를 기존 지식 프레임워크에 연결합니다.  
-    - 사실의 정확성을 확인하고 추가 조사가 필요한 주장을 기록하세요.  
-4.  **출력 생성**  
-    - 가장 적합한 형식으로 기본 학습 자료를 만듭니다.  
-    - 강화를 위한 보충 자료 개발  
-    - 메타인지적 요소(반성 촉구, 자기 평가)를 포함합니다.  
-    - 추가 탐색 및 적용을 위한 지침 제공  
-5.  **품질 평가**  
-    - 생성된 자료의 교육적 효과를 평가합니다.  
-    - 남아 있는 격차나 불분명한 설명을 식별합니다.  
-    - 표시된 부정확한 내용이 적절하게 처리되었는지 확인합니다.  
-    - 모든 학습 목표가 적절하게 다루어졌는지 확인하세요.
-
-## 필사본 품질 처리  
-다양한 품질의 대본을 작업할 때:  
-1.  **고품질 성적증명서**: 교육 최적화에 중점을 두고 표준 프로세스를 진행합니다.  
-2.  **미완료 성적증명서의 경우**:  
-    - 지식 격차를 파악하고 명확하게 기록합니다.  
-    - 누락된 정보에 대한 보충 자료를 제안합니다.  
-    - 사용 가능한 콘텐츠를 논리적으로 연결하여 일관성을 유지합니다.  
-3.  **기술적/복잡한 사본의 경우**:  
-    - 복잡한 용어를 추가 설명으로 분석합니다.  
-    - 단순화된 비유와 시각적 표현을 사용하세요  
-    - 기술 용어의 어휘집을 제공합니다.  
-    - 학습자의 다양한 역량에 맞춰 점진적으로 복잡도를 높여줍니다.  
-4.  **잠재적으로 부정확한 콘텐츠**:  
-    - 의심스럽거나 근거가 없는 주장을 신고하세요.  
-    - 진술이 확립된 지식과 충돌하는 경우 주의하세요  
-    - 적절한 경우 검증 소스를 제안합니다.  
-    - 확립된 사실과 화자의 의견을 구별합니다.
-
-## 출력 구조 (이 구조에 맞춰 Markdown 형식으로 결과를 생성해주세요):  
-1.  **학습 목표**  
-    - 이 자료에서 배울 내용  
-2.  **핵심 개념**  
-    - 명확한 설명과 함께 제시된 필수 아이디어  
-3.  **개념 지도**  
-    - 아이디어가 연결되는 방식을 보여주는 ASCII 시각적 표현 (Markdown 코드 블록으로 표현 가능)  
-4.  **자세한 분석**  
-    - 콘텐츠에 대한 체계적인 설명  
-5.  **요약**  
-    - 가장 중요한 요점에 대한 간략한 검토  
-6.  **응용**  
-    - 이 지식을 실제로 사용하는 방법  
-7.  **자체 평가**  
-    - 이해도를 확인하기 위한 질문
-
----
-{transcript_text}
----
-
-위 스크립트(또는 스크립트 부재 정보)를 바탕으로, 앞서 정의된 "## 역할", "## 역량", "## 프로세스", "## 필사본 품질 처리"를 고려하여 "## 출력 구조"에 따라 교육적인 학습 노트를 Markdown 형식으로 작성해주십시오."""
+    processing_info 딕셔너리가 주어지면 처리한 청크 수 등의 처리 정보를 기록합니다.
+    deadline(요청 마감 시간)이 지나면 남은 단계를 멈추고 DeadlineExceeded를 발생시킵니다.
+    """
+    log_message("Gemini API 호출 시작")
+    if processing_info is None:
+        processing_info = {}
 
     if not GEMINI_API_KEY:
         log_message("API 키 없음")
         raise HTTPException(status_code=500, detail="GEMINI_API_KEY가 설정되어 있지 않습니다. 환경 변수를 확인하세요.")
 
     try:
-        # API 키가 있을 때만 실제 Gemini API 호출
+        # API 키가 있을 때만 실제 Gemini API 호출 (2단계 모드의 공유 분석 호출도 프롬프트 준비 중에 실행)
         if GEMINI_API_KEY:
-            try:
-                log_message("Gemini Pro 모델 사용 시도")
-                model = genai.GenerativeModel('gemini-pro')
-                response = model.generate_content(prompt)
-                log_message("Gemini API 호출 성공")
-                return response.text
-            except Exception as api_error:
-                log_message(f"Gemini Pro 모델 오류: {str(api_error)}, 1.5 Flash 모델로 대체")
-                # Pro 모델이 실패하면 1.5 모델로 시도
-                model = genai.GenerativeModel('gemini-1.5-flash')
-                response = model.generate_content(prompt)
-                log_message("Gemini 1.5 Flash API 호출 성공")
-                return response.text
+            prompt = prepare_notes_prompt(transcript_text, video_info, learning_level, processing_info, deadline)
+            return call_gemini(prompt, processing_info, deadline)
         else:
             # API 키가 없을 때는 간단한 노트 생성
             log_message("API 키 없음 - 간단한 노트 생성")
@@ -281,53 +404,149 @@ def generate_notes_with_gemini(transcript_text, video_info=None, learning_level=
 ## 자체 평가
 - 학습 내용을 잘 이해했는지 확인하는 질문
 """
+    except DeadlineExceeded:
+        raise
     except Exception as e:
-        log_message(f"노트 생성 중 오류: {str(e)}")
+        log_message(f"노트 생성 중 오류: {str(e)}", level='error')
         raise HTTPException(status_code=500, detail=f"학습 노트 생성 중 오류가 발생했습니다: {str(e)}")
 
-@app.post("/api")
-async def generate_notes(request: NoteRequest):
+# 동시 실행 수 제한 도우미 (세마포어가 없으면 바로 실행)
+async def run_limited(semaphore, awaitable):
+    if semaphore is None:
+        return await awaitable
+    async with semaphore:
+        return await awaitable
+
+# 입장 거절 응답 본문
+def admission_error_detail(error):
+    return {
+        "error": str(error),
+        "errorType": "QUOTA_EXCEEDED",
+        "retryAfter": error.retry_after,
+        "recommendationText": "서버가 현재 많은 요청을 처리 중입니다. 잠시 후 다시 시도해주세요."
+    }
+
+# 입장 제어 함수 (예산이 곧 생기면 기다리고, 아니면 429와 Retry-After로 거절)
+async def admit_generation(client_id, deadline=None):
+    """캐시에 없는 요청이 자막 조회와 Gemini 호출을 시작해도 되는지 확인합니다."""
     try:
-        input_type = request.inputType
-        input_value = request.inputValue
-        learning_level = request.learningLevel
+        return await admission.admit_async(client_id, deadline=deadline)
+    except AdmissionRejected as e:
+        log_message(f"입장 거절 ({e.reason}), {e.retry_after}초 후 재시도 안내", level='warning')
+        raise HTTPException(status_code=429, detail=admission_error_detail(e),
+                            headers={"Retry-After": str(e.retry_after)})
+
+# 노트 생성 파이프라인 (비디오 ID 추출 → 정보/자막 조회 → 노트 생성)
+async def run_note_pipeline(input_type, input_value, learning_level, fetch_semaphore=None, generate_semaphore=None,
+                            client_id=None, deadline=None):
+    """하나의 노트 요청을 처리해 응답 딕셔너리를 반환합니다. 실패하면 HTTPException을 발생시킵니다.
+
+    fetch_semaphore/generate_semaphore가 주어지면 조회 단계와 생성 단계의 동시 실행 수를 각각 제한합니다.
+    client_id(클라이언트 IP)가 주어지면 클라이언트별 요청 한도도 적용합니다.
+    deadline(요청 마감 시간)이 주어지면 각 단계의 대기 시간과 모델 대체를 남은 시간에 맞춥니다.
+    """
+    # 입력 타입에 따라 처리
+    transcript_text = ""
+    video_title = "유튜브_학습"
+    
+    # 같은 캐시 키로 동시에 들어온 생성 요청은 하나의 Gemini 호출로 합침
+    async def generate(*args, **kwargs):
+        return await run_limited(generate_semaphore, generate_notes_with_gemini_async(*args, **kwargs))
+    
+    if input_type == 'url':
+        # URL에서 비디오 ID 추출
+        video_id = extract_video_id(input_value)
+        if not video_id:
+            raise HTTPException(status_code=400, detail="유효한 유튜브 URL이 아닙니다.")
         
-        # 입력 타입에 따라 처리
-        transcript_text = ""
-        video_title = "유튜브_학습"
+        # 캐시 확인 (자막 조회와 Gemini 호출 생략)
+        cache_key = make_cache_key(video_id=video_id, learning_level=learning_level,
+                                   prompt_version=PROMPT_VERSION, model_name=MODEL_NAME)
+        cached = get_note_cache().get(cache_key)
+        if cached:
+            log_message(f"노트 캐시 적중: {video_id}")
+            return cached
+        ticket = await admit_generation(client_id, deadline)
         
-        if input_type == 'url':
-            # URL에서 비디오 ID 추출
-            video_id = extract_video_id(input_value)
-            if not video_id:
-                raise HTTPException(status_code=400, detail="유효한 유튜브 URL이 아닙니다.")
-            
-            # 비디오 정보 가져오기
-            video_info = get_video_info(video_id)
-            video_title = video_info.get('title', f"Video_{video_id}")
-            
-            # 유튜브 자막 가져오기
-            transcript_text = get_youtube_transcript(video_id)
-            
-            # 학습 노트 생성
-            markdown_content = generate_notes_with_gemini(transcript_text, video_info, learning_level)
-        else:  # input_type == 'text'
-            # 사용자가 직접 입력한 스크립트 사용
-            transcript_text = input_value
-            
-            # 학습 노트 생성
-            markdown_content = generate_notes_with_gemini(transcript_text, None, learning_level)
+        # 비디오 정보와 유튜브 자막을 동시에 가져오기
+        try:
+            video_info, transcript_text = await run_limited(fetch_semaphore, asyncio.gather(
+                get_video_info_async(video_id, deadline),
+                get_youtube_transcript_async(video_id, deadline)
+            ))
+        except BaseException:
+            # 자막 조회에 실패하면(마감 시간 초과, 취소 포함) Gemini를 호출하지 않으므로 예약분을 돌려줌
+            admission.release(ticket)
+            raise
+        video_title = video_info.get('title', f"Video_{video_id}")
+        
+        # 학습 노트 생성
+        markdown_content, processing_info = await coalesce_generation_async(
+            cache_key, generate, transcript_text, video_info, learning_level, deadline=deadline, ticket=ticket)
+    else:  # input_type == 'text'
+        # 사용자가 직접 입력한 스크립트 사용
+        transcript_text = input_value
         
+        # 캐시 확인
+        cache_key = make_cache_key(transcript_text=transcript_text, learning_level=learning_level,
+                                   prompt_version=PROMPT_VERSION, model_name=MODEL_NAME)
+        # 거의 같은 스크립트(줄바꿈, 도입부 차이 등)로 만든 노트도 재사용
+        cached = get_note_cache().get(cache_key) or find_similar_notes(transcript_text, cache_key)
+        if cached:
+            log_message("노트 캐시 적중: 직접 입력 텍스트")
+            return cached
+        ticket = await admit_generation(client_id, deadline)
+        
+        # 학습 노트 생성
+        markdown_content, processing_info = await coalesce_generation_async(
+            cache_key, generate, transcript_text, None, learning_level, deadline=deadline, ticket=ticket)
+    
+    result = {
+        "markdownContent": markdown_content,
+        "videoTitle": video_title,
+        "processingInfo": processing_info
+    }
+    register_export(result)
+    get_note_cache().set(cache_key, result)
+    if input_type != 'url':
+        remember_transcript(transcript_text, cache_key)
+    index_notes(cache_key, result, transcript_text)
+    return result
+
+# 마감 시간 초과 응답 본문
+def deadline_error_detail(error):
+    return {
+        "error": str(error),
+        "errorType": "DEADLINE_EXCEEDED",
+        "stage": error.stage,
+        "recommendationText": "처리 시간이 너무 오래 걸렸습니다. 잠시 후 다시 시도하거나 더 짧은 영상으로 시도해 보세요."
+    }
+
+def deadline_exceeded_error(error):
+    log_message(f"마감 시간 초과로 요청 중단 ({error.stage} 단계)", level='warning')
+    record_deadline_exceeded(BACKEND_NAME, error.stage)
+    return HTTPException(status_code=504, detail=deadline_error_detail(error))
+
+@app.post("/api")
+async def generate_notes(request: NoteRequest, http_request: Request):
+    client_id = client_address(http_request.headers, http_request.client.host if http_request.client else None)
+    # 요청 마감 시간 (X-Request-Timeout 헤더 또는 기본값), 지나면 진행 중인 조회/모델 호출을 취소
+    deadline = deadline_from_headers(http_request.headers)
+    try:
         # 성공 응답
-        return {
-            "markdownContent": markdown_content,
-            "videoTitle": video_title
-        }
+        return await asyncio.wait_for(
+            run_note_pipeline(request.inputType, request.inputValue, request.learningLevel,
+                              client_id=client_id, deadline=deadline),
+            deadline.remaining())
     except HTTPException as e:
         # FastAPI HTTP 예외
         raise e
+    except DeadlineExceeded as e:
+        raise deadline_exceeded_error(e)
+    except asyncio.TimeoutError:
+        raise deadline_exceeded_error(DeadlineExceeded('request'))
     except Exception as e:
-        log_message(f"처리 중 오류 발생: {str(e)}")
+        log_message(f"처리 중 오류 발생: {str(e)}", level='error')
         raise HTTPException(
             status_code=500, 
             detail={
@@ -338,6 +557,229 @@ async def generate_notes(request: NoteRequest):
             }
         )
 
+# 여러 URL/스크립트 일괄 처리 (NDJSON 스트리밍)
+async def batch_result_lines(items, client_id=None):
+    """각 항목이 끝나는 순서대로 결과를 한 줄짜리 JSON으로 돌려주고, 마지막에 요약 줄을 보냅니다.
+
+    캐시에 없는 항목은 하나하나가 client_id(클라이언트 IP)의 요청 한도를 씁니다 (한도를 넘은 항목은 429 줄).
+    """
+    fetch_semaphore = asyncio.Semaphore(BATCH_FETCH_CONCURRENCY)
+    generate_semaphore = asyncio.Semaphore(BATCH_GENERATE_CONCURRENCY)
+    # 대기열에서 기다리는 시간이 항목의 마감 시간을 쓰지 않도록 처리 중인 항목 수도 제한
+    item_semaphore = asyncio.Semaphore(BATCH_FETCH_CONCURRENCY)
+    
+    async def process(index, item):
+        try:
+            async with item_semaphore:
+                deadline = Deadline(BATCH_ITEM_DEADLINE_SECONDS)
+                result = await asyncio.wait_for(
+                    run_note_pipeline(item.inputType, item.inputValue, item.learningLevel,
+                                      fetch_semaphore, generate_semaphore, client_id=client_id, deadline=deadline),
+                    deadline.remaining())
+            return {"index": index, "ok": True, **result}
+        except HTTPException as e:
+            return {"index": index, "ok": False, "status": e.status_code, "error": e.detail}
+        except DeadlineExceeded as e:
+            record_deadline_exceeded(BACKEND_NAME, e.stage)
+            return {"index": index, "ok": False, "status": 504, "error": deadline_error_detail(e)}
+        except asyncio.TimeoutError:
+            record_deadline_exceeded(BACKEND_NAME, 'request')
+            return {"index": index, "ok": False, "status": 504,
+                    "error": deadline_error_detail(DeadlineExceeded('request'))}
+        except Exception as e:
+            log_message(f"일괄 처리 항목 {index} 오류: {str(e)}", level='error')
+            return {"index": index, "ok": False, "status": 500, "error": str(e)}
+    
+    tasks = [asyncio.create_task(process(index, item)) for index, item in enumerate(items)]
+    succeeded = 0
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            line = await next_done
+            succeeded += 1 if line["ok"] else 0
+            yield json.dumps(line, ensure_ascii=False) + "\n"
+        yield json.dumps({"done": True, "total": len(items), "succeeded": succeeded,
+                          "failed": len(items) - succeeded}, ensure_ascii=False) + "\n"
+    finally:
+        # 클라이언트 연결이 끊기면 남은 작업 취소
+        for task in tasks:
+            task.cancel()
+
+@app.post("/api/batch")
+async def generate_notes_batch(request: BatchNoteRequest, http_request: Request):
+    if not request.items:
+        raise HTTPException(status_code=400, detail="items가 비어 있습니다.")
+    if len(request.items) > MAX_BATCH_ITEMS:
+        raise HTTPException(status_code=400, detail=f"한 번에 최대 {MAX_BATCH_ITEMS}개까지 요청할 수 있습니다.")
+    log_message(f"일괄 요청 받음: {len(request.items)}개")
+    client_id = client_address(http_request.headers, http_request.client.host if http_request.client else None)
+    return StreamingResponse(batch_result_lines(request.items, client_id), media_type="application/x-ndjson")
+
+# 비동기 학습 노트 생성 함수
+async def generate_notes_with_gemini_async(transcript_text, video_info=None, learning_level='beginner', processing_info=None,
+                                           deadline=None):
+    """generate_notes_with_gemini의 비동기 버전입니다."""
+    log_message("Gemini API 비동기 호출 시작")
+    if processing_info is None:
+        processing_info = {}
+    if not GEMINI_API_KEY:
+        log_message("API 키 없음")
+        raise HTTPException(status_code=500, detail="GEMINI_API_KEY가 설정되어 있지 않습니다. 환경 변수를 확인하세요.")
+    
+    try:
+        prompt = await prepare_notes_prompt_async(transcript_text, video_info, learning_level, processing_info, deadline)
+        return await call_gemini_async(prompt, processing_info, deadline)
+    except DeadlineExceeded:
+        raise
+    except Exception as e:
+        log_message(f"노트 생성 중 오류: {str(e)}", level='error')
+        raise HTTPException(status_code=500, detail=f"학습 노트 생성 중 오류가 발생했습니다: {str(e)}")
+
+# 스트리밍 노트 생성 (SSE)
+def stream_notes_events(input_type, input_value, learning_level, client_id=None, deadline=None):
+    """노트 생성 과정을 SSE 이벤트(start → chunk... → done 또는 error)로 돌려줍니다."""
+    yield format_sse("start", {"learningLevel": learning_level})
+    ticket = None
+    try:
+        video_title = "유튜브_학습"
+        video_info = None
+        processing_info = {}
+        
+        if input_type == 'url':
+            video_id = extract_video_id(input_value)
+            if not video_id:
+                yield format_sse("error", {"error": "유효한 유튜브 URL이 아닙니다.", "errorType": "INVALID_URL"})
+                return
+            cache_key = make_cache_key(video_id=video_id, learning_level=learning_level,
+                                       prompt_version=PROMPT_VERSION, model_name=MODEL_NAME)
+        else:
+            video_id = None
+            cache_key = make_cache_key(transcript_text=input_value, learning_level=learning_level,
+                                       prompt_version=PROMPT_VERSION, model_name=MODEL_NAME)
+        
+        # 캐시 적중 시 전체 노트를 한 번에 전송
+        cached = get_note_cache().get(cache_key)
+        if not cached and not video_id:
+            cached = find_similar_notes(input_value, cache_key)
+        if cached:
+            log_message("노트 캐시 적중 (스트리밍)")
+            yield format_sse("chunk", {"text": cached["markdownContent"]})
+            yield format_sse("done", {"videoTitle": cached["videoTitle"],
+                                      "processingInfo": {**cached.get("processingInfo", {}), "cacheHit": True}})
+            return
+        
+        try:
+            ticket = admission.admit(client_id, deadline=deadline)
+        except AdmissionRejected as e:
+            log_message(f"입장 거절 ({e.reason}, 스트리밍)", level='warning')
+            yield format_sse("error", admission_error_detail(e))
+            return
+        
+        if video_id:
+            video_info = get_video_info(video_id, deadline)
+            video_title = video_info.get('title', f"Video_{video_id}")
+            transcript_text = get_youtube_transcript(video_id, deadline)
+        else:
+            transcript_text = input_value
+        
+        if not GEMINI_API_KEY:
+            yield format_sse("error", {"error": "GEMINI_API_KEY가 설정되어 있지 않습니다. 환경 변수를 확인하세요.",
+                                       "errorType": "API_ERROR"})
+            return
+        
+        parts = []
+        try:
+            prompt = prepare_notes_prompt(transcript_text, video_info, learning_level, processing_info, deadline)
+            for text in stream_with_fallback(GEMINI_MODELS, prompt, processing_info, log_message, deadline):
+                parts.append(text)
+                yield format_sse("chunk", {"text": text})
+        finally:
+            # 모델 호출을 시작한 뒤에는 실패해도 예약분을 정산 (돌려주지 않음)
+            admission.settle(ticket, processing_info)
+        
+        result = {
+            "markdownContent": "".join(parts),
+            "videoTitle": video_title,
+            "processingInfo": processing_info
+        }
+        register_export(result)
+        get_note_cache().set(cache_key, result)
+        if not video_id:
+            remember_transcript(transcript_text, cache_key)
+        index_notes(cache_key, result, transcript_text)
+        yield format_sse("done", {"videoTitle": video_title, "processingInfo": processing_info,
+                                   "noteId": result.get("noteId")})
+    except HTTPException as e:
+        yield format_sse("error", {"error": e.detail, "errorType": "API_ERROR"})
+    except DeadlineExceeded as e:
+        log_message(f"마감 시간 초과로 스트리밍 중단 ({e.stage} 단계)", level='warning')
+        record_deadline_exceeded(BACKEND_NAME, e.stage)
+        yield format_sse("error", deadline_error_detail(e))
+    except Exception as e:
+        log_message(f"스트리밍 처리 중 오류 발생: {str(e)}", level='error')
+        yield format_sse("error", {"error": str(e), "errorType": "API_ERROR"})
+    finally:
+        # 자막 조회 실패, 마감 시간 초과, 연결 끊김 등으로 Gemini를 호출하지 않고 끝난 요청은 예약분을 돌려줌
+        admission.release(ticket)
+
+@app.post("/api/stream")
+async def generate_notes_stream(request: NoteRequest, http_request: Request):
+    client_id = client_address(http_request.headers, http_request.client.host if http_request.client else None)
+    deadline = deadline_from_headers(http_request.headers)
+    return StreamingResponse(
+        stream_notes_events(request.inputType, request.inputValue, request.learningLevel, client_id, deadline),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# 백그라운드 작업 (job_worker.py 워커 프로세스가 처리)
+@app.post("/api/jobs", status_code=202)
+async def enqueue_note_job(request: NoteRequest):
+    job_id = get_job_queue().enqueue({
+        "inputType": request.inputType,
+        "inputValue": request.inputValue,
+        "learningLevel": request.learningLevel
+    })
+    log_message(f"작업 등록: {job_id}")
+    return {"jobId": job_id, "status": "queued"}
+
+@app.get("/api/jobs/{job_id}")
+async def get_note_job(job_id: str):
+    job = get_job_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="작업을 찾을 수 없습니다.")
+    return job
+
+@app.on_event("shutdown")
+async def close_clients():
+    await close_async_http_client()
+    transcript_executor.shutdown(wait=False)
+
+# 생성한 노트/스크립트 전문 검색
+@app.get("/api/search")
+async def search_generated_notes(q: str = "", level: Optional[str] = None, limit: int = 10):
+    try:
+        return search_notes(q, level, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail={"error": str(e), "errorType": "INVALID_QUERY"})
+
+# 생성한 노트의 HTML/PDF 내보내기 (렌더링한 파일은 캐시에서 바로 보냄)
+@app.get("/api/notes/{note_id}.{export_format}")
+async def export_generated_note(note_id: str, export_format: str, request: Request):
+    # 처음 내려받는 노트의 렌더링은 이벤트 루프를 막지 않도록 스레드에서
+    loop = asyncio.get_running_loop()
+    status, body, headers = await loop.run_in_executor(
+        None, export_note, note_id, export_format, request.headers.get("if-none-match"))
+    return Response(body, status_code=status, headers=headers)
+
 @app.get("/api/health")
 async def health_check():
-    return {"status": "ok", "message": "API is running"} 
\ No newline at end of file
+    return {"status": "ok", "message": "API is running", "noteCache": get_note_cache().stats(),
+            "singleFlight": get_flight_stats(), "models": model_health.stats(),
+            "transcriptCleaning": get_cleaning_stats(), "logging": logger.stats(),
+            "latency": metrics.snapshot(), "admission": admission.stats(),
+            "nearDuplicate": get_near_duplicate_index().stats(), "search": get_note_search().stats(),
+            "export": get_note_exporter().stats()}
+
+@app.get("/api/metrics")
+async def prometheus_metrics():
+    return Response(metrics.render_prometheus(), media_type=PROMETHEUS_CONTENT_TYPE) 
\ No newline at end of file
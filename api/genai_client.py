@@ -0,0 +1,23 @@
+import os
+import threading
+
+# google.generativeai 모듈 (첫 사용 시 가져와서 API 키 설정)
+_genai = None
+_genai_lock = threading.Lock()
+
+def get_genai():
+    """API 키가 설정된 google.generativeai 모듈을 반환합니다.
+
+    SDK는 가져오는 데만 수백 ms가 걸리므로 모듈 로드 시점이 아니라 처음 모델을 부를 때 가져옵니다.
+    그래서 OPTIONS 요청이나 캐시된 응답만 처리하는 콜드 스타트는 SDK 로드 비용을 내지 않습니다.
+    """
+    global _genai
+    if _genai is None:
+        with _genai_lock:
+            if _genai is None:
+                import google.generativeai as genai
+                api_key = os.environ.get("GEMINI_API_KEY")
+                if api_key:
+                    genai.configure(api_key=api_key)
+                _genai = genai
+    return _genai
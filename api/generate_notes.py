@@ -2,24 +2,52 @@ from flask import Flask, request, jsonify
 import json
 import os
 import re
-import google.generativeai as genai
-from youtube_transcript_api import YouTubeTranscriptApi, _errors as yt_errors
+from functools import partial
+from note_cache import get_note_cache, make_cache_key
+from log_writer import StructuredLogger
+from metrics import metrics, stage_timer, timed, record_deadline_exceeded, PROMETHEUS_CONTENT_TYPE
+from video_store import get_video_store
+from single_flight import transcript_flight, coalesce_generation
+from http_client import http_get, fetch_transcript_list, deadline_timeout
+from chunked_notes import map_transcript
+from model_health import call_with_fallback
+from token_budget import fit_prompt, transcript_token_budget
+from prompts import get_prompt_template, prepare_generation, generation_options, RENDER_PROMPT
+from shared_analysis import NOTES_TWO_PHASE, get_analysis, build_render_prompt
+from near_duplicate import find_similar_notes, remember_transcript
+from note_search import index_notes, search_notes
+from note_export import register_export, export_note
+from transcript_cleaner import clean_transcript_segments
+from admission import admission, client_address, AdmissionRejected
+from deadline import DeadlineExceeded, deadline_from_headers
 
 app = Flask(__name__)
 
 # 환경 변수에서 API 키 가져오기
 GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
 
-# Gemini API 설정
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
+# Gemini SDK는 콜드 스타트를 줄이기 위해 처음 모델을 호출할 때 가져와 설정함 (genai_client.get_genai)
 
-# 디버깅을 위한 로그 함수
-def log_message(message):
-    with open("/tmp/api_log.txt", "a") as f:
-        f.write(f"{message}\n")
+# 학습 노트 프롬프트 템플릿 (PROMPT_VARIANT=full 또는 compact)
+NOTES_PROMPT = get_prompt_template(os.environ.get("PROMPT_VARIANT", "full"))
+
+# 캐시 키에 포함되는 프롬프트 버전과 기본 모델 (2단계 모드에서는 렌더링 템플릿 버전)
+PROMPT_VERSION = f"generate-notes-{RENDER_PROMPT.version if NOTES_TWO_PHASE else NOTES_PROMPT.version}"
+MODEL_NAME = 'gemini-pro'
+# 모델 대체 순서 (앞 모델의 회로가 열려 있거나 실패하면 다음 모델 사용)
+GEMINI_MODELS = [MODEL_NAME, 'gemini-1.5-flash']
+
+# 로그/메트릭에 쓰는 백엔드 이름
+BACKEND_NAME = 'generate-notes'
+
+# 디버깅을 위한 로그 함수 (백그라운드 스레드가 JSON 줄로 모아서 기록하므로 요청 처리를 막지 않음)
+logger = StructuredLogger(BACKEND_NAME, os.environ.get("API_LOG_PATH", "/tmp/api_log.txt"))
+
+def log_message(message, level='info', **fields):
+    logger.log(level, message, **fields)
 
 # 유튜브 비디오 ID 추출 함수
+@timed('extract_video_id', BACKEND_NAME)
 def extract_video_id(url):
     """유튜브 URL에서 비디오 ID를 추출합니다."""
     log_message(f"URL 분석 시작: {url}")
@@ -32,173 +60,163 @@ def extract_video_id(url):
     return None
 
 # 유튜브 비디오 제목 가져오기 함수
-def get_video_title(video_id):
+@timed('video_info', BACKEND_NAME)
+def get_video_title(video_id, deadline=None):
     """유튜브 비디오 ID로부터 제목을 가져옵니다."""
+    cached = get_video_store().get_info(video_id)
+    if cached is not None:
+        return cached['title']
+    # 요청 마감 시간이 있으면 남은 시간을 넘지 않는 타임아웃 사용
+    timeout = deadline_timeout(deadline, 'video_info')
     try:
         # YouTube Data API를 사용하려면 API 키가 필요하지만, 
         # 여기서는 간단하게 OEmbed API를 사용하여 제목을 가져오겠습니다.
-        import requests
         url = f"https://www.youtube.com/oembed?url=https://www.youtube.com/watch?v={video_id}&format=json"
-        response = requests.get(url)
+        response = http_get(url, timeout=timeout)
         
         if response.status_code == 200:
             data = response.json()
             title = data.get('title', f"Video_{video_id}")
             log_message(f"비디오 제목: {title}")
+            get_video_store().put_info(video_id, {'title': title, 'video_id': video_id})
             return title
         else:
-            log_message(f"OEmbed API 오류: {response.status_code}")
+            log_message(f"OEmbed API 오류: {response.status_code}", level='warning')
             return f"Video_{video_id}"
     except Exception as e:
-        log_message(f"비디오 정보 가져오기 오류: {str(e)}")
+        log_message(f"비디오 정보 가져오기 오류: {str(e)}", level='warning')
         return f"Video_{video_id}"
 
-# 유튜브 자막 가져오기 함수
-def get_youtube_transcript(video_id):
+# 유튜브 자막 조회 함수 (실제 조회, get_youtube_transcript를 통해 호출)
+def _fetch_youtube_transcript(video_id, deadline=None):
     """유튜브 비디오 ID를 통해 자막을 가져옵니다."""
+    # youtube_transcript_api는 실제로 자막을 조회할 때만 가져옴 (콜드 스타트 단축)
+    from youtube_transcript_api import _errors as yt_errors
     log_message(f"자막 가져오기 시작: {video_id}")
+    store = get_video_store()
+    cached = store.get_transcript(video_id)
+    if cached is not None:
+        log_message("자막 캐시 적중")
+        return cached
+    timeout = deadline_timeout(deadline, 'transcript')
     try:
-        transcript_list = YouTubeTranscriptApi.get_transcript(video_id, languages=['ko', 'en'])
-        transcript_text = ' '.join([item['text'] for item in transcript_list])
+        # 최근 실패한 영상은 YouTube에 다시 묻지 않고 같은 오류로 처리
+        failure = store.get_failure(video_id)
+        if failure:
+            raise getattr(yt_errors, failure)(video_id)
+        transcript_list = fetch_transcript_list(video_id, languages=['ko', 'en'], timeout=timeout)
+        # 롤링 캡션 중복, 소리 태그, 추임새, 공백을 정리해 입력 토큰을 줄임
+        transcript_text, report = clean_transcript_segments(transcript_list)
+        log_message(f"자막 정리: {report['removedChars']}자 (약 {report['removedTokens']}토큰) 제거")
         log_message(f"자막 가져오기 성공: {len(transcript_text)} 글자")
+        store.put_transcript(video_id, transcript_text)
         return transcript_text
     except yt_errors.NoTranscriptAvailable:
+        store.put_failure(video_id, 'NoTranscriptAvailable')
         log_message("자막이 제공되지 않는 비디오")
         raise Exception("이 영상에는 자막이 제공되지 않습니다. 스크립트 직접 입력 방식을 이용해주세요.")
     except yt_errors.TranscriptsDisabled:
+        store.put_failure(video_id, 'TranscriptsDisabled')
         log_message("자막이 비활성화된 비디오")
         raise Exception("이 영상의 자막이 비활성화되어 있습니다. 스크립트 직접 입력 방식을 이용해주세요.")
     except yt_errors.VideoUnavailable:
+        store.put_failure(video_id, 'VideoUnavailable')
         log_message("접근할 수 없는 비디오")
         raise Exception("유효하지 않거나 접근할 수 없는 영상입니다.")
     except Exception as e:
-        log_message(f"자막 가져오기 중 오류: {str(e)}")
+        if deadline is not None and deadline.expired():
+            raise DeadlineExceeded('transcript') from e
+        log_message(f"자막 가져오기 중 오류: {str(e)}", level='error')
         raise Exception(f"자막을 가져오는 중 오류가 발생했습니다: {str(e)}")
 
-# Gemini API를 사용하여 학습 노트 생성 함수
-def generate_notes_with_gemini(transcript_text, learning_level='beginner'):
-    """Gemini API를 사용하여 주어진 자막으로 학습 노트를 생성합니다."""
-    log_message("Gemini API 호출 시작")
-    
-    # 텍스트가 너무 길면 잘라내기 (API 한도 고려)
-    if len(transcript_text) > 30000:
-        transcript_text = transcript_text[:30000]
-        log_message("텍스트가 너무 길어 잘라냄")
-    
-    # 학습 레벨 설정
-    level_context = ""
-    if learning_level == 'advanced':
-        level_context = """
-이 학습 노트는 고급 학습자를 위해 작성됩니다. 다음 지침을 따라주세요:
-- 더 깊이 있는 개념 설명과 고급 이론을 포함해주세요
-- 실제 활용 사례와 응용 방법을 더 상세히 제시해주세요
-- 해당 분야의 전문 용어와 관련 학술적 개념을 적절히 포함해주세요
-- 자기 평가 질문은 비판적 사고와 분석적 능력을 측정할 수 있는 것으로 구성해주세요
-"""
-    else:  # beginner
-        level_context = """
-이 학습 노트는 초보 학습자를 위해 작성됩니다. 다음 지침을 따라주세요:
-- 기본 개념과 원리를 쉽게 이해할 수 있도록 설명해주세요
-- 복잡한 용어는 간단한 설명과 예시를 함께 제공해주세요
-- 실생활에서 쉽게 이해할 수 있는 예시를 포함해주세요
-- 자기 평가 질문은 기본 이해도를 측정할 수 있는 간단한 것으로 구성해주세요
-"""
-    
-    prompt = f"""# 유튜브 대본 티칭 머신
 
-## 역할: 적응형 교육 합성기
-귀하는 YouTube 원본 스크립트를 최적화된 학습 자료로 변환하는 전문 교육 콘텐츠 처리 전문가입니다. 고급 교육 프레임워크를 활용합니다.
+# 유튜브 자막 가져오기 함수 (같은 영상에 대한 동시 조회는 하나로 합침)
+@timed('transcript', BACKEND_NAME)
+def get_youtube_transcript(video_id, deadline=None):
+    """유튜브 비디오 ID를 통해 자막을 가져옵니다. deadline이 주어지면 마감 시간까지만 기다립니다."""
+    timeout = deadline.remaining() if deadline is not None else None
+    return transcript_flight.do(video_id, _fetch_youtube_transcript, video_id, deadline, timeout=timeout)
 
-{level_context}
+# 단일 Gemini 모델 호출 함수
+def generate_with_model(model_name, prompt, timeout=None):
+    """지정한 Gemini 모델 하나로 텍스트를 생성합니다. timeout은 요청 마감 시간까지 남은 초입니다."""
+    log_message(f"{model_name} 모델 사용 시도")
+    model, contents = prepare_generation(model_name, prompt, log_message)
+    response = model.generate_content(contents, **generation_options(timeout))
+    log_message(f"{model_name} 모델 호출 성공")
+    return response.text
 
-## 역량  
-1.  **콘텐츠 분석 및 추출**  
-    - 필사본에서 핵심 개념, 사실, 이론 및 방법론 추출  
-    - 개념적 계층과 지식 구조를 식별합니다.  
-    - 강사의 교육 접근 방식과 방법을 인식합니다.  
-    - 관련 없는 내용, 불필요한 단어, 반복을 걸러냅니다.  
-    - 검증을 위해 잠재적인 부정확성이나 뒷받침되지 않는 주장을 표시합니다.  
-2.  **교육 구조 조정**  
-    - 교육 모범 사례에 따라 콘텐츠를 구성합니다.  
-    - 콘텐츠에 기반한 명확한 학습 목표 개발  
-    - 논리적인 지식 진행(기초 → 고급)을 생성합니다.  
-    - 잠재적인 혼란 지점을 식별하고 명확히 합니다.  
-    - 복잡한 주제를 관리 가능한 학습 단위로 나누세요  
-3.  **학습 스타일 적응**  
-    - 다양한 인지적 접근 방식(분석적, 실용적, 창의적)에 적응  
-    - 다양한 지능 유형(논리, 언어, 공간 등)에 맞춰 조정 가능  
-    - 다양한 주의 지속 시간과 처리 속도에 맞게 조정  
-    - 도전적인 개념에 대한 대체 설명 제공
+# Gemini 모델 호출 함수 (모델 상태에 따라 Pro → 1.5 Flash 순으로 대체)
+@timed('gemini', BACKEND_NAME)
+def call_gemini(prompt, processing_info=None, deadline=None):
+    """프롬프트로 Gemini 모델을 호출하고 생성된 텍스트를 반환합니다.
 
-## 프로세스  
-1.  **입력 분석**  
-    - 주제, 범위, 복잡성 및 구조를 파악하기 위해 대본을 검토합니다.  
-    - 교육 수준 및 선행 지식 확인  
-    - 영상에서 사용된 원래의 교육 방식을 평가합니다.  
-    - 원본 자료의 장점과 한계를 인식합니다.  
-    - 필사본 품질을 평가하고 차이점이나 모호한 부분을 해결합니다.  
-2.  **학습자 프로필 통합** (이 부분은 현재 MVP에서는 사용자 입력을 받지 않으므로, 일반적인 학습자 기준으로 처리해주세요.)  
-    - 학습자의 특정 요구 사항, 목표 및 선호도를 고려합니다.  
-    - 현재 지식 수준과 학습 맥락에 맞게 조정  
-    - 학습 가능한 시간과 리소스를 최적화합니다.  
-    - 언급된 경우 특정 학습 과제를 설명하십시오.  
-    - 인지 부하 기능에 맞춰 콘텐츠 복잡성 조정  
-3.  **콘텐츠 변환**  
-    - 교육 자료를 일관된 교육 구조로 재구성합니다.  
-    - 비유와 예를 통해 복잡한 개념을 단순화합니다.  
-    - 불분명하거나 충분히 설명되지 않은 사항에 대해 자세히 설명하십시오.  
-    - 새로운 정보를 기존 지식 프레임워크에 연결합니다.  
-    - 사실의 정확성을 확인하고 추가 조사가 필요한 주장을 기록하세요.  
-4.  **출력 생성**  
-    - 가장 적합한 형식으로 기본 학습 자료를 만듭니다.  
-    - 강화를 위한 보충 자료 개발  
-    - 메타인지적 요소(반성 촉구, 자기 평가)를 포함합니다.  
-    - 추가 탐색 및 적용을 위한 지침 제공  
-5.  **품질 평가**  
-    - 생성된 자료의 교육적 효과를 평가합니다.  
-    - 남아 있는 격차나 불분명한 설명을 식별합니다.  
-    - 표시된 부정확한 내용이 적절하게 처리되었는지 확인합니다.  
-    - 모든 학습 목표가 적절하게 다루어졌는지 확인하세요.
+    processing_info 딕셔너리가 주어지면 사용한 모델과 대체 사유를 기록합니다.
+    deadline이 주어지면 남은 시간 안에 끝나기 어려운 대체 모델은 건너뜁니다.
+    """
+    return call_with_fallback(GEMINI_MODELS, generate_with_model, prompt, processing_info, log_message, deadline)
 
-## 필사본 품질 처리  
-다양한 품질의 대본을 작업할 때:  
-1.  **고품질 성적증명서**: 교육 최적화에 중점을 두고 표준 프로세스를 진행합니다.  
-2.  **미완료 성적증명서의 경우**:  
-    - 지식 격차를 파악하고 명확하게 기록합니다.  
-    - 누락된 정보에 대한 보충 자료를 제안합니다.  
-    - 사용 가능한 콘텐츠를 논리적으로 연결하여 일관성을 유지합니다.  
-3.  **기술적/복잡한 사본의 경우**:  
-    - 복잡한 용어를 추가 설명으로 분석합니다.  
-    - 단순화된 비유와 시각적 표현을 사용하세요  
-    - 기술 용어의 어휘집을 제공합니다.  
-    - 학습자의 다양한 역량에 맞춰 점진적으로 복잡도를 높여줍니다.  
-4.  **잠재적으로 부정확한 콘텐츠**:  
-    - 의심스럽거나 근거가 없는 주장을 신고하세요.  
-    - 진술이 확립된 지식과 충돌하는 경우 주의하세요  
-    - 적절한 경우 검증 소스를 제안합니다.  
-    - 확립된 사실과 화자의 의견을 구별합니다.
+# 긴 스크립트 맵 단계 함수 (청크별로 동시에 요약한 뒤 요약본 반환)
+def map_long_transcript(transcript_text, processing_info, deadline=None):
+    """스크립트가 너무 길면 청크별로 동시에 요약해 리듀스 입력으로 바꿉니다."""
+    processing_info['chunkCount'] = 1
+    if not GEMINI_API_KEY:
+        return transcript_text
+    with stage_timer('map', BACKEND_NAME):
+        try:
+            transcript_text, chunk_count = map_transcript(transcript_text, partial(call_gemini, deadline=deadline),
+                                                          transcript_token_budget(MODEL_NAME), deadline)
+            processing_info['chunkCount'] = chunk_count
+            if chunk_count > 1:
+                log_message(f"청크 요약 완료: {chunk_count}개")
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            log_message(f"청크 요약 실패, 잘라내기로 대체: {str(e)}")
+    return transcript_text
 
-## 출력 구조 (이 구조에 맞춰 Markdown 형식으로 결과를 생성해주세요):  
-1.  **학습 목표**  
-    - 이 자료에서 배울 내용  
-2.  **핵심 개념**  
-    - 명확한 설명과 함께 제시된 필수 아이디어  
-3.  **개념 지도**  
-    - 아이디어가 연결되는 방식을 보여주는 ASCII 시각적 표현 (Markdown 코드 블록으로 표현 가능)  
-4.  **자세한 분석**  
-    - 콘텐츠에 대한 체계적인 설명  
-5.  **요약**  
-    - 가장 중요한 요점에 대한 간략한 검토  
-6.  **응용**  
-    - 이 지식을 실제로 사용하는 방법  
-7.  **자체 평가**  
-    - 이해도를 확인하기 위한 질문
+# 학습 노트 생성 프롬프트 구성 함수
+def build_notes_prompt(transcript_text, learning_level='beginner', processing_info=None, deadline=None):
+    """긴 스크립트를 맵 단계로 줄인 뒤 모델 입력 토큰 예산에 맞춰 학습 노트 생성 프롬프트를 만듭니다."""
+    if processing_info is None:
+        processing_info = {}
+    
+    # 긴 스크립트는 청크별로 동시에 요약(맵)한 뒤 요약본으로 노트를 생성(리듀스)
+    transcript_text = map_long_transcript(transcript_text, processing_info, deadline)
+    
+    def render_prompt(transcript_text):
+        return NOTES_PROMPT.render(transcript_text, None, learning_level)
 
----
-{transcript_text}
----
+    # 모델 입력 토큰 예산에 맞게 스크립트를 문장 단위로 줄여 프롬프트 생성
+    with stage_timer('prompt', BACKEND_NAME):
+        return fit_prompt(render_prompt, transcript_text, MODEL_NAME, processing_info, log_message)
 
-위 스크립트(또는 스크립트 부재 정보)를 바탕으로, 앞서 정의된 "## 역할", "## 역량", "## 프로세스", "## 필사본 품질 처리"를 고려하여 "## 출력 구조"에 따라 교육적인 학습 노트를 Markdown 형식으로 작성해주십시오."""
+# 2단계 모드 프롬프트 구성 함수 (스크립트별로 캐시된 공유 분석 결과 → 학습 레벨별 렌더링 프롬프트)
+def build_two_phase_prompt(transcript_text, learning_level='beginner', processing_info=None, deadline=None):
+    """공유 분석 결과(없으면 한 번 생성)로 학습 레벨에 맞는 노트 렌더링 프롬프트를 만듭니다."""
+    if processing_info is None:
+        processing_info = {}
+    analysis = get_analysis(transcript_text, None, MODEL_NAME, partial(call_gemini, deadline=deadline),
+                            partial(map_long_transcript, deadline=deadline), processing_info, deadline, log_message)
+    with stage_timer('prompt', BACKEND_NAME):
+        return build_render_prompt(analysis, None, learning_level, MODEL_NAME, processing_info, log_message)
+
+# Gemini API를 사용하여 학습 노트 생성 함수
+def generate_notes_with_gemini(transcript_text, learning_level='beginner', processing_info=None, deadline=None):
+    """Gemini API를 사용하여 주어진 자막으로 학습 노트를 생성합니다.
+
+    processing_info 딕셔너리가 주어지면 처리한 청크 수 등의 처리 정보를 기록합니다.
+    deadline(요청 마감 시간)이 지나면 남은 단계를 멈추고 DeadlineExceeded를 발생시킵니다.
+    """
+    log_message("Gemini API 호출 시작")
+    if processing_info is None:
+        processing_info = {}
+    
+    # 2단계 모드: 스크립트별로 캐시된 공유 분석 결과로 학습 레벨에 맞는 노트만 렌더링
+    if NOTES_TWO_PHASE and GEMINI_API_KEY:
+        prompt = build_two_phase_prompt(transcript_text, learning_level, processing_info, deadline)
+    else:
+        prompt = build_notes_prompt(transcript_text, learning_level, processing_info, deadline)
 
     if not GEMINI_API_KEY:
         log_message("API 키 없음")
@@ -206,37 +224,75 @@ def generate_notes_with_gemini(transcript_text, learning_level='beginner'):
 
     try:
         # Gemini API 호출 시도
-        try:
-            log_message("Gemini Pro 모델 사용 시도")
-            model = genai.GenerativeModel('gemini-pro')
-            response = model.generate_content(prompt)
-            log_message("Gemini API 호출 성공")
-            return response.text
-        except Exception as api_error:
-            log_message(f"Gemini Pro 모델 오류: {str(api_error)}, 1.5 Flash 모델로 대체 시도")
-            # Pro 모델이 실패하면 1.5 모델로 시도
-            model = genai.GenerativeModel('gemini-1.5-flash')
-            response = model.generate_content(prompt)
-            log_message("Gemini 1.5 Flash API 호출 성공")
-            return response.text
+        return call_gemini(prompt, processing_info, deadline)
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         raise Exception(f"AI 모델 호출 중 오류가 발생했습니다: {str(e)}")
 
+# 입장 거절 응답 함수 (429와 Retry-After)
+def admission_rejected_response(error, headers):
+    log_message(f"입장 거절 ({error.reason}), {error.retry_after}초 후 재시도 안내", level='warning')
+    return jsonify({
+        'error': str(error),
+        'errorType': 'QUOTA_EXCEEDED',
+        'retryAfter': error.retry_after,
+        'recommendationText': '서버가 현재 많은 요청을 처리 중입니다. 잠시 후 다시 시도해주세요.'
+    }), 429, {**headers, 'Retry-After': str(error.retry_after)}
+
+# 마감 시간 초과 응답 함수 (504)
+def deadline_exceeded_response(error, headers):
+    log_message(f"마감 시간 초과로 요청 중단 ({error.stage} 단계)", level='warning')
+    record_deadline_exceeded(BACKEND_NAME, error.stage)
+    return jsonify({
+        'error': str(error),
+        'errorType': 'DEADLINE_EXCEEDED',
+        'stage': error.stage,
+        'recommendationText': '처리 시간이 너무 오래 걸렸습니다. 잠시 후 다시 시도하거나 더 짧은 영상으로 시도해 보세요.'
+    }), 504, headers
+
+# 단계별 지연 시간 메트릭 (Prometheus 텍스트 형식)
+@app.route('/api/metrics', methods=['GET'])
+def prometheus_metrics():
+    return metrics.render_prometheus(), 200, {'Content-Type': PROMETHEUS_CONTENT_TYPE}
+
+# 생성한 노트/스크립트 전문 검색 (?q=검색어&level=beginner&limit=10)
+@app.route('/api/search', methods=['GET'])
+def search_generated_notes():
+    headers = {'Access-Control-Allow-Origin': '*'}
+    try:
+        return jsonify(search_notes(request.args.get('q', ''), request.args.get('level'),
+                                    request.args.get('limit', 10, type=int))), 200, headers
+    except ValueError as e:
+        return jsonify({'error': str(e), 'errorType': 'INVALID_QUERY'}), 400, headers
+
+# 생성한 노트의 HTML/PDF 내보내기 (렌더링한 파일은 캐시에서 바로 보냄)
+@app.route('/api/notes/<note_id>.<export_format>', methods=['GET'])
+def export_generated_note(note_id, export_format):
+    status, body, headers = export_note(note_id, export_format, request.headers.get('If-None-Match'))
+    return body, status, headers
+
 @app.route('/', defaults={'path': ''}, methods=['POST', 'OPTIONS'])
 @app.route('/<path:path>', methods=['POST', 'OPTIONS'])
+@timed('request', BACKEND_NAME)
 def generate_notes(path):
     # CORS 헤더 설정
     headers = {
         'Access-Control-Allow-Origin': '*',
         'Access-Control-Allow-Methods': 'POST, OPTIONS',
-        'Access-Control-Allow-Headers': 'Content-Type'
+        'Access-Control-Allow-Headers': 'Content-Type, X-Request-Timeout',
+        'Access-Control-Expose-Headers': 'Retry-After'
     }
     
     # OPTIONS 요청 처리 (CORS 프리플라이트)
     if request.method == 'OPTIONS':
         return '', 200, headers
     
+    ticket = None
     try:
+        # 요청 마감 시간 (X-Request-Timeout 헤더 또는 기본값, 각 단계의 타임아웃을 여기에 맞춤)
+        deadline = deadline_from_headers(request.headers)
+        
         # 요청 데이터 받기
         data = request.json
         
@@ -258,23 +314,61 @@ def generate_notes(path):
             if not video_id:
                 return jsonify({'error': '유효한 유튜브 URL이 아닙니다.'}), 400, headers
             
+            # 캐시 확인 (자막 조회와 Gemini 호출 생략)
+            cache_key = make_cache_key(video_id=video_id, learning_level=learning_level,
+                                       prompt_version=PROMPT_VERSION, model_name=MODEL_NAME)
+            cached = get_note_cache().get(cache_key)
+            if cached:
+                log_message(f"노트 캐시 적중: {video_id}")
+                return jsonify(cached), 200, headers
+            
+            # 입장 제어 (자막 조회와 Gemini 호출 전에 클라이언트/Gemini 예산 확인)
+            try:
+                ticket = admission.admit(client_address(request.headers, request.remote_addr), deadline=deadline)
+            except AdmissionRejected as e:
+                return admission_rejected_response(e, headers)
+            
             # 비디오 제목 가져오기
-            video_title = get_video_title(video_id)
+            video_title = get_video_title(video_id, deadline)
             
             # 유튜브 자막 가져오기
-            transcript_text = get_youtube_transcript(video_id)
+            transcript_text = get_youtube_transcript(video_id, deadline)
         else:  # input_type == 'text'
             # 사용자가 직접 입력한 스크립트 사용
             transcript_text = input_value
+            
+            # 캐시 확인
+            cache_key = make_cache_key(transcript_text=transcript_text, learning_level=learning_level,
+                                       prompt_version=PROMPT_VERSION, model_name=MODEL_NAME)
+            # 거의 같은 스크립트(줄바꿈, 도입부 차이 등)로 만든 노트도 재사용
+            cached = get_note_cache().get(cache_key) or find_similar_notes(transcript_text, cache_key)
+            if cached:
+                log_message("노트 캐시 적중: 직접 입력 텍스트")
+                return jsonify(cached), 200, headers
+            
+            # 입장 제어 (직접 입력 텍스트는 Gemini 호출 전에 클라이언트/Gemini 예산 확인)
+            try:
+                ticket = admission.admit(client_address(request.headers, request.remote_addr), deadline=deadline)
+            except AdmissionRejected as e:
+                return admission_rejected_response(e, headers)
         
         # 학습 노트 생성
-        markdown_content = generate_notes_with_gemini(transcript_text, learning_level)
+        # 같은 영상/스크립트와 학습 레벨의 동시 요청은 하나의 Gemini 호출로 합침
+        markdown_content, processing_info = coalesce_generation(
+            cache_key, generate_notes_with_gemini, transcript_text, learning_level, deadline=deadline, ticket=ticket)
+        response_data = {
+            'markdownContent': markdown_content,
+            'videoTitle': video_title,
+            'processingInfo': processing_info
+        }
+        register_export(response_data)
+        get_note_cache().set(cache_key, response_data)
+        if input_type != 'url':
+            remember_transcript(transcript_text, cache_key)
+        index_notes(cache_key, response_data, transcript_text)
         
         # 성공 응답
-        response = jsonify({
-            'markdownContent': markdown_content,
-            'videoTitle': video_title
-        })
+        response = jsonify(response_data)
         
         # CORS 헤더 추가
         for key, value in headers.items():
@@ -282,6 +376,8 @@ def generate_notes(path):
         
         return response
         
+    except DeadlineExceeded as e:
+        return deadline_exceeded_response(e, headers)
     except Exception as e:
         # 오류 응답
         response = jsonify({
@@ -296,6 +392,10 @@ def generate_notes(path):
             response.headers[key] = value
         
         return response, 400
+    finally:
+        # 자막 조회 실패나 마감 시간 초과로 Gemini를 호출하지 않고 끝난 요청은 예약분을 돌려줌
+        # (생성까지 간 요청은 coalesce_generation에서 이미 정산했으므로 무시됨)
+        admission.release(ticket)
 
 # 직접 실행 시
 if __name__ == '__main__':
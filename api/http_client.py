@@ -0,0 +1,121 @@
+import os
+import threading
+
+# 연결 풀/타임아웃 설정 (환경 변수로 조정 가능)
+HTTP_POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", "20"))
+HTTP_CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", "3"))
+HTTP_READ_TIMEOUT = float(os.environ.get("HTTP_READ_TIMEOUT", "10"))
+HTTP_MAX_RETRIES = int(os.environ.get("HTTP_MAX_RETRIES", "1"))
+
+# requests는 가져오는 데 100ms 가까이 걸리므로 세션을 처음 만들 때 가져와 세션 클래스를 정의
+_session_class = None
+
+def _timeout_session_class():
+    global _session_class
+    if _session_class is None:
+        import requests
+
+        class TimeoutSession(requests.Session):
+            """요청마다 timeout을 지정하지 않아도 기본 연결/읽기 타임아웃이 적용되는 세션입니다."""
+
+            def __init__(self, timeout=(HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)):
+                super().__init__()
+                self.timeout = timeout
+
+            def request(self, method, url, **kwargs):
+                if kwargs.get('timeout') is None:
+                    kwargs['timeout'] = self.timeout
+                return super().request(method, url, **kwargs)
+
+        _session_class = TimeoutSession
+    return _session_class
+
+# HTTP 세션 생성 함수
+def create_http_session(pool_size=HTTP_POOL_SIZE, connect_timeout=HTTP_CONNECT_TIMEOUT,
+                        read_timeout=HTTP_READ_TIMEOUT, max_retries=HTTP_MAX_RETRIES):
+    """연결을 재사용(keep-alive)하는 연결 풀 세션을 만듭니다."""
+    from requests.adapters import HTTPAdapter
+    session = _timeout_session_class()(timeout=(connect_timeout, read_timeout))
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=max_retries)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+# 프로세스 전역 세션 (첫 사용 시 생성)
+_http_session = None
+_http_session_lock = threading.Lock()
+
+def get_http_session():
+    """프로세스 전역 연결 풀 세션을 반환합니다."""
+    global _http_session
+    if _http_session is None:
+        with _http_session_lock:
+            if _http_session is None:
+                _http_session = create_http_session()
+    return _http_session
+
+def http_get(url, **kwargs):
+    """공유 세션으로 GET 요청을 보냅니다."""
+    return get_http_session().get(url, **kwargs)
+
+# 요청 마감 시간에 맞춘 타임아웃 계산 함수
+def deadline_timeout(deadline, stage):
+    """남은 시간을 넘지 않는 (연결, 읽기) 타임아웃을 반환합니다. deadline이 None이면 None(세션 기본값)을 반환합니다."""
+    if deadline is None:
+        return None
+    remaining = deadline.timeout(stage)
+    return (min(HTTP_CONNECT_TIMEOUT, remaining), min(HTTP_READ_TIMEOUT, remaining))
+
+class _TimeoutSessionView:
+    """공유 세션의 요청에 지정한 타임아웃을 붙여 주는 래퍼입니다 (연결 풀과 쿠키는 공유 세션 것을 그대로 사용)."""
+
+    def __init__(self, session, timeout):
+        self._session = session
+        self._timeout = timeout
+
+    def __getattr__(self, name):
+        return getattr(self._session, name)
+
+    def get(self, url, **kwargs):
+        kwargs.setdefault('timeout', self._timeout)
+        return self._session.get(url, **kwargs)
+
+# 유튜브 자막 조회 함수 (공유 세션 사용)
+def fetch_transcript_list(video_id, languages=('en',), timeout=None):
+    """공유 연결 풀 세션으로 자막 세그먼트 목록을 가져옵니다.
+
+    YouTubeTranscriptApi.get_transcript는 호출마다 새 세션을 만들기 때문에,
+    같은 동작을 하는 내부 TranscriptListFetcher에 공유 세션을 넘겨 사용합니다.
+    timeout이 주어지면 자막 목록/자막 요청마다 그 타임아웃을 적용합니다.
+    """
+    from youtube_transcript_api import YouTubeTranscriptApi
+    try:
+        from youtube_transcript_api._transcripts import TranscriptListFetcher
+    except ImportError:
+        return YouTubeTranscriptApi.get_transcript(video_id, languages=languages)
+    session = get_http_session()
+    if timeout is not None:
+        session = _TimeoutSessionView(session, timeout)
+    transcript_list = TranscriptListFetcher(session).fetch(video_id)
+    return transcript_list.find_transcript(languages).fetch()
+
+# 비동기 HTTP 클라이언트 (FastAPI 앱에서 사용, 첫 사용 시 생성)
+_async_http_client = None
+
+def get_async_http_client():
+    """프로세스 전역 httpx 비동기 클라이언트를 반환합니다."""
+    global _async_http_client
+    if _async_http_client is None:
+        import httpx
+        _async_http_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=HTTP_POOL_SIZE, max_keepalive_connections=HTTP_POOL_SIZE)
+        )
+    return _async_http_client
+
+async def close_async_http_client():
+    """비동기 HTTP 클라이언트를 닫습니다."""
+    global _async_http_client
+    if _async_http_client is not None:
+        await _async_http_client.aclose()
+        _async_http_client = None
@@ -4,22 +4,54 @@ import os
 import sys
 import traceback
 import re
-import google.generativeai as genai
-import requests
+from functools import partial
+from urllib.parse import urlparse, parse_qs
+from note_cache import get_note_cache, make_cache_key
+from log_writer import StructuredLogger
+from metrics import metrics, stage_timer, timed, record_deadline_exceeded, PROMETHEUS_CONTENT_TYPE
+from video_store import get_video_store
+from single_flight import coalesce_generation
+from http_client import http_get, deadline_timeout
+from chunked_notes import map_transcript
+from streaming import format_sse, stream_with_fallback
+from model_health import call_with_fallback
+from token_budget import fit_prompt, transcript_token_budget
+from prompts import get_prompt_template, prepare_generation, generation_options, RENDER_PROMPT
+from shared_analysis import NOTES_TWO_PHASE, get_analysis, build_render_prompt
+from near_duplicate import find_similar_notes, remember_transcript
+from note_search import index_notes, search_notes
+from note_export import register_export, export_note, EXPORT_PATH
+from admission import admission, client_address, AdmissionRejected
+from deadline import DeadlineExceeded, deadline_from_headers
 
 # 환경 변수에서 API 키 가져오기
 GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
 
-# Gemini API 설정
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
+# Gemini SDK는 콜드 스타트를 줄이기 위해 처음 모델을 호출할 때 가져와 설정함 (genai_client.get_genai)
 
-# 디버깅을 위한 로그 함수
-def log_message(message):
-    with open("/tmp/api_debug.log", "a") as f:
-        f.write(f"{message}\n")
+# 학습 노트 프롬프트 템플릿 (PROMPT_VARIANT=full 또는 compact)
+NOTES_PROMPT = get_prompt_template(os.environ.get("PROMPT_VARIANT", "full"))
+
+# 캐시 키에 포함되는 프롬프트 버전과 기본 모델 (2단계 모드에서는 렌더링 템플릿 버전)
+PROMPT_VERSION = f"index-{RENDER_PROMPT.version if NOTES_TWO_PHASE else NOTES_PROMPT.version}"
+MODEL_NAME = 'gemini-pro'
+# 모델 대체 순서 (앞 모델의 회로가 열려 있거나 실패하면 다음 모델 사용)
+GEMINI_MODELS = [MODEL_NAME, 'gemini-1.5-flash']
+
+# 노트 생성 실패 시 반환되는 안내문 머리말 (캐시 제외 판단에 사용)
+GENERATION_ERROR_PREFIX = "학습 노트 생성 중 오류가 발생했습니다"
+
+# 로그/메트릭에 쓰는 백엔드 이름
+BACKEND_NAME = 'index'
+
+# 디버깅을 위한 로그 함수 (백그라운드 스레드가 JSON 줄로 모아서 기록하므로 요청 처리를 막지 않음)
+logger = StructuredLogger(BACKEND_NAME, os.environ.get("API_LOG_PATH", "/tmp/api_debug.log"))
+
+def log_message(message, level='info', **fields):
+    logger.log(level, message, **fields)
 
 # 유튜브 비디오 ID 추출 함수
+@timed('extract_video_id', BACKEND_NAME)
 def extract_video_id(url):
     log_message(f"URL 분석 시작: {url}")
     video_id_match = re.search(r'(?:v=|\/)([0-9A-Za-z_-]{11}).*', url)
@@ -31,184 +63,112 @@ def extract_video_id(url):
     return None
 
 # 유튜브 비디오 정보 가져오기
-def get_video_info(video_id):
+@timed('video_info', BACKEND_NAME)
+def get_video_info(video_id, deadline=None):
     log_message(f"비디오 정보 가져오기 시작: {video_id}")
+    cached = get_video_store().get_info(video_id)
+    if cached is not None:
+        return cached
+    # 요청 마감 시간이 있으면 남은 시간을 넘지 않는 타임아웃 사용
+    timeout = deadline_timeout(deadline, 'video_info')
     try:
         url = f"https://www.youtube.com/oembed?url=https://www.youtube.com/watch?v={video_id}&format=json"
-        response = requests.get(url)
+        response = http_get(url, timeout=timeout)
         
         if response.status_code == 200:
             data = response.json()
             title = data.get('title', f"Video_{video_id}")
             log_message(f"비디오 제목: {title}")
-            return {
+            video_info = {
                 'title': title,
                 'video_id': video_id
             }
+            get_video_store().put_info(video_id, video_info)
+            return video_info
         else:
-            log_message(f"OEmbed API 오류: {response.status_code}")
+            log_message(f"OEmbed API 오류: {response.status_code}", level='warning')
             return {
                 'title': f"Video_{video_id}",
                 'video_id': video_id
             }
     except Exception as e:
-        log_message(f"비디오 정보 가져오기 오류: {str(e)}")
+        log_message(f"비디오 정보 가져오기 오류: {str(e)}", level='warning')
         return {
             'title': f"Video_{video_id}",
             'video_id': video_id
         }
 
-# Gemini API를 사용하여 고품질 학습 노트 생성 함수
-def generate_notes_with_gemini(transcript_text, video_info=None, learning_level='beginner'):
-    log_message("Gemini API 호출 시작")
-    
-    # 텍스트가 너무 길면 잘라내기 (API 한도 고려)
-    if len(transcript_text) > 30000:
-        transcript_text = transcript_text[:30000]
-        log_message("텍스트가 너무 길어 잘라냄")
-    
-    # 비디오 정보가 있으면 프롬프트에 추가
-    video_context = ""
-    if video_info:
-        video_context = f"""
-이 학습 노트는 다음 유튜브 영상을 기반으로 합니다:
-제목: {video_info.get('title', '알 수 없는 제목')}
-비디오 ID: {video_info.get('video_id', '알 수 없는 ID')}
-"""
-
-    # 학습 레벨 설정
-    level_context = ""
-    if learning_level == 'advanced':
-        level_context = """
-이 학습 노트는 고급 학습자를 위해 작성됩니다. 다음 지침을 따라주세요:
-- 더 깊이 있는 개념 설명과 고급 이론을 포함해주세요
-- 실제 활용 사례와 응용 방법을 더 상세히 제시해주세요
-- 해당 분야의 전문 용어와 관련 학술적 개념을 적절히 포함해주세요
-- 자기 평가 질문은 비판적 사고와 분석적 능력을 측정할 수 있는 것으로 구성해주세요
-"""
-    else:  # beginner
-        level_context = """
-이 학습 노트는 초보 학습자를 위해 작성됩니다. 다음 지침을 따라주세요:
-- 기본 개념과 원리를 쉽게 이해할 수 있도록 설명해주세요
-- 복잡한 용어는 간단한 설명과 예시를 함께 제공해주세요
-- 실생활에서 쉽게 이해할 수 있는 예시를 포함해주세요
-- 자기 평가 질문은 기본 이해도를 측정할 수 있는 간단한 것으로 구성해주세요
-"""
-    
-    prompt = f"""# 유튜브 대본 티칭 머신
-
-## 역할: 적응형 교육 합성기
-귀하는 YouTube 원본 스크립트를 최적화된 학습 자료로 변환하는 전문 교육 콘텐츠 처리 전문가입니다. 고급 교육 프레임워크를 활용합니다.
-
-{video_context}
-
-{level_context}
+# 단일 Gemini 모델 호출 함수 (timeout은 요청 마감 시간까지 남은 초)
+def generate_with_model(model_name, prompt, timeout=None):
+    log_message(f"{model_name} 모델 사용 시도")
+    model, contents = prepare_generation(model_name, prompt, log_message)
+    response = model.generate_content(contents, **generation_options(timeout))
+    log_message(f"{model_name} 모델 호출 성공")
+    return response.text
 
-## 역량  
-1.  **콘텐츠 분석 및 추출**  
-    - 필사본에서 핵심 개념, 사실, 이론 및 방법론 추출  
-    - 개념적 계층과 지식 구조를 식별합니다.  
-    - 강사의 교육 접근 방식과 방법을 인식합니다.  
-    - 관련 없는 내용, 불필요한 단어, 반복을 걸러냅니다.  
-    - 검증을 위해 잠재적인 부정확성이나 뒷받침되지 않는 주장을 표시합니다.  
-2.  **교육 구조 조정**  
-    - 교육 모범 사례에 따라 콘텐츠를 구성합니다.  
-    - 콘텐츠에 기반한 명확한 학습 목표 개발  
-    - 논리적인 지식 진행(기초 → 고급)을 생성합니다.  
-    - 잠재적인 혼란 지점을 식별하고 명확히 합니다.  
-    - 복잡한 주제를 관리 가능한 학습 단위로 나누세요  
-3.  **학습 스타일 적응**  
-    - 다양한 인지적 접근 방식(분석적, 실용적, 창의적)에 적응  
-    - 다양한 지능 유형(논리, 언어, 공간 등)에 맞춰 조정 가능  
-    - 다양한 주의 지속 시간과 처리 속도에 맞게 조정  
-    - 도전적인 개념에 대한 대체 설명 제공
+# Gemini 모델 호출 함수 (모델 상태에 따라 Pro → 1.5 Flash 순으로 대체)
+# processing_info 딕셔너리가 주어지면 사용한 모델과 대체 사유를 기록
+# deadline이 주어지면 남은 시간 안에 끝나기 어려운 대체 모델은 건너뜀
+@timed('gemini', BACKEND_NAME)
+def call_gemini(prompt, processing_info=None, deadline=None):
+    return call_with_fallback(GEMINI_MODELS, generate_with_model, prompt, processing_info, log_message, deadline)
 
-## 프로세스  
-1.  **입력 분석**  
-    - 주제, 범위, 복잡성 및 구조를 파악하기 위해 대본을 검토합니다.  
-    - 교육 수준 및 선행 지식 확인  
-    - 영상에서 사용된 원래의 교육 방식을 평가합니다.  
-    - 원본 자료의 장점과 한계를 인식합니다.  
-    - 필사본 품질을 평가하고 차이점이나 모호한 부분을 해결합니다.  
-2.  **학습자 프로필 통합** (이 부분은 현재 MVP에서는 사용자 입력을 받지 않으므로, 일반적인 학습자 기준으로 처리해주세요.)  
-    - 학습자의 특정 요구 사항, 목표 및 선호도를 고려합니다.  
-    - 현재 지식 수준과 학습 맥락에 맞게 조정  
-    - 학습 가능한 시간과 리소스를 최적화합니다.  
-    - 언급된 경우 특정 학습 과제를 설명하십시오.  
-    - 인지 부하 기능에 맞춰 콘텐츠 복잡성 조정  
-3.  **콘텐츠 변환**  
-    - 교육 자료를 일관된 교육 구조로 재구성합니다.  
-    - 비유와 예를 통해 복잡한 개념을 단순화합니다.  
-    - 불분명하거나 충분히 설명되지 않은 사항에 대해 자세히 설명하십시오.  
-    - 새로운 정보를 기존 지식 프레임워크에 연결합니다.  
-    - 사실의 정확성을 확인하고 추가 조사가 필요한 주장을 기록하세요.  
-4.  **출력 생성**  
-    - 가장 적합한 형식으로 기본 학습 자료를 만듭니다.  
-    - 강화를 위한 보충 자료 개발  
-    - 메타인지적 요소(반성 촉구, 자기 평가)를 포함합니다.  
-    - 추가 탐색 및 적용을 위한 지침 제공  
-5.  **품질 평가**  
-    - 생성된 자료의 교육적 효과를 평가합니다.  
-    - 남아 있는 격차나 불분명한 설명을 식별합니다.  
-    - 표시된 부정확한 내용이 적절하게 처리되었는지 확인합니다.  
-    - 모든 학습 목표가 적절하게 다루어졌는지 확인하세요.
+# 긴 스크립트 맵 단계 함수 (청크별로 동시에 요약한 뒤 요약본 반환)
+def map_long_transcript(transcript_text, processing_info, deadline=None):
+    processing_info['chunkCount'] = 1
+    if not GEMINI_API_KEY:
+        return transcript_text
+    with stage_timer('map', BACKEND_NAME):
+        try:
+            transcript_text, chunk_count = map_transcript(transcript_text, partial(call_gemini, deadline=deadline),
+                                                          transcript_token_budget(MODEL_NAME), deadline)
+            processing_info['chunkCount'] = chunk_count
+            if chunk_count > 1:
+                log_message(f"청크 요약 완료: {chunk_count}개")
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            log_message(f"청크 요약 실패, 잘라내기로 대체: {str(e)}")
+    return transcript_text
 
-## 필사본 품질 처리  
-다양한 품질의 대본을 작업할 때:  
-1.  **고품질 성적증명서**: 교육 최적화에 중점을 두고 표준 프로세스를 진행합니다.  
-2.  **미완료 성적증명서의 경우**:  
-    - 지식 격차를 파악하고 명확하게 기록합니다.  
-    - 누락된 정보에 대한 보충 자료를 제안합니다.  
-    - 사용 가능한 콘텐츠를 논리적으로 연결하여 일관성을 유지합니다.  
-3.  **기술적/복잡한 사본의 경우**:  
-    - 복잡한 용어를 추가 설명으로 분석합니다.  
-    - 단순화된 비유와 시각적 표현을 사용하세요  
-    - 기술 용어의 어휘집을 제공합니다.  
-    - 학습자의 다양한 역량에 맞춰 점진적으로 복잡도를 높여줍니다.  
-4.  **잠재적으로 부정확한 콘텐츠**:  
-    - 의심스럽거나 근거가 없는 주장을 신고하세요.  
-    - 진술이 확립된 지식과 충돌하는 경우 주의하세요  
-    - 적절한 경우 검증 소스를 제안합니다.  
-    - 확립된 사실과 화자의 의견을 구별합니다.
+# 2단계 모드 프롬프트 구성 함수 (영상별로 캐시된 공유 분석 결과 → 학습 레벨별 렌더링 프롬프트)
+def build_two_phase_prompt(transcript_text, video_info=None, learning_level='beginner', processing_info=None, deadline=None):
+    if processing_info is None:
+        processing_info = {}
+    analysis = get_analysis(transcript_text, video_info, MODEL_NAME, partial(call_gemini, deadline=deadline),
+                            partial(map_long_transcript, deadline=deadline), processing_info, deadline, log_message)
+    with stage_timer('prompt', BACKEND_NAME):
+        return build_render_prompt(analysis, video_info, learning_level, MODEL_NAME, processing_info, log_message)
 
-## 출력 구조 (이 구조에 맞춰 Markdown 형식으로 결과를 생성해주세요):  
-1.  **학습 목표**  
-    - 이 자료에서 배울 내용  
-2.  **핵심 개념**  
-    - 명확한 설명과 함께 제시된 필수 아이디어  
-3.  **개념 지도**  
-    - 아이디어가 연결되는 방식을 보여주는 ASCII 시각적 표현 (Markdown 코드 블록으로 표현 가능)  
-4.  **자세한 분석**  
-    - 콘텐츠에 대한 체계적인 설명  
-5.  **요약**  
-    - 가장 중요한 요점에 대한 간략한 검토  
-6.  **응용**  
-    - 이 지식을 실제로 사용하는 방법  
-7.  **자체 평가**  
-    - 이해도를 확인하기 위한 질문
+# 학습 노트 생성 프롬프트 구성 함수
+# processing_info 딕셔너리가 주어지면 처리한 청크 수 등의 처리 정보를 기록
+def build_notes_prompt(transcript_text, video_info=None, learning_level='beginner', processing_info=None, deadline=None):
+    if processing_info is None:
+        processing_info = {}
+    if NOTES_TWO_PHASE and GEMINI_API_KEY:
+        return build_two_phase_prompt(transcript_text, video_info, learning_level, processing_info, deadline)
+    
+    # 긴 스크립트는 청크별로 동시에 요약(맵)한 뒤 요약본으로 노트를 생성(리듀스)
+    transcript_text = map_long_transcript(transcript_text, processing_info, deadline)
+    
+    def render_prompt(transcript_text):
+        return NOTES_PROMPT.render(transcript_text, video_info, learning_level)
 
----
-{transcript_text}
----
+    # 모델 입력 토큰 예산에 맞게 스크립트를 문장 단위로 줄여 프롬프트 생성
+    with stage_timer('prompt', BACKEND_NAME):
+        return fit_prompt(render_prompt, transcript_text, MODEL_NAME, processing_info, log_message)
 
-위 스크립트(또는 스크립트 부재 정보)를 바탕으로, 앞서 정의된 "## 역할", "## 역량", "## 프로세스", "## 필사본 품질 처리"를 고려하여 "## 출력 구조"에 따라 교육적인 학습 노트를 Markdown 형식으로 작성해주십시오."""
+# Gemini API를 사용하여 고품질 학습 노트 생성 함수
+# deadline(요청 마감 시간)이 지나면 남은 단계를 멈추고 DeadlineExceeded를 발생시킴
+def generate_notes_with_gemini(transcript_text, video_info=None, learning_level='beginner', processing_info=None,
+                               deadline=None):
+    log_message("Gemini API 호출 시작")
 
     try:
-        # API 키가 있을 때만 실제 Gemini API 호출
+        # API 키가 있을 때만 실제 Gemini API 호출 (2단계 모드의 공유 분석 호출도 프롬프트 구성 중에 실행)
+        prompt = build_notes_prompt(transcript_text, video_info, learning_level, processing_info, deadline)
         if GEMINI_API_KEY:
-            try:
-                log_message("Gemini Pro 모델 사용 시도")
-                model = genai.GenerativeModel('gemini-pro')
-                response = model.generate_content(prompt)
-                log_message("Gemini API 호출 성공")
-                return response.text
-            except Exception as api_error:
-                log_message(f"Gemini Pro 모델 오류: {str(api_error)}, 1.5 Flash 모델로 대체")
-                # Pro 모델이 실패하면 1.5 모델로 시도
-                model = genai.GenerativeModel('gemini-1.5-flash')
-                response = model.generate_content(prompt)
-                log_message("Gemini 1.5 Flash API 호출 성공")
-                return response.text
+            return call_gemini(prompt, processing_info, deadline)
         else:
             # 간단한 노트 생성 (Gemini API 키가 없을 때)
             log_message("API 키 없음 - 간단한 노트 생성")
@@ -230,21 +190,24 @@ def generate_notes_with_gemini(transcript_text, video_info=None, learning_level=
 ## 자체 평가
 - 학습 내용을 잘 이해했는지 확인하는 질문
 """
+    except DeadlineExceeded:
+        raise
     except Exception as e:
-        log_message(f"노트 생성 중 오류: {str(e)}")
-        log_message(traceback.format_exc())
-        return f"학습 노트 생성 중 오류가 발생했습니다: {str(e)}"
+        log_message(f"노트 생성 중 오류: {str(e)}\n{traceback.format_exc()}", level='error')
+        return f"{GENERATION_ERROR_PREFIX}: {str(e)}"
 
 # HTTP 요청 핸들러
 class Handler(BaseHTTPRequestHandler):
+    @timed('request', BACKEND_NAME)
     def do_POST(self):
+        ticket = None
         try:
             log_message("POST 요청 받음")
             
             # 요청 데이터 읽기
             content_length = int(self.headers['Content-Length'])
             post_data = self.rfile.read(content_length).decode('utf-8')
-            log_message(f"요청 데이터: {post_data}")
+            log_message("요청 데이터", level='debug', body=post_data)
             
             data = json.loads(post_data)
             input_type = data.get('inputType', 'text')
@@ -254,24 +217,64 @@ class Handler(BaseHTTPRequestHandler):
             log_message(f"입력 타입: {input_type}, 학습 레벨: {learning_level}")
             log_message(f"입력 값 길이: {len(input_value)}")
             
+            # 요청 마감 시간 (X-Request-Timeout 헤더 또는 기본값, 각 단계의 타임아웃을 여기에 맞춤)
+            deadline = deadline_from_headers(self.headers)
+            
+            # 스트리밍 요청(/api/stream)은 SSE로 응답
+            if self.path.rstrip('/').endswith('/stream'):
+                self._stream_notes(input_type, input_value, learning_level, deadline)
+                return
+            
             video_title = "YouTube 학습 노트"
+            video_id = None
             
             # 입력 유형에 따라 처리
             if input_type == 'url':
-                # URL인 경우 비디오 ID 추출 및 정보 가져오기
                 video_id = extract_video_id(input_value)
+            
+            # 캐시 확인 (URL은 비디오 ID, 텍스트는 정규화된 내용 해시 기준)
+            cache_key = make_cache_key(video_id=video_id, transcript_text=input_value,
+                                       learning_level=learning_level,
+                                       prompt_version=PROMPT_VERSION, model_name=MODEL_NAME)
+            response_data = get_note_cache().get(cache_key)
+            if not response_data and not video_id:
+                # 직접 입력 텍스트는 거의 같은 스크립트(줄바꿈, 도입부 차이 등)로 만든 노트도 재사용
+                response_data = find_similar_notes(input_value, cache_key)
+            if response_data:
+                log_message("노트 캐시 적중")
+            else:
+                # 입장 제어 (비디오 정보 조회와 Gemini 호출 전에 클라이언트/Gemini 예산 확인)
+                try:
+                    ticket = admission.admit(client_address(self.headers, self.client_address[0]), deadline=deadline)
+                except AdmissionRejected as e:
+                    self._send_admission_rejected(e)
+                    return
+                
                 if video_id:
-                    video_info = get_video_info(video_id)
+                    # URL인 경우 비디오 정보 가져오기
+                    video_info = get_video_info(video_id, deadline)
                     video_title = video_info.get('title', "YouTube 학습 노트")
+                    
+                # Gemini API로 노트 생성
+                # 같은 영상/스크립트와 학습 레벨의 동시 요청은 하나의 Gemini 호출로 합침
+                markdown_content, processing_info = coalesce_generation(
+                    cache_key, generate_notes_with_gemini, input_value, None, learning_level, deadline=deadline,
+                    ticket=ticket)
                 
-            # Gemini API로 노트 생성
-            markdown_content = generate_notes_with_gemini(input_value, None, learning_level)
-            
-            # 응답 준비
-            response_data = {
-                'markdownContent': markdown_content,
-                'videoTitle': video_title
-            }
+                # 응답 준비
+                response_data = {
+                    'markdownContent': markdown_content,
+                    'videoTitle': video_title,
+                    'processingInfo': processing_info
+                }
+                
+                # 실패 안내문이나 API 키 없는 간이 노트는 캐시하지 않음
+                if GEMINI_API_KEY and not markdown_content.startswith(GENERATION_ERROR_PREFIX):
+                    register_export(response_data)
+                    get_note_cache().set(cache_key, response_data)
+                    if not video_id:
+                        remember_transcript(input_value, cache_key)
+                    index_notes(cache_key, response_data, None if video_id else input_value)
             
             # 성공 응답
             self.send_response(200)
@@ -285,9 +288,10 @@ class Handler(BaseHTTPRequestHandler):
             self.wfile.write(response.encode('utf-8'))
             log_message("응답 성공")
             
+        except DeadlineExceeded as e:
+            self._send_deadline_exceeded(e)
         except Exception as e:
-            log_message(f"오류 발생: {str(e)}")
-            log_message(traceback.format_exc())
+            log_message(f"오류 발생: {str(e)}\n{traceback.format_exc()}", level='error')
             
             # 오류 응답
             self.send_response(500)
@@ -302,11 +306,186 @@ class Handler(BaseHTTPRequestHandler):
                 'errorType': 'SERVER_ERROR'
             })
             self.wfile.write(error_response.encode('utf-8'))
+        finally:
+            # 비디오 정보 조회 중 마감 시간 초과 등으로 Gemini를 호출하지 않고 끝난 요청은 예약분을 돌려줌
+            # (생성까지 간 요청은 coalesce_generation에서 이미 정산했으므로 무시됨)
+            admission.release(ticket)
     
-    def do_OPTIONS(self):
-        log_message("OPTIONS 요청 받음")
+    # 입장 거절 응답 (429와 Retry-After)
+    def _send_admission_rejected(self, error):
+        log_message(f"입장 거절 ({error.reason}), {error.retry_after}초 후 재시도 안내", level='warning')
+        self.send_response(429)
+        self.send_header('Content-type', 'application/json')
+        self.send_header('Retry-After', str(error.retry_after))
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Allow-Methods', 'POST, OPTIONS')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.send_header('Access-Control-Expose-Headers', 'Retry-After')
+        self.end_headers()
+        
+        error_response = json.dumps({
+            'error': str(error),
+            'errorType': 'QUOTA_EXCEEDED',
+            'retryAfter': error.retry_after
+        })
+        self.wfile.write(error_response.encode('utf-8'))
+    
+    # 마감 시간 초과 응답 (504, 남은 단계는 실행하지 않음)
+    def _send_deadline_exceeded(self, error):
+        log_message(f"마감 시간 초과로 요청 중단 ({error.stage} 단계)", level='warning')
+        record_deadline_exceeded(BACKEND_NAME, error.stage)
+        self.send_response(504)
+        self.send_header('Content-type', 'application/json')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Allow-Methods', 'POST, OPTIONS')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.end_headers()
+        
+        error_response = json.dumps({
+            'error': str(error),
+            'errorType': 'DEADLINE_EXCEEDED',
+            'stage': error.stage
+        })
+        self.wfile.write(error_response.encode('utf-8'))
+    
+    # SSE 스트리밍 응답 (start → chunk... → done 또는 error)
+    def _stream_notes(self, input_type, input_value, learning_level, deadline=None):
         self.send_response(200)
+        self.send_header('Content-type', 'text/event-stream; charset=utf-8')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('X-Accel-Buffering', 'no')
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'POST, OPTIONS')
         self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.end_headers()
+        
+        def send_event(event, data):
+            self.wfile.write(format_sse(event, data).encode('utf-8'))
+            self.wfile.flush()
+        
+        send_event("start", {"learningLevel": learning_level})
+        ticket = None
+        try:
+            video_title = "YouTube 학습 노트"
+            video_id = extract_video_id(input_value) if input_type == 'url' else None
+            cache_key = make_cache_key(video_id=video_id, transcript_text=input_value,
+                                       learning_level=learning_level,
+                                       prompt_version=PROMPT_VERSION, model_name=MODEL_NAME)
+            
+            # 캐시 적중 시 전체 노트를 한 번에 전송
+            cached = get_note_cache().get(cache_key)
+            if not cached and not video_id:
+                cached = find_similar_notes(input_value, cache_key)
+            if cached:
+                log_message("노트 캐시 적중 (스트리밍)")
+                send_event("chunk", {"text": cached['markdownContent']})
+                send_event("done", {"videoTitle": cached['videoTitle'],
+                                    "processingInfo": {**cached.get('processingInfo', {}), "cacheHit": True}})
+                return
+            
+            try:
+                ticket = admission.admit(client_address(self.headers, self.client_address[0]), deadline=deadline)
+            except AdmissionRejected as e:
+                log_message(f"입장 거절 ({e.reason}, 스트리밍)", level='warning')
+                send_event("error", {"error": str(e), "errorType": "QUOTA_EXCEEDED", "retryAfter": e.retry_after})
+                return
+            
+            if video_id:
+                video_info = get_video_info(video_id, deadline)
+                video_title = video_info.get('title', "YouTube 학습 노트")
+            
+            if not GEMINI_API_KEY:
+                send_event("error", {"error": "GEMINI_API_KEY가 설정되어 있지 않습니다.", "errorType": "SERVER_ERROR"})
+                return
+            
+            processing_info = {}
+            parts = []
+            try:
+                prompt = build_notes_prompt(input_value, None, learning_level, processing_info, deadline)
+                for text in stream_with_fallback(GEMINI_MODELS, prompt, processing_info, log_message, deadline):
+                    parts.append(text)
+                    send_event("chunk", {"text": text})
+            finally:
+                # 모델 호출을 시작한 뒤에는 실패해도 예약분을 정산 (돌려주지 않음)
+                admission.settle(ticket, processing_info)
+            
+            response_data = {
+                'markdownContent': ''.join(parts),
+                'videoTitle': video_title,
+                'processingInfo': processing_info
+            }
+            register_export(response_data)
+            get_note_cache().set(cache_key, response_data)
+            if not video_id:
+                remember_transcript(input_value, cache_key)
+            index_notes(cache_key, response_data, None if video_id else input_value)
+            send_event("done", {"videoTitle": video_title, "processingInfo": processing_info,
+                                "noteId": response_data.get('noteId')})
+            log_message("스트리밍 응답 성공")
+        except DeadlineExceeded as e:
+            log_message(f"마감 시간 초과로 스트리밍 중단 ({e.stage} 단계)", level='warning')
+            record_deadline_exceeded(BACKEND_NAME, e.stage)
+            send_event("error", {"error": str(e), "errorType": "DEADLINE_EXCEEDED", "stage": e.stage})
+        except Exception as e:
+            log_message(f"스트리밍 중 오류 발생: {str(e)}\n{traceback.format_exc()}", level='error')
+            send_event("error", {"error": str(e), "errorType": "SERVER_ERROR"})
+        finally:
+            # 비디오 정보 조회 실패, API 키 없음 등으로 Gemini를 호출하지 않고 끝난 요청은 예약분을 돌려줌
+            admission.release(ticket)
+    
+    # 노트 검색 응답 (검색어가 없으면 400)
+    def _send_search_results(self, params):
+        try:
+            status = 200
+            response_data = search_notes(params.get('q', [''])[0], params.get('level', [None])[0],
+                                         int(params.get('limit', ['10'])[0]))
+        except ValueError as e:
+            status = 400
+            response_data = {'error': str(e), 'errorType': 'INVALID_QUERY'}
+        body = json.dumps(response_data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(body)
+    
+    # 노트 내보내기 응답 (렌더링한 파일은 캐시에서 바로 보냄)
+    def _send_export(self, note_id, export_format):
+        status, body, headers = export_note(note_id, export_format, self.headers.get('If-None-Match'))
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def do_GET(self):
+        # 단계별 지연 시간 메트릭 (Prometheus 텍스트 형식)
+        if self.path.rstrip('/').endswith('/metrics'):
+            body = metrics.render_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-type', PROMETHEUS_CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        # 생성한 노트/스크립트 전문 검색 (?q=검색어&level=beginner&limit=10)
+        url = urlparse(self.path)
+        if url.path.rstrip('/').endswith('/search'):
+            self._send_search_results(parse_qs(url.query))
+            return
+        # 생성한 노트의 HTML/PDF 내보내기 (/api/notes/{noteId}.html, .pdf)
+        export = EXPORT_PATH.search(url.path)
+        if export:
+            self._send_export(*export.groups())
+            return
+        self.send_response(404)
+        self.end_headers()
+    
+    def do_OPTIONS(self):
+        log_message("OPTIONS 요청 받음")
+        self.send_response(200)
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type, X-Request-Timeout')
         self.end_headers() 
\ No newline at end of file
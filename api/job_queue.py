@@ -0,0 +1,183 @@
+import functools
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+# 작업 큐 설정 (환경 변수로 조정 가능)
+JOB_QUEUE_PATH = os.environ.get("JOB_QUEUE_PATH", "/tmp/note_jobs.sqlite3")
+JOB_LEASE_SECONDS = float(os.environ.get("JOB_LEASE_SECONDS", "60"))
+JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", "3"))
+
+# 작업 상태
+STATUS_QUEUED = 'queued'
+STATUS_RUNNING = 'running'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+
+def _locked(method):
+    # 같은 연결을 여러 스레드(요청 처리, 하트비트)가 쓰므로 메서드 단위로 직렬화
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+class JobQueue:
+    """SQLite(WAL) 기반의 내구성 있는 작업 큐입니다.
+
+    워커는 작업을 리스(lease)와 함께 가져가고 하트비트로 리스를 연장합니다.
+    리스가 만료된 작업은 다른 워커가 다시 가져갈 수 있으므로 워커 프로세스가 죽어도 작업이 사라지지 않습니다.
+    """
+
+    def __init__(self, path=JOB_QUEUE_PATH, lease_seconds=JOB_LEASE_SECONDS, max_attempts=JOB_MAX_ATTEMPTS):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._conn = None
+        self._pid = None
+        self._lock = threading.RLock()
+
+    def _connect(self):
+        # 프로세스마다 별도 연결 사용 (fork 후 연결 공유 방지)
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, status TEXT NOT NULL, payload TEXT NOT NULL, "
+                "result TEXT, error TEXT, attempts INTEGER NOT NULL DEFAULT 0, "
+                "lease_owner TEXT, lease_expires_at REAL, "
+                "created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs(status, created_at)")
+            self._pid = os.getpid()
+        return self._conn
+
+    @_locked
+    def enqueue(self, payload):
+        """작업을 큐에 넣고 작업 ID를 반환합니다."""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self._connect().execute(
+            "INSERT INTO jobs (id, status, payload, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+            (job_id, STATUS_QUEUED, json.dumps(payload, ensure_ascii=False), now, now)
+        )
+        return job_id
+
+    @_locked
+    def claim(self, worker_id):
+        """대기 중이거나 리스가 만료된 가장 오래된 작업을 가져옵니다. 없으면 None을 반환합니다."""
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # 재시도 한도를 넘긴 채 리스가 만료된 작업은 실패 처리
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, lease_owner = NULL, updated_at = ? "
+                "WHERE status = ? AND lease_expires_at < ? AND attempts >= ?",
+                (STATUS_FAILED, "작업 처리 중 워커가 응답하지 않았습니다.", now,
+                 STATUS_RUNNING, now, self.max_attempts)
+            )
+            row = conn.execute(
+                "SELECT id, payload, attempts FROM jobs "
+                "WHERE (status = ? AND (lease_expires_at IS NULL OR lease_expires_at < ?)) "
+                "OR (status = ? AND lease_expires_at < ?) "
+                "ORDER BY created_at LIMIT 1",
+                (STATUS_QUEUED, now, STATUS_RUNNING, now)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = ?, lease_owner = ?, lease_expires_at = ?, "
+                "attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                (STATUS_RUNNING, worker_id, now + self.lease_seconds, now, row[0])
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return {'id': row[0], 'payload': json.loads(row[1]), 'attempts': row[2] + 1}
+
+    @_locked
+    def heartbeat(self, job_id, worker_id):
+        """작업 리스를 연장합니다. 리스를 이미 잃었으면 False를 반환합니다."""
+        now = time.time()
+        cursor = self._connect().execute(
+            "UPDATE jobs SET lease_expires_at = ?, updated_at = ? "
+            "WHERE id = ? AND lease_owner = ? AND status = ?",
+            (now + self.lease_seconds, now, job_id, worker_id, STATUS_RUNNING)
+        )
+        return cursor.rowcount == 1
+
+    @_locked
+    def complete(self, job_id, worker_id, result):
+        """작업을 완료 처리합니다. 리스를 잃은 워커의 결과는 무시하고 False를 반환합니다."""
+        cursor = self._connect().execute(
+            "UPDATE jobs SET status = ?, result = ?, lease_owner = NULL, lease_expires_at = NULL, updated_at = ? "
+            "WHERE id = ? AND lease_owner = ? AND status = ?",
+            (STATUS_DONE, json.dumps(result, ensure_ascii=False), time.time(), job_id, worker_id, STATUS_RUNNING)
+        )
+        return cursor.rowcount == 1
+
+    @_locked
+    def fail(self, job_id, worker_id, error, retry=False, retry_after=None):
+        """작업 실패를 기록합니다. retry가 참이고 재시도 한도 안이면 다시 대기열에 넣습니다.
+
+        retry_after(초)가 주어지면 그 시간이 지나기 전에는 다른 워커가 작업을 다시 가져가지 않습니다.
+        """
+        conn = self._connect()
+        now = time.time()
+        row = conn.execute("SELECT attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        status = STATUS_QUEUED if retry and row and row[0] < self.max_attempts else STATUS_FAILED
+        # 대기 중인 작업의 lease_expires_at은 다시 가져갈 수 있는 시각으로 씀
+        not_before = now + retry_after if status == STATUS_QUEUED and retry_after else None
+        cursor = conn.execute(
+            "UPDATE jobs SET status = ?, error = ?, lease_owner = NULL, lease_expires_at = ?, updated_at = ? "
+            "WHERE id = ? AND lease_owner = ? AND status = ?",
+            (status, error if isinstance(error, str) else json.dumps(error, ensure_ascii=False),
+             not_before, now, job_id, worker_id, STATUS_RUNNING)
+        )
+        return cursor.rowcount == 1
+
+    @_locked
+    def get(self, job_id):
+        """작업 상태와 결과를 반환합니다. 없으면 None을 반환합니다."""
+        row = self._connect().execute(
+            "SELECT id, status, result, error, attempts, created_at, updated_at FROM jobs WHERE id = ?",
+            (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        job = {
+            'id': row[0],
+            'status': row[1],
+            'attempts': row[4],
+            'createdAt': row[5],
+            'updatedAt': row[6]
+        }
+        if row[2] is not None:
+            job['result'] = json.loads(row[2])
+        if row[3] is not None:
+            job['error'] = row[3]
+        return job
+
+    @_locked
+    def counts(self):
+        """상태별 작업 수를 반환합니다."""
+        rows = self._connect().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return dict(rows)
+
+# 프로세스 전역 작업 큐 인스턴스
+_job_queue = None
+
+def get_job_queue():
+    """프로세스 전역 작업 큐를 반환합니다."""
+    global _job_queue
+    if _job_queue is None:
+        _job_queue = JobQueue()
+    return _job_queue
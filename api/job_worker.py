@@ -0,0 +1,120 @@
+"""노트 생성 작업 워커.
+
+job_queue.py의 작업 큐에서 작업을 리스와 함께 가져와 처리하고 결과를 저장합니다.
+워커 프로세스 수를 늘리면 처리량이 늘어나며, 워커가 죽어도 리스가 만료되면 다른 워커가 작업을 이어받습니다.
+
+사용법:
+    python job_worker.py --processes 4
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import socket
+import threading
+import time
+from job_queue import get_job_queue
+
+JOB_POLL_INTERVAL = float(os.environ.get("JOB_POLL_INTERVAL", "1"))
+
+# 리스 연장 스레드
+class Heartbeat(threading.Thread):
+    """작업을 처리하는 동안 주기적으로 리스를 연장합니다."""
+
+    def __init__(self, queue, job_id, worker_id):
+        super().__init__(daemon=True)
+        self.queue = queue
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.stopped = threading.Event()
+        self.lost = False
+
+    def run(self):
+        interval = max(self.queue.lease_seconds / 3, 0.1)
+        while not self.stopped.wait(interval):
+            if not self.queue.heartbeat(self.job_id, self.worker_id):
+                self.lost = True
+                return
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+# 작업 하나 처리 함수
+def process_job(job, run_pipeline, loop):
+    """작업 페이로드로 노트 생성 파이프라인을 워커의 이벤트 루프에서 실행합니다."""
+    payload = job['payload']
+    return loop.run_until_complete(run_pipeline(
+        payload.get('inputType', 'text'),
+        payload.get('inputValue', ''),
+        payload.get('learningLevel', 'beginner')
+    ))
+
+def _retry_after(error):
+    try:
+        return float((error.headers or {}).get('Retry-After', JOB_POLL_INTERVAL))
+    except ValueError:
+        return JOB_POLL_INTERVAL
+
+def worker_loop(worker_id, stop_event=None, max_jobs=None):
+    """작업 큐를 폴링하며 작업을 처리합니다."""
+    # 파이프라인은 워커 프로세스 안에서만 불러옴 (무거운 의존성)
+    from fastapi import HTTPException
+    from fastapi_app import run_note_pipeline, log_message
+
+    queue = get_job_queue()
+    # 이벤트 루프는 워커당 하나만 만들어 재사용
+    # (Gemini gRPC 클라이언트와 전역 httpx.AsyncClient가 처음 쓴 루프에 묶이므로 작업마다 새 루프를 만들면 안 됨)
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        processed = 0
+        while not (stop_event and stop_event.is_set()):
+            job = queue.claim(worker_id)
+            if job is None:
+                time.sleep(JOB_POLL_INTERVAL)
+                continue
+
+            log_message(f"작업 시작: {job['id']} (워커 {worker_id}, 시도 {job['attempts']})")
+            heartbeat = Heartbeat(queue, job['id'], worker_id)
+            heartbeat.start()
+            try:
+                result = process_job(job, run_note_pipeline, loop)
+                heartbeat.stop()
+                if not queue.complete(job['id'], worker_id, result):
+                    log_message(f"작업 리스 상실, 결과 폐기: {job['id']}")
+            except HTTPException as e:
+                # 잘못된 URL, 자막 없음 등은 재시도해도 같은 결과이므로 바로 실패 처리
+                # Gemini 예산 부족(429)은 Retry-After만큼 기다렸다가 다시 시도
+                heartbeat.stop()
+                retry_after = _retry_after(e) if e.status_code == 429 else None
+                queue.fail(job['id'], worker_id, e.detail, retry=e.status_code >= 500 or e.status_code == 429,
+                           retry_after=retry_after)
+            except Exception as e:
+                heartbeat.stop()
+                log_message(f"작업 처리 오류: {job['id']}: {str(e)}", level='error')
+                queue.fail(job['id'], worker_id, str(e), retry=True)
+
+            processed += 1
+            if max_jobs and processed >= max_jobs:
+                break
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
+
+def _run_worker(index):
+    worker_loop(f"{socket.gethostname()}-{os.getpid()}-{index}")
+
+def main():
+    parser = argparse.ArgumentParser(description="노트 생성 작업 워커")
+    parser.add_argument('--processes', type=int, default=int(os.environ.get("JOB_WORKER_PROCESSES", "2")))
+    args = parser.parse_args()
+
+    processes = [multiprocessing.Process(target=_run_worker, args=(index,)) for index in range(args.processes)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+if __name__ == '__main__':
+    main()
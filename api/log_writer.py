@@ -0,0 +1,174 @@
+import atexit
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# 로그 설정 (환경 변수로 조정 가능)
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "info").lower()
+LOG_MAX_BYTES = int(os.environ.get("LOG_MAX_BYTES", str(5 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.environ.get("LOG_BACKUP_COUNT", "3"))
+LOG_QUEUE_SIZE = int(os.environ.get("LOG_QUEUE_SIZE", "50000"))
+LOG_FLUSH_INTERVAL = float(os.environ.get("LOG_FLUSH_INTERVAL", "0.5"))
+# 요청 본문 같은 큰 필드는 이 길이까지만 기록
+LOG_MAX_FIELD_CHARS = int(os.environ.get("LOG_MAX_FIELD_CHARS", "500"))
+
+LEVELS = {'debug': 10, 'info': 20, 'warning': 30, 'error': 40}
+
+def truncate_value(value, max_chars=LOG_MAX_FIELD_CHARS):
+    """긴 문자열은 잘라내고, 딕셔너리/리스트는 안쪽 값까지 잘라냅니다."""
+    if isinstance(value, str):
+        if len(value) > max_chars:
+            return f"{value[:max_chars]}...(+{len(value) - max_chars}자)"
+        return value
+    if isinstance(value, dict):
+        return {key: truncate_value(item, max_chars) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [truncate_value(item, max_chars) for item in value]
+    if isinstance(value, (int, float, bool)) or value is None:
+        return value
+    return truncate_value(str(value), max_chars)
+
+class LogWriter:
+    """로그 레코드를 메모리 버퍼에 넣고 백그라운드 스레드가 주기적으로 모아서 JSON 줄로 파일에 씁니다.
+
+    호출하는 쪽은 버퍼에 추가만 하므로 파일 I/O나 잠금을 기다리지 않습니다. 버퍼가 가득 차면 레코드를 버리고 개수를 셉니다.
+    파일이 LOG_MAX_BYTES를 넘으면 path.1, path.2 ... 로 순환합니다.
+    """
+
+    def __init__(self, path, max_bytes=LOG_MAX_BYTES, backup_count=LOG_BACKUP_COUNT,
+                 queue_size=LOG_QUEUE_SIZE, flush_interval=LOG_FLUSH_INTERVAL):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.queue_size = queue_size
+        self.flush_interval = flush_interval
+        # deque.append/popleft는 스레드 안전하므로 호출 쪽에서 잠금이 필요 없음
+        self._buffer = deque()
+        self._write_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._file = None
+        self.written = 0
+        self.dropped = 0
+        self.rotations = 0
+        self.errors = 0
+        self._thread = threading.Thread(target=self._run, name=f"log-writer:{path}", daemon=True)
+        self._thread.start()
+
+    def write(self, record):
+        """레코드(딕셔너리)를 버퍼에 넣습니다. 절대 블로킹하지 않습니다."""
+        if len(self._buffer) >= self.queue_size:
+            self.dropped += 1
+            return
+        self._buffer.append(record)
+
+    def _open(self):
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+        return self._file
+
+    def _rotate(self):
+        self._file.close()
+        self._file = None
+        for index in range(self.backup_count - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        if self.backup_count > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self.rotations += 1
+
+    def flush(self):
+        """버퍼에 쌓인 레코드를 지금 파일에 씁니다."""
+        with self._write_lock:
+            while self._buffer:
+                records = []
+                while self._buffer and len(records) < 1000:
+                    records.append(self._buffer.popleft())
+                lines = "".join(json.dumps(record, ensure_ascii=False, default=str) + "\n" for record in records)
+                try:
+                    f = self._open()
+                    f.write(lines)
+                    f.flush()
+                    self.written += len(records)
+                    if self.max_bytes and f.tell() >= self.max_bytes:
+                        self._rotate()
+                except OSError:
+                    # 로그 파일 문제로 요청 처리가 실패하지 않도록 무시하고 개수만 셈
+                    self.errors += len(records)
+                    self._file = None
+
+    def _run(self):
+        while not self._stopped.wait(self.flush_interval):
+            self.flush()
+
+    def close(self):
+        """남은 레코드를 쓰고 백그라운드 스레드를 멈춥니다."""
+        self._stopped.set()
+        self.flush()
+        with self._write_lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def stats(self):
+        """쓴 레코드 수, 버린 레코드 수, 대기 중인 레코드 수, 순환 횟수를 반환합니다."""
+        return {
+            'written': self.written,
+            'dropped': self.dropped,
+            'queued': len(self._buffer),
+            'rotations': self.rotations,
+            'errors': self.errors
+        }
+
+# 경로별 로그 작성기 (포크된 워커 프로세스는 새로 만듦)
+_writers = {}
+_writers_lock = threading.Lock()
+
+def get_log_writer(path):
+    """경로별 프로세스 전역 LogWriter를 반환합니다."""
+    key = (os.getpid(), path)
+    writer = _writers.get(key)
+    if writer is None:
+        with _writers_lock:
+            writer = _writers.get(key)
+            if writer is None:
+                writer = LogWriter(path)
+                _writers[key] = writer
+                atexit.register(writer.close)
+    return writer
+
+class StructuredLogger:
+    """레벨과 추가 필드를 가진 JSON 로그 레코드를 LogWriter로 보냅니다."""
+
+    def __init__(self, name, path, level=LOG_LEVEL):
+        self.name = name
+        self.path = path
+        self.threshold = LEVELS.get(level, LEVELS['info'])
+
+    def log(self, level, message, **fields):
+        if LEVELS.get(level, LEVELS['info']) < self.threshold:
+            return
+        record = {'ts': round(time.time(), 3), 'level': level, 'logger': self.name, 'msg': message}
+        if fields:
+            record.update(truncate_value(fields))
+        get_log_writer(self.path).write(record)
+
+    def debug(self, message, **fields):
+        self.log('debug', message, **fields)
+
+    def info(self, message, **fields):
+        self.log('info', message, **fields)
+
+    def warning(self, message, **fields):
+        self.log('warning', message, **fields)
+
+    def error(self, message, **fields):
+        self.log('error', message, **fields)
+
+    def stats(self):
+        """이 로거가 쓰는 LogWriter의 통계를 반환합니다."""
+        return get_log_writer(self.path).stats()
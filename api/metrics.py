@@ -0,0 +1,169 @@
+import functools
+import inspect
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# 지연 시간 히스토그램 구간 (초)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# 백분위수 계산에 쓰는 단계별 최근 관측값 수
+METRICS_WINDOW = int(os.environ.get("METRICS_WINDOW", "1024"))
+QUANTILES = (0.5, 0.95, 0.99)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+class Histogram:
+    """누적 구간 카운트(Prometheus 히스토그램)와 백분위수용 최근 관측값을 함께 보관합니다."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS, window=METRICS_WINDOW):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        self.recent.append(value)
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+
+    def quantiles(self):
+        values = sorted(self.recent)
+        if not values:
+            return {}
+        return {q: values[min(len(values) - 1, int(len(values) * q))] for q in QUANTILES}
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+class MetricsRegistry:
+    """단계별 지연 시간 히스토그램과 카운터를 모아 Prometheus 텍스트 형식으로 내보냅니다.
+
+    값은 프로세스별로 집계됩니다 (서버리스 인스턴스나 워커 프로세스마다 따로).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+
+    def observe(self, stage, seconds, backend):
+        key = (('backend', backend), ('stage', stage))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    def increment(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def snapshot(self):
+        """단계별 호출 수와 p50/p95/p99(밀리초)를 딕셔너리로 반환합니다."""
+        with self._lock:
+            stages = {}
+            for key, histogram in self._histograms.items():
+                labels = dict(key)
+                quantiles = histogram.quantiles()
+                stages[f"{labels['backend']}:{labels['stage']}"] = {
+                    'count': histogram.count,
+                    **{f"p{int(q * 100)}Ms": round(value * 1000, 1) for q, value in quantiles.items()}
+                }
+            counters = {}
+            for (name, labels), value in self._counters.items():
+                counters[f"{name}{_labels(labels)}"] = value
+        return {'stages': stages, 'counters': counters}
+
+    def render_prometheus(self):
+        """Prometheus 텍스트 노출 형식 문자열을 반환합니다."""
+        lines = []
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            lines.append("# HELP note_stage_duration_seconds 노트 생성 단계별 처리 시간")
+            lines.append("# TYPE note_stage_duration_seconds histogram")
+            for key, histogram in histograms:
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f"note_stage_duration_seconds_bucket{_labels(key + (('le', bound),))} {cumulative}")
+                lines.append(f"note_stage_duration_seconds_bucket{_labels(key + (('le', '+Inf'),))} {histogram.count}")
+                lines.append(f"note_stage_duration_seconds_sum{_labels(key)} {histogram.sum:.6f}")
+                lines.append(f"note_stage_duration_seconds_count{_labels(key)} {histogram.count}")
+
+            lines.append("# HELP note_stage_duration_quantile_seconds 최근 관측값 기준 단계별 처리 시간 백분위수")
+            lines.append("# TYPE note_stage_duration_quantile_seconds gauge")
+            for key, histogram in histograms:
+                for q, value in histogram.quantiles().items():
+                    lines.append(f"note_stage_duration_quantile_seconds{_labels(key + (('quantile', q),))} {value:.6f}")
+
+            names = sorted({name for name, _ in self._counters})
+            for name in names:
+                lines.append(f"# TYPE {name} counter")
+                for (counter_name, labels), value in sorted(self._counters.items()):
+                    if counter_name == name:
+                        lines.append(f"{name}{_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+# 프로세스 전역 메트릭 레지스트리
+metrics = MetricsRegistry()
+
+def error_type(error):
+    """예외를 오류 종류 레이블로 바꿉니다 (HTTPException은 상태 코드 포함)."""
+    status_code = getattr(error, 'status_code', None)
+    if status_code is not None:
+        return f"{type(error).__name__}_{status_code}"
+    return type(error).__name__
+
+@contextmanager
+def stage_timer(stage, backend):
+    """with 블록의 처리 시간을 단계 히스토그램에 기록하고, 예외가 나면 오류 카운터를 올립니다."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        metrics.increment('note_errors_total', backend=backend, stage=stage, error_type=error_type(e))
+        raise
+    finally:
+        metrics.observe(stage, time.perf_counter() - start, backend)
+
+def timed(stage, backend):
+    """함수(동기/비동기) 호출 시간을 단계 히스토그램에 기록하는 데코레이터입니다."""
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with stage_timer(stage, backend):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage_timer(stage, backend):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def record_model_used(model_name):
+    """실제로 응답한 모델을 셉니다."""
+    metrics.increment('note_model_used_total', model=model_name)
+
+def record_model_error(model_name, error):
+    """모델 호출 실패를 모델과 오류 종류별로 셉니다."""
+    metrics.increment('note_model_errors_total', model=model_name, error_type=error_type(error))
+
+def record_deadline_exceeded(backend, stage):
+    """마감 시간이 지나 중단한 요청을 단계별로 셉니다."""
+    metrics.increment('note_deadline_exceeded_total', backend=backend, stage=stage)
@@ -0,0 +1,386 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from metrics import record_model_error, record_model_used
+from deadline import DeadlineExceeded
+
+# 회로 차단기/헤징 설정 (환경 변수로 조정 가능)
+MODEL_FAILURE_THRESHOLD = int(os.environ.get("MODEL_FAILURE_THRESHOLD", "3"))
+MODEL_ERROR_RATE_THRESHOLD = float(os.environ.get("MODEL_ERROR_RATE_THRESHOLD", "0.5"))
+MODEL_HEALTH_WINDOW = int(os.environ.get("MODEL_HEALTH_WINDOW", "50"))
+MODEL_MIN_SAMPLES = int(os.environ.get("MODEL_MIN_SAMPLES", "10"))
+MODEL_COOLDOWN_SECONDS = float(os.environ.get("MODEL_COOLDOWN_SECONDS", "60"))
+MODEL_HEDGE_ENABLED = os.environ.get("MODEL_HEDGE", "0") == "1"
+MODEL_HEDGE_PERCENTILE = float(os.environ.get("MODEL_HEDGE_PERCENTILE", "95"))
+MODEL_HEDGE_MIN_DELAY = float(os.environ.get("MODEL_HEDGE_MIN_DELAY", "1"))
+# 지연 시간 기록이 없는 모델이 응답하는 데 걸린다고 보는 시간(초) (남은 시간이 이보다 짧으면 호출하지 않음)
+MODEL_MIN_CALL_SECONDS = float(os.environ.get("MODEL_MIN_CALL_SECONDS", "2"))
+# 마감 시간이 있는 호출을 실행하는 스레드 수
+MODEL_CALL_WORKERS = int(os.environ.get("MODEL_CALL_WORKERS", "32"))
+
+# 회로 상태
+CIRCUIT_CLOSED = 'closed'
+CIRCUIT_OPEN = 'open'
+CIRCUIT_HALF_OPEN = 'half_open'
+
+class ModelHealthRegistry:
+    """모델별 지연 시간과 오류율을 기록하고, 계속 실패하는 모델의 회로를 열어 일정 시간 건너뜁니다.
+
+    냉각 시간이 지나면 한 번의 시험 호출(half-open)만 허용하고, 성공하면 회로를 다시 닫습니다.
+    """
+
+    def __init__(self, failure_threshold=MODEL_FAILURE_THRESHOLD, error_rate_threshold=MODEL_ERROR_RATE_THRESHOLD,
+                 window=MODEL_HEALTH_WINDOW, min_samples=MODEL_MIN_SAMPLES, cooldown=MODEL_COOLDOWN_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.error_rate_threshold = error_rate_threshold
+        self.window = window
+        self.min_samples = min_samples
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._models = {}
+
+    def _model(self, model_name):
+        health = self._models.get(model_name)
+        if health is None:
+            health = {
+                'latencies': deque(maxlen=self.window),
+                'outcomes': deque(maxlen=self.window),
+                'successes': 0,
+                'failures': 0,
+                'consecutive_failures': 0,
+                'state': CIRCUIT_CLOSED,
+                'opened_until': 0.0,
+                'probing': False,
+                'last_error': None
+            }
+            self._models[model_name] = health
+        return health
+
+    def allow(self, model_name):
+        """모델을 호출해도 되는지 반환합니다. 냉각이 끝난 열린 회로는 시험 호출 하나만 허용합니다."""
+        with self._lock:
+            health = self._model(model_name)
+            if health['state'] == CIRCUIT_CLOSED:
+                return True
+            if health['probing']:
+                return False
+            if health['state'] == CIRCUIT_OPEN and time.time() < health['opened_until']:
+                return False
+            health['state'] = CIRCUIT_HALF_OPEN
+            health['probing'] = True
+            return True
+
+    def record_success(self, model_name, latency):
+        """성공한 호출과 지연 시간(초)을 기록하고 회로를 닫습니다."""
+        with self._lock:
+            health = self._model(model_name)
+            health['latencies'].append(latency)
+            health['outcomes'].append(True)
+            health['successes'] += 1
+            health['consecutive_failures'] = 0
+            health['state'] = CIRCUIT_CLOSED
+            health['probing'] = False
+
+    def record_failure(self, model_name, error):
+        """실패한 호출을 기록하고, 연속 실패나 오류율이 기준을 넘으면 회로를 엽니다."""
+        record_model_error(model_name, error)
+        with self._lock:
+            health = self._model(model_name)
+            health['outcomes'].append(False)
+            health['failures'] += 1
+            health['consecutive_failures'] += 1
+            health['last_error'] = str(error)[:200]
+            outcomes = health['outcomes']
+            error_rate = outcomes.count(False) / len(outcomes)
+            if (health['state'] == CIRCUIT_HALF_OPEN
+                    or health['consecutive_failures'] >= self.failure_threshold
+                    or (len(outcomes) >= self.min_samples and error_rate >= self.error_rate_threshold)):
+                health['state'] = CIRCUIT_OPEN
+                health['opened_until'] = time.time() + self.cooldown
+            health['probing'] = False
+
+    def record_abandoned(self, model_name):
+        """마감 시간 초과나 취소로 결과 없이 끝난 호출을 기록합니다.
+
+        모델 상태는 알 수 없으므로 성공/실패로 세지 않고, 시험 호출이었다면 회로를 다시 열린 상태로 돌려
+        다음 호출이 시험 호출을 이어받게 합니다.
+        """
+        with self._lock:
+            health = self._model(model_name)
+            if health['state'] == CIRCUIT_HALF_OPEN:
+                health['state'] = CIRCUIT_OPEN
+            health['probing'] = False
+
+    def latency_percentile(self, model_name, percentile):
+        """최근 성공 호출 지연 시간의 백분위수(초)를 반환합니다. 표본이 부족하면 None을 반환합니다."""
+        with self._lock:
+            latencies = sorted(self._model(model_name)['latencies'])
+        if len(latencies) < self.min_samples:
+            return None
+        index = min(len(latencies) - 1, int(len(latencies) * percentile / 100))
+        return latencies[index]
+
+    def stats(self):
+        """모델별 상태, 호출 수, 오류율, 지연 시간을 반환합니다."""
+        with self._lock:
+            names = list(self._models)
+        stats = {}
+        for model_name in names:
+            with self._lock:
+                health = self._models[model_name]
+                outcomes = list(health['outcomes'])
+                stats[model_name] = {
+                    'state': health['state'],
+                    'successes': health['successes'],
+                    'failures': health['failures'],
+                    'errorRate': round(outcomes.count(False) / len(outcomes), 3) if outcomes else 0.0,
+                    'lastError': health['last_error']
+                }
+            stats[model_name]['p50Latency'] = self.latency_percentile(model_name, 50)
+            stats[model_name]['p95Latency'] = self.latency_percentile(model_name, 95)
+        return stats
+
+# 프로세스 전역 모델 상태 레지스트리
+model_health = ModelHealthRegistry()
+
+def _timed_call(call_model, model_name, prompt, deadline=None):
+    start = time.perf_counter()
+    try:
+        if deadline is None:
+            text = call_model(model_name, prompt)
+        else:
+            text = call_model(model_name, prompt, deadline.timeout('gemini'))
+    except Exception as e:
+        # 마감 시간 때문에 끊긴 호출은 모델 탓이 아니므로 회로 상태에 반영하지 않음 (시험 호출만 반납)
+        if deadline is not None and deadline.expired():
+            model_health.record_abandoned(model_name)
+            raise DeadlineExceeded('gemini') from e
+        model_health.record_failure(model_name, e)
+        raise
+    model_health.record_success(model_name, time.perf_counter() - start)
+    return text
+
+def can_finish(model_name, deadline):
+    """남은 시간 안에 모델 호출이 끝날 가망이 있는지 반환합니다.
+
+    남은 시간이 최근 지연 시간 중앙값(기록이 없으면 MODEL_MIN_CALL_SECONDS)보다 짧으면 False입니다.
+    """
+    if deadline is None:
+        return True
+    expected = model_health.latency_percentile(model_name, 50)
+    return deadline.remaining() >= (MODEL_MIN_CALL_SECONDS if expected is None else expected)
+
+# 마감 시간이 있는 호출용 스레드 풀
+# SDK가 요청 타임아웃을 지원하지 않아도 요청을 처리하는 스레드는 마감 시간에 풀려남
+_deadline_executor = ThreadPoolExecutor(max_workers=MODEL_CALL_WORKERS, thread_name_prefix="model-call")
+
+def _call_before_deadline(deadline, call_model, model_name, prompt):
+    future = _deadline_executor.submit(_timed_call, call_model, model_name, prompt, deadline)
+    done, _ = wait([future], timeout=deadline.remaining())
+    if not done:
+        # 아직 시작하지 못한 호출은 _timed_call이 결과를 기록하지 않으므로 여기서 시험 호출을 반납
+        # (실행 중인 호출은 끝날 때 _timed_call이 기록함)
+        if future.cancel():
+            model_health.record_abandoned(model_name)
+        raise DeadlineExceeded('gemini')
+    return future.result()
+
+def _hedge_delay(model_name):
+    if not MODEL_HEDGE_ENABLED:
+        return None
+    delay = model_health.latency_percentile(model_name, MODEL_HEDGE_PERCENTILE)
+    if delay is None:
+        return None
+    # 지연 시간이 아주 짧은 모델도 매번 헤징하지 않도록 최소 대기 시간 적용
+    return max(delay, MODEL_HEDGE_MIN_DELAY)
+
+def _finish(processing_info, model_name, reasons):
+    processing_info['modelUsed'] = model_name
+    processing_info['fallbackReason'] = "; ".join(reasons) if reasons else None
+    record_model_used(model_name)
+
+# 모델 대체 호출 함수 (회로가 열린 모델은 건너뛰고, 필요하면 다음 모델로 헤징)
+def call_with_fallback(model_names, call_model, prompt, processing_info=None, log=print, deadline=None):
+    """model_names 순서대로 call_model(model_name, prompt)를 시도해 처음 성공한 결과를 반환합니다.
+
+    processing_info에는 사용한 모델(modelUsed)과 대체 사유(fallbackReason)를 기록합니다.
+    deadline이 주어지면 call_model(model_name, prompt, timeout)으로 남은 시간을 넘기고,
+    남은 시간 안에 끝나기 어려운 모델은 건너뛰며, 마감 시간이 지나면 DeadlineExceeded를 발생시킵니다.
+    """
+    if processing_info is None:
+        processing_info = {}
+    reasons = []
+    last_error = None
+    skipped_for_deadline = False
+    tried = set()
+    for index, model_name in enumerate(model_names):
+        if model_name in tried:
+            log(f"{model_name} 모델은 헤징에서 이미 호출해 건너뜀")
+            continue
+        if not can_finish(model_name, deadline):
+            log(f"{model_name} 모델은 남은 시간({deadline.remaining():.1f}초) 안에 끝나기 어려워 건너뜀")
+            reasons.append(f"{model_name}: deadline")
+            skipped_for_deadline = True
+            continue
+        if not model_health.allow(model_name):
+            log(f"{model_name} 모델 회로 열림, 건너뜀")
+            reasons.append(f"{model_name}: circuit_open")
+            continue
+
+        delay = _hedge_delay(model_name)
+        backups = model_names[index + 1:]
+        try:
+            if delay is not None and backups:
+                used, text, hedge_reasons = _call_hedged(model_name, backups[0], call_model, prompt, delay, log,
+                                                         deadline, tried)
+                reasons.extend(hedge_reasons)
+            elif deadline is not None:
+                used, text = model_name, _call_before_deadline(deadline, call_model, model_name, prompt)
+            else:
+                used, text = model_name, _timed_call(call_model, model_name, prompt)
+            _finish(processing_info, used, reasons)
+            return text
+        except DeadlineExceeded:
+            log(f"{model_name} 모델 호출 중 마감 시간 초과")
+            raise
+        except Exception as e:
+            log(f"{model_name} 모델 오류: {str(e)}")
+            reasons.append(f"{model_name}: {str(e)[:100]}")
+            last_error = e
+
+    if last_error is None:
+        if skipped_for_deadline:
+            raise DeadlineExceeded('gemini')
+        raise Exception("모든 AI 모델이 일시적으로 차단되어 있습니다. 잠시 후 다시 시도해 주세요.")
+    raise last_error
+
+def _call_hedged(primary, backup, call_model, prompt, delay, log, deadline=None, tried=None):
+    # 주 모델이 지연 시간 백분위수 안에 응답하지 않으면 예비 모델을 동시에 호출해 먼저 성공한 결과 사용
+    # (예비 모델을 호출하면 tried에 기록해 대체 루프에서 같은 모델을 다시 호출하지 않게 함)
+    executor = ThreadPoolExecutor(max_workers=2)
+    try:
+        futures = {executor.submit(_timed_call, call_model, primary, prompt, deadline): primary}
+        done, _ = wait(futures, timeout=delay if deadline is None else min(delay, deadline.remaining()))
+        if not done and can_finish(backup, deadline) and model_health.allow(backup):
+            log(f"{primary} 모델 응답 지연({delay:.1f}초), {backup} 모델로 헤징")
+            futures[executor.submit(_timed_call, call_model, backup, prompt, deadline)] = backup
+            if tried is not None:
+                tried.add(backup)
+        reasons = []
+        pending = set(futures)
+        error = None
+        while pending:
+            done, pending = wait(pending, timeout=None if deadline is None else deadline.remaining(),
+                                 return_when=FIRST_COMPLETED)
+            if not done:
+                raise DeadlineExceeded('gemini')
+            for future in done:
+                if future.exception() is None:
+                    used = futures[future]
+                    if used != primary:
+                        reasons.append(f"{primary}: hedged after {delay:.1f}s")
+                    return used, future.result(), reasons
+                error = future.exception()
+        raise error
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+# 비동기 모델 대체 호출 함수
+async def call_with_fallback_async(model_names, call_model, prompt, processing_info=None, log=print, deadline=None):
+    """call_with_fallback의 비동기 버전입니다. call_model은 코루틴 함수여야 합니다.
+
+    deadline이 주어지면 마감 시간에 맞춰 진행 중인 호출을 취소합니다.
+    """
+    import asyncio
+    if processing_info is None:
+        processing_info = {}
+    reasons = []
+    last_error = None
+    skipped_for_deadline = False
+
+    async def timed(model_name):
+        start = time.perf_counter()
+        try:
+            if deadline is None:
+                text = await call_model(model_name, prompt)
+            else:
+                timeout = deadline.timeout('gemini')
+                text = await asyncio.wait_for(call_model(model_name, prompt, timeout), timeout)
+        except asyncio.CancelledError:
+            # 헤징에서 진 호출이나 요청 취소로 끊긴 호출은 결과가 없으므로 시험 호출만 반납
+            model_health.record_abandoned(model_name)
+            raise
+        except Exception as e:
+            if deadline is not None and deadline.expired():
+                model_health.record_abandoned(model_name)
+                raise DeadlineExceeded('gemini') from e
+            model_health.record_failure(model_name, e)
+            raise
+        model_health.record_success(model_name, time.perf_counter() - start)
+        return text
+
+    tried = set()
+    for index, model_name in enumerate(model_names):
+        if model_name in tried:
+            log(f"{model_name} 모델은 헤징에서 이미 호출해 건너뜀")
+            continue
+        if not can_finish(model_name, deadline):
+            log(f"{model_name} 모델은 남은 시간({deadline.remaining():.1f}초) 안에 끝나기 어려워 건너뜀")
+            reasons.append(f"{model_name}: deadline")
+            skipped_for_deadline = True
+            continue
+        if not model_health.allow(model_name):
+            log(f"{model_name} 모델 회로 열림, 건너뜀")
+            reasons.append(f"{model_name}: circuit_open")
+            continue
+
+        delay = _hedge_delay(model_name)
+        backups = model_names[index + 1:]
+        try:
+            if delay is None or not backups:
+                text = await timed(model_name)
+                _finish(processing_info, model_name, reasons)
+                return text
+
+            tasks = {asyncio.ensure_future(timed(model_name)): model_name}
+            try:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done and can_finish(backups[0], deadline) and model_health.allow(backups[0]):
+                    log(f"{model_name} 모델 응답 지연({delay:.1f}초), {backups[0]} 모델로 헤징")
+                    tasks[asyncio.ensure_future(timed(backups[0]))] = backups[0]
+                    tried.add(backups[0])
+                pending = set(tasks)
+                error = None
+                while pending:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        if task.exception() is None:
+                            used = tasks[task]
+                            if used != model_name:
+                                reasons.append(f"{model_name}: hedged after {delay:.1f}s")
+                            _finish(processing_info, used, reasons)
+                            return task.result()
+                        error = task.exception()
+                raise error
+            finally:
+                # 먼저 끝난 결과를 썼거나 호출자가 취소되면(마감 시간) 남은 호출을 취소하고 정리될 때까지 기다림
+                outstanding = [task for task in tasks if not task.done()]
+                for task in outstanding:
+                    task.cancel()
+                if outstanding:
+                    await asyncio.gather(*outstanding, return_exceptions=True)
+        except DeadlineExceeded:
+            log(f"{model_name} 모델 호출 중 마감 시간 초과")
+            raise
+        except Exception as e:
+            log(f"{model_name} 모델 오류: {str(e)}")
+            reasons.append(f"{model_name}: {str(e)[:100]}")
+            last_error = e
+
+    if last_error is None:
+        if skipped_for_deadline:
+            raise DeadlineExceeded('gemini')
+        raise Exception("모든 AI 모델이 일시적으로 차단되어 있습니다. 잠시 후 다시 시도해 주세요.")
+    raise last_error
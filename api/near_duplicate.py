@@ -0,0 +1,229 @@
+import hashlib
+import os
+import re
+import sqlite3
+import struct
+import threading
+import time
+from note_cache import get_note_cache, NOTE_CACHE_TTL
+
+# 유사 스크립트 캐시 설정 (환경 변수로 조정 가능)
+NEAR_DUPLICATE_CACHE = os.environ.get("NEAR_DUPLICATE_CACHE", "1") != "0"
+NEAR_DUPLICATE_PATH = os.environ.get("NEAR_DUPLICATE_PATH", "/tmp/near_duplicates.sqlite3")
+# 이 값 이상으로 비슷한(추정 자카드 유사도) 스크립트의 노트를 재사용
+NEAR_DUPLICATE_THRESHOLD = float(os.environ.get("NEAR_DUPLICATE_THRESHOLD", "0.9"))
+# 짧은 텍스트는 작은 수정도 의미가 크게 달라지므로 비교하지 않음
+NEAR_DUPLICATE_MIN_WORDS = int(os.environ.get("NEAR_DUPLICATE_MIN_WORDS", "50"))
+NEAR_DUPLICATE_MAX_ENTRIES = int(os.environ.get("NEAR_DUPLICATE_MAX_ENTRIES", "500000"))
+
+# MinHash 서명 설정 (값을 바꾸면 기존 색인과 호환되지 않음)
+SHINGLE_WORDS = 5
+SIGNATURE_SIZE = 128
+BAND_COUNT = 16
+BAND_ROWS = SIGNATURE_SIZE // BAND_COUNT
+# 밴드 하나라도 같은 후보만 비교 (비교 대상 수를 제한해 조회 시간을 일정하게 유지)
+MAX_CANDIDATES = 32
+
+_WORD = re.compile(r'\w+')
+_MASK64 = (1 << 64) - 1
+_BIN_BITS = SIGNATURE_SIZE.bit_length() - 1
+# 빈 칸을 채울 때 빌려온 거리만큼 더하는 값 (원래 값의 범위 밖)
+_DENSIFY_STEP = 1 << (64 - _BIN_BITS)
+_SIGNATURE_FORMAT = f"<{SIGNATURE_SIZE}Q"
+
+def _hash64(data):
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'little')
+
+def _signed64(value):
+    # SQLite INTEGER는 부호 있는 64비트
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+# 스크립트 MinHash 서명 계산 함수
+def minhash_signature(text):
+    """정규화한 스크립트의 단어 슁글(shingle) 집합으로 MinHash 서명을 만듭니다. 너무 짧으면 None을 반환합니다.
+
+    슁글마다 해시를 한 번만 계산하는 one-permutation hashing을 쓰고, 빈 칸은 오른쪽 칸 값을 빌려 채웁니다.
+    """
+    words = _WORD.findall((text or '').lower())
+    if len(words) < max(NEAR_DUPLICATE_MIN_WORDS, SHINGLE_WORDS):
+        return None
+    bins = [None] * SIGNATURE_SIZE
+    seen = set()
+    for start in range(len(words) - SHINGLE_WORDS + 1):
+        shingle = ' '.join(words[start:start + SHINGLE_WORDS])
+        if shingle in seen:
+            continue
+        seen.add(shingle)
+        value = _hash64(shingle.encode('utf-8'))
+        index = value & (SIGNATURE_SIZE - 1)
+        value >>= _BIN_BITS
+        if bins[index] is None or value < bins[index]:
+            bins[index] = value
+
+    signature = list(bins)
+    for index in range(SIGNATURE_SIZE):
+        if signature[index] is None:
+            for distance in range(1, SIGNATURE_SIZE):
+                borrowed = bins[(index + distance) % SIGNATURE_SIZE]
+                if borrowed is not None:
+                    signature[index] = (borrowed + distance * _DENSIFY_STEP) & _MASK64
+                    break
+    return signature
+
+def similarity(signature, other):
+    """두 서명의 추정 자카드 유사도(같은 칸의 비율)를 반환합니다."""
+    return sum(1 for a, b in zip(signature, other) if a == b) / SIGNATURE_SIZE
+
+def _band_keys(signature, scope):
+    # 생성 조건(학습 레벨, 프롬프트 버전, 모델)이 같은 항목끼리만 후보가 되도록 밴드 해시에 포함
+    scope_bytes = scope.encode('utf-8')
+    keys = []
+    for band in range(BAND_COUNT):
+        rows = signature[band * BAND_ROWS:(band + 1) * BAND_ROWS]
+        keys.append(_signed64(_hash64(scope_bytes + bytes([band]) + struct.pack(f"<{BAND_ROWS}Q", *rows))))
+    return keys
+
+def cache_scope(cache_key):
+    """노트 캐시 키에서 입력 출처를 뺀 생성 조건 부분(학습 레벨|프롬프트 버전|모델)을 반환합니다."""
+    return cache_key.split('|', 1)[1] if '|' in cache_key else ''
+
+class NearDuplicateIndex:
+    """직접 입력한 스크립트의 MinHash 서명을 LSH 밴드로 색인해, 거의 같은 스크립트로 만든 노트의 캐시 키를 찾습니다.
+
+    밴드 해시로 SQLite 색인을 한 번 조회하고 소수의 후보 서명만 비교하므로 항목 수가 많아도 조회 시간이 거의 일정합니다.
+    """
+
+    def __init__(self, path=NEAR_DUPLICATE_PATH, threshold=NEAR_DUPLICATE_THRESHOLD,
+                 max_entries=NEAR_DUPLICATE_MAX_ENTRIES, ttl=NOTE_CACHE_TTL):
+        self.path = path
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = None
+        self._stats = {'lookups': 0, 'hits': 0, 'misses': 0, 'skipped': 0, 'writes': 0}
+
+    def _connect(self):
+        # 첫 사용 시에만 SQLite 연결 (콜드 스타트 비용 최소화)
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "id INTEGER PRIMARY KEY, key TEXT UNIQUE NOT NULL, signature BLOB NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS bands ("
+                "band INTEGER NOT NULL, entry_id INTEGER NOT NULL, PRIMARY KEY (band, entry_id)) WITHOUT ROWID"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS bands_entry ON bands(entry_id)")
+        return self._conn
+
+    def find(self, signature, scope):
+        """scope가 같은 항목 중 유사도가 기준 이상인 가장 비슷한 항목의 (캐시 키, 유사도)를 반환합니다. 없으면 None."""
+        bands = _band_keys(signature, scope)
+        with self._lock:
+            self._stats['lookups'] += 1
+            try:
+                rows = self._connect().execute(
+                    "SELECT key, signature FROM entries WHERE created_at >= ? AND id IN ("
+                    f"SELECT DISTINCT entry_id FROM bands WHERE band IN ({','.join('?' * len(bands))}) LIMIT ?)",
+                    (time.time() - self.ttl, *bands, MAX_CANDIDATES)
+                ).fetchall()
+            except sqlite3.Error:
+                # 색인 오류는 미스로 처리
+                rows = []
+            best = None
+            for key, stored in rows:
+                score = similarity(signature, struct.unpack(_SIGNATURE_FORMAT, stored))
+                if score >= self.threshold and (best is None or score > best[1]):
+                    best = (key, score)
+            self._stats['hits' if best else 'misses'] += 1
+            return best
+
+    def add(self, signature, scope, cache_key):
+        """노트 캐시 키와 스크립트 서명을 색인에 추가하고, 최대 개수를 넘는 오래된 항목을 제거합니다."""
+        bands = _band_keys(signature, scope)
+        with self._lock:
+            self._stats['writes'] += 1
+            try:
+                conn = self._connect()
+                previous = conn.execute("SELECT id FROM entries WHERE key = ?", (cache_key,)).fetchone()
+                if previous is not None:
+                    conn.execute("DELETE FROM bands WHERE entry_id = ?", previous)
+                    conn.execute("DELETE FROM entries WHERE id = ?", previous)
+                entry_id = conn.execute(
+                    "INSERT INTO entries (key, signature, created_at) VALUES (?, ?, ?)",
+                    (cache_key, struct.pack(_SIGNATURE_FORMAT, *signature), time.time())
+                ).lastrowid
+                conn.executemany("INSERT OR IGNORE INTO bands (band, entry_id) VALUES (?, ?)",
+                                 [(band, entry_id) for band in bands])
+                self._evict(conn, entry_id)
+                conn.commit()
+            except sqlite3.Error:
+                pass
+
+    def _evict(self, conn, newest_id):
+        # id는 추가 순서대로 늘어나므로 최대 개수보다 오래된 id를 한 번에 제거
+        oldest_kept = newest_id - self.max_entries
+        if oldest_kept > 0:
+            conn.execute("DELETE FROM bands WHERE entry_id <= ?", (oldest_kept,))
+            conn.execute("DELETE FROM entries WHERE id <= ?", (oldest_kept,))
+
+    def skip(self):
+        with self._lock:
+            self._stats['skipped'] += 1
+
+    def stats(self):
+        """조회/적중/미스/건너뜀(짧은 텍스트)/추가 횟수를 반환합니다."""
+        with self._lock:
+            return dict(self._stats)
+
+# 프로세스 전역 색인 인스턴스
+_near_duplicate_index = None
+_near_duplicate_index_lock = threading.Lock()
+
+def get_near_duplicate_index():
+    """프로세스 전역 유사 스크립트 색인을 반환합니다."""
+    global _near_duplicate_index
+    if _near_duplicate_index is None:
+        with _near_duplicate_index_lock:
+            if _near_duplicate_index is None:
+                _near_duplicate_index = NearDuplicateIndex()
+    return _near_duplicate_index
+
+# 유사 스크립트 노트 조회 함수
+def find_similar_notes(transcript_text, cache_key):
+    """정확히 같은 캐시 항목이 없을 때, 거의 같은 스크립트로 만든 노트를 찾아 반환합니다. 없으면 None.
+
+    찾은 노트는 processingInfo.nearDuplicate(원본과의 유사도)를 붙여 이번 캐시 키로도 저장하므로
+    같은 텍스트의 다음 요청은 정확한 캐시로 적중합니다.
+    """
+    if not NEAR_DUPLICATE_CACHE:
+        return None
+    index = get_near_duplicate_index()
+    signature = minhash_signature(transcript_text)
+    if signature is None:
+        index.skip()
+        return None
+    match = index.find(signature, cache_scope(cache_key))
+    if match is None:
+        return None
+    source_key, score = match
+    cached = get_note_cache().get(source_key)
+    if not cached:
+        return None
+    processing_info = dict(cached.get('processingInfo') or {})
+    processing_info['nearDuplicate'] = {'similarity': round(score, 3)}
+    result = {**cached, 'processingInfo': processing_info}
+    get_note_cache().set(cache_key, result)
+    return result
+
+# 생성한 노트의 스크립트 색인 함수
+def remember_transcript(transcript_text, cache_key):
+    """직접 입력한 스크립트로 새로 생성해 캐시한 노트를 유사 스크립트 색인에 추가합니다."""
+    if not NEAR_DUPLICATE_CACHE:
+        return
+    signature = minhash_signature(transcript_text)
+    if signature is not None:
+        get_near_duplicate_index().add(signature, cache_scope(cache_key), cache_key)
@@ -0,0 +1,142 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# 캐시 설정 (환경 변수로 조정 가능)
+NOTE_CACHE_PATH = os.environ.get("NOTE_CACHE_PATH", "/tmp/note_cache.sqlite3")
+NOTE_CACHE_MEMORY_SIZE = int(os.environ.get("NOTE_CACHE_MEMORY_SIZE", "256"))
+NOTE_CACHE_MAX_ENTRIES = int(os.environ.get("NOTE_CACHE_MAX_ENTRIES", "5000"))
+NOTE_CACHE_TTL = int(os.environ.get("NOTE_CACHE_TTL", str(7 * 24 * 3600)))
+
+# 텍스트 입력 정규화 (공백 차이로 캐시가 빗나가지 않도록)
+def normalize_transcript(text):
+    """비교를 위해 스크립트의 공백을 정규화합니다."""
+    return re.sub(r'\s+', ' ', text or '').strip()
+
+# 캐시 키 생성 함수
+def make_cache_key(video_id=None, transcript_text=None, learning_level='beginner',
+                   prompt_version='v1', model_name='gemini-pro'):
+    """비디오 ID 또는 정규화된 스크립트 해시와 생성 조건으로 캐시 키를 만듭니다."""
+    if video_id:
+        source = f"video:{video_id}"
+    else:
+        digest = hashlib.sha256(normalize_transcript(transcript_text).encode('utf-8')).hexdigest()
+        source = f"text:{digest}"
+    return "|".join([source, learning_level or 'beginner', prompt_version, model_name])
+
+class NoteCache:
+    """메모리 LRU 계층과 SQLite 디스크 계층으로 구성된 학습 노트 캐시입니다."""
+
+    def __init__(self, path=NOTE_CACHE_PATH, memory_size=NOTE_CACHE_MEMORY_SIZE,
+                 max_entries=NOTE_CACHE_MAX_ENTRIES, ttl=NOTE_CACHE_TTL):
+        self.path = path
+        self.memory_size = memory_size
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'writes': 0, 'evictions': 0}
+
+    def _connect(self):
+        # 첫 사용 시에만 SQLite 연결 (콜드 스타트 비용 최소화)
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS notes ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS notes_accessed ON notes(accessed_at)")
+        return self._conn
+
+    def _remember(self, key, value, created_at):
+        self._memory[key] = (value, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        """캐시된 노트를 반환합니다. 없거나 만료되었으면 None을 반환합니다."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, created_at = entry
+                if now - created_at <= self.ttl:
+                    self._memory.move_to_end(key)
+                    self._stats['memory_hits'] += 1
+                    return value
+                del self._memory[key]
+
+            try:
+                conn = self._connect()
+                row = conn.execute(
+                    "SELECT value, created_at FROM notes WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and now - row[1] <= self.ttl:
+                    conn.execute("UPDATE notes SET accessed_at = ? WHERE key = ?", (now, key))
+                    conn.commit()
+                    value = json.loads(row[0])
+                    self._remember(key, value, row[1])
+                    self._stats['disk_hits'] += 1
+                    return value
+            except sqlite3.Error:
+                # 디스크 캐시 오류는 캐시 미스로 처리
+                pass
+
+            self._stats['misses'] += 1
+            return None
+
+    def set(self, key, value):
+        """노트를 두 계층 모두에 저장하고 필요하면 오래된 항목을 제거합니다."""
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now)
+            self._stats['writes'] += 1
+            try:
+                conn = self._connect()
+                conn.execute(
+                    "INSERT OR REPLACE INTO notes (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value, ensure_ascii=False), now, now)
+                )
+                self._evict(conn, now)
+                conn.commit()
+            except sqlite3.Error:
+                pass
+
+    def _evict(self, conn, now):
+        # TTL이 지난 항목과 최대 개수를 넘는 오래된 항목 제거
+        expired = conn.execute("DELETE FROM notes WHERE created_at < ?", (now - self.ttl,)).rowcount
+        overflow = conn.execute(
+            "DELETE FROM notes WHERE key IN ("
+            "SELECT key FROM notes ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        ).rowcount
+        self._stats['evictions'] += max(expired, 0) + max(overflow, 0)
+
+    def stats(self):
+        """캐시 적중/미스 카운터를 반환합니다."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['memory_entries'] = len(self._memory)
+        return stats
+
+# 프로세스 전역 캐시 인스턴스
+_note_cache = None
+_note_cache_lock = threading.Lock()
+
+def get_note_cache():
+    """프로세스 전역 노트 캐시를 반환합니다."""
+    global _note_cache
+    if _note_cache is None:
+        with _note_cache_lock:
+            if _note_cache is None:
+                _note_cache = NoteCache()
+    return _note_cache
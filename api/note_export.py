@@ -0,0 +1,245 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from urllib.parse import quote
+
+from note_render import RENDER_VERSION, render_html, render_pdf
+
+# 노트 내보내기 설정 (환경 변수로 조정 가능)
+NOTE_EXPORT = os.environ.get("NOTE_EXPORT", "1") != "0"
+NOTE_EXPORT_DIR = os.environ.get("NOTE_EXPORT_DIR", "/tmp/note_exports")
+# 내보낼 수 있게 보관하는 노트 원본(마크다운) 수
+NOTE_EXPORT_MAX_NOTES = int(os.environ.get("NOTE_EXPORT_MAX_NOTES", "20000"))
+# 렌더링한 HTML/PDF 파일 전체 크기 상한 (넘으면 가장 오래 쓰지 않은 파일부터 지움)
+NOTE_EXPORT_MAX_BYTES = int(os.environ.get("NOTE_EXPORT_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# 형식별 Content-Type과 렌더링 함수
+EXPORT_FORMATS = {
+    'html': ('text/html; charset=utf-8', render_html),
+    'pdf': ('application/pdf', render_pdf),
+}
+# 요청 경로에서 노트 ID와 형식을 꺼냄 (http.server 백엔드용)
+EXPORT_PATH = re.compile(r'/notes/([^/.]+)\.(\w+)$')
+# 내보낸 HTML은 스크립트, 외부 리소스 없이 인라인 스타일만 허용
+HTML_CONTENT_SECURITY_POLICY = "default-src 'none'; style-src 'unsafe-inline'; base-uri 'none'; form-action 'none'"
+_NOTE_ID = re.compile(r'^[0-9a-f]{20}$')
+_FILENAME_UNSAFE = re.compile(r'[^\w\s가-힣-]')
+
+# 노트 ID 생성 함수
+def make_note_id(title, markdown):
+    """영상 제목과 노트 마크다운의 해시로 노트 ID(16진수 20자)를 만듭니다. 같은 노트는 항상 같은 ID입니다."""
+    return hashlib.sha256(f"{title}\0{markdown}".encode('utf-8')).hexdigest()[:20]
+
+def export_filename(title, export_format):
+    """다운로드 파일명(특수문자 제거, 공백은 밑줄)을 만듭니다. 프런트엔드의 .md 파일명 규칙과 같습니다."""
+    name = re.sub(r'\s+', '_', _FILENAME_UNSAFE.sub('', title or '').strip())
+    return f"{name or '학습'}_학습노트.{export_format}"
+
+class NoteExporter:
+    """생성한 노트를 HTML/PDF로 내보내고 렌더링 결과를 파일로 캐시합니다.
+
+    노트가 생성될 때는 원본 마크다운만 SQLite에 저장하고(register), 처음 내려받을 때 렌더링해
+    artifacts/ 아래에 '노트 ID.렌더러 버전.형식' 파일로 남깁니다. 노트 ID가 내용의 해시이므로 파일은 바뀌지 않고,
+    같은 노트를 다시 내려받으면 렌더링 없이 파일을 그대로 돌려줍니다.
+    """
+
+    def __init__(self, directory=NOTE_EXPORT_DIR, max_notes=NOTE_EXPORT_MAX_NOTES, max_bytes=NOTE_EXPORT_MAX_BYTES):
+        self.directory = directory
+        self.max_notes = max_notes
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = None
+        self._artifact_bytes = None
+        self._stats = {'registered': 0, 'hits': 0, 'renders': 0, 'renderMs': 0.0, 'notFound': 0,
+                       'evictions': 0, 'errors': 0}
+
+    def _connect(self):
+        # 첫 사용 시에만 디렉터리와 SQLite 연결을 만듦 (콜드 스타트 비용 최소화)
+        if self._conn is None:
+            os.makedirs(os.path.join(self.directory, 'artifacts'), exist_ok=True)
+            conn = sqlite3.connect(os.path.join(self.directory, 'notes.sqlite3'), check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS notes ("
+                "id TEXT PRIMARY KEY, title TEXT NOT NULL, markdown TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS notes_created ON notes(created_at)")
+            self._conn = conn
+        return self._conn
+
+    def _artifact_path(self, note_id, export_format):
+        return os.path.join(self.directory, 'artifacts', f"{note_id}.{RENDER_VERSION}.{export_format}")
+
+    def register(self, title, markdown):
+        """노트 원본을 저장하고 노트 ID를 반환합니다. 저장하지 못해도 ID는 반환합니다."""
+        note_id = make_note_id(title, markdown)
+        with self._lock:
+            try:
+                conn = self._connect()
+                conn.execute("INSERT OR IGNORE INTO notes (id, title, markdown, created_at) VALUES (?, ?, ?, ?)",
+                             (note_id, title or '', markdown, time.time()))
+                conn.execute(
+                    "DELETE FROM notes WHERE id IN ("
+                    "SELECT id FROM notes ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_notes,)
+                )
+                conn.commit()
+                self._stats['registered'] += 1
+            except (sqlite3.Error, OSError):
+                self._stats['errors'] += 1
+        return note_id
+
+    def artifact(self, note_id, export_format):
+        """내보낸 파일의 (바이트, 영상 제목)을 반환합니다. 노트가 없거나 지원하지 않는 형식이면 None을 반환합니다."""
+        if not _NOTE_ID.match(note_id or '') or export_format not in EXPORT_FORMATS:
+            return None
+        path = self._artifact_path(note_id, export_format)
+        with self._lock:
+            try:
+                row = self._connect().execute("SELECT title, markdown FROM notes WHERE id = ?", (note_id,)).fetchone()
+            except (sqlite3.Error, OSError):
+                self._stats['errors'] += 1
+                row = None
+        body = self._read(path)
+        if body is None and row is not None:
+            # 캐시에 없으면 렌더링 (같은 노트를 동시에 처음 내려받으면 각자 렌더링하지만 결과 파일은 같음)
+            start = time.perf_counter()
+            body = EXPORT_FORMATS[export_format][1](row[1], row[0])
+            elapsed = (time.perf_counter() - start) * 1000
+            self._write(path, body)
+            with self._lock:
+                self._stats['renders'] += 1
+                self._stats['renderMs'] += elapsed
+            return body, row[0]
+        with self._lock:
+            self._stats['hits' if body is not None else 'notFound'] += 1
+        if body is None:
+            return None
+        # 원본이 정리된 노트도 이미 만든 파일은 그대로 씀 (파일명은 기본값)
+        return body, row[0] if row is not None else ''
+
+    def _read(self, path):
+        try:
+            with open(path, 'rb') as f:
+                body = f.read()
+            # 최근에 쓴 파일이 나중에 지워지도록 수정 시각을 갱신
+            os.utime(path)
+            return body
+        except OSError:
+            return None
+
+    def _write(self, path, body):
+        # 임시 파일에 쓴 뒤 이름을 바꿔 다른 요청이 쓰는 중인 파일을 읽지 않게 함
+        temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temporary, 'wb') as f:
+                f.write(body)
+            os.replace(temporary, path)
+        except OSError:
+            with self._lock:
+                self._stats['errors'] += 1
+            return
+        with self._lock:
+            if self._artifact_bytes is None:
+                self._artifact_bytes = self._scan_bytes()
+            else:
+                self._artifact_bytes += len(body)
+            if self._artifact_bytes > self.max_bytes:
+                self._evict()
+
+    def _artifact_files(self):
+        directory = os.path.join(self.directory, 'artifacts')
+        files = []
+        for entry in os.scandir(directory):
+            if not entry.name.endswith('.tmp'):
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        return files
+
+    def _scan_bytes(self):
+        try:
+            return sum(size for _, size, _ in self._artifact_files())
+        except OSError:
+            return 0
+
+    def _evict(self):
+        # 가장 오래 쓰지 않은 파일부터 상한의 90%까지 지움 (여러 워커가 같은 디렉터리를 쓰므로 디렉터리를 다시 훑음)
+        try:
+            files = sorted(self._artifact_files())
+        except OSError:
+            return
+        total = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if total <= self.max_bytes * 0.9:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= size
+            self._stats['evictions'] += 1
+        self._artifact_bytes = total
+
+    def stats(self):
+        """원본 저장 수, 캐시 적중/렌더링 수, 렌더링 시간 합계(ms), 없는 노트 요청 수, 파일 제거 수, 오류 수를 반환합니다."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['renderMs'] = round(stats['renderMs'], 1)
+            stats['artifactBytes'] = self._artifact_bytes
+        return stats
+
+# 프로세스 전역 내보내기 인스턴스
+_note_exporter = None
+_note_exporter_lock = threading.Lock()
+
+def get_note_exporter():
+    """프로세스 전역 노트 내보내기 인스턴스를 반환합니다."""
+    global _note_exporter
+    if _note_exporter is None:
+        with _note_exporter_lock:
+            if _note_exporter is None:
+                _note_exporter = NoteExporter()
+    return _note_exporter
+
+# 생성한 노트 내보내기 등록 함수
+def register_export(response_data):
+    """새로 생성한 노트 응답의 원본을 저장하고 응답에 noteId를 넣습니다 (캐시에 저장하기 전에 호출)."""
+    if not NOTE_EXPORT:
+        return
+    response_data['noteId'] = get_note_exporter().register(response_data.get('videoTitle', ''),
+                                                           response_data.get('markdownContent', ''))
+
+# 노트 내보내기 응답 함수
+def export_note(note_id, export_format, if_none_match=None):
+    """GET /api/notes/{id}.{html,pdf}의 (상태 코드, 본문 바이트, 헤더)를 반환합니다.
+
+    파일은 내용의 해시로 구분되어 바뀌지 않으므로 ETag가 같으면 본문 없이 304를 반환합니다.
+    """
+    headers = {'Access-Control-Allow-Origin': '*'}
+    # 검사하지 않은 경로 문자열이 응답 헤더에 들어가지 않도록 ID와 형식부터 확인
+    valid = NOTE_EXPORT and _NOTE_ID.match(note_id or '') and export_format in EXPORT_FORMATS
+    etag = f'"{note_id}.{RENDER_VERSION}.{export_format}"' if valid else None
+    if valid and if_none_match and etag in if_none_match:
+        headers['ETag'] = etag
+        return 304, b'', headers
+    result = get_note_exporter().artifact(note_id, export_format) if valid else None
+    if result is None:
+        body = json.dumps({'error': "노트를 찾을 수 없습니다.", 'errorType': 'NOT_FOUND'}, ensure_ascii=False)
+        headers['Content-Type'] = 'application/json; charset=utf-8'
+        return 404, body.encode('utf-8'), headers
+    body, title = result
+    headers.update({
+        'Content-Type': EXPORT_FORMATS[export_format][0],
+        'Content-Length': str(len(body)),
+        'Content-Disposition': f"inline; filename*=UTF-8''{quote(export_filename(title, export_format))}",
+        'Cache-Control': 'public, max-age=86400',
+        'ETag': etag,
+        'X-Content-Type-Options': 'nosniff',
+    })
+    if export_format == 'html':
+        headers['Content-Security-Policy'] = HTML_CONTENT_SECURITY_POLICY
+    return 200, body, headers
@@ -0,0 +1,521 @@
+import html
+import re
+import unicodedata
+import zlib
+
+# 렌더러 버전 (출력 형식이 바뀌면 올려서 이전에 만든 내보내기 파일을 다시 만들게 함)
+RENDER_VERSION = "r2"
+
+_FENCE = re.compile(r'^\s*(```|~~~)\s*([\w+#.-]*)')
+_HEADING = re.compile(r'^(#{1,6})\s+(.+?)\s*#*\s*$')
+_RULE = re.compile(r'^\s*([-*_])(\s*\1){2,}\s*$')
+_LIST_ITEM = re.compile(r'^(\s*)([-*+]|\d{1,9}[.)])\s+(.*)$')
+_QUOTE = re.compile(r'^\s*>\s?(.*)$')
+_TABLE_SEPARATOR = re.compile(r'^\s*\|?\s*:?-+:?\s*(\|\s*:?-+:?\s*)*\|?\s*$')
+# 인라인 서식: 코드, 이미지(대체 텍스트만), 링크(주소 안의 괄호는 한 단계까지), 굵게, 기울임
+_INLINE = re.compile(
+    r'(?P<code>`+)(?P<code_text>.+?)(?P=code)'
+    r'|!\[(?P<alt>[^\]]*)\]\([^)]*\)'
+    r'|\[(?P<link_text>[^\]]+)\]\((?P<href>(?:[^()\s]|\([^()\s]*\))+)(?:\s+"[^"]*")?\)'
+    r'|\*\*(?P<bold>.+?)\*\*|__(?P<bold2>.+?)__'
+    r'|(?<![\w*])\*(?P<italic>[^\s*](?:.*?[^\s*])?)\*(?![\w*])'
+)
+# 표 칸 정렬 (허용한 값만 style 속성으로)
+_ALIGN_ATTRIBUTE = {'center': ' style="text-align:center"', 'right': ' style="text-align:right"'}
+# 링크로 남길 주소 (그 밖의 주소는 텍스트만 남김)
+_SAFE_HREF = re.compile(r'^(https?://|mailto:|#)', re.IGNORECASE)
+
+# 마크다운 블록 분석 함수
+def parse_blocks(markdown):
+    """노트 마크다운을 블록 목록으로 나눕니다.
+
+    생성 노트에 쓰이는 문법(제목, 문단, 목록, 인용, 코드 블록, 표, 구분선)만 다루고,
+    원본의 HTML 태그는 해석하지 않고 텍스트로 남깁니다.
+    블록은 ('heading', 수준, 텍스트), ('paragraph', 텍스트), ('list', [(깊이, 번호 또는 None, 텍스트), ...]),
+    ('quote', 텍스트), ('code', 언어, 텍스트), ('table', 머리글 칸, 정렬, 행 목록), ('rule',) 중 하나입니다.
+    """
+    lines = (markdown or '').replace('\r\n', '\n').replace('\t', '    ').split('\n')
+    blocks = []
+    index = 0
+    while index < len(lines):
+        line = lines[index]
+        if not line.strip():
+            index += 1
+            continue
+        fence = _FENCE.match(line)
+        if fence:
+            end = index + 1
+            while end < len(lines) and not lines[end].strip().startswith(fence.group(1)):
+                end += 1
+            blocks.append(('code', fence.group(2), '\n'.join(lines[index + 1:end])))
+            index = end + 1
+            continue
+        heading = _HEADING.match(line)
+        if heading:
+            blocks.append(('heading', len(heading.group(1)), heading.group(2)))
+            index += 1
+            continue
+        if _RULE.match(line):
+            blocks.append(('rule',))
+            index += 1
+            continue
+        if '|' in line and index + 1 < len(lines) and _TABLE_SEPARATOR.match(lines[index + 1]):
+            index = _parse_table(lines, index, blocks)
+            continue
+        if _LIST_ITEM.match(line):
+            index = _parse_list(lines, index, blocks)
+            continue
+        if _QUOTE.match(line):
+            quoted = []
+            while index < len(lines) and _QUOTE.match(lines[index]):
+                quoted.append(_QUOTE.match(lines[index]).group(1).strip())
+                index += 1
+            blocks.append(('quote', ' '.join(part for part in quoted if part)))
+            continue
+        paragraph = []
+        while index < len(lines) and lines[index].strip() and not _starts_block(lines, index):
+            paragraph.append(lines[index].strip())
+            index += 1
+        if not paragraph:
+            paragraph.append(line.strip())
+            index += 1
+        blocks.append(('paragraph', ' '.join(paragraph)))
+    return blocks
+
+def _starts_block(lines, index):
+    line = lines[index]
+    return bool(_FENCE.match(line) or _HEADING.match(line) or _RULE.match(line) or _LIST_ITEM.match(line)
+                or _QUOTE.match(line)
+                or ('|' in line and index + 1 < len(lines) and _TABLE_SEPARATOR.match(lines[index + 1])))
+
+def _parse_list(lines, index, blocks):
+    # 들여쓰기 2칸을 한 단계로 보고, 항목 아래 들여쓴 줄은 그 항목에 이어 붙임
+    items = []
+    while index < len(lines):
+        line = lines[index]
+        item = _LIST_ITEM.match(line)
+        if item:
+            marker = item.group(2)
+            number = int(marker[:-1]) if marker[0].isdigit() else None
+            items.append([min(len(item.group(1)) // 2, 5), number, item.group(3).strip()])
+        elif line.strip() and items and line.startswith(' ') and not _starts_block(lines, index):
+            items[-1][2] += ' ' + line.strip()
+        elif not line.strip() and index + 1 < len(lines) and _LIST_ITEM.match(lines[index + 1]):
+            pass
+        else:
+            break
+        index += 1
+    blocks.append(('list', [tuple(item) for item in items]))
+    return index
+
+def _split_row(line):
+    line = line.strip()
+    if line.startswith('|'):
+        line = line[1:]
+    if line.endswith('|') and not line.endswith('\\|'):
+        line = line[:-1]
+    return [cell.strip().replace('\\|', '|') for cell in re.split(r'(?<!\\)\|', line)]
+
+def _parse_table(lines, index, blocks):
+    header = _split_row(lines[index])
+    alignments = []
+    for cell in _split_row(lines[index + 1]):
+        if cell.startswith(':') and cell.endswith(':'):
+            alignments.append('center')
+        elif cell.endswith(':'):
+            alignments.append('right')
+        else:
+            alignments.append(None)
+    rows = []
+    index += 2
+    while index < len(lines) and lines[index].strip() and '|' in lines[index]:
+        row = _split_row(lines[index])
+        rows.append((row + [''] * len(header))[:len(header)])
+        index += 1
+    alignments = (alignments + [None] * len(header))[:len(header)]
+    blocks.append(('table', header, alignments, rows))
+    return index
+
+# 인라인 서식 분석 함수
+def parse_inline(text, style=frozenset(), href=None):
+    """인라인 마크다운을 (텍스트, 서식 집합, 링크 주소) 조각 목록으로 나눕니다. 서식은 bold, italic, code입니다."""
+    spans = []
+    position = 0
+    for match in _INLINE.finditer(text):
+        if match.start() > position:
+            spans.append((text[position:match.start()], style, href))
+        if match.group('code') is not None:
+            spans.append((match.group('code_text').strip(), style | {'code'}, href))
+        elif match.group('alt') is not None:
+            if match.group('alt'):
+                spans.append((match.group('alt'), style, href))
+        elif match.group('link_text') is not None:
+            target = match.group('href') if _SAFE_HREF.match(match.group('href')) else None
+            spans += parse_inline(match.group('link_text'), style, target or href)
+        elif match.group('bold') is not None or match.group('bold2') is not None:
+            spans += parse_inline(match.group('bold') or match.group('bold2'), style | {'bold'}, href)
+        else:
+            spans += parse_inline(match.group('italic'), style | {'italic'}, href)
+        position = match.end()
+    if position < len(text):
+        spans.append((text[position:], style, href))
+    return spans
+
+def _inline_html(text):
+    parts = []
+    for content, style, href in parse_inline(text):
+        piece = html.escape(content)
+        if 'code' in style:
+            piece = f"<code>{piece}</code>"
+        if 'italic' in style:
+            piece = f"<em>{piece}</em>"
+        if 'bold' in style:
+            piece = f"<strong>{piece}</strong>"
+        if href:
+            piece = f'<a href="{html.escape(href)}" rel="noopener noreferrer nofollow">{piece}</a>'
+        parts.append(piece)
+    return ''.join(parts)
+
+def _list_html(items):
+    # 깊이 목록을 중첩된 <ul>/<ol>로 바꿈
+    parts = []
+    stack = []
+    for depth, number, text in items:
+        depth = min(depth, len(stack))
+        tag = 'ol' if number is not None else 'ul'
+        while len(stack) > depth + 1 or (len(stack) == depth + 1 and stack[-1] != tag):
+            parts.append(f"</li></{stack.pop()}>")
+        if len(stack) == depth + 1:
+            parts.append("</li>")
+        else:
+            start = f' start="{number}"' if number not in (None, 1) else ''
+            parts.append(f"<{tag}{start}>")
+            stack.append(tag)
+        parts.append(f"<li>{_inline_html(text)}")
+    while stack:
+        parts.append(f"</li></{stack.pop()}>")
+    return ''.join(parts)
+
+def _table_html(header, alignments, rows):
+    def cells(tag, values):
+        return ''.join(f'<{tag}{_ALIGN_ATTRIBUTE.get(align, "")}>{_inline_html(value)}</{tag}>'
+                       for value, align in zip(values, alignments))
+    body = ''.join(f"<tr>{cells('td', row)}</tr>" for row in rows)
+    return f"<table><thead><tr>{cells('th', header)}</tr></thead><tbody>{body}</tbody></table>"
+
+_HTML_STYLE = """
+body { margin: 0; background: #fff; color: #1f2933; }
+article { max-width: 46rem; margin: 0 auto; padding: 2rem 1.25rem; font: 16px/1.7 "Noto Sans KR", "Apple SD Gothic Neo",
+  "Malgun Gothic", sans-serif; word-break: keep-all; overflow-wrap: anywhere; }
+h1, h2, h3 { line-height: 1.35; } h1 { font-size: 1.8rem; } h2 { font-size: 1.4rem; border-bottom: 1px solid #e4e7eb;
+  padding-bottom: .25rem; } h3 { font-size: 1.15rem; }
+code { font-family: ui-monospace, Menlo, Consolas, monospace; font-size: .9em; background: #f0f4f8; padding: .1em .3em;
+  border-radius: 3px; }
+pre { background: #f0f4f8; padding: .9rem 1rem; overflow-x: auto; border-radius: 6px; } pre code { padding: 0; }
+blockquote { margin: 1rem 0; padding: .25rem 1rem; border-left: 4px solid #9fb3c8; color: #486581; }
+table { border-collapse: collapse; width: 100%; margin: 1rem 0; } th, td { border: 1px solid #cbd2d9; padding: .4rem .6rem;
+  vertical-align: top; } th { background: #f0f4f8; }
+hr { border: 0; border-top: 1px solid #cbd2d9; margin: 1.5rem 0; } a { color: #2457a6; }
+@media print { article { max-width: none; padding: 0; } pre, table, blockquote { break-inside: avoid; } }
+"""
+
+# 노트 HTML 렌더링 함수
+def render_html(markdown, title=''):
+    """노트 마크다운을 하나로 완결된 HTML 문서(UTF-8 바이트)로 렌더링합니다.
+
+    허용한 태그만 직접 만들고 원본 텍스트는 모두 이스케이프하므로 따로 정제(sanitize)할 HTML이 남지 않습니다.
+    링크는 http(s)/mailto/문서 내부 주소만 남기고, 이미지와 원본 HTML 태그는 텍스트로 바뀝니다.
+    """
+    body = []
+    for block in parse_blocks(markdown):
+        kind = block[0]
+        if kind == 'heading':
+            body.append(f"<h{block[1]}>{_inline_html(block[2])}</h{block[1]}>")
+        elif kind == 'paragraph':
+            body.append(f"<p>{_inline_html(block[1])}</p>")
+        elif kind == 'list':
+            body.append(_list_html(block[1]))
+        elif kind == 'quote':
+            body.append(f"<blockquote><p>{_inline_html(block[1])}</p></blockquote>")
+        elif kind == 'code':
+            language = f' class="language-{html.escape(block[1])}"' if block[1] else ''
+            body.append(f"<pre><code{language}>{html.escape(block[2])}</code></pre>")
+        elif kind == 'table':
+            body.append(_table_html(*block[1:]))
+        else:
+            body.append("<hr>")
+    document = (
+        '<!DOCTYPE html>\n<html lang="ko">\n<head>\n<meta charset="utf-8">\n'
+        '<meta name="viewport" content="width=device-width, initial-scale=1">\n'
+        f'<title>{html.escape(title or "학습 노트")}</title>\n<style>{_HTML_STYLE}</style>\n</head>\n'
+        '<body>\n<article>\n' + '\n'.join(body) + '\n</article>\n</body>\n</html>\n'
+    )
+    return document.encode('utf-8')
+
+# PDF 페이지 설정 (A4, 포인트 단위)
+PAGE_WIDTH, PAGE_HEIGHT = 595.28, 841.89
+PAGE_MARGIN = 56
+_CONTENT_WIDTH = PAGE_WIDTH - 2 * PAGE_MARGIN
+# 글꼴을 담지 않고 뷰어의 한국어 글꼴(Adobe-Korea1)을 쓰는 CID 글꼴 (PDF 크기를 작게 유지)
+_PDF_FONT = "HYGoThic-Medium"
+_PDF_ENCODING = "UniKS-UCS2-H"
+# 블록 종류별 (글자 크기, 줄 간격 배수, 위 여백, 아래 여백)
+_HEADING_STYLE = {1: (19, 1.35, 16, 8), 2: (15, 1.4, 14, 6), 3: (12.5, 1.4, 10, 4)}
+_BODY_SIZE, _BODY_LEADING = 10.5, 1.65
+_CODE_SIZE, _TABLE_SIZE = 9, 9.5
+_LIST_INDENT = 16
+# 글꼴에 없는 그림 문자(이모지 등)와 변형 선택자는 PDF에서 뺌
+_PDF_DROPPED = re.compile('[\u200d\ufe0e\ufe0f\u2600-\u27bf\u2b00-\u2bff\U00010000-\U0010ffff]')
+
+def _pdf_text(text):
+    return _PDF_DROPPED.sub('', unicodedata.normalize('NFC', text))
+
+def text_width(text, size):
+    """PDF 글꼴로 text를 size 크기로 쓸 때의 폭(포인트)입니다.
+
+    글꼴의 글자 폭 표(/W)와 같게 ASCII는 0.5em, 나머지(한글, 한자, 기호)는 1em으로 계산합니다.
+    """
+    return (len(text) - len(text.encode('ascii', 'ignore')) / 2) * size
+
+def _wrap_spans(spans, size, width):
+    # (텍스트, 서식) 조각들을 폭에 맞춰 줄 목록으로 나눔. 줄은 (x, 텍스트, 서식) 목록이고 같은 서식의 단어는 한 항목으로 합침
+    lines, line, x = [], [], 0.0
+
+    def place(token, token_width):
+        nonlocal x
+        if line and line[-1][2] == style:
+            line[-1] = (line[-1][0], line[-1][1] + token, style)
+        else:
+            line.append((x, token, style))
+        x += token_width
+
+    for content, style, _ in spans:
+        for token in re.findall(r'\S+|\s+', content):
+            if token.isspace():
+                if line:
+                    place(' ', text_width(' ', size))
+                continue
+            token_width = text_width(token, size)
+            if x + token_width > width and line:
+                lines.append(line)
+                line, x = [], 0.0
+            if token_width > width:
+                # 한 줄보다 긴 단어(주소 등)는 글자 단위로 자름
+                pieces = _wrap_chars(token, size, width)
+                for piece in pieces[:-1]:
+                    place(piece, 0)
+                    lines.append(line)
+                    line, x = [], 0.0
+                token = pieces[-1]
+                token_width = text_width(token, size)
+            place(token, token_width)
+    if line:
+        lines.append(line)
+    return lines or [[]]
+
+def _wrap_chars(text, size, width):
+    lines, start, used = [], 0, 0.0
+    for index, ch in enumerate(text):
+        ch_width = text_width(ch, size)
+        if used + ch_width > width and index > start:
+            lines.append(text[start:index])
+            start, used = index, 0.0
+        used += ch_width
+    lines.append(text[start:])
+    return lines
+
+def _hex(text):
+    return '<' + text.encode('utf-16-be', 'replace').hex().upper() + '>'
+
+class _PdfLayout:
+    """블록을 위에서 아래로 쌓으며 페이지별 그리기 명령(content stream)을 만듭니다."""
+
+    def __init__(self):
+        self.pages = []
+        self._new_page()
+
+    def _new_page(self):
+        self.ops = []
+        self.pages.append(self.ops)
+        self.y = PAGE_HEIGHT - PAGE_MARGIN
+
+    def ensure(self, height):
+        if self.y - height < PAGE_MARGIN and self.y < PAGE_HEIGHT - PAGE_MARGIN:
+            self._new_page()
+
+    def space(self, height):
+        self.y = max(self.y - height, PAGE_MARGIN)
+
+    def text_line(self, line, left, size, color=(0.12, 0.16, 0.2), bold=False):
+        # 기준선은 줄 위쪽에서 글자 크기만큼 아래 (나머지 줄 간격은 아래 여백)
+        baseline = self.y - size
+        for x, text, style in line:
+            if not text:
+                continue
+            fill = (0.55, 0.1, 0.25) if 'code' in style else color
+            strong = bold or 'bold' in style
+            # 굵은 글씨는 같은 글꼴을 채우기+윤곽선 모드(Tr 2)로 그림
+            mode = f"2 Tr {size * 0.03:.2f} w {fill[0]} {fill[1]} {fill[2]} RG " if strong else "0 Tr "
+            skew = "1 0 0.2 1" if 'italic' in style else "1 0 0 1"
+            self.ops.append(f"BT /F1 {size} Tf {fill[0]} {fill[1]} {fill[2]} rg {mode}"
+                            f"{skew} {left + x:.2f} {baseline:.2f} Tm {_hex(text)} Tj ET")
+
+    def paragraph(self, spans, left, size, leading, **kwargs):
+        line_height = size * leading
+        for line in _wrap_spans(spans, size, PAGE_WIDTH - PAGE_MARGIN - left):
+            self.ensure(line_height)
+            self.text_line(line, left, size, **kwargs)
+            self.y -= line_height
+
+    def rect(self, x, y, width, height, gray):
+        self.ops.append(f"{gray} g {x:.2f} {y:.2f} {width:.2f} {height:.2f} re f")
+
+    def line(self, x1, y1, x2, y2, gray=0.75, width=0.6):
+        self.ops.append(f"{gray} G {width} w {x1:.2f} {y1:.2f} m {x2:.2f} {y2:.2f} l S")
+
+    def table(self, header, alignments, rows):
+        columns = len(header)
+        cell_width = _CONTENT_WIDTH / max(columns, 1)
+        line_height = _TABLE_SIZE * 1.45
+        padding = 4
+        for number, row in enumerate([header] + rows):
+            cells = [_wrap_spans(parse_inline(_pdf_text(value)), _TABLE_SIZE, cell_width - 2 * padding)
+                     for value in row]
+            height = max(len(lines) for lines in cells) * line_height + 2 * padding
+            self.ensure(height)
+            top = self.y
+            if number == 0:
+                self.rect(PAGE_MARGIN, top - height, _CONTENT_WIDTH, height, 0.94)
+            for column, lines in enumerate(cells):
+                left = PAGE_MARGIN + column * cell_width + padding
+                self.y = top - padding
+                for line in lines:
+                    used = line[-1][0] + text_width(line[-1][1], _TABLE_SIZE) if line else 0
+                    shift = {'right': cell_width - 2 * padding - used,
+                             'center': (cell_width - 2 * padding - used) / 2}.get(alignments[column], 0)
+                    self.text_line(line, left + max(shift, 0), _TABLE_SIZE, bold=number == 0)
+                    self.y -= line_height
+            self.y = top - height
+            for column in range(columns + 1):
+                x = PAGE_MARGIN + column * cell_width
+                self.line(x, top, x, self.y)
+            self.line(PAGE_MARGIN, top, PAGE_MARGIN + _CONTENT_WIDTH, top)
+            self.line(PAGE_MARGIN, self.y, PAGE_MARGIN + _CONTENT_WIDTH, self.y)
+
+def _layout_blocks(blocks):
+    layout = _PdfLayout()
+    for block in blocks:
+        kind = block[0]
+        if kind == 'heading':
+            size, leading, before, after = _HEADING_STYLE.get(block[1], (11, 1.5, 8, 3))
+            layout.space(before)
+            # 제목만 페이지 끝에 남지 않도록 다음 두 줄 높이까지 확보
+            layout.ensure(size * leading + 2 * _BODY_SIZE * _BODY_LEADING)
+            layout.paragraph(parse_inline(_pdf_text(block[2])), PAGE_MARGIN, size, leading, bold=True)
+            if block[1] <= 2:
+                layout.line(PAGE_MARGIN, layout.y + 2, PAGE_WIDTH - PAGE_MARGIN, layout.y + 2, gray=0.85)
+            layout.space(after)
+        elif kind == 'paragraph':
+            layout.paragraph(parse_inline(_pdf_text(block[1])), PAGE_MARGIN, _BODY_SIZE, _BODY_LEADING)
+            layout.space(6)
+        elif kind == 'list':
+            for depth, number, text in block[1]:
+                left = PAGE_MARGIN + _LIST_INDENT * (depth + 1)
+                layout.ensure(_BODY_SIZE * _BODY_LEADING)
+                marker_y = layout.y - _BODY_SIZE
+                if number is None:
+                    # 글꼴에 따라 없는 글머리 기호 대신 작은 사각형을 그림
+                    layout.rect(left - 9, marker_y + _BODY_SIZE * 0.3, 3, 3, 0.3)
+                else:
+                    label = f"{number}."
+                    layout.text_line([(0, label, frozenset())], left - 4 - text_width(label, _BODY_SIZE), _BODY_SIZE)
+                layout.paragraph(parse_inline(_pdf_text(text)), left, _BODY_SIZE, _BODY_LEADING)
+                layout.space(1.5)
+            layout.space(5)
+        elif kind == 'quote':
+            top = layout.y
+            pages = len(layout.pages)
+            layout.paragraph(parse_inline(_pdf_text(block[1])), PAGE_MARGIN + 14, _BODY_SIZE, _BODY_LEADING,
+                             color=(0.28, 0.4, 0.5))
+            if len(layout.pages) == pages:
+                layout.line(PAGE_MARGIN + 4, top - 2, PAGE_MARGIN + 4, layout.y + 2, gray=0.65, width=2.5)
+            layout.space(6)
+        elif kind == 'code':
+            line_height = _CODE_SIZE * 1.5
+            layout.space(2)
+            for source_line in _pdf_text(block[2]).split('\n'):
+                # 코드는 들여쓰기를 살리도록 공백을 줄이지 않고 글자 단위로 자름
+                for text in _wrap_chars(source_line, _CODE_SIZE, _CONTENT_WIDTH - 16):
+                    layout.ensure(line_height)
+                    layout.rect(PAGE_MARGIN, layout.y - line_height, _CONTENT_WIDTH, line_height, 0.95)
+                    layout.text_line([(0, text, frozenset())], PAGE_MARGIN + 8, _CODE_SIZE, color=(0.15, 0.15, 0.15))
+                    layout.y -= line_height
+            layout.space(8)
+        elif kind == 'table':
+            layout.table(*block[1:])
+            layout.space(8)
+        else:
+            layout.ensure(12)
+            layout.line(PAGE_MARGIN, layout.y - 6, PAGE_WIDTH - PAGE_MARGIN, layout.y - 6)
+            layout.space(12)
+    return layout.pages
+
+# 노트 PDF 렌더링 함수
+def render_pdf(markdown, title=''):
+    """노트 마크다운을 A4 PDF(바이트)로 렌더링합니다.
+
+    외부 라이브러리 없이 PDF를 직접 쓰며, 글꼴은 담지 않고 뷰어가 가진 한국어 CID 글꼴을 씁니다.
+    같은 입력이면 항상 같은 바이트를 만듭니다 (생성 시각을 넣지 않음).
+    """
+    pages = _layout_blocks(parse_blocks(markdown))
+    objects = []
+
+    def add(body):
+        objects.append(body)
+        return len(objects)
+
+    catalog = add(None)
+    page_tree = add(None)
+    descriptor = add(
+        f"<< /Type /FontDescriptor /FontName /{_PDF_FONT} /Flags 6 /FontBBox [-6 -145 1003 880] "
+        "/ItalicAngle 0 /Ascent 880 /Descent -120 /CapHeight 880 /StemV 59 >>"
+    )
+    cid_font = add(
+        f"<< /Type /Font /Subtype /CIDFontType0 /BaseFont /{_PDF_FONT} "
+        "/CIDSystemInfo << /Registry (Adobe) /Ordering (Korea1) /Supplement 1 >> "
+        f"/FontDescriptor {descriptor} 0 R /DW 1000 /W [1 95 500] >>"
+    )
+    font = add(
+        f"<< /Type /Font /Subtype /Type0 /BaseFont /{_PDF_FONT}-{_PDF_ENCODING} /Encoding /{_PDF_ENCODING} "
+        f"/DescendantFonts [{cid_font} 0 R] >>"
+    )
+    info = add(f"<< /Title <FEFF{_pdf_text(title or '학습 노트').encode('utf-16-be', 'replace').hex().upper()}> "
+               "/Producer (youtube-study-notes-generator) >>")
+    page_ids = []
+    for number, ops in enumerate(pages, start=1):
+        footer = f"{number} / {len(pages)}"
+        ops = ops + [f"BT /F1 8 Tf 0.5 g 0 Tr {(PAGE_WIDTH - text_width(footer, 8)) / 2:.2f} {PAGE_MARGIN / 2:.2f} Td "
+                     f"{_hex(footer)} Tj ET"]
+        stream = zlib.compress('\n'.join(ops).encode('ascii'))
+        content = add(f"<< /Length {len(stream)} /Filter /FlateDecode >>\nstream\n".encode('ascii')
+                      + stream + b"\nendstream")
+        page_ids.append(add(
+            f"<< /Type /Page /Parent {page_tree} 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+            f"/Resources << /Font << /F1 {font} 0 R >> >> /Contents {content} 0 R >>"
+        ))
+    objects[catalog - 1] = f"<< /Type /Catalog /Pages {page_tree} 0 R >>"
+    objects[page_tree - 1] = (f"<< /Type /Pages /Kids [{' '.join(f'{page} 0 R' for page in page_ids)}] "
+                              f"/Count {len(page_ids)} >>")
+
+    output = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        body = body if isinstance(body, bytes) else body.encode('ascii')
+        output += f"{number} 0 obj\n".encode('ascii') + body + b"\nendobj\n"
+    xref = len(output)
+    output += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode('ascii')
+    output += ''.join(f"{offset:010d} 00000 n \n" for offset in offsets).encode('ascii')
+    output += (f"trailer\n<< /Size {len(objects) + 1} /Root {catalog} 0 R /Info {info} 0 R >>\n"
+               f"startxref\n{xref}\n%%EOF\n").encode('ascii')
+    return bytes(output)
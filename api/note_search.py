@@ -0,0 +1,273 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+
+# 노트 검색 색인 설정 (환경 변수로 조정 가능)
+NOTE_SEARCH = os.environ.get("NOTE_SEARCH", "1") != "0"
+NOTE_SEARCH_PATH = os.environ.get("NOTE_SEARCH_PATH", "/tmp/note_search.sqlite3")
+NOTE_SEARCH_MAX_DOCUMENTS = int(os.environ.get("NOTE_SEARCH_MAX_DOCUMENTS", "100000"))
+NOTE_SEARCH_MAX_RESULTS = int(os.environ.get("NOTE_SEARCH_MAX_RESULTS", "50"))
+
+# 스크립트는 이 단어 수 단위 구간으로 나눠 색인 (구간별로 순위를 매기고 발췌문을 보여줌)
+TRANSCRIPT_PASSAGE_WORDS = 200
+# 검색어 단어 수 상한 (긴 검색어로 조회가 느려지지 않도록)
+MAX_QUERY_TERMS = 8
+# 제목 일치를 본문 일치보다 높게 평가 (bm25 열 가중치: 제목, 본문)
+SECTION_RANK = "bm25(4.0, 1.0)"
+# 일치하는 행이 이보다 많은 흔한 단어 검색은 가장 최근에 색인한 이 개수의 행만 순위를 매김 (검색 시간 상한)
+MAX_RANKED_MATCHES = int(os.environ.get("NOTE_SEARCH_MAX_RANKED", "200"))
+
+_HEADING = re.compile(r'^#{1,6}\s+(.+?)\s*#*\s*$', re.MULTILINE)
+_QUERY_TERM = re.compile(r'\w+')
+
+# 노트 마크다운 섹션 분할 함수
+def split_sections(markdown, title=''):
+    """마크다운 노트를 제목(#) 기준으로 나눠 (섹션 제목, 본문) 목록을 반환합니다.
+
+    첫 제목 앞의 내용은 영상 제목을 섹션 제목으로 씁니다.
+    """
+    sections = []
+    headings = list(_HEADING.finditer(markdown or ''))
+    lead = (markdown or '')[:headings[0].start() if headings else None].strip()
+    if lead:
+        sections.append((title, lead))
+    for number, match in enumerate(headings):
+        end = headings[number + 1].start() if number + 1 < len(headings) else len(markdown)
+        body = markdown[match.end():end].strip()
+        if body:
+            sections.append((match.group(1), body))
+    return sections
+
+def split_passages(transcript_text, words=TRANSCRIPT_PASSAGE_WORDS):
+    """스크립트를 일정한 단어 수의 구간으로 나눕니다."""
+    tokens = (transcript_text or '').split()
+    return [' '.join(tokens[start:start + words]) for start in range(0, len(tokens), words)]
+
+def build_match_query(query):
+    """검색어를 FTS5 MATCH 식으로 바꿉니다. 검색할 단어가 없으면 None을 반환합니다.
+
+    한국어는 조사가 단어 뒤에 붙으므로(예: '루프가') 모든 단어를 접두어로 검색하고, 모든 단어가 있는 섹션만 찾습니다.
+    """
+    terms = _QUERY_TERM.findall((query or '').lower())[:MAX_QUERY_TERMS]
+    if not terms:
+        return None
+    return ' '.join(f'"{term}"*' for term in terms)
+
+def _term_frequency_score(text, pattern, average_length, k1=1.2, b=0.75):
+    # 검색어(접두어)가 나온 횟수의 bm25식 점수 (모든 행에 흔한 단어이므로 문서 빈도 가중치는 생략, 길이는 글자 수 기준)
+    frequency = len(pattern.findall(text))
+    return frequency * (k1 + 1) / (frequency + k1 * (1 - b + b * len(text) / average_length))
+
+def make_snippet(text, pattern, words=16):
+    """첫 일치 위치 주변 단어들로 일치 부분을 [ ]로 표시한 발췌문을 만듭니다."""
+    tokens = text.split()
+    first = next((index for index, token in enumerate(tokens) if pattern.search(token)), 0)
+    start = max(0, min(first - words // 4, len(tokens) - words))
+    window = [pattern.sub(lambda found: f"[{found.group(0)}]", token) for token in tokens[start:start + words]]
+    return ('…' if start > 0 else '') + ' '.join(window) + ('…' if start + words < len(tokens) else '')
+
+def _cache_key_parts(cache_key):
+    # 노트 캐시 키(출처|학습 레벨|프롬프트 버전|모델)에서 비디오 ID와 학습 레벨을 꺼냄
+    parts = cache_key.split('|')
+    source = parts[0]
+    video_id = source[len('video:'):] if source.startswith('video:') else None
+    learning_level = parts[1] if len(parts) > 1 else 'beginner'
+    return video_id, learning_level
+
+class NoteSearchIndex:
+    """생성한 노트(섹션별)와 스크립트(구간별)를 SQLite FTS5로 색인하는 전문 검색 색인입니다.
+
+    노트가 생성될 때마다 그 노트의 행만 추가하고(같은 캐시 키는 교체), 가장 오래된 문서부터 최대 개수를 넘는 만큼 제거합니다.
+    각 문서의 FTS 행 번호 범위를 함께 저장하므로 교체와 제거도 전체 색인을 훑지 않습니다.
+    """
+
+    def __init__(self, path=NOTE_SEARCH_PATH, max_documents=NOTE_SEARCH_MAX_DOCUMENTS):
+        self.path = path
+        self.max_documents = max_documents
+        self._lock = threading.Lock()
+        self._conn = None
+        self._stats = {'queries': 0, 'broad': 0, 'writes': 0, 'errors': 0}
+
+    def _connect(self):
+        # 첫 사용 시에만 SQLite 연결 (콜드 스타트 비용 최소화)
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS documents ("
+                "id INTEGER PRIMARY KEY, key TEXT UNIQUE NOT NULL, video_id TEXT, title TEXT NOT NULL, "
+                "learning_level TEXT NOT NULL, first_row INTEGER NOT NULL, last_row INTEGER NOT NULL, "
+                "created_at REAL NOT NULL)"
+            )
+            exists = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sections'").fetchone()
+            if exists is None:
+                # 한글 음절도 단어 문자로 나누는 unicode61 토크나이저, 2~3글자 접두어 색인
+                conn.execute(
+                    "CREATE VIRTUAL TABLE sections USING fts5("
+                    "heading, body, document_id UNINDEXED, kind UNINDEXED, learning_level UNINDEXED, "
+                    "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+                )
+                conn.execute("INSERT INTO sections (sections, rank) VALUES ('rank', ?)", (SECTION_RANK,))
+                conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def add(self, cache_key, title, markdown, transcript_text=None):
+        """노트 하나를 섹션별로 (스크립트가 주어지면 스크립트 구간도) 색인합니다."""
+        video_id, learning_level = _cache_key_parts(cache_key)
+        rows = [(heading, body, 'note') for heading, body in split_sections(markdown, title)]
+        rows += [(f"스크립트 {number}", passage, 'transcript')
+                 for number, passage in enumerate(split_passages(transcript_text), start=1)]
+        if not rows:
+            return
+        with self._lock:
+            self._stats['writes'] += 1
+            try:
+                conn = self._connect()
+                previous = conn.execute(
+                    "SELECT id, first_row, last_row FROM documents WHERE key = ?", (cache_key,)
+                ).fetchone()
+                if previous is not None:
+                    conn.execute("DELETE FROM sections WHERE rowid BETWEEN ? AND ?", previous[1:])
+                    conn.execute("DELETE FROM documents WHERE id = ?", previous[:1])
+                document_id = conn.execute(
+                    "INSERT INTO documents (key, video_id, title, learning_level, first_row, last_row, created_at) "
+                    "VALUES (?, ?, ?, ?, 0, 0, ?)",
+                    (cache_key, video_id, title or '', learning_level, time.time())
+                ).lastrowid
+                row_ids = [conn.execute(
+                    "INSERT INTO sections (heading, body, document_id, kind, learning_level) VALUES (?, ?, ?, ?, ?)",
+                    (heading, body, document_id, kind, learning_level)
+                ).lastrowid for heading, body, kind in rows]
+                conn.execute("UPDATE documents SET first_row = ?, last_row = ? WHERE id = ?",
+                             (min(row_ids), max(row_ids), document_id))
+                self._evict(conn, document_id)
+                conn.commit()
+            except sqlite3.Error:
+                self._stats['errors'] += 1
+
+    def _evict(self, conn, newest_id):
+        # 문서 id와 FTS 행 번호는 추가 순서대로 늘어나므로 오래된 문서의 행을 범위로 한 번에 제거
+        oldest_kept = newest_id - self.max_documents
+        if oldest_kept > 0:
+            last_row = conn.execute("SELECT max(last_row) FROM documents WHERE id <= ?", (oldest_kept,)).fetchone()[0]
+            if last_row is not None:
+                conn.execute("DELETE FROM sections WHERE rowid <= ?", (last_row,))
+                conn.execute("DELETE FROM documents WHERE id <= ?", (oldest_kept,))
+
+    def search(self, query, learning_level=None, limit=10):
+        """검색어와 일치하는 섹션을 관련도 순으로 반환합니다. 검색할 단어가 없으면 ValueError를 발생시킵니다.
+
+        결과마다 비디오 ID, 영상 제목, 학습 레벨, 섹션 제목, 종류(note/transcript), 일치 부분을 [ ]로 표시한 발췌문, 점수를 담습니다.
+        일치하는 행이 MAX_RANKED_MATCHES개 이하이면 FTS5의 bm25로 순위를 매기고, 더 많으면(흔한 단어)
+        가장 최근에 색인한 MAX_RANKED_MATCHES개 행 사이에서 단어 빈도로 순위를 매깁니다.
+        """
+        match = build_match_query(query)
+        if match is None:
+            raise ValueError("검색어를 입력해주세요.")
+        limit = max(1, min(int(limit), NOTE_SEARCH_MAX_RESULTS))
+        level_filter = "AND learning_level = ? " if learning_level else ""
+        params = (match, learning_level) if learning_level else (match,)
+        with self._lock:
+            self._stats['queries'] += 1
+            try:
+                conn = self._connect()
+                # bm25는 검색어의 문서 빈도를 구하려고 일치하는 행을 모두 읽으므로, 최근 일치 행을 먼저 모아 흔한 단어인지 확인
+                # (rowid 순서 조회는 앞에서부터 필요한 만큼만 읽음)
+                candidates = max(MAX_RANKED_MATCHES, limit)
+                recent = [row[0] for row in conn.execute(
+                    f"SELECT rowid FROM sections WHERE sections MATCH ? {level_filter}ORDER BY rowid DESC LIMIT ?",
+                    params + (candidates + 1,)
+                )]
+                broad = len(recent) > candidates
+                if broad:
+                    ranked = self._rank_recent(conn, recent[:candidates], match, limit)
+                else:
+                    # ORDER BY rank LIMIT은 FTS5가 처리하므로 발췌문은 반환할 행만 만듦
+                    ranked = conn.execute(
+                        "SELECT document_id, heading, kind, -rank, snippet(sections, 1, '[', ']', '…', 16) "
+                        f"FROM sections WHERE sections MATCH ? {level_filter}ORDER BY rank LIMIT ?",
+                        params + (limit,)
+                    ).fetchall()
+                document_ids = sorted({row[0] for row in ranked})
+                documents = {row[0]: row[1:] for row in conn.execute(
+                    "SELECT id, video_id, title, learning_level FROM documents "
+                    f"WHERE id IN ({','.join('?' * len(document_ids))})",
+                    document_ids
+                )}
+            except sqlite3.Error:
+                self._stats['errors'] += 1
+                return []
+            if broad:
+                self._stats['broad'] += 1
+        return [{
+            'videoId': documents[document_id][0],
+            'videoTitle': documents[document_id][1],
+            'learningLevel': documents[document_id][2],
+            'section': heading,
+            'kind': kind,
+            'snippet': snippet,
+            # 클수록 관련도가 높음 (bm25는 관련도가 높을수록 작은 음수이므로 부호를 바꿈)
+            'score': round(score, 3)
+        } for document_id, heading, kind, score, snippet in ranked if document_id in documents]
+
+    def _rank_recent(self, conn, row_ids, match, limit):
+        # 최근 일치 행들을 제목/본문의 검색어 빈도(bm25와 같은 포화·길이 보정, 문서 빈도 제외)로 평가
+        # (행 번호로 읽으므로 검색어 일치를 다시 계산하지 않음)
+        rows = conn.execute(
+            f"SELECT document_id, heading, kind, body FROM sections WHERE rowid IN ({','.join('?' * len(row_ids))})",
+            row_ids
+        ).fetchall()
+        terms = sorted((term.strip('"*') for term in match.split()), key=len, reverse=True)
+        pattern = re.compile(r'(?<!\w)(?:' + '|'.join(re.escape(term) for term in terms) + r')\w*', re.IGNORECASE)
+        average_length = sum(len(row[3]) for row in rows) / max(len(rows), 1) or 1
+        scored = sorted(((4.0 * _term_frequency_score(heading, pattern, average_length)
+                          + _term_frequency_score(body, pattern, average_length), document_id, heading, kind, body)
+                         for document_id, heading, kind, body in rows), key=lambda row: row[0], reverse=True)
+        # 발췌문은 반환할 행만 만듦 (snippet()과 같은 형식)
+        return [(document_id, heading, kind, score, make_snippet(body, pattern))
+                for score, document_id, heading, kind, body in scored[:limit]]
+
+    def stats(self):
+        """검색 횟수(그중 흔한 단어 검색 수), 색인 횟수, 오류 수, 색인된 문서 수를 반환합니다."""
+        with self._lock:
+            stats = dict(self._stats)
+            try:
+                stats['documents'] = self._connect().execute("SELECT count(*) FROM documents").fetchone()[0]
+            except sqlite3.Error:
+                stats['documents'] = None
+        return stats
+
+# 프로세스 전역 검색 색인 인스턴스
+_note_search = None
+_note_search_lock = threading.Lock()
+
+def get_note_search():
+    """프로세스 전역 노트 검색 색인을 반환합니다."""
+    global _note_search
+    if _note_search is None:
+        with _note_search_lock:
+            if _note_search is None:
+                _note_search = NoteSearchIndex()
+    return _note_search
+
+# 생성한 노트 색인 함수
+def index_notes(cache_key, response_data, transcript_text=None):
+    """새로 생성해 캐시한 노트 응답(markdownContent, videoTitle)을 검색 색인에 추가합니다."""
+    if not NOTE_SEARCH:
+        return
+    get_note_search().add(cache_key, response_data.get('videoTitle', ''),
+                          response_data.get('markdownContent', ''), transcript_text)
+
+# 노트 검색 함수
+def search_notes(query, learning_level=None, limit=10):
+    """검색 응답 본문(검색어, 결과 목록, 걸린 시간)을 반환합니다. 검색어가 비어 있으면 ValueError를 발생시킵니다."""
+    start = time.perf_counter()
+    results = get_note_search().search(query, learning_level, limit)
+    return {
+        'query': query,
+        'results': results,
+        'tookMs': round((time.perf_counter() - start) * 1000, 2)
+    }
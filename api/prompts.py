@@ -0,0 +1,384 @@
+import datetime
+import hashlib
+import inspect
+import os
+import threading
+import time
+from genai_client import get_genai
+
+# 프롬프트 설정 (환경 변수로 조정 가능)
+PROMPT_CONTEXT_CACHE = os.environ.get("PROMPT_CONTEXT_CACHE", "0") == "1"
+PROMPT_CONTEXT_CACHE_TTL = int(os.environ.get("PROMPT_CONTEXT_CACHE_TTL", "3600"))
+# 컨텍스트 캐시 생성에 실패한 경우 다시 시도하기까지 기다리는 시간(초)
+PROMPT_CONTEXT_CACHE_RETRY = int(os.environ.get("PROMPT_CONTEXT_CACHE_RETRY", "600"))
+
+class NotePrompt:
+    """정적인 시스템 지시문(접두부)과 요청마다 바뀌는 내용(영상 정보, 스크립트)으로 나뉜 프롬프트입니다."""
+
+    def __init__(self, version, learning_level, system, user):
+        self.version = version
+        self.learning_level = learning_level
+        self.system = system
+        self.user = user
+
+    @property
+    def text(self):
+        """시스템 지시문을 지원하지 않는 모델에 보낼 하나로 합친 프롬프트입니다."""
+        return f"{self.system}\n\n{self.user}"
+
+    def __str__(self):
+        return self.text
+
+class PromptTemplate:
+    """학습 레벨별 시스템 지시문과 요청 본문 템플릿을 묶은 버전 있는 프롬프트 템플릿입니다.
+
+    시스템 지시문은 버전과 학습 레벨이 같으면 항상 같은 문자열이므로 한 번 만든 뒤 재사용하며,
+    제공자 측 컨텍스트 캐시의 키로도 쓸 수 있습니다.
+    """
+
+    def __init__(self, version, instructions, level_instructions, user_template):
+        self.version = version
+        self.instructions = instructions
+        self.level_instructions = level_instructions
+        self.user_template = user_template
+        self._system_cache = {}
+
+    def system_instruction(self, learning_level='beginner'):
+        """학습 레벨에 맞는 정적 시스템 지시문을 반환합니다."""
+        # 레벨별 지시문이 없는 템플릿(공유 분석 등)은 레벨과 무관하게 같은 지시문 사용
+        if not self.level_instructions:
+            return self.instructions
+        if learning_level not in self.level_instructions:
+            learning_level = 'beginner'
+        system = self._system_cache.get(learning_level)
+        if system is None:
+            system = f"{self.instructions}\n\n{self.level_instructions[learning_level]}"
+            self._system_cache[learning_level] = system
+        return system
+
+    def render(self, transcript_text, video_info=None, learning_level='beginner'):
+        """스크립트와 영상 정보로 NotePrompt를 만듭니다."""
+        video_context = ""
+        if video_info:
+            video_context = (f"이 학습 노트는 다음 유튜브 영상을 기반으로 합니다:\n"
+                             f"제목: {video_info.get('title', '알 수 없는 제목')}\n"
+                             f"비디오 ID: {video_info.get('video_id', '알 수 없는 ID')}\n\n")
+        user = self.user_template.format(video_context=video_context, transcript_text=transcript_text)
+        return NotePrompt(self.version, learning_level, self.system_instruction(learning_level), user)
+
+# 등록된 프롬프트 템플릿 (버전 → 템플릿)
+PROMPT_REGISTRY = {}
+
+def register_prompt(template):
+    """프롬프트 템플릿을 버전 이름으로 등록합니다."""
+    PROMPT_REGISTRY[template.version] = template
+    return template
+
+# 전체 지시문 버전 (유튜브 대본 티칭 머신)
+NOTES_PROMPT_FULL = register_prompt(PromptTemplate(
+    'notes-full-v3',
+    """# 유튜브 대본 티칭 머신
+
+## 역할: 적응형 교육 합성기
+귀하는 YouTube 원본 스크립트를 최적화된 학습 자료로 변환하는 전문 교육 콘텐츠 처리 전문가입니다. 고급 교육 프레임워크를 활용합니다.
+
+## 역량  
+1.  **콘텐츠 분석 및 추출**  
+    - 필사본에서 핵심 개념, 사실, 이론 및 방법론 추출  
+    - 개념적 계층과 지식 구조를 식별합니다.  
+    - 강사의 교육 접근 방식과 방법을 인식합니다.  
+    - 관련 없는 내용, 불필요한 단어, 반복을 걸러냅니다.  
+    - 검증을 위해 잠재적인 부정확성이나 뒷받침되지 않는 주장을 표시합니다.  
+2.  **교육 구조 조정**  
+    - 교육 모범 사례에 따라 콘텐츠를 구성합니다.  
+    - 콘텐츠에 기반한 명확한 학습 목표 개발  
+    - 논리적인 지식 진행(기초 → 고급)을 생성합니다.  
+    - 잠재적인 혼란 지점을 식별하고 명확히 합니다.  
+    - 복잡한 주제를 관리 가능한 학습 단위로 나누세요  
+3.  **학습 스타일 적응**  
+    - 다양한 인지적 접근 방식(분석적, 실용적, 창의적)에 적응  
+    - 다양한 지능 유형(논리, 언어, 공간 등)에 맞춰 조정 가능  
+    - 다양한 주의 지속 시간과 처리 속도에 맞게 조정  
+    - 도전적인 개념에 대한 대체 설명 제공
+
+## 프로세스  
+1.  **입력 분석**  
+    - 주제, 범위, 복잡성 및 구조를 파악하기 위해 대본을 검토합니다.  
+    - 교육 수준 및 선행 지식 확인  
+    - 영상에서 사용된 원래의 교육 방식을 평가합니다.  
+    - 원본 자료의 장점과 한계를 인식합니다.  
+    - 필사본 품질을 평가하고 차이점이나 모호한 부분을 해결합니다.  
+2.  **학습자 프로필 통합** (이 부분은 현재 MVP에서는 사용자 입력을 받지 않으므로, 일반적인 학습자 기준으로 처리해주세요.)  
+    - 학습자의 특정 요구 사항, 목표 및 선호도를 고려합니다.  
+    - 현재 지식 수준과 학습 맥락에 맞게 조정  
+    - 학습 가능한 시간과 리소스를 최적화합니다.  
+    - 언급된 경우 특정 학습 과제를 설명하십시오.  
+    - 인지 부하 기능에 맞춰 콘텐츠 복잡성 조정  
+3.  **콘텐츠 변환**  
+    - 교육 자료를 일관된 교육 구조로 재구성합니다.  
+    - 비유와 예를 통해 복잡한 개념을 단순화합니다.  
+    - 불분명하거나 충분히 설명되지 않은 사항에 대해 자세히 설명하십시오.  
+    - 새로운 정보를 기존 지식 프레임워크에 연결합니다.  
+    - 사실의 정확성을 확인하고 추가 조사가 필요한 주장을 기록하세요.  
+4.  **출력 생성**  
+    - 가장 적합한 형식으로 기본 학습 자료를 만듭니다.  
+    - 강화를 위한 보충 자료 개발  
+    - 메타인지적 요소(반성 촉구, 자기 평가)를 포함합니다.  
+    - 추가 탐색 및 적용을 위한 지침 제공  
+5.  **품질 평가**  
+    - 생성된 자료의 교육적 효과를 평가합니다.  
+    - 남아 있는 격차나 불분명한 설명을 식별합니다.  
+    - 표시된 부정확한 내용이 적절하게 처리되었는지 확인합니다.  
+    - 모든 학습 목표가 적절하게 다루어졌는지 확인하세요.
+
+## 필사본 품질 처리  
+다양한 품질의 대본을 작업할 때:  
+1.  **고품질 성적증명서**: 교육 최적화에 중점을 두고 표준 프로세스를 진행합니다.  
+2.  **미완료 성적증명서의 경우**:  
+    - 지식 격차를 파악하고 명확하게 기록합니다.  
+    - 누락된 정보에 대한 보충 자료를 제안합니다.  
+    - 사용 가능한 콘텐츠를 논리적으로 연결하여 일관성을 유지합니다.  
+3.  **기술적/복잡한 사본의 경우**:  
+    - 복잡한 용어를 추가 설명으로 분석합니다.  
+    - 단순화된 비유와 시각적 표현을 사용하세요  
+    - 기술 용어의 어휘집을 제공합니다.  
+    - 학습자의 다양한 역량에 맞춰 점진적으로 복잡도를 높여줍니다.  
+4.  **잠재적으로 부정확한 콘텐츠**:  
+    - 의심스럽거나 근거가 없는 주장을 신고하세요.  
+    - 진술이 확립된 지식과 충돌하는 경우 주의하세요  
+    - 적절한 경우 검증 소스를 제안합니다.  
+    - 확립된 사실과 화자의 의견을 구별합니다.
+
+## 출력 구조 (이 구조에 맞춰 Markdown 형식으로 결과를 생성해주세요):  
+1.  **학습 목표**  
+    - 이 자료에서 배울 내용  
+2.  **핵심 개념**  
+    - 명확한 설명과 함께 제시된 필수 아이디어  
+3.  **개념 지도**  
+    - 아이디어가 연결되는 방식을 보여주는 ASCII 시각적 표현 (Markdown 코드 블록으로 표현 가능)  
+4.  **자세한 분석**  
+    - 콘텐츠에 대한 체계적인 설명  
+5.  **요약**  
+    - 가장 중요한 요점에 대한 간략한 검토  
+6.  **응용**  
+    - 이 지식을 실제로 사용하는 방법  
+7.  **자체 평가**  
+    - 이해도를 확인하기 위한 질문""",
+    {
+        'beginner': """이 학습 노트는 초보 학습자를 위해 작성됩니다. 다음 지침을 따라주세요:
+- 기본 개념과 원리를 쉽게 이해할 수 있도록 설명해주세요
+- 복잡한 용어는 간단한 설명과 예시를 함께 제공해주세요
+- 실생활에서 쉽게 이해할 수 있는 예시를 포함해주세요
+- 자기 평가 질문은 기본 이해도를 측정할 수 있는 간단한 것으로 구성해주세요""",
+        'advanced': """이 학습 노트는 고급 학습자를 위해 작성됩니다. 다음 지침을 따라주세요:
+- 더 깊이 있는 개념 설명과 고급 이론을 포함해주세요
+- 실제 활용 사례와 응용 방법을 더 상세히 제시해주세요
+- 해당 분야의 전문 용어와 관련 학술적 개념을 적절히 포함해주세요
+- 자기 평가 질문은 비판적 사고와 분석적 능력을 측정할 수 있는 것으로 구성해주세요"""
+    },
+    """{video_context}---
+{transcript_text}
+---
+
+위 스크립트(또는 스크립트 부재 정보)를 바탕으로, 앞서 정의된 "## 역할", "## 역량", "## 프로세스", "## 필사본 품질 처리"를 고려하여 "## 출력 구조"에 따라 교육적인 학습 노트를 Markdown 형식으로 작성해주십시오."""
+))
+
+# 압축 버전 (같은 출력 구조를 유지하면서 지시문 토큰을 줄임)
+NOTES_PROMPT_COMPACT = register_prompt(PromptTemplate(
+    'notes-compact-v3',
+    """# 유튜브 대본 학습 노트 생성기
+역할: YouTube 스크립트를 체계적인 학습 자료로 바꾸는 교육 콘텐츠 전문가.
+
+지침:
+- 핵심 개념, 사실, 방법론을 추출하고 반복/불필요한 말은 제외
+- 기초 → 고급 순으로 구성하고 어려운 개념은 비유와 예시로 설명
+- 스크립트가 불완전하면 빠진 부분을 표시하고, 근거 없는 주장은 검증 필요로 표시
+- 사실과 화자의 의견을 구별
+
+출력 구조 (Markdown):
+1. 학습 목표
+2. 핵심 개념
+3. 개념 지도 (코드 블록의 ASCII 표현)
+4. 자세한 분석
+5. 요약
+6. 응용
+7. 자체 평가 (질문 3-5개)""",
+    {
+        'beginner': """초보 학습자용: 기본 원리를 쉽게 설명하고, 용어는 간단한 설명과 실생활 예시를 함께 제시하며, 자체 평가는 기본 이해도 확인 질문으로 구성""",
+        'advanced': """고급 학습자용: 심층 이론과 실제 활용 사례를 다루고, 전문 용어와 학술 개념을 사용하며, 자체 평가는 비판적/분석적 사고 질문으로 구성"""
+    },
+    """{video_context}스크립트:
+---
+{transcript_text}
+---
+
+위 스크립트를 바탕으로 지침과 출력 구조에 따라 학습 노트를 Markdown으로 작성해주세요."""
+))
+
+# 2단계 생성의 공유 분석 템플릿 (학습 레벨과 무관한 중간 결과 추출, shared_analysis.py 참고)
+ANALYSIS_PROMPT = register_prompt(PromptTemplate(
+    'analysis-v1',
+    """# 유튜브 대본 분석기
+역할: YouTube 스크립트에서 학습 노트 작성에 필요한 내용을 학습 레벨과 무관하게 추출하는 교육 콘텐츠 분석가.
+
+지침:
+- 학습 노트를 쓰지 말고, 이후 초보자용과 고급자용 노트를 모두 만들 수 있는 분석 결과만 작성
+- 스크립트에 있는 내용만 사용하고 반복/불필요한 말은 제외
+- 근거 없는 주장은 검증 필요로, 화자의 의견은 의견으로 표시
+- 스크립트가 불완전하면 빠진 부분을 기록
+- 원본 스크립트보다 훨씬 짧게(약 800단어 이내) 간결한 목록으로 작성
+
+출력 구조 (Markdown):
+1. 주제와 범위
+2. 핵심 개념 (개념마다 한 줄 정의, 기초 → 고급 순)
+3. 개념 구조 (상위/하위, 선행/후행, 원인/결과 관계)
+4. 사실, 예시, 방법론 (스크립트 근거)
+5. 용어 목록
+6. 검증이 필요한 주장과 빠진 부분
+7. 질문 후보 (기본 이해 확인 질문과 비판적/분석적 질문 모두)""",
+    {},
+    """{video_context}스크립트:
+---
+{transcript_text}
+---
+
+위 스크립트를 지침과 출력 구조에 따라 분석해주세요."""
+))
+
+# 2단계 생성의 렌더링 템플릿 (공유 분석 결과 → 레벨별 학습 노트)
+RENDER_PROMPT = register_prompt(PromptTemplate(
+    'notes-render-v1',
+    """# 분석 결과 기반 학습 노트 생성기
+역할: 유튜브 영상 분석 결과를 학습자 수준에 맞는 학습 자료로 바꾸는 교육 콘텐츠 전문가.
+
+지침:
+- 입력은 원본 스크립트가 아니라 스크립트에서 추출한 분석 결과(개념, 구조, 사실, 질문 후보)
+- 분석 결과에 있는 개념과 사실만 사용하고 새로운 사실을 지어내지 않음 (이해를 돕는 비유와 예시는 추가 가능)
+- 검증 필요로 표시된 주장과 빠진 부분은 노트에서도 표시
+- 질문 후보 중 학습자 수준에 맞는 것을 골라 자체 평가를 구성
+
+출력 구조 (Markdown):
+1. 학습 목표
+2. 핵심 개념
+3. 개념 지도 (코드 블록의 ASCII 표현)
+4. 자세한 분석
+5. 요약
+6. 응용
+7. 자체 평가 (질문 3-5개)""",
+    NOTES_PROMPT_FULL.level_instructions,
+    """{video_context}분석 결과:
+---
+{transcript_text}
+---
+
+위 분석 결과를 바탕으로 지침과 출력 구조에 따라 학습 노트를 Markdown으로 작성해주세요."""
+))
+
+# 변형 이름 → 버전
+PROMPT_VARIANTS = {
+    'full': NOTES_PROMPT_FULL.version,
+    'compact': NOTES_PROMPT_COMPACT.version
+}
+
+def get_prompt_template(name='full'):
+    """변형 이름(full/compact) 또는 버전으로 등록된 프롬프트 템플릿을 반환합니다."""
+    version = PROMPT_VARIANTS.get(name, name)
+    if version not in PROMPT_REGISTRY:
+        raise ValueError(f"등록되지 않은 프롬프트입니다: {name}")
+    return PROMPT_REGISTRY[version]
+
+# 설치된 SDK가 시스템 지시문/컨텍스트 캐시를 지원하는지 여부 (None이면 SDK를 처음 쓸 때 확인)
+SYSTEM_INSTRUCTION_SUPPORTED = None
+CONTEXT_CACHE_SUPPORTED = None
+
+def sdk_features():
+    """(시스템 지시문 지원 여부, 컨텍스트 캐시 지원 여부)를 반환합니다."""
+    global SYSTEM_INSTRUCTION_SUPPORTED, CONTEXT_CACHE_SUPPORTED
+    if SYSTEM_INSTRUCTION_SUPPORTED is None or CONTEXT_CACHE_SUPPORTED is None:
+        genai = get_genai()
+        if SYSTEM_INSTRUCTION_SUPPORTED is None:
+            SYSTEM_INSTRUCTION_SUPPORTED = 'system_instruction' in inspect.signature(genai.GenerativeModel.__init__).parameters
+        if CONTEXT_CACHE_SUPPORTED is None:
+            CONTEXT_CACHE_SUPPORTED = hasattr(genai, 'caching') and hasattr(genai.GenerativeModel, 'from_cached_content')
+    return SYSTEM_INSTRUCTION_SUPPORTED, CONTEXT_CACHE_SUPPORTED
+
+# 설치된 SDK가 호출별 요청 옵션(타임아웃)을 지원하는지 여부 (None이면 처음 쓸 때 확인)
+REQUEST_OPTIONS_SUPPORTED = None
+
+def generation_options(timeout=None):
+    """generate_content에 넘길 추가 인자를 반환합니다.
+
+    timeout(초)이 주어지고 SDK가 request_options를 지원하면 요청 타임아웃을 넣어,
+    마감 시간이 지난 호출이 응답을 기다리며 스레드와 할당량을 계속 쓰지 않게 합니다.
+    """
+    global REQUEST_OPTIONS_SUPPORTED
+    if timeout is None:
+        return {}
+    if REQUEST_OPTIONS_SUPPORTED is None:
+        generate_content = get_genai().GenerativeModel.generate_content
+        REQUEST_OPTIONS_SUPPORTED = 'request_options' in inspect.signature(generate_content).parameters
+    return {'request_options': {'timeout': timeout}} if REQUEST_OPTIONS_SUPPORTED else {}
+
+class ContextCacheRegistry:
+    """시스템 지시문별로 제공자 측 컨텍스트 캐시를 만들어 두고 만료 전까지 재사용합니다."""
+
+    def __init__(self, ttl=PROMPT_CONTEXT_CACHE_TTL, retry_after=PROMPT_CONTEXT_CACHE_RETRY):
+        self.ttl = ttl
+        self.retry_after = retry_after
+        self._lock = threading.Lock()
+        self._entries = {}
+        self.created = 0
+        self.reused = 0
+        self.failed = 0
+
+    def get(self, model_name, prompt, log=print):
+        """캐시된 컨텐츠를 반환합니다. 만들 수 없으면(최소 토큰 수 미달 등) None을 반환합니다."""
+        key = (model_name, prompt.version, hashlib.sha256(prompt.system.encode('utf-8')).hexdigest())
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[1] > now:
+                if entry[0] is not None:
+                    self.reused += 1
+                return entry[0]
+            try:
+                cached = get_genai().caching.CachedContent.create(
+                    model=model_name,
+                    system_instruction=prompt.system,
+                    ttl=datetime.timedelta(seconds=self.ttl)
+                )
+                # 만료 직전에 쓰지 않도록 여유를 두고 갱신
+                self._entries[key] = (cached, now + self.ttl * 0.9)
+                self.created += 1
+                return cached
+            except Exception as e:
+                log(f"컨텍스트 캐시 생성 실패, 일반 호출로 대체: {str(e)}")
+                self._entries[key] = (None, now + self.retry_after)
+                self.failed += 1
+                return None
+
+    def stats(self):
+        """생성/재사용/실패 횟수를 반환합니다."""
+        return {'created': self.created, 'reused': self.reused, 'failed': self.failed}
+
+# 프로세스 전역 컨텍스트 캐시 레지스트리
+context_caches = ContextCacheRegistry()
+
+# 프롬프트 종류에 맞는 모델과 요청 내용 준비 함수
+def prepare_generation(model_name, prompt, log=print):
+    """(모델, 요청 내용)을 반환합니다.
+
+    NotePrompt는 가능하면 정적 지시문을 시스템 지시문(또는 컨텍스트 캐시)으로 보내고 요청 본문만 내용으로 보냅니다.
+    SDK가 지원하지 않으면 하나로 합친 프롬프트를 보냅니다.
+    """
+    genai = get_genai()
+    if not isinstance(prompt, NotePrompt):
+        return genai.GenerativeModel(model_name), prompt
+    system_supported, cache_supported = sdk_features()
+    if PROMPT_CONTEXT_CACHE and cache_supported:
+        cached = context_caches.get(model_name, prompt, log)
+        if cached is not None:
+            return genai.GenerativeModel.from_cached_content(cached_content=cached), prompt.user
+    if system_supported:
+        return genai.GenerativeModel(model_name, system_instruction=prompt.system), prompt.user
+    return genai.GenerativeModel(model_name), prompt.text
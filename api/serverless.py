@@ -2,9 +2,23 @@ from flask import Flask, request, jsonify
 import json
 import os
 import re
-import google.generativeai as genai
-from youtube_transcript_api import YouTubeTranscriptApi, _errors as yt_errors
-import requests
+from functools import partial
+from note_cache import get_note_cache, make_cache_key
+from video_store import get_video_store
+from single_flight import transcript_flight, coalesce_generation
+from http_client import http_get, fetch_transcript_list, deadline_timeout
+from chunked_notes import map_transcript
+from model_health import call_with_fallback
+from token_budget import ModelPrompts, prompt_for_model, transcript_token_budget
+from prompts import get_prompt_template, prepare_generation, generation_options, RENDER_PROMPT
+from shared_analysis import NOTES_TWO_PHASE, get_analysis, build_render_prompt
+from near_duplicate import find_similar_notes, remember_transcript
+from note_search import index_notes, search_notes
+from note_export import register_export, export_note
+from transcript_cleaner import clean_transcript_segments
+from metrics import metrics, stage_timer, timed, record_deadline_exceeded, PROMETHEUS_CONTENT_TYPE
+from admission import admission, client_address, AdmissionRejected
+from deadline import DeadlineExceeded, deadline_from_headers
 
 # 환경 변수에서 API 키 가져오기 (먼저 .env 파일에서 로드 시도)
 try:
@@ -17,15 +31,28 @@ GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
 
 # API 키 상태 로깅
 if GEMINI_API_KEY:
+    # Gemini SDK는 콜드 스타트를 줄이기 위해 처음 모델을 호출할 때 가져와 설정함 (genai_client.get_genai)
     print("Gemini API 키가 정상적으로 로드되었습니다.")
-    genai.configure(api_key=GEMINI_API_KEY)
 else:
     print("경고: Gemini API 키가 환경 변수에 설정되어 있지 않습니다.")
 
+# 학습 노트 프롬프트 템플릿 (PROMPT_VARIANT=full 또는 compact)
+NOTES_PROMPT = get_prompt_template(os.environ.get("PROMPT_VARIANT", "compact"))
+
+# 캐시 키에 포함되는 프롬프트 버전과 기본 모델 (2단계 모드에서는 렌더링 템플릿 버전)
+PROMPT_VERSION = f"serverless-{RENDER_PROMPT.version if NOTES_TWO_PHASE else NOTES_PROMPT.version}"
+MODEL_NAME = 'gemini-pro'
+# 모델 대체 순서 (앞 모델의 회로가 열려 있거나 실패하면 다음 모델 사용)
+GEMINI_MODELS = [MODEL_NAME, 'gemini-1.5-flash', 'text-bison']
+
+# 메트릭에 쓰는 백엔드 이름
+BACKEND_NAME = 'serverless'
+
 # Flask 앱 설정
 app = Flask(__name__)
 
 # 유튜브 비디오 ID 추출 함수
+@timed('extract_video_id', BACKEND_NAME)
 def extract_video_id(url):
     """유튜브 URL에서 비디오 ID를 추출합니다."""
     video_id_match = re.search(r'(?:v=|\/)([0-9A-Za-z_-]{11}).*', url)
@@ -33,36 +60,71 @@ def extract_video_id(url):
         return video_id_match.group(1)
     return None
 
-# 유튜브 자막 가져오기 함수
-def get_youtube_transcript(video_id):
+# 유튜브 자막 조회 함수 (실제 조회, get_youtube_transcript를 통해 호출)
+def _fetch_youtube_transcript(video_id, deadline=None):
     """유튜브 비디오 ID를 통해 자막을 가져옵니다."""
+    # youtube_transcript_api는 실제로 자막을 조회할 때만 가져옴 (콜드 스타트 단축)
+    from youtube_transcript_api import _errors as yt_errors
+    store = get_video_store()
+    cached = store.get_transcript(video_id)
+    if cached is not None:
+        return cached
+    # 요청 마감 시간이 있으면 남은 시간을 넘지 않는 타임아웃 사용
+    timeout = deadline_timeout(deadline, 'transcript')
     try:
-        transcript_list = YouTubeTranscriptApi.get_transcript(video_id, languages=['ko', 'en'])
-        transcript_text = ' '.join([item['text'] for item in transcript_list])
+        # 최근 실패한 영상은 YouTube에 다시 묻지 않고 같은 오류로 처리
+        failure = store.get_failure(video_id)
+        if failure:
+            raise getattr(yt_errors, failure)(video_id)
+        transcript_list = fetch_transcript_list(video_id, languages=['ko', 'en'], timeout=timeout)
+        # 롤링 캡션 중복, 소리 태그, 추임새, 공백을 정리해 입력 토큰을 줄임
+        transcript_text, report = clean_transcript_segments(transcript_list)
+        print(f"자막 정리: {report['removedChars']}자 (약 {report['removedTokens']}토큰) 제거")
+        store.put_transcript(video_id, transcript_text)
         return transcript_text
     except yt_errors.NoTranscriptAvailable:
+        store.put_failure(video_id, 'NoTranscriptAvailable')
         raise Exception("이 영상에는 자막이 제공되지 않습니다. 스크립트 직접 입력 방식을 이용해주세요.")
     except yt_errors.TranscriptsDisabled:
+        store.put_failure(video_id, 'TranscriptsDisabled')
         raise Exception("이 영상의 자막이 비활성화되어 있습니다. 스크립트 직접 입력 방식을 이용해주세요.")
     except yt_errors.VideoUnavailable:
+        store.put_failure(video_id, 'VideoUnavailable')
         raise Exception("유효하지 않거나 접근할 수 없는 영상입니다.")
     except Exception as e:
+        if deadline is not None and deadline.expired():
+            raise DeadlineExceeded('transcript') from e
         raise Exception(f"자막을 가져오는 중 오류가 발생했습니다: {str(e)}")
 
+
+# 유튜브 자막 가져오기 함수 (같은 영상에 대한 동시 조회는 하나로 합침)
+@timed('transcript', BACKEND_NAME)
+def get_youtube_transcript(video_id, deadline=None):
+    """유튜브 비디오 ID를 통해 자막을 가져옵니다. deadline이 주어지면 마감 시간까지만 기다립니다."""
+    timeout = deadline.remaining() if deadline is not None else None
+    return transcript_flight.do(video_id, _fetch_youtube_transcript, video_id, deadline, timeout=timeout)
+
 # 유튜브 비디오 정보 가져오기 함수
-def get_video_info(video_id):
+@timed('video_info', BACKEND_NAME)
+def get_video_info(video_id, deadline=None):
     """유튜브 비디오 ID로부터 제목과 설명을 가져옵니다."""
+    cached = get_video_store().get_info(video_id)
+    if cached is not None:
+        return cached
+    timeout = deadline_timeout(deadline, 'video_info')
     try:
         url = f"https://www.youtube.com/oembed?url=https://www.youtube.com/watch?v={video_id}&format=json"
-        response = requests.get(url)
+        response = http_get(url, timeout=timeout)
         
         if response.status_code == 200:
             data = response.json()
             title = data.get('title', f"Video_{video_id}")
-            return {
+            video_info = {
                 'title': title,
                 'video_id': video_id
             }
+            get_video_store().put_info(video_id, video_info)
+            return video_info
         else:
             return {
                 'title': f"Video_{video_id}",
@@ -74,61 +136,102 @@ def get_video_info(video_id):
             'video_id': video_id
         }
 
-# Gemini API를 사용하여 학습 노트 생성 함수
-def generate_notes_with_gemini(transcript_text, video_info=None, learning_level='beginner'):
-    """Gemini API를 사용하여 주어진 자막으로 학습 노트를 생성합니다."""
-    # 입력 길이 확인 및 로깅
+# 단일 Gemini 모델 호출 함수
+def generate_with_model(model_name, prompt, timeout=None):
+    """지정한 모델 하나로 텍스트를 생성합니다. timeout은 요청 마감 시간까지 남은 초입니다."""
+    print(f"{model_name} 모델 사용 시도")
+    # 컨텍스트가 작은 대체 모델(text-bison)에는 그 모델의 입력 예산에 맞춰 다시 줄인 프롬프트를 보냄
+    model, contents = prepare_generation(model_name, prompt_for_model(prompt, model_name), print)
+    response = model.generate_content(contents, **generation_options(timeout))
+    print(f"{model_name} 모델 호출 성공")
+    return response.text
+
+# Gemini 모델 호출 함수 (모델 상태에 따라 gemini-pro → gemini-1.5-flash → text-bison 순으로 대체)
+@timed('gemini', BACKEND_NAME)
+def call_gemini(prompt, processing_info=None, deadline=None):
+    """프롬프트로 Gemini 모델을 호출하고 생성된 텍스트를 반환합니다.
+
+    processing_info 딕셔너리가 주어지면 사용한 모델과 대체 사유를 기록합니다.
+    deadline이 주어지면 남은 시간 안에 끝나기 어려운 대체 모델은 건너뜁니다.
+    """
+    try:
+        return call_with_fallback(GEMINI_MODELS, generate_with_model, prompt, processing_info, deadline=deadline)
+    except DeadlineExceeded:
+        raise
+    except Exception as e:
+        print(f"모든 모델 호출 실패: {str(e)}")
+        raise Exception("모든 AI 모델 호출에 실패했습니다. 잠시 후 다시 시도해 주세요.")
+
+# 긴 스크립트 맵 단계 함수 (청크별로 동시에 요약한 뒤 요약본 반환)
+def map_long_transcript(transcript_text, processing_info, deadline=None):
+    """스크립트가 너무 길면 청크별로 동시에 요약해 리듀스 입력으로 바꿉니다."""
+    processing_info['chunkCount'] = 1
+    if not GEMINI_API_KEY:
+        return transcript_text
+    with stage_timer('map', BACKEND_NAME):
+        try:
+            transcript_text, chunk_count = map_transcript(transcript_text, partial(call_gemini, deadline=deadline),
+                                                          transcript_token_budget(MODEL_NAME), deadline)
+            processing_info['chunkCount'] = chunk_count
+            if chunk_count > 1:
+                print(f"청크 요약 완료: {chunk_count}개")
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            print(f"청크 요약 실패, 잘라내기로 대체: {str(e)}")
+    return transcript_text
+
+# 학습 노트 생성 프롬프트 구성 함수
+def build_notes_prompt(transcript_text, video_info=None, learning_level='beginner', processing_info=None, deadline=None):
+    """긴 스크립트를 맵 단계로 줄인 뒤 모델 입력 토큰 예산에 맞춰 학습 노트 생성 프롬프트를 만듭니다."""
+    if processing_info is None:
+        processing_info = {}
+
+    # 긴 스크립트는 청크별로 동시에 요약(맵)한 뒤 요약본으로 노트를 생성(리듀스)
+    transcript_text = map_long_transcript(transcript_text, processing_info, deadline)
+
+    # 입력 길이 확인 (토큰 예산을 넘으면 아래 fit_prompt에서 문장 단위로 줄임)
     original_length = len(transcript_text)
-    max_length = 25000  # 안전한 토큰 한도를 위해 더 줄임
-
-    # 자막 길이가 제한을 초과할 경우
-    if original_length > max_length:
-        print(f"경고: 자막이 너무 깁니다 ({original_length}자). {max_length}자로 잘라냅니다.")
-        transcript_text = transcript_text[:max_length]
-        transcript_text += f"\n\n[참고: 원본 자막이 너무 길어 {max_length}자로 잘랐습니다. 전체 내용의 약 {int(max_length/original_length*100)}%만 처리되었습니다.]"
-
-    # 비디오 정보가 있으면 프롬프트에 추가
-    video_context = ""
-    if video_info:
-        video_context = f"""
-이 학습 노트는 다음 유튜브 영상을 기반으로 합니다:
-제목: {video_info.get('title', '알 수 없는 제목')}
-비디오 ID: {video_info.get('video_id', '알 수 없는 ID')}
-"""
 
-    # 학습 레벨 설정
-    level_context = ""
-    if learning_level == 'advanced':
-        level_context = """
-고급 학습자를 위한 자료를 만들어 주세요:
-- 더 심층적인 분석과 고급 개념 설명을 포함하세요
-- 학술적 용어와 전문 개념을 적절히 사용하세요
-- 비판적 사고를 요하는 더 복잡한 자기 평가 질문을 포함하세요
-"""
-    else:
-        level_context = """
-초보 학습자를 위한 자료를 만들어 주세요:
-- 기본 개념을 쉽게 이해할 수 있는 설명을 제공하세요
-- 복잡한 용어는 간단한 설명과 예시를 함께 제공하세요
-- 일상생활에서 적용할 수 있는 실용적인 예시를 포함하세요
-"""
+    def render_prompt(transcript_text):
+        # 자막을 줄였으면 처리한 비율을 모델에 알림
+        # (fit_prompt가 빈 스크립트로 템플릿 토큰 수를 잴 때도 안내문을 붙여, 줄인 뒤 붙는 안내문까지 예산에 포함)
+        if len(transcript_text) < original_length:
+            transcript_text += f"\n\n[참고: 원본 자막이 너무 길어 앞부분만 사용했습니다. 전체 내용의 약 {int(len(transcript_text)/original_length*100)}%만 처리되었습니다.]"
+        return NOTES_PROMPT.render(transcript_text, video_info, learning_level)
+
+    # 모델 입력 토큰 예산에 맞게 스크립트를 문장 단위로 줄여 프롬프트 생성
+    # (대체 모델 중 컨텍스트가 더 작은 모델은 호출할 때 그 모델 예산에 맞춰 다시 줄임)
+    with stage_timer('prompt', BACKEND_NAME):
+        return ModelPrompts(render_prompt, transcript_text, MODEL_NAME, processing_info)
+
+# 2단계 모드 프롬프트 구성 함수 (영상별로 캐시된 공유 분석 결과 → 학습 레벨별 렌더링 프롬프트)
+def build_two_phase_prompt(transcript_text, video_info=None, learning_level='beginner', processing_info=None,
+                           deadline=None):
+    """공유 분석 결과(없으면 한 번 생성)로 학습 레벨에 맞는 노트 렌더링 프롬프트를 만듭니다."""
+    if processing_info is None:
+        processing_info = {}
+    analysis = get_analysis(transcript_text, video_info, MODEL_NAME, partial(call_gemini, deadline=deadline),
+                            partial(map_long_transcript, deadline=deadline), processing_info, deadline)
+    with stage_timer('prompt', BACKEND_NAME):
+        return build_render_prompt(analysis, video_info, learning_level, MODEL_NAME, processing_info)
 
-    prompt = f"""아래 유튜브 영상 스크립트를 바탕으로 학습 노트를 만들어주세요.
-{video_context}
-{level_context}
-
-학습 노트는 다음 구조로 작성해 주세요 (모든 섹션은 마크다운 형식으로 작성):
-1. 학습 목표 - 이 노트를 통해 배울 수 있는 주요 내용 (3-5개 항목)
-2. 핵심 개념 - 중요 키워드와 그에 대한 간결한 설명
-3. 개념 지도 - 주요 개념 간의 관계를 보여주는 구조 (마크다운으로 표현)
-4. 자세한 내용 분석 - 주제별 체계적인 설명
-5. 요약 - 핵심 내용의 간략한 정리
-6. 응용 방법 - 학습 내용을 실생활이나 실무에 적용하는 방법
-7. 자체 평가 질문 - 이해도를 확인할 수 있는 질문 (3-5개)
-
-스크립트:
-{transcript_text}
-"""
+# Gemini API를 사용하여 학습 노트 생성 함수
+def generate_notes_with_gemini(transcript_text, video_info=None, learning_level='beginner', processing_info=None,
+                               deadline=None):
+    """Gemini API를 사용하여 주어진 자막으로 학습 노트를 생성합니다.
+
+    processing_info 딕셔너리가 주어지면 처리한 청크 수 등의 처리 정보를 기록합니다.
+    deadline(요청 마감 시간)이 지나면 남은 단계를 멈추고 DeadlineExceeded를 발생시킵니다.
+    """
+    if processing_info is None:
+        processing_info = {}
+
+    # 2단계 모드: 영상별로 캐시된 공유 분석 결과로 학습 레벨에 맞는 노트만 렌더링
+    if NOTES_TWO_PHASE and GEMINI_API_KEY:
+        prompt = build_two_phase_prompt(transcript_text, video_info, learning_level, processing_info, deadline)
+    else:
+        prompt = build_notes_prompt(transcript_text, video_info, learning_level, processing_info, deadline)
 
     # API 키 검증
     if not GEMINI_API_KEY:
@@ -151,31 +254,9 @@ API 키가 설정되어 있지 않아 학습 노트를 생성할 수 없습니
     # API 호출 시도
     try:
         print("Gemini API 호출 시작")
-        try:
-            print("gemini-pro 모델 사용 시도")
-            model = genai.GenerativeModel('gemini-pro')
-            response = model.generate_content(prompt)
-            print("gemini-pro 모델 호출 성공")
-            return response.text
-        except Exception as e:
-            print(f"gemini-pro 모델 오류: {str(e)}, gemini-1.5-flash 모델로 대체")
-            try:
-                # Pro 모델이 실패하면 1.5 모델로 시도
-                model = genai.GenerativeModel('gemini-1.5-flash')
-                response = model.generate_content(prompt)
-                print("gemini-1.5-flash 모델 호출 성공")
-                return response.text
-            except Exception as e2:
-                print(f"gemini-1.5-flash 모델 오류: {str(e2)}")
-                # 두 모델 모두 실패하면 PaLM 모델로 시도
-                try:
-                    model = genai.GenerativeModel('text-bison')
-                    response = model.generate_content(prompt)
-                    print("PaLM text-bison 모델 호출 성공")
-                    return response.text
-                except Exception as e3:
-                    print(f"모든 모델 호출 실패: {str(e3)}")
-                    raise Exception("모든 AI 모델 호출에 실패했습니다. 잠시 후 다시 시도해 주세요.")
+        return call_gemini(prompt, processing_info, deadline)
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         print(f"노트 생성 중 오류: {str(e)}")
         error_detail = str(e)
@@ -190,21 +271,68 @@ API 키가 설정되어 있지 않아 학습 노트를 생성할 수 없습니
         else:
             raise Exception(f"학습 노트 생성 중 오류가 발생했습니다: {error_detail}")
 
+# 입장 거절 응답 함수 (429와 Retry-After)
+def admission_rejected_response(error, headers):
+    print(f"입장 거절 ({error.reason}), {error.retry_after}초 후 재시도 안내")
+    return jsonify({
+        'error': str(error),
+        'errorType': 'QUOTA_EXCEEDED',
+        'retryAfter': error.retry_after,
+        'recommendationText': '서버가 현재 많은 요청을 처리 중입니다. 잠시 후 다시 시도해주세요.'
+    }), 429, {**headers, 'Retry-After': str(error.retry_after)}
+
+# 마감 시간 초과 응답 함수 (504)
+def deadline_exceeded_response(error, headers):
+    print(f"마감 시간 초과로 요청 중단 ({error.stage} 단계)")
+    record_deadline_exceeded(BACKEND_NAME, error.stage)
+    return jsonify({
+        'error': str(error),
+        'errorType': 'DEADLINE_EXCEEDED',
+        'stage': error.stage,
+        'recommendationText': '처리 시간이 너무 오래 걸렸습니다. 잠시 후 다시 시도하거나 더 짧은 영상으로 시도해 보세요.'
+    }), 504, headers
+
+# 단계별 지연 시간 메트릭 (Prometheus 텍스트 형식)
+@app.route('/api/metrics', methods=['GET'])
+def prometheus_metrics():
+    return metrics.render_prometheus(), 200, {'Content-Type': PROMETHEUS_CONTENT_TYPE}
+
+# 생성한 노트/스크립트 전문 검색 (?q=검색어&level=beginner&limit=10)
+@app.route('/api/search', methods=['GET'])
+def search_generated_notes():
+    headers = {'Access-Control-Allow-Origin': '*'}
+    try:
+        return jsonify(search_notes(request.args.get('q', ''), request.args.get('level'),
+                                    request.args.get('limit', 10, type=int))), 200, headers
+    except ValueError as e:
+        return jsonify({'error': str(e), 'errorType': 'INVALID_QUERY'}), 400, headers
+
+# 생성한 노트의 HTML/PDF 내보내기 (렌더링한 파일은 캐시에서 바로 보냄)
+@app.route('/api/notes/<note_id>.<export_format>', methods=['GET'])
+def export_generated_note(note_id, export_format):
+    status, body, headers = export_note(note_id, export_format, request.headers.get('If-None-Match'))
+    return body, status, headers
+
 @app.route('/api', methods=['POST', 'OPTIONS'])
+@timed('request', BACKEND_NAME)
 def generate_notes():
     # CORS 헤더 설정
     headers = {
         'Access-Control-Allow-Origin': '*',
         'Access-Control-Allow-Methods': 'POST, OPTIONS',
-        'Access-Control-Allow-Headers': 'Content-Type, Authorization'
+        'Access-Control-Allow-Headers': 'Content-Type, Authorization, X-Request-Timeout',
+        'Access-Control-Expose-Headers': 'Retry-After'
     }
 
     # OPTIONS 요청 처리 (CORS 프리플라이트)
     if request.method == 'OPTIONS':
         return '', 200, headers
 
+    ticket = None
     try:
         print("API 요청 시작")
+        # 요청 마감 시간 (X-Request-Timeout 헤더 또는 기본값, 각 단계의 타임아웃을 여기에 맞춤)
+        deadline = deadline_from_headers(request.headers)
         # 요청 데이터 받기
         data = request.get_json()
         if not data:
@@ -253,19 +381,37 @@ def generate_notes():
 
             print(f"비디오 ID 추출 성공: {video_id}")
 
+            # 캐시 확인 (자막 조회와 Gemini 호출 생략)
+            cache_key = make_cache_key(video_id=video_id, learning_level=learning_level,
+                                       prompt_version=PROMPT_VERSION, model_name=MODEL_NAME)
+            cached = get_note_cache().get(cache_key)
+            if cached:
+                print(f"노트 캐시 적중: {video_id}")
+                return jsonify(cached), 200, headers
+
+            # 입장 제어 (자막 조회와 Gemini 호출 전에 클라이언트/Gemini 예산 확인)
+            try:
+                ticket = admission.admit(client_address(request.headers, request.remote_addr), deadline=deadline)
+            except AdmissionRejected as e:
+                return admission_rejected_response(e, headers)
+
             # 비디오 정보 가져오기
             try:
-                video_info = get_video_info(video_id)
+                video_info = get_video_info(video_id, deadline)
                 video_title = video_info.get('title', f"Video_{video_id}")
                 print(f"비디오 정보 가져오기 성공: {video_title}")
+            except DeadlineExceeded:
+                raise
             except Exception as e:
                 print(f"비디오 정보 가져오기 실패: {str(e)}")
                 # 정보 가져오기 실패해도 계속 진행
 
             try:
                 # 유튜브 자막 가져오기 시도
-                transcript_text = get_youtube_transcript(video_id)
+                transcript_text = get_youtube_transcript(video_id, deadline)
                 print(f"자막 가져오기 성공: {len(transcript_text)}자")
+            except DeadlineExceeded:
+                raise
             except Exception as e:
                 error_msg = str(e)
                 print(f"자막 가져오기 실패: {error_msg}")
@@ -300,6 +446,15 @@ def generate_notes():
             transcript_text = input_value
             print("직접 입력 텍스트 모드")
 
+            # 캐시 확인
+            cache_key = make_cache_key(transcript_text=transcript_text, learning_level=learning_level,
+                                       prompt_version=PROMPT_VERSION, model_name=MODEL_NAME)
+            # 거의 같은 스크립트(줄바꿈, 도입부 차이 등)로 만든 노트도 재사용
+            cached = get_note_cache().get(cache_key) or find_similar_notes(transcript_text, cache_key)
+            if cached:
+                print("노트 캐시 적중: 직접 입력 텍스트")
+                return jsonify(cached), 200, headers
+
         # 학습 노트 생성 전 텍스트 검증
         if len(transcript_text.strip()) < 50:
             print(f"텍스트가 너무 짧음: {len(transcript_text)}자")
@@ -308,9 +463,19 @@ def generate_notes():
                 'recommendationText': '최소 50자 이상의 텍스트를 입력해주세요.'
             }), 400, headers
 
+        if input_type != 'url':
+            # 입장 제어 (직접 입력 텍스트는 Gemini 호출 전에 클라이언트/Gemini 예산 확인)
+            try:
+                ticket = admission.admit(client_address(request.headers, request.remote_addr), deadline=deadline)
+            except AdmissionRejected as e:
+                return admission_rejected_response(e, headers)
+
         print("학습 노트 생성 시작")
         # 학습 노트 생성
-        markdown_content = generate_notes_with_gemini(transcript_text, video_info, learning_level)
+        # 같은 영상/스크립트와 학습 레벨의 동시 요청은 하나의 Gemini 호출로 합침
+        markdown_content, processing_info = coalesce_generation(
+            cache_key, generate_notes_with_gemini, transcript_text, video_info, learning_level, deadline=deadline,
+            ticket=ticket)
         print(f"학습 노트 생성 완료: {len(markdown_content)}자")
 
         # 성공 응답
@@ -319,13 +484,24 @@ def generate_notes():
             "videoTitle": video_title,
             "processingInfo": {
                 "textLength": len(transcript_text),
-                "modelUsed": "gemini"
+                "modelUsed": "gemini",
+                **processing_info
             }
         }
 
+        # API 키 오류 안내문은 캐시하지 않음
+        if GEMINI_API_KEY:
+            register_export(response_data)
+            get_note_cache().set(cache_key, response_data)
+            if input_type != 'url':
+                remember_transcript(transcript_text, cache_key)
+            index_notes(cache_key, response_data, transcript_text)
+
         print("API 요청 처리 완료")
         return jsonify(response_data), 200, headers
 
+    except DeadlineExceeded as e:
+        return deadline_exceeded_response(e, headers)
     except Exception as e:
         error_msg = str(e)
         print(f"API 요청 처리 중 오류: {error_msg}")
@@ -343,6 +519,10 @@ def generate_notes():
             return jsonify(error_response), 429, headers
 
         return jsonify(error_response), 400, headers
+    finally:
+        # 자막 조회 실패, 짧은 텍스트, 마감 시간 초과 등으로 Gemini를 호출하지 않고 끝난 요청은 예약분을 돌려줌
+        # (생성까지 간 요청은 coalesce_generation에서 이미 정산했으므로 무시됨)
+        admission.release(ticket)
 
 # 타임스탬프 가져오기 함수
 def import_timestamp():
@@ -0,0 +1,114 @@
+import os
+from note_cache import get_note_cache, make_cache_key
+from prompts import ANALYSIS_PROMPT, RENDER_PROMPT
+from single_flight import analysis_flight
+from token_budget import fit_prompt
+
+# 2단계 생성 설정 (환경 변수로 조정 가능)
+# 1단계: 학습 레벨과 무관한 분석 결과(개념, 구조, 사실, 질문 후보)를 한 번 만들어 영상별로 캐시
+# 2단계: 분석 결과로 초보자용/고급자용 노트를 렌더링 (스크립트 대신 짧은 분석 결과만 입력)
+NOTES_TWO_PHASE = os.environ.get("NOTES_TWO_PHASE", "0") == "1"
+
+# 분석 결과 캐시 키의 학습 레벨 자리에 쓰는 값 (노트 캐시와 같은 저장소를 공유)
+ANALYSIS_CACHE_LEVEL = 'analysis'
+
+# 분석 결과 캐시 키 생성 함수
+def analysis_cache_key(transcript_text, video_info=None, model_name='gemini-pro'):
+    """영상 ID(없으면 스크립트 해시) 기준 분석 결과 캐시 키를 만듭니다. 학습 레벨과 백엔드는 키에 넣지 않습니다."""
+    video_id = video_info.get('video_id') if video_info else None
+    return make_cache_key(video_id=video_id, transcript_text=transcript_text, learning_level=ANALYSIS_CACHE_LEVEL,
+                          prompt_version=ANALYSIS_PROMPT.version, model_name=model_name)
+
+def _analysis_prompt(transcript_text, video_info, model_name, analysis_info, log):
+    def render_prompt(transcript_text):
+        return ANALYSIS_PROMPT.render(transcript_text, video_info)
+    return fit_prompt(render_prompt, transcript_text, model_name, analysis_info, log)
+
+def _record_analysis(processing_info, analysis_info, status):
+    # 이번 요청에서 분석을 실제로 실행했을 때만 맵 단계 호출 수를 요청 처리 정보에 반영
+    processing_info['analysis'] = {**analysis_info, 'cache': status}
+    if status == 'miss':
+        processing_info['chunkCount'] = analysis_info.get('chunkCount', 1)
+
+# 공유 분석 결과 조회/생성 함수
+def get_analysis(transcript_text, video_info, model_name, call_model, map_long=None, processing_info=None,
+                 deadline=None, log=print):
+    """학습 레벨과 무관한 분석 결과를 반환합니다. 캐시에 없으면 한 번만 생성해 저장합니다.
+
+    call_model(prompt, processing_info)는 모델을 호출하고, map_long(transcript_text, processing_info)는
+    긴 스크립트를 맵 단계로 줄입니다. 같은 영상의 분석을 동시에 요청하면(두 레벨 동시 요청 등) 호출을 하나로 합칩니다.
+    processing_info['analysis']에는 캐시 상태(hit/miss/shared)와 분석 호출의 처리 정보를 기록합니다.
+    """
+    if processing_info is None:
+        processing_info = {}
+    cache_key = analysis_cache_key(transcript_text, video_info, model_name)
+    cached = get_note_cache().get(cache_key)
+    if cached:
+        log("공유 분석 캐시 적중")
+        _record_analysis(processing_info, cached['processingInfo'], 'hit')
+        return cached['analysis']
+
+    executed = []
+
+    def analyze():
+        executed.append(True)
+        analysis_info = {}
+        text = map_long(transcript_text, analysis_info) if map_long else transcript_text
+        prompt = _analysis_prompt(text, video_info, model_name, analysis_info, log)
+        analysis = call_model(prompt, analysis_info)
+        if analysis:
+            get_note_cache().set(cache_key, {'analysis': analysis, 'processingInfo': analysis_info})
+        return analysis, analysis_info
+
+    timeout = deadline.remaining() if deadline is not None else None
+    analysis, analysis_info = analysis_flight.do(cache_key, analyze, timeout=timeout)
+    _record_analysis(processing_info, analysis_info, 'miss' if executed else 'shared')
+    return analysis
+
+async def get_analysis_async(transcript_text, video_info, model_name, call_model, map_long=None, processing_info=None,
+                             deadline=None, log=print):
+    """get_analysis의 비동기 버전입니다. call_model과 map_long은 코루틴 함수여야 합니다."""
+    if processing_info is None:
+        processing_info = {}
+    cache_key = analysis_cache_key(transcript_text, video_info, model_name)
+    cached = get_note_cache().get(cache_key)
+    if cached:
+        log("공유 분석 캐시 적중")
+        _record_analysis(processing_info, cached['processingInfo'], 'hit')
+        return cached['analysis']
+
+    executed = []
+
+    async def analyze():
+        executed.append(True)
+        analysis_info = {}
+        text = await map_long(transcript_text, analysis_info) if map_long else transcript_text
+        prompt = _analysis_prompt(text, video_info, model_name, analysis_info, log)
+        analysis = await call_model(prompt, analysis_info)
+        if analysis:
+            get_note_cache().set(cache_key, {'analysis': analysis, 'processingInfo': analysis_info})
+        return analysis, analysis_info
+
+    timeout = deadline.remaining() if deadline is not None else None
+    analysis, analysis_info = await analysis_flight.do_async(cache_key, analyze, timeout=timeout)
+    _record_analysis(processing_info, analysis_info, 'miss' if executed else 'shared')
+    return analysis
+
+# 레벨별 렌더링 프롬프트 생성 함수
+def build_render_prompt(analysis, video_info=None, learning_level='beginner', model_name='gemini-pro',
+                        processing_info=None, log=print):
+    """분석 결과로 학습 레벨에 맞는 노트 렌더링 프롬프트를 만듭니다.
+
+    processing_info['inputTokens']에는 이번 요청에서 실제로 보낸 입력 토큰 수(렌더링 + 실행한 경우 분석)를 기록합니다.
+    """
+    if processing_info is None:
+        processing_info = {}
+
+    def render_prompt(analysis):
+        return RENDER_PROMPT.render(analysis, video_info, learning_level)
+
+    prompt = fit_prompt(render_prompt, analysis, model_name, processing_info, log)
+    analysis_info = processing_info.get('analysis') or {}
+    if analysis_info.get('cache') == 'miss':
+        processing_info['inputTokens'] += analysis_info.get('inputTokens', 0)
+    return prompt
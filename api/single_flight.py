@@ -0,0 +1,161 @@
+import threading
+from deadline import DeadlineExceeded
+from admission import admission
+
+class LeaderCancelled(Exception):
+    """같은 키의 호출을 실행하던 요청(리더)이 취소되어 기다리던 요청이 결과를 받지 못했을 때 발생합니다."""
+
+    def __init__(self, name):
+        super().__init__(f"같은 내용을 먼저 처리하던 요청이 취소되었습니다 ({name}). 다시 시도해 주세요.")
+
+class _Call:
+    """진행 중인 호출 하나의 결과를 기다리는 요청들이 공유하는 상태입니다."""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """같은 키로 동시에 들어온 호출을 하나로 합쳐(single-flight) 결과를 공유합니다.
+
+    먼저 들어온 호출(리더)만 실제로 실행되고, 그동안 같은 키로 들어온 호출은
+    리더의 결과(또는 예외)를 그대로 받습니다. 완료된 결과는 보관하지 않습니다(캐시 아님).
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._async_calls = {}
+        self._stats = {'calls': 0, 'executions': 0, 'coalesced': 0}
+
+    def _count(self, coalesced):
+        self._stats['calls'] += 1
+        self._stats['coalesced' if coalesced else 'executions'] += 1
+
+    def do(self, key, fn, *args, timeout=None, **kwargs):
+        """스레드 환경에서 key가 같은 동시 호출을 하나로 합쳐 fn을 실행합니다.
+
+        timeout(초)이 주어지면 리더의 결과를 그 시간까지만 기다리고, 넘으면 DeadlineExceeded를 발생시킵니다.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+            self._count(not leader)
+
+        if not leader:
+            if not call.event.wait(timeout):
+                raise DeadlineExceeded(self.name)
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+    async def do_async(self, key, coro_fn, *args, timeout=None, **kwargs):
+        """asyncio 환경에서 key가 같은 동시 호출을 하나로 합쳐 coro_fn을 실행합니다.
+
+        timeout(초)이 주어지면 리더의 결과를 그 시간까지만 기다립니다.
+        """
+        # 동기 백엔드의 콜드 스타트에 asyncio 로드 비용이 들지 않도록 여기서 가져옴
+        import asyncio
+        loop = asyncio.get_running_loop()
+        loop_key = (id(loop), key)
+        with self._lock:
+            future = self._async_calls.get(loop_key)
+            leader = future is None
+            if leader:
+                future = loop.create_future()
+                self._async_calls[loop_key] = future
+            self._count(not leader)
+
+        if not leader:
+            # 기다리던 요청이 취소되어도 리더의 작업은 취소되지 않도록 shield 사용
+            try:
+                return await asyncio.wait_for(asyncio.shield(future), timeout)
+            except asyncio.TimeoutError:
+                raise DeadlineExceeded(self.name)
+
+        try:
+            result = await coro_fn(*args, **kwargs)
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            # 리더가 마감 시간 초과나 연결 끊김으로 취소되면 기다리던 요청에는 일반 예외로 알림
+            future.set_exception(LeaderCancelled(self.name))
+            future.exception()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # 기다리는 요청이 없을 때 "Future exception was never retrieved" 경고 방지
+            future.exception()
+            raise
+        finally:
+            with self._lock:
+                del self._async_calls[loop_key]
+
+    def stats(self):
+        """전체 호출 수, 실제 실행 수, 합쳐진(coalesced) 호출 수를 반환합니다."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['inFlight'] = len(self._calls) + len(self._async_calls)
+        return stats
+
+# 프로세스 전역 그룹 (자막 조회, 노트 생성, 2단계 생성의 공유 분석)
+transcript_flight = SingleFlight('transcript')
+generation_flight = SingleFlight('generation')
+analysis_flight = SingleFlight('analysis')
+
+def get_flight_stats():
+    """모든 single-flight 그룹의 카운터를 반환합니다."""
+    return {group.name: group.stats() for group in (transcript_flight, generation_flight, analysis_flight)}
+
+# 노트 생성 호출 합치기 도우미
+def coalesce_generation(key, generate, *args, deadline=None, ticket=None):
+    """generate(*args, processing_info, deadline=deadline) 노트 생성 호출을 key(노트 캐시 키) 기준으로 합칩니다.
+
+    (노트, 처리 정보) 튜플을 반환하며, 처리 정보는 호출자마다 복사본을 받습니다.
+    합쳐진 요청은 리더의 마감 시간으로 생성되고, 각자의 마감 시간까지만 결과를 기다립니다.
+    ticket(입장 허가)이 주어지면 Gemini를 실제로 호출한 리더만 예약분을 정산하고, 합쳐진 요청은 예약분을 돌려줍니다.
+    """
+    def run():
+        processing_info = {}
+        try:
+            return generate(*args, processing_info, deadline=deadline), processing_info
+        finally:
+            admission.settle(ticket, processing_info)
+    timeout = deadline.remaining() if deadline is not None else None
+    try:
+        markdown_content, processing_info = generation_flight.do(key, run, timeout=timeout)
+    finally:
+        # 리더는 run에서 이미 정산했으므로 무시됨
+        admission.release(ticket)
+    return markdown_content, dict(processing_info)
+
+async def coalesce_generation_async(key, generate, *args, deadline=None, ticket=None):
+    """coalesce_generation의 비동기 버전입니다. generate는 코루틴 함수여야 합니다."""
+    async def run():
+        processing_info = {}
+        try:
+            return await generate(*args, processing_info, deadline=deadline), processing_info
+        finally:
+            admission.settle(ticket, processing_info)
+    timeout = deadline.remaining() if deadline is not None else None
+    try:
+        markdown_content, processing_info = await generation_flight.do_async(key, run, timeout=timeout)
+    finally:
+        admission.release(ticket)
+    return markdown_content, dict(processing_info)
@@ -0,0 +1,103 @@
+import itertools
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from metrics import record_model_used
+from deadline import DeadlineExceeded
+from model_health import MODEL_CALL_WORKERS, can_finish, model_health
+from prompts import generation_options, prepare_generation
+
+# 첫 조각을 기다리는 스레드 풀 (SDK가 타임아웃을 지키지 않아도 스트리밍 요청은 마감 시간에 풀려남)
+_first_chunk_executor = ThreadPoolExecutor(max_workers=MODEL_CALL_WORKERS, thread_name_prefix="stream-start")
+
+# SSE 이벤트 문자열 생성 함수
+def format_sse(event, data):
+    """이벤트 이름과 JSON 데이터로 Server-Sent Events 메시지를 만듭니다."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def _open_stream(model, contents, deadline=None):
+    # 스트리밍 요청을 시작하고 첫 조각까지는 남은 시간만큼만 기다림 (첫 조각이 늦으면 다음 모델로 대체할 수 있게)
+    if deadline is None:
+        return model.generate_content(contents, stream=True)
+
+    def start():
+        response = iter(model.generate_content(contents, stream=True, **generation_options(deadline.timeout('gemini'))))
+        return response, next(response, None)
+
+    future = _first_chunk_executor.submit(start)
+    done, _ = wait([future], timeout=deadline.remaining())
+    if not done:
+        future.cancel()
+        raise DeadlineExceeded('gemini')
+    response, first = future.result()
+    return response if first is None else itertools.chain([first], response)
+
+# 스트리밍 생성 함수 (첫 조각을 받기 전 실패하면 다음 모델로 대체)
+def stream_with_fallback(model_names, prompt, processing_info=None, log=print, deadline=None):
+    """Gemini 스트리밍 생성 결과를 텍스트 조각 단위로 돌려줍니다.
+
+    이미 일부 조각을 보낸 뒤에 실패하면 내용이 섞이지 않도록 대체하지 않고 오류를 그대로 올립니다.
+    deadline이 주어지면 남은 시간을 요청 타임아웃으로 넘기고, 첫 조각을 남은 시간 안에 받지 못하면 DeadlineExceeded를
+    발생시킵니다 (남은 시간 안에 끝나기 어려운 모델은 건너뜀).
+    """
+    if processing_info is None:
+        processing_info = {}
+    reasons = []
+    last_error = None
+    skipped_for_deadline = False
+    for model_name in model_names:
+        if deadline is not None:
+            deadline.check('gemini')
+        if not can_finish(model_name, deadline):
+            log(f"{model_name} 모델은 남은 시간({deadline.remaining():.1f}초) 안에 끝나기 어려워 건너뜀")
+            reasons.append(f"{model_name}: deadline")
+            skipped_for_deadline = True
+            continue
+        if not model_health.allow(model_name):
+            log(f"{model_name} 모델 회로 열림, 건너뜀")
+            reasons.append(f"{model_name}: circuit_open")
+            continue
+        started = False
+        start = time.perf_counter()
+        try:
+            log(f"{model_name} 모델 스트리밍 시도")
+            model, contents = prepare_generation(model_name, prompt, log)
+            for chunk in _open_stream(model, contents, deadline):
+                text = chunk.text
+                if text:
+                    if not started:
+                        # 첫 조각까지의 지연 시간을 모델 상태에 기록
+                        model_health.record_success(model_name, time.perf_counter() - start)
+                        processing_info['modelUsed'] = model_name
+                        processing_info['fallbackReason'] = "; ".join(reasons) if reasons else None
+                        record_model_used(model_name)
+                    started = True
+                    yield text
+            if not started:
+                model_health.record_success(model_name, time.perf_counter() - start)
+                processing_info['modelUsed'] = model_name
+                processing_info['fallbackReason'] = "; ".join(reasons) if reasons else None
+                record_model_used(model_name)
+            log(f"{model_name} 모델 스트리밍 완료")
+            return
+        except Exception as e:
+            # 첫 조각 전에 마감 시간 때문에 끊긴 호출은 모델 탓이 아니므로 회로 상태에 반영하지 않음
+            if not started and deadline is not None and deadline.expired():
+                model_health.record_abandoned(model_name)
+                raise DeadlineExceeded('gemini') from e
+            model_health.record_failure(model_name, e)
+            if started:
+                raise
+            log(f"{model_name} 모델 스트리밍 오류: {str(e)}")
+            reasons.append(f"{model_name}: {str(e)[:100]}")
+            last_error = e
+        except BaseException:
+            # 첫 조각 전에 클라이언트가 연결을 끊어 스트림이 닫히면(GeneratorExit) 시험 호출만 반납
+            if not started:
+                model_health.record_abandoned(model_name)
+            raise
+    if last_error is None:
+        if skipped_for_deadline:
+            raise DeadlineExceeded('gemini')
+        raise Exception("모든 AI 모델이 일시적으로 차단되어 있습니다. 잠시 후 다시 시도해 주세요.")
+    raise Exception(f"모든 AI 모델 호출에 실패했습니다: {str(last_error)}")
@@ -0,0 +1,177 @@
+import hashlib
+import math
+import os
+import re
+import threading
+from collections import OrderedDict
+
+# 토큰 예산 설정 (환경 변수로 조정 가능)
+TOKEN_BUDGET_FRACTION = float(os.environ.get("TOKEN_BUDGET_FRACTION", "0.8"))
+TOKEN_COUNT_MODE = os.environ.get("TOKEN_COUNT_MODE", "estimate")  # estimate 또는 api
+TOKEN_COUNT_CACHE_SIZE = int(os.environ.get("TOKEN_COUNT_CACHE_SIZE", "1024"))
+# 맵 단계 판단 시 프롬프트 템플릿 몫으로 남겨두는 토큰 수
+PROMPT_RESERVE_TOKENS = int(os.environ.get("PROMPT_RESERVE_TOKENS", "3000"))
+
+# 모델별 입력 컨텍스트 크기 (토큰)
+MODEL_CONTEXT_TOKENS = {
+    'gemini-pro': 30720,
+    'gemini-1.5-flash': 1048576,
+    'text-bison': 8192
+}
+DEFAULT_CONTEXT_TOKENS = int(os.environ.get("DEFAULT_CONTEXT_TOKENS", "30720"))
+
+# 글자 종류별 토큰 추정 (한글/한자/가나는 글자당 약 1토큰, 영문/숫자는 약 4글자당 1토큰)
+_CJK_CHARS = re.compile(r'[ᄀ-ᇿ぀-ヿ㄰-㆏一-鿿가-힣]')
+_ASCII_WORDS = re.compile(r'[A-Za-z0-9]+')
+_OTHER_CHARS = re.compile(r'[^\sA-Za-z0-9ᄀ-ᇿ぀-ヿ㄰-㆏一-鿿가-힣]')
+
+# 문장 경계 (마침표/물음표/느낌표 뒤 공백, 또는 줄바꿈)
+_SENTENCE_END = re.compile(r'(?<=[.!?。])\s+|\n+')
+
+def context_tokens(model_name):
+    """모델의 입력 컨텍스트 크기(토큰)를 반환합니다."""
+    return MODEL_CONTEXT_TOKENS.get(model_name, DEFAULT_CONTEXT_TOKENS)
+
+def input_token_budget(model_name):
+    """모델 컨텍스트 중 입력으로 채울 토큰 수(TOKEN_BUDGET_FRACTION 비율)를 반환합니다."""
+    return int(context_tokens(model_name) * TOKEN_BUDGET_FRACTION)
+
+def estimate_tokens(text):
+    """글자 종류별 비율로 텍스트의 토큰 수를 추정합니다."""
+    if not text:
+        return 0
+    ascii_tokens = sum(math.ceil(len(word) / 4) for word in _ASCII_WORDS.findall(text))
+    return len(_CJK_CHARS.findall(text)) + ascii_tokens + len(_OTHER_CHARS.findall(text))
+
+class TokenCounter:
+    """모델별 토큰 수 계산 결과를 기억해 같은 텍스트(프롬프트 템플릿 등)를 다시 세지 않습니다."""
+
+    def __init__(self, max_entries=TOKEN_COUNT_CACHE_SIZE, mode=TOKEN_COUNT_MODE):
+        self.max_entries = max_entries
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._counts = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _count(self, model_name, text):
+        if self.mode == 'api':
+            try:
+                from genai_client import get_genai
+                return get_genai().GenerativeModel(model_name).count_tokens(text).total_tokens
+            except Exception:
+                # API 호출이 실패하면 추정값 사용
+                pass
+        return estimate_tokens(text)
+
+    def count(self, model_name, text):
+        """model_name 기준 text의 토큰 수를 반환합니다."""
+        key = (model_name, hashlib.sha256(text.encode('utf-8')).digest())
+        with self._lock:
+            if key in self._counts:
+                self._counts.move_to_end(key)
+                self.hits += 1
+                return self._counts[key]
+            self.misses += 1
+
+        tokens = self._count(model_name, text)
+        with self._lock:
+            self._counts[key] = tokens
+            while len(self._counts) > self.max_entries:
+                self._counts.popitem(last=False)
+        return tokens
+
+# 프로세스 전역 토큰 카운터
+token_counter = TokenCounter()
+
+def transcript_token_budget(model_name):
+    """프롬프트 템플릿 몫을 뺀, 스크립트에 쓸 수 있는 대략적인 토큰 수를 반환합니다 (맵 단계 판단용)."""
+    return max(input_token_budget(model_name) - PROMPT_RESERVE_TOKENS, 0)
+
+def trim_to_tokens(text, max_tokens):
+    """문장 경계에서 잘라 max_tokens 이하가 되는 가장 긴 앞부분을 반환합니다."""
+    if max_tokens <= 0:
+        return ""
+    used = 0
+    end = 0
+    start = 0
+    for match in _SENTENCE_END.finditer(text):
+        sentence_tokens = estimate_tokens(text[start:match.end()])
+        if used + sentence_tokens > max_tokens:
+            break
+        used += sentence_tokens
+        end = start = match.end()
+    else:
+        if used + estimate_tokens(text[start:]) <= max_tokens:
+            return text
+
+    if end == 0:
+        # 첫 문장부터 예산을 넘으면 글자 비율로 자름
+        tokens = estimate_tokens(text) or 1
+        end = int(len(text) * max_tokens / tokens)
+        while end > 0 and estimate_tokens(text[:end]) > max_tokens:
+            end = int(end * 0.9)
+    return text[:end].rstrip()
+
+def prompt_text(prompt):
+    """문자열 또는 NotePrompt(시스템 지시문 + 본문)의 전체 텍스트를 반환합니다."""
+    return prompt if isinstance(prompt, str) else prompt.text
+
+# 토큰 예산에 맞춘 프롬프트 생성 함수
+def fit_prompt(render_prompt, transcript_text, model_name, processing_info=None, log=print):
+    """render_prompt(스크립트)로 만든 프롬프트(문자열 또는 NotePrompt)가 모델 입력 예산 안에 들도록 스크립트를 문장 단위로 줄입니다.
+
+    processing_info에는 사용한 입력 토큰 수(inputTokens)와 예산(inputTokenBudget)을 기록합니다.
+    """
+    if processing_info is None:
+        processing_info = {}
+    budget = input_token_budget(model_name)
+    # 템플릿 토큰 수는 레벨/제목이 같으면 동일하므로 기억된 값을 재사용
+    template_tokens = token_counter.count(model_name, prompt_text(render_prompt("")))
+    transcript_tokens = token_counter.count(model_name, transcript_text)
+    available = max(budget - template_tokens, 0)
+
+    trimmed = transcript_tokens > available
+    if trimmed:
+        original_length = len(transcript_text)
+        transcript_text = trim_to_tokens(transcript_text, available)
+        transcript_tokens = estimate_tokens(transcript_text)
+        log(f"스크립트가 입력 예산을 넘어 문장 단위로 줄임: {original_length}자 → {len(transcript_text)}자")
+
+    processing_info['inputTokens'] = template_tokens + transcript_tokens
+    processing_info['inputTokenBudget'] = budget
+    processing_info['transcriptTrimmed'] = trimmed
+    return render_prompt(transcript_text)
+
+class ModelPrompts:
+    """대체 모델마다 입력 예산에 맞춘 프롬프트를 돌려줍니다.
+
+    첫 모델 기준으로 맞춘 프롬프트를 그대로 쓰고, 컨텍스트가 더 작은 대체 모델을 호출할 때만 스크립트를 다시 줄여 만듭니다.
+    """
+
+    def __init__(self, render_prompt, transcript_text, model_name, processing_info=None, log=print):
+        self.render_prompt = render_prompt
+        self.transcript_text = transcript_text
+        self.model_name = model_name
+        self.log = log
+        self.prompt = fit_prompt(render_prompt, transcript_text, model_name, processing_info, log)
+        self._prompts = {}
+        self._lock = threading.Lock()
+
+    def for_model(self, model_name):
+        """model_name의 입력 예산 안에 드는 프롬프트를 반환합니다."""
+        if input_token_budget(model_name) >= input_token_budget(self.model_name):
+            return self.prompt
+        with self._lock:
+            prompt = self._prompts.get(model_name)
+        if prompt is None:
+            # 처리 정보(inputTokens)는 첫 모델 기준 값을 유지 (입장 제어 정산은 더 큰 값으로 함)
+            prompt = fit_prompt(self.render_prompt, self.transcript_text, model_name, {}, self.log)
+            with self._lock:
+                self._prompts[model_name] = prompt
+        return prompt
+
+# 모델별 프롬프트 선택 함수
+def prompt_for_model(prompt, model_name):
+    """ModelPrompts면 model_name에 맞춘 프롬프트를, 아니면(맵 단계 청크 프롬프트 등) 그대로 반환합니다."""
+    return prompt.for_model(model_name) if isinstance(prompt, ModelPrompts) else prompt
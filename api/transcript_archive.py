@@ -0,0 +1,276 @@
+import hashlib
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+import zlib
+from collections import Counter
+
+try:
+    import fcntl
+except ImportError:
+    # fcntl이 없는 환경(Windows 개발 환경)에서는 프로세스 간 잠금 없이 단일 프로세스로 사용
+    fcntl = None
+
+# 자막 아카이브 설정 (환경 변수로 조정 가능)
+TRANSCRIPT_ARCHIVE = os.environ.get("TRANSCRIPT_ARCHIVE", "1") != "0"
+TRANSCRIPT_ARCHIVE_DIR = os.environ.get("TRANSCRIPT_ARCHIVE_DIR", "/tmp/transcript_archive")
+# 사전 없이 저장한 레코드가 이 개수에 이르면 그 레코드들로 공유 압축 사전을 학습
+ARCHIVE_DICT_TRAIN_RECORDS = int(os.environ.get("ARCHIVE_DICT_TRAIN_RECORDS", "100"))
+# zlib 사전은 압축 창(32KB)보다 길어도 앞부분은 쓰이지 않음
+ARCHIVE_DICT_SIZE = min(int(os.environ.get("ARCHIVE_DICT_SIZE", "32768")), 32768)
+ARCHIVE_COMPRESSION_LEVEL = int(os.environ.get("ARCHIVE_COMPRESSION_LEVEL", "9"))
+
+# 색인 항목: 비디오 ID 해시(8), 데이터 파일 오프셋(8), 압축된 길이(4), 사전 번호(2, 0이면 사전 없음), 저장 시각(4, 초)
+INDEX_ENTRY = struct.Struct("<QQIHI")
+# 색인 파일 이름 (항목 형식이 바뀌면 이름을 바꿔 이전 형식의 색인을 잘못 읽지 않게 함)
+INDEX_FILE = 'transcripts.v2.idx'
+# 사전 학습에 쓰는 표본 크기 상한 (학습 시간 제한)
+_TRAIN_SAMPLE_BYTES = 4 * 1024 * 1024
+_DICT_FILE = re.compile(r'^dict-(\d+)\.zdict$')
+
+def archive_key(video_id):
+    """비디오 ID를 색인에 쓰는 8바이트 정수 키로 바꿉니다."""
+    return int.from_bytes(hashlib.blake2b(video_id.encode('utf-8'), digest_size=8).digest(), 'little')
+
+# 공유 압축 사전 학습 함수
+def train_dictionary(samples, size=ARCHIVE_DICT_SIZE):
+    """자막 표본에서 자주 나오는 1~3단어 묶음을 모아 zlib 사전(zdict)을 만듭니다.
+
+    zlib은 가까운 위치의 일치를 더 적은 비트로 부호화하므로 가장 많이 줄여주는 조각을 사전 끝에 둡니다.
+    """
+    counts = Counter()
+    for text in samples:
+        words = text.split()
+        for length in (1, 2, 3):
+            counts.update(' '.join(words[start:start + length]) for start in range(len(words) - length + 1))
+    # 두 번 이상 나온 조각만, (등장 횟수 × 길이)가 큰 순서로
+    scored = sorted(((count * len(piece.encode('utf-8')), piece) for piece, count in counts.items() if count > 1),
+                    reverse=True)
+    pieces, total = [], 0
+    for _, piece in scored:
+        encoded = (piece + ' ').encode('utf-8')
+        if total + len(encoded) > size:
+            continue
+        pieces.append(encoded)
+        total += len(encoded)
+        if total >= size - 8:
+            break
+    return b''.join(reversed(pieces))
+
+def compress_record(text, zdict=None, level=ARCHIVE_COMPRESSION_LEVEL):
+    """자막 하나를 (사전이 있으면 사전과 함께) zlib으로 압축합니다."""
+    compressor = zlib.compressobj(level, zdict=zdict) if zdict else zlib.compressobj(level)
+    return compressor.compress(text.encode('utf-8')) + compressor.flush()
+
+def decompress_record(payload, zdict=None):
+    decompressor = zlib.decompressobj(zdict=zdict) if zdict else zlib.decompressobj()
+    return (decompressor.decompress(payload) + decompressor.flush()).decode('utf-8')
+
+class TranscriptArchive:
+    """자막을 레코드별로 압축해 하나의 데이터 파일에 이어 붙이는 추가 전용(append-only) 아카이브입니다.
+
+    파일 구성 (directory 아래):
+      - transcripts.dat: 압축된 레코드를 이어 붙인 데이터 파일 (메모리 맵으로 읽음)
+      - transcripts.v2.idx: 고정 길이 색인 항목(비디오 ID 해시 → 오프셋, 길이, 사전 번호, 저장 시각)을 이어 붙인 파일
+      - dict-N.zdict: 공유 압축 사전 (한 번 만든 사전은 바꾸지 않음)
+
+    같은 비디오를 다시 저장하면 나중 항목이 이깁니다. 레코드는 지우지 않고, 읽을 때 저장 시각으로 만료 여부를 판단합니다. 여러 프로세스가 함께 쓸 수 있도록 추가는 파일 잠금 안에서 하고,
+    다른 프로세스가 추가한 항목은 색인에 없는 키를 조회할 때 색인 파일의 늘어난 부분만 읽어 반영합니다.
+    """
+
+    def __init__(self, directory=TRANSCRIPT_ARCHIVE_DIR, train_records=ARCHIVE_DICT_TRAIN_RECORDS):
+        self.directory = directory
+        self.train_records = train_records
+        self._lock = threading.Lock()
+        self._index = {}
+        self._index_bytes = 0
+        self._data = None
+        self._index_file = None
+        self._map = None
+        self._dicts = {}
+        self._current_dict = 0
+        self._training = False
+        self._stats = {'hits': 0, 'misses': 0, 'expired': 0, 'writes': 0, 'bytesIn': 0, 'bytesStored': 0}
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _open(self):
+        # 첫 사용 시에만 파일을 열고 색인을 읽음 (콜드 스타트 비용 최소화)
+        if self._data is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._data = open(self._path('transcripts.dat'), 'ab')
+            self._index_file = open(self._path(INDEX_FILE), 'ab')
+            for name in os.listdir(self.directory):
+                match = _DICT_FILE.match(name)
+                if match:
+                    self._load_dictionary(int(match.group(1)))
+            self._refresh_index()
+
+    def _load_dictionary(self, dict_id):
+        if dict_id not in self._dicts:
+            with open(self._path(f'dict-{dict_id}.zdict'), 'rb') as f:
+                self._dicts[dict_id] = f.read()
+            self._current_dict = max(self._current_dict, dict_id)
+        return self._dicts[dict_id]
+
+    def _refresh_index(self):
+        # 마지막으로 읽은 뒤 늘어난 부분만 읽음 (쓰는 중인 마지막 항목은 다음에 읽음)
+        with open(self._path(INDEX_FILE), 'rb') as f:
+            f.seek(self._index_bytes)
+            tail = f.read()
+        usable = len(tail) - len(tail) % INDEX_ENTRY.size
+        for key, offset, length, dict_id, created_at in INDEX_ENTRY.iter_unpack(tail[:usable]):
+            self._index[key] = (offset, length, dict_id, created_at)
+            if dict_id and dict_id not in self._dicts:
+                self._load_dictionary(dict_id)
+        self._index_bytes += usable
+
+    def _view(self, end):
+        # 데이터 파일이 늘어났으면 다시 매핑 (읽을 때 레코드 부분만 복사)
+        if self._map is None or len(self._map) < end:
+            if self._map is not None:
+                self._map.close()
+            with open(self._path('transcripts.dat'), 'rb') as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map
+
+    def get(self, video_id, max_age=None):
+        """저장된 자막을 반환합니다. 없거나 저장한 지 max_age(초)가 지났으면 None을 반환합니다."""
+        key = archive_key(video_id)
+        with self._lock:
+            try:
+                self._open()
+                entry = self._index.get(key)
+                if entry is None:
+                    self._refresh_index()
+                    entry = self._index.get(key)
+                if entry is None:
+                    self._stats['misses'] += 1
+                    return None
+                offset, length, dict_id, created_at = entry
+                if max_age is not None and created_at + max_age < time.time():
+                    # 만료된 자막은 미스로 처리 (다시 가져와 저장하면 새 항목이 이김)
+                    self._stats['expired'] += 1
+                    self._stats['misses'] += 1
+                    return None
+                payload = self._view(offset + length)[offset:offset + length]
+                zdict = self._dicts.get(dict_id)
+            except (OSError, ValueError):
+                # 아카이브 오류는 미스로 처리
+                self._stats['misses'] += 1
+                return None
+        try:
+            text = decompress_record(payload, zdict)
+        except (zlib.error, UnicodeDecodeError):
+            # 잘리거나 손상된 레코드, 맞지 않는 사전도 미스로 처리 (YouTube에서 다시 가져옴)
+            with self._lock:
+                self._stats['misses'] += 1
+            return None
+        with self._lock:
+            self._stats['hits'] += 1
+        return text
+
+    def put(self, video_id, text):
+        """자막을 압축해 아카이브 끝에 추가합니다."""
+        key = archive_key(video_id)
+        with self._lock:
+            try:
+                self._open()
+                dict_id = self._current_dict
+                payload = compress_record(text, self._dicts.get(dict_id))
+                if fcntl is not None:
+                    fcntl.flock(self._data.fileno(), fcntl.LOCK_EX)
+                try:
+                    offset = os.fstat(self._data.fileno()).st_size
+                    self._data.write(payload)
+                    self._data.flush()
+                    # 레코드를 다 쓴 뒤에 색인 항목을 추가해야 다른 프로세스가 쓰는 중인 레코드를 읽지 않음
+                    self._index_file.write(INDEX_ENTRY.pack(key, offset, len(payload), dict_id, int(time.time())))
+                    self._index_file.flush()
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(self._data.fileno(), fcntl.LOCK_UN)
+                self._refresh_index()
+            except OSError:
+                return
+            self._stats['writes'] += 1
+            self._stats['bytesIn'] += len(text.encode('utf-8'))
+            self._stats['bytesStored'] += len(payload)
+            should_train = (not self._dicts and not self._training and len(self._index) >= self.train_records)
+            if should_train:
+                self._training = True
+        if should_train:
+            threading.Thread(target=self._train, name="transcript-archive-train", daemon=True).start()
+
+    def _train(self):
+        # 사전 없이 저장된 최근 레코드로 사전을 학습 (요청 처리를 막지 않도록 백그라운드에서)
+        try:
+            with self._lock:
+                entries = sorted(self._index.values(), key=lambda entry: entry[0], reverse=True)
+            samples, total = [], 0
+            for offset, length, dict_id, _ in entries:
+                if dict_id != 0 or total >= _TRAIN_SAMPLE_BYTES:
+                    continue
+                with self._lock:
+                    payload = self._view(offset + length)[offset:offset + length]
+                text = decompress_record(payload)
+                samples.append(text)
+                total += len(text)
+            # 사전 없이 시작한 아카이브의 첫 사전 (여러 프로세스가 동시에 학습해도 하나만 남음)
+            self.install_dictionary(train_dictionary(samples), dict_id=1)
+        except (OSError, ValueError, zlib.error):
+            pass
+        finally:
+            with self._lock:
+                self._training = False
+
+    def install_dictionary(self, zdict, dict_id=None):
+        """학습한 사전을 dict_id(기본값: 다음 번호)로 저장하고 이후 추가하는 레코드에 사용합니다. 사전 번호를 반환합니다.
+
+        다른 프로세스가 같은 번호의 사전을 먼저 만들었으면 그 사전을 그대로 씁니다
+        (이미 그 사전으로 압축된 레코드가 있을 수 있으므로 덮어쓰지 않음).
+        """
+        if not zdict:
+            return self._current_dict
+        with self._lock:
+            self._open()
+            if dict_id is None:
+                dict_id = self._current_dict + 1
+            path = self._path(f'dict-{dict_id}.zdict')
+            temporary = f"{path}.{os.getpid()}.tmp"
+            with open(temporary, 'wb') as f:
+                f.write(zdict)
+            try:
+                # link는 대상이 이미 있으면 실패하므로 먼저 만든 사전만 남음
+                os.link(temporary, path)
+            except FileExistsError:
+                pass
+            finally:
+                os.unlink(temporary)
+            self._load_dictionary(dict_id)
+            return dict_id
+
+    def stats(self):
+        """적중/미스/만료/추가 횟수, 원본/저장 바이트 수, 항목 수, 현재 사전 번호를 반환합니다."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._index)
+            stats['dictionary'] = self._current_dict
+        return stats
+
+# 프로세스 전역 아카이브 인스턴스
+_transcript_archive = None
+_transcript_archive_lock = threading.Lock()
+
+def get_transcript_archive():
+    """프로세스 전역 자막 아카이브를 반환합니다."""
+    global _transcript_archive
+    if _transcript_archive is None:
+        with _transcript_archive_lock:
+            if _transcript_archive is None:
+                _transcript_archive = TranscriptArchive()
+    return _transcript_archive
@@ -0,0 +1,159 @@
+import os
+import re
+import threading
+from token_budget import estimate_tokens
+from transcript_segments import TranscriptSegments
+
+# 자막 정리 설정 (환경 변수로 조정 가능)
+TRANSCRIPT_CLEANING = os.environ.get("TRANSCRIPT_CLEANING", "1") != "0"
+TRANSCRIPT_STRIP_FILLERS = os.environ.get("TRANSCRIPT_STRIP_FILLERS", "1") != "0"
+# 이전 자막 줄과 겹치는지 비교할 최대 단어 수 (자동 생성 자막의 롤링 캡션)
+TRANSCRIPT_OVERLAP_WORDS = int(os.environ.get("TRANSCRIPT_OVERLAP_WORDS", "30"))
+
+# 말이 아닌 소리 태그 ([음악], [Music], (박수) 등)와 음표 기호
+_NON_SPEECH_TAG = re.compile(
+    r'[\[(（]\s*(?:음악|배경\s*음악|박수|박수\s*소리|웃음|웃음\s*소리|침묵|효과음|소음|들리지\s*않음|'
+    r'music|applause|laughter|laughs|laughing|silence|inaudible|noise|cheering|foreign)\s*[\])）]',
+    re.IGNORECASE
+)
+_MUSIC_NOTES = re.compile(r'[♪♫♬]+')
+
+# 단독으로 쓰인 추임새 (뒤따르는 쉼표/말줄임표 포함)
+_FILLERS = re.compile(
+    r'(?<![\w])(?:음+|어+|으음+|흠+|um+|uh+|erm+|hmm+|uh-huh)(?:[,.…]+|(?=\s|$))(?![\w])',
+    re.IGNORECASE
+)
+
+_SPACES = re.compile(r'\s+')
+_SPACE_BEFORE_PUNCT = re.compile(r'\s+([,.!?…])')
+_REPEATED_PUNCT = re.compile(r'([,!?])\1+')
+_LONG_ELLIPSIS = re.compile(r'\.{4,}')
+
+class CleaningReport:
+    """정리 단계별로 제거한 양을 기록합니다."""
+
+    def __init__(self):
+        self.segments = 0
+        self.dropped_segments = 0
+        self.tags_removed = 0
+        self.fillers_removed = 0
+        self.duplicate_words_removed = 0
+        self.original_chars = 0
+        self.cleaned_chars = 0
+        self.original_tokens = 0
+        self.cleaned_tokens = 0
+
+    def as_dict(self):
+        return {
+            'segments': self.segments,
+            'droppedSegments': self.dropped_segments,
+            'tagsRemoved': self.tags_removed,
+            'fillersRemoved': self.fillers_removed,
+            'duplicateWordsRemoved': self.duplicate_words_removed,
+            'originalChars': self.original_chars,
+            'cleanedChars': self.cleaned_chars,
+            'removedChars': self.original_chars - self.cleaned_chars,
+            'removedTokens': self.original_tokens - self.cleaned_tokens
+        }
+
+def clean_segment_text(text, report=None):
+    """자막 한 줄에서 소리 태그와 추임새를 지우고 공백/문장 부호를 정리합니다."""
+    text, tags = _NON_SPEECH_TAG.subn(' ', text)
+    text, notes = _MUSIC_NOTES.subn(' ', text)
+    fillers = 0
+    if TRANSCRIPT_STRIP_FILLERS:
+        text, fillers = _FILLERS.subn(' ', text)
+    text = _SPACES.sub(' ', text)
+    text = _SPACE_BEFORE_PUNCT.sub(r'\1', text)
+    text = _REPEATED_PUNCT.sub(r'\1', text)
+    text = _LONG_ELLIPSIS.sub('...', text)
+    # 태그를 지우고 남은 앞쪽 문장 부호 제거
+    text = text.strip().lstrip(',.')
+    if report is not None:
+        report.tags_removed += tags + notes
+        report.fillers_removed += fillers
+    return text.strip()
+
+def _overlap_length(previous_words, words):
+    # 이전 줄의 끝과 현재 줄의 시작이 겹치는 가장 긴 단어 수
+    # (한 단어만 겹치는 경우는 실제 반복 발화일 수 있으므로 줄 전체가 겹칠 때만 인정)
+    limit = min(len(previous_words), len(words), TRANSCRIPT_OVERLAP_WORDS)
+    for size in range(limit, 0, -1):
+        if previous_words[-size:] == words[:size] and (size > 1 or len(words) == 1):
+            return size
+    return 0
+
+def _segment_timing(segment):
+    # 자막 조각의 (시작 초, 길이 초), 문자열 조각은 시간 정보 없음
+    if isinstance(segment, dict):
+        return segment.get('start') or 0, segment.get('duration') or 0
+    return 0, 0
+
+def iter_clean_segments(segments, report=None):
+    """자막 조각을 하나씩 정리해 돌려줍니다 (스트리밍 처리).
+
+    segments는 {'text': ...} 딕셔너리 또는 문자열의 반복자입니다. 롤링 캡션처럼 앞 줄과 겹치는
+    단어는 지우고, 정리 후 비어 있는 줄은 건너뜁니다.
+    """
+    for text, _, _ in iter_clean_entries(segments, report):
+        yield text
+
+def iter_clean_entries(segments, report=None):
+    """iter_clean_segments와 같지만 정리한 조각마다 (텍스트, 시작 초, 길이 초)를 돌려줍니다."""
+    if report is None:
+        report = CleaningReport()
+    tail = []
+    for segment in segments:
+        raw = segment['text'] if isinstance(segment, dict) else segment
+        raw = raw or ""
+        report.segments += 1
+        report.original_chars += len(raw) + 1
+        report.original_tokens += estimate_tokens(raw)
+
+        words = clean_segment_text(raw, report).split()
+        overlap = _overlap_length(tail, words)
+        if overlap:
+            report.duplicate_words_removed += overlap
+            words = words[overlap:]
+        if not words:
+            report.dropped_segments += 1
+            continue
+
+        tail = (tail + words)[-TRANSCRIPT_OVERLAP_WORDS:]
+        text = ' '.join(words)
+        report.cleaned_chars += len(text) + 1
+        report.cleaned_tokens += estimate_tokens(text)
+        yield (text, *_segment_timing(segment))
+    # 마지막 조각 뒤에는 구분 공백이 없음
+    report.original_chars = max(report.original_chars - 1, 0)
+    report.cleaned_chars = max(report.cleaned_chars - 1, 0)
+
+# 프로세스 전역 누적 통계
+_totals_lock = threading.Lock()
+_totals = {'transcripts': 0, 'removedChars': 0, 'removedTokens': 0}
+
+def clean_transcript_segments(segments):
+    """자막 조각 목록을 정리된 하나의 스크립트로 합치고 (스크립트, 보고서 딕셔너리)를 반환합니다.
+
+    스크립트는 조각별 시작 시간/길이를 함께 담은 TranscriptSegments(문자열)입니다.
+    """
+    report = CleaningReport()
+    if TRANSCRIPT_CLEANING:
+        text = TranscriptSegments.from_entries(iter_clean_entries(segments, report))
+    else:
+        text = TranscriptSegments.from_entries(
+            (segment['text'] if isinstance(segment, dict) else segment, *_segment_timing(segment))
+            for segment in segments
+        )
+        report.original_chars = report.cleaned_chars = len(text)
+    summary = report.as_dict()
+    with _totals_lock:
+        _totals['transcripts'] += 1
+        _totals['removedChars'] += summary['removedChars']
+        _totals['removedTokens'] += summary['removedTokens']
+    return text, summary
+
+def get_cleaning_stats():
+    """지금까지 정리한 자막 수와 제거한 글자/토큰 수 합계를 반환합니다."""
+    with _totals_lock:
+        return dict(_totals)
@@ -0,0 +1,165 @@
+import struct
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
+
+# 직렬화한 타임스탬프 정보 머리말: 형식 버전, 조각 수, 전체 글자 수
+_TIMINGS_HEADER = struct.Struct("<BII")
+_TIMINGS_VERSION = 1
+
+def _uint_array(values=()):
+    # 조각 하나에 4바이트 (글자 위치, 밀리초 시간)
+    return array('I', values)
+
+def format_timestamp(seconds):
+    """초를 영상 시간 표기(12:05, 1:02:03)로 바꿉니다."""
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+class TranscriptSegments(str):
+    """자막 조각들을 공백 하나로 이어 붙인 스크립트 문자열에 조각별 위치와 시간을 배열로 붙인 것입니다.
+
+    str을 상속하므로 기존 스크립트 문자열 자리에 그대로 쓸 수 있고(str 메서드 결과는 일반 문자열),
+    조각마다 딕셔너리를 두는 대신 시작 글자 위치, 시작 시간(ms), 길이(ms)를 배열 세 개에 담습니다.
+    slice_time/slice_chars로 얻은 부분은 배열을 복사하지 않고 원본 배열의 메모리 뷰를 공유합니다.
+    """
+
+    def __new__(cls, text, offsets, starts, durations, base=0):
+        self = super().__new__(cls, text)
+        # offsets는 원본 스크립트 기준 글자 위치이고, base는 이 부분이 원본에서 시작하는 위치
+        self._offsets = memoryview(offsets)
+        self._starts = memoryview(starts)
+        self._durations = memoryview(durations)
+        self._base = base
+        return self
+
+    @classmethod
+    def from_entries(cls, entries):
+        """(텍스트, 시작 초, 길이 초) 목록으로 만듭니다. 스크립트 문자열은 한 번만 이어 붙입니다."""
+        pieces = []
+        offsets, starts, durations = _uint_array(), _uint_array(), _uint_array()
+        position = 0
+        for text, start, duration in entries:
+            pieces.append(text)
+            offsets.append(position)
+            starts.append(max(int(round((start or 0) * 1000)), 0))
+            durations.append(max(int(round((duration or 0) * 1000)), 0))
+            position += len(text) + 1
+        return cls(' '.join(pieces), offsets, starts, durations)
+
+    @classmethod
+    def from_timings(cls, text, timings):
+        """저장된 스크립트 문자열과 timing_bytes()의 결과를 합칩니다. 맞지 않으면 ValueError를 발생시킵니다."""
+        try:
+            data = zlib.decompress(timings)
+            version, count, length = _TIMINGS_HEADER.unpack_from(data)
+        except (zlib.error, struct.error) as e:
+            raise ValueError(f"타임스탬프 정보를 읽을 수 없습니다: {e}") from e
+        if version != _TIMINGS_VERSION or length != len(text):
+            raise ValueError("스크립트와 타임스탬프 정보가 맞지 않습니다.")
+        arrays = []
+        position = _TIMINGS_HEADER.size
+        for _ in range(3):
+            values = _uint_array()
+            values.frombytes(data[position:position + count * values.itemsize])
+            position += count * values.itemsize
+            arrays.append(values)
+        if len(arrays[2]) != count:
+            raise ValueError("타임스탬프 정보가 잘려 있습니다.")
+        return cls(text, *arrays)
+
+    def timing_bytes(self):
+        """조각 위치/시간 배열을 압축한 바이트로 반환합니다 (스크립트 문자열은 포함하지 않음)."""
+        offsets = _uint_array(offset - self._base for offset in self._offsets)
+        header = _TIMINGS_HEADER.pack(_TIMINGS_VERSION, self.segment_count, len(self))
+        return zlib.compress(header + offsets.tobytes() + self._starts.tobytes() + self._durations.tobytes())
+
+    def __reduce__(self):
+        # 메모리 뷰는 pickle/copy가 되지 않으므로 스크립트 문자열과 timing_bytes()로 다시 만듦
+        # (ProcessPoolExecutor, 작업 큐 payload, pickle을 쓰는 캐시를 거칠 때 필요)
+        return self.__class__.from_timings, (str(self), self.timing_bytes())
+
+    @property
+    def segment_count(self):
+        return len(self._starts)
+
+    @property
+    def start_time(self):
+        """첫 조각의 시작 시간(초)입니다."""
+        return self._starts[0] / 1000 if self.segment_count else 0.0
+
+    @property
+    def end_time(self):
+        """마지막 조각이 끝나는 시간(초)입니다."""
+        return (self._starts[-1] + self._durations[-1]) / 1000 if self.segment_count else 0.0
+
+    def segment(self, index):
+        """index번째 조각의 (텍스트, 시작 초, 길이 초)를 반환합니다."""
+        start = self._offsets[index] - self._base
+        end = self._offsets[index + 1] - self._base - 1 if index + 1 < self.segment_count else len(self)
+        return str.__getitem__(self, slice(start, end)), self._starts[index] / 1000, self._durations[index] / 1000
+
+    def _view(self, first, last):
+        # first 이상 last 미만 조각 (배열은 메모리 뷰 슬라이스로 공유)
+        last = max(first, last)
+        if first >= self.segment_count:
+            return TranscriptSegments('', self._offsets[:0], self._starts[:0], self._durations[:0], self._base + len(self))
+        base = self._offsets[first]
+        end = self._offsets[last] - self._base - 1 if last < self.segment_count else len(self)
+        text = str.__getitem__(self, slice(base - self._base, end))
+        return TranscriptSegments(text, self._offsets[first:last], self._starts[first:last],
+                                  self._durations[first:last], base)
+
+    def slice_time(self, start, end):
+        """영상 시간 start~end(초)와 겹치는 조각들을 반환합니다."""
+        start_ms, end_ms = int(start * 1000), int(end * 1000)
+        first = max(bisect_right(self._starts, start_ms) - 1, 0)
+        if first < self.segment_count and self._starts[first] + self._durations[first] <= start_ms:
+            first += 1
+        return self._view(first, bisect_left(self._starts, end_ms))
+
+    def slice_chars(self, start, end):
+        """이 스크립트의 start~end 글자 범위와 겹치는 조각들을 반환합니다 (조각 경계로 넓혀짐)."""
+        first = max(bisect_right(self._offsets, self._base + start) - 1, 0)
+        return self._view(first, bisect_left(self._offsets, self._base + end))
+
+    def time_at(self, index):
+        """index번째 글자가 속한 조각의 시작 시간(초)을 반환합니다."""
+        if not self.segment_count:
+            return 0.0
+        segment = max(bisect_right(self._offsets, self._base + index) - 1, 0)
+        return self._starts[segment] / 1000
+
+    def time_range(self):
+        """이 부분의 영상 시간 구간 표기(예: '12:05~18:40')를 반환합니다."""
+        return f"{format_timestamp(self.start_time)}~{format_timestamp(self.end_time)}"
+
+    def split_chunks(self, chunk_size, overlap=0):
+        """조각 경계에서 잘라 chunk_size 글자 이하의 부분들로 나눕니다. 이웃한 부분은 overlap 글자 정도 겹칩니다.
+
+        chunk_size보다 긴 조각 하나는 그대로 한 부분이 됩니다.
+        """
+        count = self.segment_count
+        if len(self) <= chunk_size or count <= 1:
+            return [self]
+        chunks = []
+        first = 0
+        while first < count:
+            limit = self._offsets[first] + chunk_size
+            # 끝 위치(다음 조각 시작 - 1)가 limit 이하인 조각까지 포함
+            last = max(bisect_right(self._offsets, limit + 1, first + 1) - 1, first + 1)
+            if self._base + len(self) <= limit:
+                last = count
+            chunks.append(self._view(first, last))
+            if last >= count:
+                break
+            first = max(bisect_left(self._offsets, self._offsets[last] - overlap, first + 1), first + 1)
+        return chunks
+
+def time_range_label(text):
+    """타임스탬프가 있는 스크립트(부분)이면 ' (영상 12:05~18:40 구간)'을, 아니면 빈 문자열을 반환합니다."""
+    if isinstance(text, TranscriptSegments) and text.end_time > 0:
+        return f" (영상 {text.time_range()} 구간)"
+    return ""
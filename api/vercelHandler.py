@@ -1,4 +1,5 @@
-from index import app
+# index.py는 Flask 앱이 아닌 http.server 핸들러이므로 같은 /api 라우트를 가진 serverless.py의 Flask 앱을 사용
+from serverless import app
 import json
 
 def handler(request, context):
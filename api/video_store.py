@@ -0,0 +1,170 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from transcript_archive import TRANSCRIPT_ARCHIVE, get_transcript_archive
+from transcript_segments import TranscriptSegments
+
+# 저장소 설정 (환경 변수로 조정 가능)
+VIDEO_STORE_PATH = os.environ.get("VIDEO_STORE_PATH", "/tmp/video_store.sqlite3")
+TRANSCRIPT_TTL = int(os.environ.get("TRANSCRIPT_TTL", str(30 * 24 * 3600)))
+VIDEO_INFO_TTL = int(os.environ.get("VIDEO_INFO_TTL", str(7 * 24 * 3600)))
+# 자막 없음/비활성화/접근 불가 영상은 짧게만 기억 (상태가 바뀔 수 있으므로)
+NEGATIVE_CACHE_TTL = int(os.environ.get("NEGATIVE_CACHE_TTL", "600"))
+
+# 네거티브 캐시 대상 youtube_transcript_api 오류 클래스 이름
+NEGATIVE_CACHE_ERRORS = ('NoTranscriptAvailable', 'TranscriptsDisabled', 'VideoUnavailable')
+
+class VideoStore:
+    """비디오 ID별 자막, oEmbed 메타데이터, 최근 실패 정보를 보관하는 SQLite 저장소입니다."""
+
+    def __init__(self, path=VIDEO_STORE_PATH, transcript_ttl=TRANSCRIPT_TTL,
+                 info_ttl=VIDEO_INFO_TTL, negative_ttl=NEGATIVE_CACHE_TTL, archive=None):
+        self.path = path
+        # 자막 아카이브가 주어지면 자막은 SQLite 대신 압축 아카이브에 저장 (같은 transcript_ttl로 만료)
+        self.archive = archive
+        self.transcript_ttl = transcript_ttl
+        self.info_ttl = info_ttl
+        self.negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        self._conn = None
+        self._stats = {'hits': 0, 'misses': 0, 'negative_hits': 0, 'writes': 0}
+
+    def _connect(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            for table in ('transcripts', 'video_info', 'failures'):
+                self._conn.execute(
+                    f"CREATE TABLE IF NOT EXISTS {table} ("
+                    "video_id TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+                )
+            # 자막 조각별 위치/시간 배열 (TranscriptSegments.timing_bytes, 스크립트 문자열과 따로 저장)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS transcript_timings ("
+                "video_id TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)"
+            )
+        return self._conn
+
+    def _get(self, table, video_id):
+        with self._lock:
+            try:
+                conn = self._connect()
+                row = conn.execute(
+                    f"SELECT value, expires_at FROM {table} WHERE video_id = ?", (video_id,)
+                ).fetchone()
+                if row is None:
+                    return None
+                if row[1] < time.time():
+                    # 만료된 항목은 읽는 시점에 정리
+                    conn.execute(f"DELETE FROM {table} WHERE video_id = ?", (video_id,))
+                    conn.commit()
+                    return None
+                return json.loads(row[0])
+            except sqlite3.Error:
+                return None
+
+    def _put(self, table, video_id, value, ttl, replace=True, encode=True):
+        verb = "INSERT OR REPLACE" if replace else "INSERT OR IGNORE"
+        with self._lock:
+            try:
+                conn = self._connect()
+                conn.execute(
+                    f"{verb} INTO {table} (video_id, value, expires_at) VALUES (?, ?, ?)",
+                    (video_id, json.dumps(value, ensure_ascii=False) if encode else value, time.time() + ttl)
+                )
+                conn.commit()
+                self._stats['writes'] += 1
+            except sqlite3.Error:
+                pass
+
+    def _count(self, value, hit_key='hits'):
+        with self._lock:
+            self._stats[hit_key if value is not None else 'misses'] += 1
+        return value
+
+    def get_transcript(self, video_id):
+        """저장된 자막을 반환합니다. 없으면 None을 반환합니다.
+
+        타임스탬프 정보가 남아 있으면 TranscriptSegments로 반환합니다.
+        """
+        if self.archive is not None:
+            transcript = self.archive.get(video_id, max_age=self.transcript_ttl)
+        else:
+            transcript = self._get('transcripts', video_id)
+        if transcript is not None:
+            transcript = self._with_timings(transcript, self._get_timings(video_id))
+        return self._count(transcript)
+
+    def put_transcript(self, video_id, transcript):
+        """자막을 저장합니다. TranscriptSegments이면 타임스탬프 정보도 함께 저장합니다."""
+        if isinstance(transcript, TranscriptSegments):
+            self._put('transcript_timings', video_id, transcript.timing_bytes(), self.transcript_ttl, encode=False)
+        if self.archive is not None:
+            self.archive.put(video_id, transcript)
+            with self._lock:
+                self._stats['writes'] += 1
+            return
+        self._put('transcripts', video_id, transcript, self.transcript_ttl)
+
+    def _get_timings(self, video_id):
+        with self._lock:
+            try:
+                row = self._connect().execute(
+                    "SELECT value FROM transcript_timings WHERE video_id = ? AND expires_at >= ?", (video_id, time.time())
+                ).fetchone()
+            except sqlite3.Error:
+                return None
+        return row[0] if row is not None else None
+
+    def _with_timings(self, transcript, timings):
+        # 타임스탬프 정보가 없거나(만료, 이전 버전) 스크립트와 맞지 않으면 문자열 그대로 사용
+        if timings is None:
+            return transcript
+        try:
+            return TranscriptSegments.from_timings(transcript, timings)
+        except ValueError:
+            return transcript
+
+    def get_info(self, video_id):
+        """저장된 비디오 메타데이터(oEmbed)를 반환합니다. 없으면 None을 반환합니다."""
+        return self._count(self._get('video_info', video_id))
+
+    def put_info(self, video_id, info):
+        """비디오 메타데이터를 저장합니다."""
+        self._put('video_info', video_id, info, self.info_ttl)
+
+    def get_failure(self, video_id):
+        """최근 기록된 자막 조회 실패 오류 이름을 반환합니다. 없으면 None을 반환합니다."""
+        failure = self._get('failures', video_id)
+        if failure is not None:
+            with self._lock:
+                self._stats['negative_hits'] += 1
+        return failure
+
+    def put_failure(self, video_id, error_name):
+        """자막 조회 실패를 짧은 기간 동안 기록합니다.
+
+        이미 기록된 실패는 갱신하지 않으므로 만료 후에는 반드시 다시 조회됩니다.
+        """
+        if error_name in NEGATIVE_CACHE_ERRORS:
+            self._put('failures', video_id, error_name, self.negative_ttl, replace=False)
+
+    def stats(self):
+        """조회 적중/미스 카운터를 반환합니다."""
+        with self._lock:
+            return dict(self._stats)
+
+# 프로세스 전역 저장소 인스턴스
+_video_store = None
+_video_store_lock = threading.Lock()
+
+def get_video_store():
+    """프로세스 전역 비디오 저장소를 반환합니다."""
+    global _video_store
+    if _video_store is None:
+        with _video_store_lock:
+            if _video_store is None:
+                _video_store = VideoStore(archive=get_transcript_archive() if TRANSCRIPT_ARCHIVE else None)
+    return _video_store
@@ -1,8 +1,14 @@
 'use client';
 
+// 서버 API 주소 (NoteForm과 같은 규칙)
+const API_URL = process.env.NODE_ENV === 'production'
+  ? 'https://youtube-note-lilac.vercel.app/api'
+  : '/api';
+
 // 다운로드 버튼 컴포넌트
 // 생성된 학습 노트를 .md 파일로 다운로드하는 기능을 제공합니다.
-export default function DownloadButton({ markdownContent, filename }) {
+// noteId가 있으면 서버가 렌더링해 캐시한 HTML/PDF 파일 링크도 함께 보여줍니다.
+export default function DownloadButton({ markdownContent, filename, noteId }) {
   const handleDownload = () => {
     // 마크다운 콘텐츠를 Blob 객체로 변환
     const blob = new Blob([markdownContent], { type: 'text/markdown;charset=utf-8' });
@@ -29,25 +35,39 @@ export default function DownloadButton({ markdownContent, filename }) {
   };
 
   return (
-    <button
-      onClick={handleDownload}
-      className="btn btn-primary w-full md:w-auto px-6 py-3 flex items-center justify-center dark:bg-blue-700 dark:hover:bg-blue-800"
-    >
-      <svg
-        xmlns="http://www.w3.org/2000/svg"
-        className="h-5 w-5 mr-2"
-        fill="none"
-        viewBox="0 0 24 24"
-        stroke="currentColor"
+    <>
+      <button
+        onClick={handleDownload}
+        className="btn btn-primary w-full md:w-auto px-6 py-3 flex items-center justify-center dark:bg-blue-700 dark:hover:bg-blue-800"
       >
-        <path
-          strokeLinecap="round"
-          strokeLinejoin="round"
-          strokeWidth={2}
-          d="M4 16v1a3 3 0 003 3h10a3 3 0 003-3v-1m-4-4l-4 4m0 0l-4-4m4 4V4"
-        />
-      </svg>
-      노트 다운로드 (.md)
-    </button>
+        <svg
+          xmlns="http://www.w3.org/2000/svg"
+          className="h-5 w-5 mr-2"
+          fill="none"
+          viewBox="0 0 24 24"
+          stroke="currentColor"
+        >
+          <path
+            strokeLinecap="round"
+            strokeLinejoin="round"
+            strokeWidth={2}
+            d="M4 16v1a3 3 0 003 3h10a3 3 0 003-3v-1m-4-4l-4 4m0 0l-4-4m4 4V4"
+          />
+        </svg>
+        노트 다운로드 (.md)
+      </button>
+
+      {noteId && ['html', 'pdf'].map((format) => (
+        <a
+          key={format}
+          href={`${API_URL}/notes/${noteId}.${format}`}
+          target="_blank"
+          rel="noopener noreferrer"
+          className="btn btn-secondary px-4 py-2 flex items-center dark:bg-gray-700 dark:text-gray-300"
+        >
+          {format.toUpperCase()}로 보기
+        </a>
+      ))}
+    </>
   );
 }
\ No newline at end of file
@@ -127,6 +127,8 @@ export default function NoteForm() {
         success: true,
         markdownContent: response.data.markdownContent,
         videoTitle: response.data.videoTitle || '유튜브_학습_노트',
+        // 서버에서 HTML/PDF로 내보낼 수 있는 노트 ID (캐시되지 않은 노트는 없음)
+        noteId: response.data.noteId || null,
         error: null,
         timestamp: new Date().toISOString(),
         inputType,
@@ -186,6 +188,7 @@ export default function NoteForm() {
       success: true,
       markdownContent: item.markdownContent,
       videoTitle: item.videoTitle,
+      noteId: item.noteId || null,
       error: null
     });
   };
@@ -414,6 +417,7 @@ export default function NoteForm() {
             <DownloadButton
               markdownContent={result.markdownContent}
               filename={`${result.videoTitle}_학습노트`}
+              noteId={result.noteId}
             />
 
             <button
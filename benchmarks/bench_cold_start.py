@@ -0,0 +1,193 @@
+"""진입 모듈별 콜드 스타트(모듈 로드 + 첫 응답) 시간 벤치마크.
+
+Vercel 인스턴스가 새로 뜰 때처럼 매번 새 파이썬 프로세스에서 진입 모듈을 가져오고 첫 요청 하나를 처리한 뒤
+다음 시간을 잽니다.
+  - import: 진입 모듈을 가져오는 데 걸린 시간
+  - first: 가져온 뒤 첫 응답을 만드는 데 걸린 시간
+  - total: 프로세스 시작부터 종료까지의 전체 시간 (인터프리터 시작 포함)
+
+요청 종류:
+  - options: CORS 사전 요청(OPTIONS /api)
+  - cached: 노트 캐시에 이미 있는 텍스트 입력에 대한 POST /api
+
+캐시는 준비 단계에서 가짜 Gemini 모델로 같은 요청을 한 번 처리해 임시 SQLite 파일에 채워 둡니다.
+sdk 열은 첫 응답까지 google.generativeai가 로드되었는지를 나타냅니다.
+
+사용법:
+    python benchmarks/bench_cold_start.py --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+API_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api')
+ENTRY_MODULES = ('index', 'vercel', 'vercelHandler', 'serverless')
+SCENARIOS = ('options', 'cached')
+
+SAMPLE_TEXT = ("오늘은 파이썬의 비동기 프로그래밍과 이벤트 루프가 동작하는 방식을 예제와 함께 알아보겠습니다. " * 20).strip()
+
+def request_body():
+    return json.dumps({'inputType': 'text', 'inputValue': SAMPLE_TEXT, 'learningLevel': 'beginner'})
+
+# ---------------------------------------------------------------------------
+# 자식 프로세스: 진입 모듈별로 요청 하나를 처리
+# ---------------------------------------------------------------------------
+def call_index(module, method, body):
+    # 실제 소켓 대신 socketpair로 http.server 핸들러에 요청 하나를 전달
+    import socket
+    client, server = socket.socketpair()
+    data = body.encode('utf-8')
+    client.sendall(f"{method} /api HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+                   f"Content-Length: {len(data)}\r\n\r\n".encode('ascii') + data)
+    module.Handler(server, ('127.0.0.1', 0), None)
+    server.close()
+    response = b""
+    while True:
+        chunk = client.recv(65536)
+        if not chunk:
+            break
+        response += chunk
+    client.close()
+    return int(response.split(b" ", 2)[1])
+
+def call_asgi(app, method, body):
+    import asyncio
+    data = body.encode('utf-8')
+    statuses = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': data, 'more_body': False}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            statuses.append(message['status'])
+
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': method,
+        'scheme': 'http', 'path': '/api', 'raw_path': b'/api', 'query_string': b'', 'root_path': '',
+        'headers': [(b'host', b'localhost'), (b'content-type', b'application/json'),
+                    (b'origin', b'http://localhost'), (b'access-control-request-method', b'POST')],
+        'client': ('127.0.0.1', 0), 'server': ('localhost', 80)
+    }
+    asyncio.run(app(scope, receive, send))
+    return statuses[0]
+
+def call_wsgi(app, method, body):
+    from werkzeug.test import EnvironBuilder
+    environ = EnvironBuilder(path='/api', method=method, data=body, content_type='application/json').get_environ()
+    statuses = []
+    b"".join(app(environ, lambda status, headers, exc_info=None: statuses.append(int(status.split()[0]))))
+    return statuses[0]
+
+def call_entry(entry, module, method, body):
+    if entry == 'index':
+        return call_index(module, method, body)
+    if entry == 'vercel':
+        return call_asgi(module.handler, method, body)
+    if entry == 'vercelHandler':
+        response = module.handler({'path': '/api', 'method': method, 'body': body,
+                                   'headers': {'Content-Type': 'application/json'}}, None)
+        return response['statusCode']
+    return call_wsgi(module.app, method, body)
+
+def install_fake_genai():
+    """준비 단계에서 캐시를 채울 때 쓰는 가짜 Gemini 모델을 설치합니다."""
+    import types
+    import genai_client
+
+    class FakeModel:
+        def __init__(self, model_name, system_instruction=None):
+            self.model_name = model_name
+
+        def generate_content(self, contents, stream=False):
+            return types.SimpleNamespace(text="# 학습 노트\n\n## 학습 목표\n- 콜드 스타트 벤치마크")
+
+        async def generate_content_async(self, contents, stream=False):
+            return self.generate_content(contents, stream)
+
+    genai_client._genai = types.SimpleNamespace(GenerativeModel=FakeModel)
+
+def child(entry, scenario):
+    start = time.perf_counter()
+    sys.path.insert(0, API_DIR)
+    if scenario == 'prime':
+        install_fake_genai()
+    import importlib
+    module = importlib.import_module(entry)
+    imported = time.perf_counter()
+    method = 'OPTIONS' if scenario == 'options' else 'POST'
+    status = call_entry(entry, module, method, request_body() if method == 'POST' else "")
+    done = time.perf_counter()
+    print(json.dumps({
+        'import_ms': (imported - start) * 1000,
+        'first_ms': (done - imported) * 1000,
+        'status': status,
+        'sdk': 'google.generativeai' in sys.modules
+    }))
+    sys.stdout.flush()
+    # 로그 작성기 등의 종료 처리 시간은 재지 않음
+    os._exit(0)
+
+# ---------------------------------------------------------------------------
+# 부모 프로세스: 진입 모듈/요청 종류별로 새 프로세스를 띄워 측정
+# ---------------------------------------------------------------------------
+def run_child(entry, scenario, env):
+    start = time.perf_counter()
+    completed = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', entry, scenario],
+                               env=env, capture_output=True, text=True)
+    total = (time.perf_counter() - start) * 1000
+    lines = [line for line in completed.stdout.splitlines() if line.startswith('{')]
+    if completed.returncode != 0 or not lines:
+        raise RuntimeError(f"{entry} {scenario} 실패:\n{completed.stderr[-2000:]}")
+    result = json.loads(lines[-1])
+    result['total_ms'] = total
+    return result
+
+def measure_interpreter_start(env, runs):
+    """아무것도 가져오지 않는 파이썬 프로세스의 실행 시간 중앙값(ms)을 반환합니다."""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', 'pass'], env=env)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help="조합별 반복 횟수 (중앙값 출력)")
+    parser.add_argument('--entries', default=','.join(ENTRY_MODULES))
+    parser.add_argument('--child', nargs=2, metavar=('ENTRY', 'SCENARIO'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(*args.child)
+        return
+
+    workdir = tempfile.mkdtemp(prefix='bench-cold-')
+    env = dict(os.environ,
+               GEMINI_API_KEY=os.environ.get('GEMINI_API_KEY', 'bench-fake-key'),
+               NOTE_CACHE_PATH=os.path.join(workdir, 'note_cache.sqlite3'),
+               VIDEO_STORE_PATH=os.path.join(workdir, 'video_store.sqlite3'),
+               API_LOG_PATH=os.path.join(workdir, 'api_log.txt'),
+               NOTES_MAP_REDUCE='0')
+
+    baseline = measure_interpreter_start(env, args.runs)
+    print(f"인터프리터 시작만: {baseline:.1f}ms, 실행 {args.runs}회 중앙값")
+    print(f"{'entry':<15}{'request':<9}{'status':>7}{'import ms':>11}{'first ms':>10}{'total ms':>10}  sdk")
+    for entry in args.entries.split(','):
+        # 같은 텍스트 요청으로 노트 캐시를 채움 (바이트코드 캐시도 이때 만들어짐)
+        run_child(entry, 'prime', env)
+        for scenario in SCENARIOS:
+            results = [run_child(entry, scenario, env) for _ in range(args.runs)]
+            print(f"{entry:<15}{scenario:<9}{results[-1]['status']:>7}"
+                  f"{statistics.median(r['import_ms'] for r in results):>11.1f}"
+                  f"{statistics.median(r['first_ms'] for r in results):>10.1f}"
+                  f"{statistics.median(r['total_ms'] for r in results):>10.1f}"
+                  f"  {'yes' if any(r['sdk'] for r in results) else 'no'}")
+
+if __name__ == '__main__':
+    main()
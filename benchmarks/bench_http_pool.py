@@ -0,0 +1,90 @@
+"""연결 풀 유무에 따른 oEmbed 호출 지연 시간 마이크로 벤치마크.
+
+로컬 HTTP/1.1 서버를 oEmbed 대역(stand-in)으로 띄우고,
+매번 새 연결을 맺는 requests.get과 api/http_client.py의 공유 세션을 비교합니다.
+로컬 루프백에는 TLS 핸드셰이크와 네트워크 왕복이 없으므로 실제 YouTube 호출에서는 차이가 더 커집니다.
+
+사용법:
+    python benchmarks/bench_http_pool.py --calls 500
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api'))
+
+import requests
+from http_client import create_http_session
+
+# oEmbed 응답 흉내 서버
+class FakeOEmbedHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # 헤더와 본문이 따로 전송될 때 Nagle/지연 ACK로 생기는 40ms 지연 방지
+    disable_nagle_algorithm = True
+    connections = 0
+
+    def setup(self):
+        super().setup()
+        FakeOEmbedHandler.connections += 1
+
+    def do_GET(self):
+        body = json.dumps({'title': '테스트 강의 영상', 'author_name': 'bench'}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeOEmbedHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+def measure(get, url, calls):
+    latencies = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        response = get(url)
+        response.json()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+def report(name, latencies, connections):
+    latencies = sorted(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{name:<18} 평균 {statistics.mean(latencies):7.3f}ms  "
+          f"p50 {statistics.median(latencies):7.3f}ms  p99 {p99:7.3f}ms  연결 수 {connections}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--calls', type=int, default=300)
+    args = parser.parse_args()
+
+    server = start_server()
+    url = f"http://127.0.0.1:{server.server_address[1]}/oembed?url=https://www.youtube.com/watch?v=abcdefghijk&format=json"
+    try:
+        # 워밍업
+        measure(requests.get, url, 5)
+
+        FakeOEmbedHandler.connections = 0
+        report("requests.get", measure(lambda u: requests.get(u, timeout=10), url, args.calls),
+               FakeOEmbedHandler.connections)
+
+        session = create_http_session()
+        FakeOEmbedHandler.connections = 0
+        report("pooled session", measure(session.get, url, args.calls), FakeOEmbedHandler.connections)
+        session.close()
+    finally:
+        server.shutdown()
+
+if __name__ == '__main__':
+    main()
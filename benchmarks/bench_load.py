@@ -0,0 +1,384 @@
+"""로컬 YouTube/Gemini 대역(stand-in)을 사용하는 백엔드별 오프라인 부하 테스트.
+
+실제 YouTube와 Gemini 할당량을 쓰지 않고 네 가지 백엔드를 동시성 단계별로 호출해
+처리량(요청/초), p50/p99 지연 시간, 오류율을 비교합니다.
+  - index: http.server Handler (api/index.py)
+  - fastapi: FastAPI 앱 (api/fastapi_app.py, uvicorn)
+  - serverless: Flask 앱 (api/serverless.py)
+  - generate-notes: Flask 앱 (api/generate_notes.py)
+
+대역 구성:
+  - 가짜 YouTube 서버: oEmbed, 시청 페이지(자막 트랙 목록), timedtext 자막 XML을 로컬 HTTP로 응답합니다.
+    백엔드가 만드는 https://www.youtube.com/... 요청은 공유 HTTP 세션(requests/httpx)의 전송 계층에서
+    로컬 서버로 바꿔 보내므로 연결 풀, youtube_transcript_api 파싱, 자막 정리까지 실제 코드가 그대로 실행됩니다.
+  - 가짜 Gemini 모델: 입력 토큰 수에 비례해 지연되고, 설정한 비율로 서버 오류나 할당량 초과(429)를 냅니다.
+
+모든 백엔드가 한 프로세스에서 실행되므로 노트 캐시, 자막 저장소, 모델 회로 상태는 임시 디렉터리에 따로 두고
+백엔드마다 초기화합니다. 기본값은 요청마다 다른 영상 ID를 써서 캐시 없이 전체 파이프라인을 지나게 하며,
+--distinct-videos로 영상 수를 줄이면 캐시 적중 경로를 볼 수 있습니다.
+
+사용법:
+    python benchmarks/bench_load.py --concurrency 1,4,16 --requests 100
+    python benchmarks/bench_load.py --backends fastapi --gemini-error-rate 0.1 --gemini-quota-rate 0.05
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from xml.sax.saxutils import escape
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api'))
+# 백엔드 모듈을 가져오기 전에 저장소/로그 경로를 임시 디렉터리로 바꿈
+_workdir = tempfile.mkdtemp(prefix='bench-load-')
+os.environ.setdefault('GEMINI_API_KEY', 'bench-fake-key')
+os.environ.setdefault('NOTE_CACHE_PATH', os.path.join(_workdir, 'note_cache.sqlite3'))
+os.environ.setdefault('VIDEO_STORE_PATH', os.path.join(_workdir, 'video_store.sqlite3'))
+os.environ.setdefault('API_LOG_PATH', os.path.join(_workdir, 'api_log.txt'))
+# 모든 요청이 같은 주소에서 오므로 입장 제어는 기본으로 끔 (ADMISSION_CONTROL=1로 켜서 측정 가능)
+os.environ.setdefault('ADMISSION_CONTROL', '0')
+
+import google.generativeai as genai
+import requests
+from google.api_core import exceptions as google_exceptions
+from requests.adapters import HTTPAdapter
+from token_budget import estimate_tokens
+
+# 대역 동작 설정 (명령행 인수로 덮어씀)
+FAKE = {
+    'yt_latency_ms': 30.0,
+    'yt_error_rate': 0.0,
+    'gemini_base_ms': 200.0,
+    'gemini_ms_per_1k': 20.0,
+    'gemini_error_rate': 0.0,
+    'gemini_quota_rate': 0.0,
+    'segments': 200
+}
+
+SEGMENT_TEXT = "오늘은 파이썬 비동기 프로그래밍에서 이벤트 루프가 작업을 예약하는 방식을 살펴보겠습니다"
+
+# ---------------------------------------------------------------------------
+# 가짜 YouTube 서버 (oEmbed, 시청 페이지, timedtext)
+# ---------------------------------------------------------------------------
+class FakeYouTubeHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # 헤더와 본문이 따로 전송될 때 Nagle/지연 ACK로 생기는 40ms 지연 방지
+    disable_nagle_algorithm = True
+
+    def _send(self, status, body, content_type):
+        body = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        time.sleep(FAKE['yt_latency_ms'] / 1000)
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        if random.random() < FAKE['yt_error_rate']:
+            self._send(503, "Service Unavailable", 'text/plain')
+        elif url.path == '/oembed':
+            video_id = query.get('url', [''])[0][-11:]
+            self._send(200, json.dumps({'title': f"부하 테스트 영상 {video_id}", 'author_name': 'bench'}),
+                       'application/json')
+        elif url.path == '/watch':
+            self._send(200, self._watch_page(query['v'][0]), 'text/html; charset=utf-8')
+        elif url.path == '/api/timedtext':
+            self._send(200, self._timedtext(), 'text/xml; charset=utf-8')
+        else:
+            self._send(404, "Not Found", 'text/plain')
+
+    def _watch_page(self, video_id):
+        captions = {
+            'playerCaptionsTracklistRenderer': {
+                'captionTracks': [{
+                    'baseUrl': f"https://www.youtube.com/api/timedtext?v={video_id}&lang=ko",
+                    'name': {'simpleText': 'Korean'},
+                    'languageCode': 'ko',
+                    'kind': 'asr',
+                    'isTranslatable': False
+                }],
+                'translationLanguages': []
+            }
+        }
+        return (f'<html><script>var ytInitialPlayerResponse = {{"playabilityStatus":{{"status":"OK"}},'
+                f'"captions":{json.dumps(captions)},"videoDetails":{{"videoId":"{video_id}"}}}};</script></html>')
+
+    def _timedtext(self):
+        # 자동 생성 자막처럼 소리 태그와 추임새를 섞어 자막 정리 단계도 실행되게 함
+        lines = []
+        for index in range(FAKE['segments']):
+            text = f"{SEGMENT_TEXT} ({index})"
+            if index % 10 == 0:
+                text = f"[음악] 음, {text}"
+            lines.append(f'<text start="{index * 2.5}" dur="2.5">{escape(text)}</text>')
+        return '<?xml version="1.0" encoding="utf-8" ?><transcript>' + ''.join(lines) + '</transcript>'
+
+    def log_message(self, format, *args):
+        pass
+
+class RewriteAdapter(HTTPAdapter):
+    """www.youtube.com 요청을 로컬 가짜 서버로 보내는 requests 전송 어댑터입니다."""
+
+    def __init__(self, target, **kwargs):
+        super().__init__(**kwargs)
+        self.target = target
+
+    def send(self, request, **kwargs):
+        request.url = request.url.replace('https://www.youtube.com', self.target, 1)
+        return super().send(request, **kwargs)
+
+def install_fake_youtube(target):
+    """공유 HTTP 세션(requests/httpx)이 가짜 YouTube 서버로 요청하도록 설정합니다."""
+    import httpx
+    import http_client
+
+    session = http_client.create_http_session()
+    session.mount('https://www.youtube.com', RewriteAdapter(target, pool_connections=http_client.HTTP_POOL_SIZE,
+                                                            pool_maxsize=http_client.HTTP_POOL_SIZE))
+    http_client._http_session = session
+
+    class RewriteTransport(httpx.AsyncHTTPTransport):
+        async def handle_async_request(self, request):
+            request.url = httpx.URL(str(request.url).replace('https://www.youtube.com', target, 1))
+            return await super().handle_async_request(request)
+
+    http_client._async_http_client = httpx.AsyncClient(transport=RewriteTransport())
+
+# ---------------------------------------------------------------------------
+# 가짜 Gemini 모델
+# ---------------------------------------------------------------------------
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+class FakeModel:
+    """입력 토큰 수에 비례해 지연되고, 설정한 비율로 오류/할당량 초과를 내는 가짜 생성 모델."""
+
+    def __init__(self, model_name, system_instruction=None, **kwargs):
+        self.model_name = model_name
+        self.system_instruction = system_instruction
+
+    def _delay_seconds(self, contents):
+        tokens = estimate_tokens(str(contents)) + estimate_tokens(self.system_instruction or "")
+        return tokens, (FAKE['gemini_base_ms'] + FAKE['gemini_ms_per_1k'] * tokens / 1000) / 1000
+
+    def _respond(self, tokens, stream):
+        roll = random.random()
+        if roll < FAKE['gemini_quota_rate']:
+            raise google_exceptions.ResourceExhausted("429 Quota exceeded for quota metric 'GenerateContent requests'")
+        if roll < FAKE['gemini_quota_rate'] + FAKE['gemini_error_rate']:
+            raise google_exceptions.InternalServerError("500 An internal error has occurred")
+        text = f"# 학습 노트\n\n## 학습 목표\n- 부하 테스트 ({self.model_name}, 입력 {tokens}토큰)"
+        return [FakeResponse(text)] if stream else FakeResponse(text)
+
+    def generate_content(self, contents, stream=False, **kwargs):
+        tokens, delay = self._delay_seconds(contents)
+        time.sleep(delay)
+        return self._respond(tokens, stream)
+
+    async def generate_content_async(self, contents, stream=False, **kwargs):
+        tokens, delay = self._delay_seconds(contents)
+        await asyncio.sleep(delay)
+        return self._respond(tokens, stream)
+
+def install_fake_genai():
+    genai.GenerativeModel = FakeModel
+
+# ---------------------------------------------------------------------------
+# 백엔드 서버
+# ---------------------------------------------------------------------------
+def _serve_in_thread(server):
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server.shutdown
+
+def start_index():
+    import index
+    server = ThreadingHTTPServer(('127.0.0.1', 0), index.Handler)
+    server.daemon_threads = True
+    index.Handler.log_message = lambda self, format, *args: None
+    return f"http://127.0.0.1:{server.server_address[1]}/api", _serve_in_thread(server)
+
+def _start_flask(app):
+    from werkzeug.serving import make_server
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    return f"http://127.0.0.1:{server.server_port}/api", _serve_in_thread(server)
+
+def start_serverless():
+    import serverless
+    return _start_flask(serverless.app)
+
+def start_generate_notes():
+    import generate_notes
+    return _start_flask(generate_notes.app)
+
+def start_fastapi():
+    import uvicorn
+    import fastapi_app
+    config = uvicorn.Config(fastapi_app.app, host='127.0.0.1', port=0, log_level='error', lifespan='off')
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+
+    def stop():
+        server.should_exit = True
+        thread.join(timeout=5)
+    return f"http://127.0.0.1:{port}/api", stop
+
+BACKENDS = {
+    'index': start_index,
+    'fastapi': start_fastapi,
+    'serverless': start_serverless,
+    'generate-notes': start_generate_notes
+}
+
+def reset_shared_state():
+    """백엔드 사이에 캐시와 모델 회로 상태가 이어지지 않도록 초기화합니다."""
+    import note_cache
+    import video_store
+    from model_health import model_health
+    note_cache._note_cache = None
+    video_store._video_store = None
+    for path in (os.environ['NOTE_CACHE_PATH'], os.environ['VIDEO_STORE_PATH']):
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+    with model_health._lock:
+        model_health._models.clear()
+
+# ---------------------------------------------------------------------------
+# 부하 생성과 보고
+# ---------------------------------------------------------------------------
+_video_counter = iter(range(10 ** 9))
+_video_counter_lock = threading.Lock()
+
+def next_video_url(prefix, distinct_videos):
+    with _video_counter_lock:
+        number = next(_video_counter)
+    if distinct_videos:
+        number %= distinct_videos
+    return f"https://www.youtube.com/watch?v={prefix}{number:010d}"
+
+def error_kind(response):
+    """실패한 응답이면 오류 종류를, 성공이면 None을 반환합니다."""
+    if response.status_code != 200:
+        return f"HTTP {response.status_code}"
+    try:
+        data = response.json()
+    except ValueError:
+        return "JSON 아님"
+    # index.py는 생성 실패를 200 응답의 본문 앞부분으로 알림
+    if 'error' in data or data.get('markdownContent', '').startswith("학습 노트 생성 중 오류"):
+        return "HTTP 200 생성 실패"
+    return None
+
+def run_level(url, prefix, concurrency, total, distinct_videos):
+    local = threading.local()
+    latencies = []
+    errors = {}
+    lock = threading.Lock()
+
+    def one_request(_):
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+        payload = {'inputType': 'url', 'inputValue': next_video_url(prefix, distinct_videos),
+                   'learningLevel': 'beginner'}
+        start = time.perf_counter()
+        try:
+            response = session.post(url, json=payload, timeout=120)
+            kind = error_kind(response)
+        except requests.RequestException as e:
+            kind = type(e).__name__
+        elapsed = (time.perf_counter() - start) * 1000
+        with lock:
+            latencies.append(elapsed)
+            if kind:
+                errors[kind] = errors.get(kind, 0) + 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one_request, range(total)))
+    wall = time.perf_counter() - start
+    latencies.sort()
+    return {
+        'throughput': total / wall,
+        'p50': statistics.median(latencies),
+        'p99': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+        'error_rate': sum(errors.values()) / total,
+        'errors': errors
+    }
+
+def run_backends(args, levels, out):
+    """백엔드를 하나씩 띄워 동시성 단계별 결과를 out에 출력합니다."""
+    for number, name in enumerate(args.backends.split(',')):
+        reset_shared_state()
+        url, stop = BACKENDS[name]()
+        try:
+            # 백엔드별로 영상 ID가 겹치지 않게 접두어를 붙임
+            prefix = chr(ord('a') + number)
+            for concurrency in levels:
+                result = run_level(url, prefix, concurrency, args.requests, args.distinct_videos)
+                kinds = ", ".join(f"{kind} x{count}" for kind, count in sorted(result['errors'].items()))
+                print(f"{name:<16}{concurrency:>5}{result['throughput']:>9.1f}{result['p50']:>10.1f}"
+                      f"{result['p99']:>10.1f}{result['error_rate']:>9.1%}  {kinds}", file=out, flush=True)
+        finally:
+            stop()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--backends', default=','.join(BACKENDS), help="쉼표로 구분한 백엔드 목록")
+    parser.add_argument('--concurrency', default='1,4,16', help="쉼표로 구분한 동시 요청 수 단계")
+    parser.add_argument('--requests', type=int, default=60, help="단계별 요청 수")
+    parser.add_argument('--distinct-videos', type=int, default=0, help="0이면 요청마다 다른 영상 ID 사용")
+    parser.add_argument('--segments', type=int, default=FAKE['segments'], help="가짜 자막 조각 수")
+    parser.add_argument('--yt-latency-ms', type=float, default=FAKE['yt_latency_ms'])
+    parser.add_argument('--yt-error-rate', type=float, default=FAKE['yt_error_rate'])
+    parser.add_argument('--gemini-base-ms', type=float, default=FAKE['gemini_base_ms'])
+    parser.add_argument('--gemini-ms-per-1k', type=float, default=FAKE['gemini_ms_per_1k'])
+    parser.add_argument('--gemini-error-rate', type=float, default=FAKE['gemini_error_rate'])
+    parser.add_argument('--gemini-quota-rate', type=float, default=FAKE['gemini_quota_rate'])
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    for key in FAKE:
+        FAKE[key] = getattr(args, key)
+    random.seed(args.seed)
+
+    youtube = ThreadingHTTPServer(('127.0.0.1', 0), FakeYouTubeHandler)
+    youtube.daemon_threads = True
+    stop_youtube = _serve_in_thread(youtube)
+    install_fake_genai()
+    install_fake_youtube(f"http://127.0.0.1:{youtube.server_address[1]}")
+
+    levels = [int(level) for level in args.concurrency.split(',')]
+    print(f"가짜 YouTube 지연 {FAKE['yt_latency_ms']:.0f}ms (오류율 {FAKE['yt_error_rate']:.0%}), "
+          f"가짜 Gemini 지연 {FAKE['gemini_base_ms']:.0f}ms + {FAKE['gemini_ms_per_1k']:.0f}ms/1k토큰 "
+          f"(오류율 {FAKE['gemini_error_rate']:.0%}, 할당량 초과 {FAKE['gemini_quota_rate']:.0%})")
+    out = sys.stdout
+    print(f"{'backend':<16}{'conc':>5}{'req/s':>9}{'p50 ms':>10}{'p99 ms':>10}{'errors':>9}  오류 종류")
+    # serverless.py처럼 print로 로그를 남기는 백엔드의 출력은 버리고 결과 표만 출력
+    try:
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            run_backends(args, levels, out)
+    finally:
+        stop_youtube()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""로그 기록 방식별 호출 비용 벤치마크.
+
+줄마다 파일을 열어 덧붙이던 기존 log_message와 api/log_writer.py의 큐 기반 StructuredLogger를 비교합니다.
+요청 하나당 log_message 호출 수(--per-request)를 곱해 요청당 로그 오버헤드도 함께 보여줍니다.
+
+사용법:
+    python benchmarks/bench_logging.py --lines 20000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api'))
+
+from log_writer import StructuredLogger, get_log_writer
+
+def legacy_log_message(path, message):
+    with open(path, "a") as f:
+        f.write(f"{message}\n")
+
+def measure(fn, lines):
+    start = time.perf_counter()
+    for index in range(lines):
+        fn(index)
+    return (time.perf_counter() - start) / lines * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description="로그 기록 방식별 호출 비용 벤치마크")
+    parser.add_argument('--lines', type=int, default=20000)
+    parser.add_argument('--per-request', type=int, default=12, help="요청 하나당 로그 호출 수")
+    args = parser.parse_args()
+
+    body = '{"inputType": "text", "inputValue": "' + "스크립트 " * 2000 + '"}'
+    with tempfile.TemporaryDirectory() as directory:
+        legacy_path = os.path.join(directory, "legacy.log")
+        queued_path = os.path.join(directory, "queued.log")
+        logger = StructuredLogger('bench', queued_path)
+
+        legacy_us = measure(lambda index: legacy_log_message(legacy_path, f"자막 가져오기 성공: {index} 글자"), args.lines)
+        queued_us = measure(lambda index: logger.info(f"자막 가져오기 성공: {index} 글자"), args.lines)
+        start = time.perf_counter()
+        get_log_writer(queued_path).flush()
+        drain_ms = (time.perf_counter() - start) * 1000
+
+        legacy_body_us = measure(lambda index: legacy_log_message(legacy_path, f"요청 데이터: {body}"), args.lines // 10)
+        queued_body_us = measure(lambda index: logger.debug("요청 데이터", body=body), args.lines // 10)
+        get_log_writer(queued_path).flush()
+
+        print(f"{'방식':<24}{'줄당 µs':>10}{'요청당 µs':>12}")
+        print(f"{'파일 열기/덧붙이기':<24}{legacy_us:>10.2f}{legacy_us * args.per_request:>12.1f}")
+        print(f"{'큐 + 백그라운드 기록':<24}{queued_us:>10.2f}{queued_us * args.per_request:>12.1f}")
+        print(f"{'요청 본문 (기존)':<24}{legacy_body_us:>10.2f}")
+        print(f"{'요청 본문 (잘라서 debug)':<24}{queued_body_us:>10.2f}")
+        print(f"남은 큐 비우기: {drain_ms:.1f}ms, 통계: {logger.stats()}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""유사 스크립트 색인(MinHash + LSH 밴드) 조회 시간 벤치마크.
+
+api/near_duplicate.py의 색인에 항목을 N개 넣은 뒤 다음 두 가지 조회의 지연 시간을 측정합니다.
+  - near: 저장된 서명 중 일부 칸만 바꾼(거의 같은 스크립트) 서명 조회 → 적중해야 함
+  - other: 무작위 서명(관련 없는 스크립트) 조회 → 미스여야 함
+서명 계산 시간은 실제 길이의 가짜 스크립트로 따로 측정합니다.
+
+사용법:
+    python benchmarks/bench_near_duplicate.py --entries 300000 --queries 2000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api'))
+
+import near_duplicate
+from near_duplicate import NearDuplicateIndex, SIGNATURE_SIZE, minhash_signature
+
+SCOPE = 'beginner|bench-v1|gemini-pro'
+
+def random_signature(rng):
+    return [rng.getrandbits(64) for _ in range(SIGNATURE_SIZE)]
+
+def near_copy(signature, rng, changed):
+    copy = list(signature)
+    for index in rng.sample(range(SIGNATURE_SIZE), changed):
+        copy[index] = rng.getrandbits(64)
+    return copy
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def measure(index, signatures):
+    latencies, hits = [], 0
+    for signature in signatures:
+        start = time.perf_counter()
+        match = index.find(signature, SCOPE)
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits += match is not None
+    return latencies, hits
+
+def main():
+    parser = argparse.ArgumentParser(description="유사 스크립트 색인 조회 시간 벤치마크")
+    parser.add_argument('--entries', type=int, default=300000)
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--changed', type=int, default=6, help="near 조회에서 바꾸는 서명 칸 수 (128칸 중)")
+    parser.add_argument('--words', type=int, default=3000, help="서명 계산용 가짜 스크립트 단어 수")
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    path = os.path.join(tempfile.mkdtemp(), 'bench_near_duplicates.sqlite3')
+    index = NearDuplicateIndex(path=path, max_entries=args.entries)
+    # 채우기 단계만 디스크 동기화를 끔 (조회 측정과 무관)
+    index._connect().execute("PRAGMA synchronous=OFF")
+
+    start = time.perf_counter()
+    stored = []
+    for number in range(args.entries):
+        signature = random_signature(rng)
+        index.add(signature, SCOPE, f"text:{number}|{SCOPE}")
+        if len(stored) < args.queries:
+            stored.append(signature)
+    print(f"항목 {args.entries}개 추가: {time.perf_counter() - start:.1f}초 ({os.path.getsize(path) / 1e6:.0f}MB)")
+
+    vocabulary = [f"단어{number}" for number in range(5000)]
+    text = " ".join(rng.choice(vocabulary) for _ in range(args.words))
+    timings = []
+    for _ in range(20):
+        start = time.perf_counter()
+        minhash_signature(text)
+        timings.append((time.perf_counter() - start) * 1000)
+    print(f"서명 계산 ({args.words}단어): 평균 {statistics.mean(timings):.2f}ms")
+
+    print(f"{'query':<8}{'hits':>8}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, signatures in (('near', [near_copy(signature, rng, args.changed) for signature in stored]),
+                             ('other', [random_signature(rng) for _ in range(args.queries)])):
+        latencies, hits = measure(index, signatures)
+        print(f"{name:<8}{hits:>8}{percentile(latencies, 0.5):>10.3f}{percentile(latencies, 0.99):>10.3f}"
+              f"{max(latencies):>10.3f}")
+    print(f"기준 유사도: {near_duplicate.NEAR_DUPLICATE_THRESHOLD}")
+
+if __name__ == '__main__':
+    main()
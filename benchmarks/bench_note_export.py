@@ -0,0 +1,71 @@
+"""노트 HTML/PDF 내보내기의 첫 렌더링 시간과 캐시된 파일 응답 시간 벤치마크.
+
+api/note_export.py의 내보내기 인스턴스에 길이가 다른 가짜 노트(제목, 문단, 목록, 표, 코드 블록)를 등록하고
+형식별로 다음을 측정합니다.
+  - render: 캐시에 파일이 없을 때 (마크다운 렌더링 + 파일 저장)
+  - cached: 같은 노트를 다시 내려받을 때 (파일 캐시에서 읽기)
+
+사용법:
+    python benchmarks/bench_note_export.py --sizes 5000 20000 60000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api'))
+
+from note_export import NoteExporter, EXPORT_FORMATS
+
+WORDS = "이벤트 루프는 코루틴을 실행하고 await는 결과를 기다립니다 asyncio.gather()로 여러 작업을 동시에 처리합니다".split()
+
+def make_words(rng, count):
+    return ' '.join(rng.choice(WORDS) for _ in range(count))
+
+def make_markdown(rng, characters):
+    # 생성 노트와 비슷한 구성의 섹션을 목표 글자 수가 될 때까지 이어 붙임
+    sections = ["# 파이썬 비동기 프로그래밍 학습 노트"]
+    number = 0
+    while sum(len(section) for section in sections) < characters:
+        number += 1
+        heading, body = make_words(rng, 3), make_words(rng, 80)
+        items = (f"- **{make_words(rng, 2)}**: {make_words(rng, 15)}\n- {make_words(rng, 20)}\n"
+                 f"  - `{rng.choice(WORDS)}` {make_words(rng, 10)}")
+        table = "| 개념 | 설명 |\n|---|---|\n" + "\n".join(
+            f"| {make_words(rng, 2)} | {make_words(rng, 12)} |" for _ in range(2))
+        code = f"```python\nasync def step_{number}():\n    await asyncio.sleep({number})\n```"
+        sections.append(f"## {number}. {heading}\n\n{body}\n\n{items}\n\n{table}\n\n{code}")
+    return '\n\n'.join(sections)
+
+def main():
+    parser = argparse.ArgumentParser(description="노트 HTML/PDF 내보내기 렌더링/캐시 응답 시간 벤치마크")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[5000, 20000, 60000], help="노트 글자 수")
+    parser.add_argument('--notes', type=int, default=20, help="크기별 노트 수")
+    parser.add_argument('--repeat', type=int, default=20, help="노트별 캐시 응답 반복 횟수")
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    exporter = NoteExporter(directory=tempfile.mkdtemp())
+    print(f"{'chars':>7}{'format':>8}{'render ms':>11}{'cached ms':>11}{'KB':>8}")
+    for size in args.sizes:
+        note_ids = [exporter.register(f"영상 {size}-{number}", make_markdown(rng, size)) for number in range(args.notes)]
+        for export_format in EXPORT_FORMATS:
+            renders, cached, sizes = [], [], []
+            for note_id in note_ids:
+                start = time.perf_counter()
+                body, _ = exporter.artifact(note_id, export_format)
+                renders.append((time.perf_counter() - start) * 1000)
+                sizes.append(len(body))
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    exporter.artifact(note_id, export_format)
+                    cached.append((time.perf_counter() - start) * 1000)
+            print(f"{size:>7}{export_format:>8}{statistics.median(renders):>11.2f}{statistics.median(cached):>11.3f}"
+                  f"{statistics.mean(sizes) / 1024:>8.1f}")
+    print(exporter.stats())
+
+if __name__ == '__main__':
+    main()
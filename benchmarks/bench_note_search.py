@@ -0,0 +1,82 @@
+"""노트 전문 검색 색인(SQLite FTS5) 색인/검색 시간 벤치마크.
+
+api/note_search.py의 색인에 가짜 노트 N개(섹션 6개, 선택적으로 스크립트 포함)를 넣으면서 노트 하나의 색인 시간을 재고,
+다음 세 가지 검색어의 지연 시간을 측정합니다.
+  - rare: 일부 노트에만 나오는 주제어 하나
+  - common: 거의 모든 노트에 나오는 흔한 단어 하나 (순위 계산 대상이 가장 많음)
+  - multi: 주제어 두 개 (모든 단어가 있는 섹션만)
+
+사용법:
+    python benchmarks/bench_note_search.py --documents 20000 --transcript-words 1000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api'))
+
+from note_search import NoteSearchIndex
+
+SECTIONS = ("학습 목표", "핵심 개념", "상세 설명", "요약", "응용", "자체 평가")
+COMMON_WORDS = "이해하기 개념 예제 설명 방법 정리 중요한 다음 사용 경우".split()
+
+def make_vocabulary(rng, size):
+    syllables = "가나다라마바사아자차카타파하개내대래매배새애재채트프스크리기지시이비피미니디"
+    return ["".join(rng.choice(syllables) for _ in range(rng.randint(2, 4))) for _ in range(size)]
+
+def make_words(rng, vocabulary, count):
+    # 흔한 단어 절반, 주제어 절반
+    return " ".join(rng.choice(COMMON_WORDS) if rng.random() < 0.5 else rng.choice(vocabulary) for _ in range(count))
+
+def make_notes(rng, vocabulary):
+    return "# 학습 노트\n\n" + "\n\n".join(f"## {heading}\n- {make_words(rng, vocabulary, 60)}" for heading in SECTIONS)
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def main():
+    parser = argparse.ArgumentParser(description="노트 전문 검색 색인/검색 시간 벤치마크")
+    parser.add_argument('--documents', type=int, default=20000)
+    parser.add_argument('--transcript-words', type=int, default=0, help="노트마다 함께 색인할 가짜 스크립트 단어 수")
+    parser.add_argument('--queries', type=int, default=500)
+    args = parser.parse_args()
+
+    rng = random.Random(5)
+    vocabulary = make_vocabulary(rng, 20000)
+    path = os.path.join(tempfile.mkdtemp(), 'bench_note_search.sqlite3')
+    index = NoteSearchIndex(path=path, max_documents=args.documents)
+
+    timings = []
+    start = time.perf_counter()
+    for number in range(args.documents):
+        markdown = make_notes(rng, vocabulary)
+        transcript = make_words(rng, vocabulary, args.transcript_words) if args.transcript_words else None
+        begin = time.perf_counter()
+        index.add(f"video:vid{number:08d}|beginner|bench-v1|gemini-pro", f"영상 {number}", markdown, transcript)
+        timings.append((time.perf_counter() - begin) * 1000)
+    print(f"노트 {args.documents}개 색인: {time.perf_counter() - start:.1f}초 ({os.path.getsize(path) / 1e6:.0f}MB), "
+          f"노트당 p50 {percentile(timings, 0.5):.2f}ms, p99 {percentile(timings, 0.99):.2f}ms")
+
+    queries = {
+        'rare': lambda: rng.choice(vocabulary),
+        'common': lambda: rng.choice(COMMON_WORDS),
+        'multi': lambda: f"{rng.choice(vocabulary)} {rng.choice(vocabulary)}",
+    }
+    print(f"{'query':<8}{'results':>9}{'p50 ms':>10}{'p99 ms':>10}{'mean ms':>10}")
+    for name, make_query in queries.items():
+        latencies, results = [], []
+        for _ in range(args.queries):
+            query = make_query()
+            begin = time.perf_counter()
+            results.append(len(index.search(query, limit=10)))
+            latencies.append((time.perf_counter() - begin) * 1000)
+        print(f"{name:<8}{statistics.mean(results):>9.1f}{percentile(latencies, 0.5):>10.2f}"
+              f"{percentile(latencies, 0.99):>10.2f}{statistics.mean(latencies):>10.2f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""프롬프트 변형별 토큰 수와 노트 생성 지연 시간 벤치마크.
+
+api/prompts.py의 full/compact 템플릿을 다음 세 가지 방식으로 보내며 비교합니다.
+  - inline: 지시문과 스크립트를 하나의 프롬프트로 전송
+  - system: 지시문을 시스템 지시문으로 분리해 전송 (접두부 처리 비용은 동일)
+  - cached: 지시문을 컨텍스트 캐시로 한 번만 올리고 이후에는 요청 본문만 전송
+
+실제 Gemini 대신 입력 토큰 수에 비례해 지연되는 로컬 가짜 모델을 사용하므로
+절대 시간보다 변형 간 상대적인 차이를 보는 용도입니다.
+
+사용법:
+    python benchmarks/bench_prompts.py --runs 20
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import types
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api'))
+os.environ.setdefault('GEMINI_API_KEY', 'bench-fake-key')
+os.environ.setdefault('NOTES_MAP_REDUCE', '0')
+
+import google.generativeai as genai
+import prompts
+from token_budget import estimate_tokens
+
+# 가짜 모델 지연 시간 설정 (명령행 인수로 덮어씀)
+FAKE_LATENCY = {'base_ms': 20.0, 'prefill_ms_per_1k': 40.0}
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+class FakeCachedContent:
+    """제공자 측 컨텍스트 캐시 흉내 (시스템 지시문을 미리 처리해 둠)."""
+
+    def __init__(self, model, system_instruction):
+        self.model = model
+        self.system_instruction = system_instruction
+
+    @classmethod
+    def create(cls, model, system_instruction=None, ttl=None):
+        # 캐시 생성 시 접두부를 한 번 처리
+        time.sleep(FAKE_LATENCY['prefill_ms_per_1k'] * estimate_tokens(system_instruction) / 1000 / 1000)
+        return cls(model, system_instruction)
+
+class FakeModel:
+    """입력 토큰 수(캐시된 접두부 제외)에 비례해 지연되는 가짜 생성 모델."""
+
+    def __init__(self, model_name, system_instruction=None, cached=None):
+        self.model_name = model_name
+        self.system_instruction = system_instruction
+        self.cached = cached
+
+    @classmethod
+    def from_cached_content(cls, cached_content):
+        return cls(cached_content.model, cached=cached_content)
+
+    def generate_content(self, contents, stream=False):
+        tokens = estimate_tokens(contents) + estimate_tokens(self.system_instruction or "")
+        delay_ms = FAKE_LATENCY['base_ms'] + FAKE_LATENCY['prefill_ms_per_1k'] * tokens / 1000
+        time.sleep(delay_ms / 1000)
+        return FakeResponse("# 학습 노트\n\n## 학습 목표\n- 벤치마크")
+
+def install_fake_genai():
+    genai.GenerativeModel = FakeModel
+    genai.caching = types.SimpleNamespace(CachedContent=FakeCachedContent)
+
+def set_mode(mode):
+    prompts.SYSTEM_INSTRUCTION_SUPPORTED = mode in ('system', 'cached')
+    prompts.CONTEXT_CACHE_SUPPORTED = mode == 'cached'
+    prompts.PROMPT_CONTEXT_CACHE = mode == 'cached'
+    prompts.context_caches = prompts.ContextCacheRegistry()
+
+def sample_transcript(sentences):
+    line = "오늘은 파이썬의 비동기 프로그래밍과 이벤트 루프가 동작하는 방식을 예제와 함께 알아보겠습니다."
+    return " ".join(f"{line} ({index})" for index in range(sentences))
+
+def sent_tokens(prompt, mode):
+    # 요청마다 실제로 전송되는(캐시되지 않은) 토큰 수
+    if mode == 'cached':
+        return estimate_tokens(prompt.user)
+    return estimate_tokens(prompt.text)
+
+def main():
+    parser = argparse.ArgumentParser(description="프롬프트 변형별 토큰 수/지연 시간 벤치마크")
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--sentences', type=int, default=60, help="가짜 스크립트 문장 수")
+    parser.add_argument('--base-ms', type=float, default=FAKE_LATENCY['base_ms'])
+    parser.add_argument('--prefill-ms-per-1k', type=float, default=FAKE_LATENCY['prefill_ms_per_1k'])
+    args = parser.parse_args()
+    FAKE_LATENCY['base_ms'] = args.base_ms
+    FAKE_LATENCY['prefill_ms_per_1k'] = args.prefill_ms_per_1k
+
+    install_fake_genai()
+    import index
+
+    transcript = sample_transcript(args.sentences)
+    video_info = {'title': '비동기 프로그래밍 입문', 'video_id': 'bench'}
+    print(f"스크립트: {len(transcript)}자, 약 {estimate_tokens(transcript)}토큰, 실행 {args.runs}회")
+    print(f"{'variant':<10}{'mode':<8}{'system':>8}{'sent':>8}{'mean ms':>10}{'p95 ms':>10}")
+
+    for variant in ('full', 'compact'):
+        index.NOTES_PROMPT = prompts.get_prompt_template(variant)
+        for mode in ('inline', 'system', 'cached'):
+            set_mode(mode)
+            prompt = index.build_notes_prompt(transcript, video_info, 'beginner', {})
+            latencies = []
+            for _ in range(args.runs):
+                start = time.perf_counter()
+                index.generate_notes_with_gemini(transcript, video_info, 'beginner', {})
+                latencies.append((time.perf_counter() - start) * 1000)
+            latencies.sort()
+            p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+            print(f"{variant:<10}{mode:<8}{estimate_tokens(prompt.system):>8}{sent_tokens(prompt, mode):>8}"
+                  f"{statistics.mean(latencies):>10.1f}{p95:>10.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""자막 저장 방식별 디스크 사용량(영상 1시간당 바이트)과 임의 읽기 지연 시간 벤치마크.
+
+다음 세 가지 방식으로 같은 가짜 자막을 저장하고 비교합니다.
+  - sqlite: 기존 비디오 저장소 (SQLite에 JSON 문자열)
+  - archive: 레코드별 zlib 압축 아카이브 (사전 없음)
+  - archive+dict: 앞부분 레코드로 학습한 공유 사전을 쓰는 아카이브
+
+가짜 자막은 자주 쓰는 말이 반복되는 강의처럼 단어를 지프(Zipf) 분포로 뽑아 만들며,
+1시간 분량은 분당 150단어로 잡습니다. 실제 자막과 압축률은 다르므로 방식 간 상대적인 차이를 보는 용도입니다.
+
+사용법:
+    python benchmarks/bench_transcript_archive.py --videos 1000 --minutes 20
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api'))
+
+from transcript_archive import TranscriptArchive
+from video_store import VideoStore
+
+WORDS_PER_MINUTE = 150
+COMMON_WORDS = ("그래서 이제 여기서 우리가 이렇게 보면 이거는 그러니까 네 자 이런 식으로 하나 두 번째 다음에 "
+                "보시면 같은 경우에는 있습니다 합니다 했습니다 됩니다 거죠 것을 수 있는 the a to is and of "
+                "we this that you it so in for let's right okay").split()
+
+def make_vocabulary(rng, size):
+    syllables = "가나다라마바사아자차카타파하개내대래매배새애재채트프스크리기지시이비피미니디"
+    topic = ["".join(rng.choice(syllables) for _ in range(rng.randint(2, 4))) for _ in range(size)]
+    return COMMON_WORDS + topic
+
+def make_transcript(rng, vocabulary, weights, minutes):
+    words = rng.choices(vocabulary, weights=weights, k=minutes * WORDS_PER_MINUTE)
+    # 문장 길이 8~16단어
+    sentences, start = [], 0
+    while start < len(words):
+        length = rng.randint(8, 16)
+        sentences.append(" ".join(words[start:start + length]) + ".")
+        start += length
+    return " ".join(sentences)
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+def read_latencies(get, video_ids, rng, reads):
+    latencies = []
+    for video_id in rng.choices(video_ids, k=reads):
+        start = time.perf_counter()
+        text = get(video_id)
+        latencies.append((time.perf_counter() - start) * 1000)
+        assert text
+    return latencies
+
+def main():
+    parser = argparse.ArgumentParser(description="자막 저장 방식별 디스크 사용량/임의 읽기 지연 시간 벤치마크")
+    parser.add_argument('--videos', type=int, default=1000)
+    parser.add_argument('--minutes', type=int, default=20, help="영상 하나의 길이(분)")
+    parser.add_argument('--reads', type=int, default=2000)
+    parser.add_argument('--train-records', type=int, default=100)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    vocabulary = make_vocabulary(rng, 4000)
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+    transcripts = {f"vid{number:08d}": make_transcript(rng, vocabulary, weights, args.minutes)
+                   for number in range(args.videos)}
+    video_ids = list(transcripts)
+    raw_bytes = sum(len(text.encode('utf-8')) for text in transcripts.values())
+    hours = args.videos * args.minutes / 60
+    print(f"가짜 자막 {args.videos}개 × {args.minutes}분 ({hours:.0f}시간), 원본 {raw_bytes / 1e6:.1f}MB")
+    print(f"{'store':<14}{'MB':>8}{'bytes/hour':>12}{'write s':>9}{'read p50 ms':>13}{'read p99 ms':>13}")
+
+    base = tempfile.mkdtemp()
+    stores = {
+        'sqlite': lambda: VideoStore(path=os.path.join(base, 'video_store.sqlite3')),
+        'archive': lambda: VideoStore(path=os.path.join(base, 'plain.sqlite3'),
+                                      archive=TranscriptArchive(os.path.join(base, 'plain'), train_records=10 ** 9)),
+        'archive+dict': lambda: VideoStore(path=os.path.join(base, 'dict.sqlite3'),
+                                           archive=TranscriptArchive(os.path.join(base, 'dict'),
+                                                                     train_records=args.train_records)),
+    }
+    for name, make_store in stores.items():
+        store = make_store()
+        start = time.perf_counter()
+        for number, video_id in enumerate(video_ids):
+            store.put_transcript(video_id, transcripts[video_id])
+            if store.archive is not None and number + 1 == args.train_records:
+                # 사전 학습이 끝나기를 기다렸다가 나머지를 저장
+                while store.archive._training:
+                    time.sleep(0.01)
+        write_seconds = time.perf_counter() - start
+        if store.archive is not None:
+            size = directory_size(store.archive.directory)
+        else:
+            store._connect().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            size = os.path.getsize(store.path)
+        latencies = read_latencies(store.get_transcript, video_ids, rng, args.reads)
+        print(f"{name:<14}{size / 1e6:>8.1f}{int(size / hours):>12}{write_seconds:>9.1f}"
+              f"{percentile(latencies, 0.5):>13.3f}{percentile(latencies, 0.99):>13.3f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""자막 조각 표현 방식별 메모리 사용량과 시간 구간 자르기/청크 나누기 시간 벤치마크.
+
+같은 가짜 자막(조각당 약 4초)을 두 가지 방식으로 들고 있을 때를 비교합니다.
+  - dicts: youtube_transcript_api가 돌려주는 {'text', 'start', 'duration'} 딕셔너리 목록
+    (시간 구간을 자르려면 목록을 훑어 조각을 고른 뒤 텍스트를 다시 이어 붙여야 함)
+  - segments: api/transcript_segments.py의 TranscriptSegments (이어 붙인 스크립트 + 위치/시간 배열)
+
+사용법:
+    python benchmarks/bench_transcript_segments.py --hours 3
+"""
+import argparse
+import copy
+import os
+import pickle
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api'))
+
+from chunked_notes import CHUNK_SIZE, CHUNK_OVERLAP, split_transcript
+from transcript_segments import TranscriptSegments
+
+SEGMENT_SECONDS = 4.0
+WORDS = "그래서 이제 여기서 우리가 이렇게 보면 이벤트 루프 코루틴 함수 호출 결과 값 예제 다음 같은".split()
+
+def make_entries(rng, hours):
+    count = int(hours * 3600 / SEGMENT_SECONDS)
+    return [{'text': ' '.join(rng.choices(WORDS, k=rng.randint(6, 12))),
+             'start': round(index * SEGMENT_SECONDS + rng.random() * 0.3, 3),
+             'duration': round(SEGMENT_SECONDS - 0.2, 3)} for index in range(count)]
+
+def measure_memory(build):
+    tracemalloc.start()
+    value = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return value, size
+
+def dict_slice_time(entries, start, end):
+    # 딕셔너리 목록에서 시간 구간의 조각을 골라 다시 이어 붙이는 기존 방식
+    return ' '.join(entry['text'] for entry in entries
+                    if entry['start'] + entry['duration'] > start and entry['start'] < end)
+
+def timed(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description="자막 조각 표현 방식별 메모리/자르기 시간 벤치마크")
+    parser.add_argument('--hours', type=float, default=3)
+    parser.add_argument('--window-minutes', type=float, default=10, help="시간 구간 자르기 길이(분)")
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    # 딕셔너리 목록은 조각 텍스트 문자열까지 포함해 측정
+    entries, dict_bytes = measure_memory(lambda: make_entries(random.Random(3), args.hours))
+    segments, segment_bytes = measure_memory(lambda: TranscriptSegments.from_entries(
+        (entry['text'], entry['start'], entry['duration']) for entry in entries))
+    rng = random.Random(4)
+    text_bytes = sys.getsizeof(str(segments))
+    print(f"자막 {args.hours:g}시간, 조각 {len(entries)}개, 스크립트 {len(segments)}자")
+    print(f"{'store':<10}{'MB':>8}{'bytes/segment':>15}")
+    print(f"{'dicts':<10}{dict_bytes / 1e6:>8.2f}{dict_bytes / len(entries):>15.0f}")
+    print(f"{'segments':<10}{segment_bytes / 1e6:>8.2f}{segment_bytes / len(entries):>15.0f}"
+          f"  (스크립트 문자열 {text_bytes / 1e6:.2f}MB + 배열)")
+
+    window = args.window_minutes * 60
+    starts = [rng.uniform(0, args.hours * 3600 - window) for _ in range(args.repeat)]
+    dict_ms = timed(lambda: [dict_slice_time(entries, start, start + window) for start in starts], 1) / len(starts)
+    # 부분의 텍스트는 str이므로 복사되지만, 조각 배열은 원본의 메모리 뷰를 공유
+    segment_ms = timed(lambda: [segments.slice_time(start, start + window) for start in starts], 1) / len(starts)
+    print(f"{args.window_minutes:g}분 구간 자르기: dicts {dict_ms:.3f}ms, segments {segment_ms:.3f}ms")
+
+    plain = str(segments)
+    plain_ms = timed(lambda: split_transcript(plain), 5)
+    chunk_ms = timed(lambda: split_transcript(segments), 5)
+    chunks = split_transcript(segments)
+    print(f"청크 나누기 ({CHUNK_SIZE}자, 겹침 {CHUNK_OVERLAP}자): 문장 경계(str) {plain_ms:.2f}ms, "
+          f"조각 경계(segments) {chunk_ms:.2f}ms, 청크 {len(chunks)}개 "
+          f"(첫 청크 {chunks[0].time_range()}, 마지막 청크 {chunks[-1].time_range()})")
+
+    # ProcessPoolExecutor/작업 큐/캐시를 거칠 때처럼 pickle과 copy로 왕복해도 같은 스크립트와 조각이어야 함
+    for value in (segments, chunks[-1], segments.slice_time(0, 0)):
+        for restored in (pickle.loads(pickle.dumps(value)), copy.copy(value), copy.deepcopy(value)):
+            assert isinstance(restored, TranscriptSegments) and restored == value
+            assert restored.segment_count == value.segment_count and restored.time_range() == value.time_range()
+            assert [restored.segment(index) for index in range(restored.segment_count)] == \
+                [value.segment(index) for index in range(value.segment_count)]
+    pickled = pickle.dumps(segments)
+    pickle_ms = timed(lambda: pickle.loads(pickle.dumps(segments)), 5)
+    print(f"pickle 왕복: {len(pickled) / 1e6:.2f}MB, {pickle_ms:.2f}ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""한 번에 생성(one-pass)과 2단계 생성(two-phase)의 토큰 수/지연 시간 벤치마크.
+
+같은 스크립트로 초보자용과 고급자용 노트를 모두 만들 때(학습 레벨 전환, 두 레벨 동시 요청)
+Gemini에 보내는 입력 토큰 수와 걸린 시간을 비교합니다.
+  - one-pass: 레벨마다 전체 스크립트로 노트를 생성
+  - two-phase: 공유 분석을 한 번 만든 뒤(영상별 캐시) 레벨마다 짧은 분석 결과로 노트를 렌더링
+
+실제 Gemini 대신 입력 토큰 수에 비례해 지연되는 로컬 가짜 모델을 사용하므로
+절대 시간보다 방식 간 상대적인 차이를 보는 용도입니다.
+
+사용법:
+    python benchmarks/bench_two_phase.py --runs 10 --sentences 200
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api'))
+os.environ.setdefault('GEMINI_API_KEY', 'bench-fake-key')
+os.environ.setdefault('NOTES_MAP_REDUCE', '0')
+os.environ.setdefault('NOTE_CACHE_PATH', os.path.join(tempfile.mkdtemp(), 'bench_two_phase.sqlite3'))
+
+import google.generativeai as genai
+from token_budget import estimate_tokens
+
+# 가짜 모델 지연 시간 설정 (명령행 인수로 덮어씀)
+FAKE_LATENCY = {'base_ms': 20.0, 'prefill_ms_per_1k': 40.0}
+# 가짜 분석 결과 (실제 분석 결과처럼 스크립트보다 훨씬 짧은 목록)
+FAKE_ANALYSIS = "\n".join(f"- 개념 {index}: 이벤트 루프와 코루틴의 관계에 대한 한 줄 정의" for index in range(40))
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+class FakeModel:
+    """입력 토큰 수에 비례해 지연되는 가짜 생성 모델."""
+
+    def __init__(self, model_name, system_instruction=None):
+        self.model_name = model_name
+        self.system_instruction = system_instruction
+
+    def generate_content(self, contents, stream=False, **kwargs):
+        tokens = estimate_tokens(contents) + estimate_tokens(self.system_instruction or "")
+        delay_ms = FAKE_LATENCY['base_ms'] + FAKE_LATENCY['prefill_ms_per_1k'] * tokens / 1000
+        time.sleep(delay_ms / 1000)
+        if "대본 분석기" in (self.system_instruction or contents):
+            return FakeResponse(FAKE_ANALYSIS)
+        return FakeResponse("# 학습 노트\n\n## 학습 목표\n- 벤치마크")
+
+def sample_transcript(sentences, run):
+    line = "오늘은 파이썬의 비동기 프로그래밍과 이벤트 루프가 동작하는 방식을 예제와 함께 알아보겠습니다."
+    return f"[run {run}] " + " ".join(f"{line} ({index})" for index in range(sentences))
+
+def generate(index, transcript, video_info, learning_level):
+    processing_info = {}
+    index.generate_notes_with_gemini(transcript, video_info, learning_level, processing_info)
+    return processing_info
+
+def run_sequential(index, transcript, video_info):
+    # 초보자용을 만든 뒤 고급자용으로 전환
+    return [generate(index, transcript, video_info, level) for level in ('beginner', 'advanced')]
+
+def run_concurrent(index, transcript, video_info):
+    # 두 레벨을 동시에 요청
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = [executor.submit(generate, index, transcript, video_info, level) for level in ('beginner', 'advanced')]
+        return [future.result() for future in futures]
+
+def main():
+    parser = argparse.ArgumentParser(description="one-pass/two-phase 생성 토큰 수/지연 시간 벤치마크")
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--sentences', type=int, default=200, help="가짜 스크립트 문장 수")
+    parser.add_argument('--base-ms', type=float, default=FAKE_LATENCY['base_ms'])
+    parser.add_argument('--prefill-ms-per-1k', type=float, default=FAKE_LATENCY['prefill_ms_per_1k'])
+    args = parser.parse_args()
+    FAKE_LATENCY['base_ms'] = args.base_ms
+    FAKE_LATENCY['prefill_ms_per_1k'] = args.prefill_ms_per_1k
+
+    genai.GenerativeModel = FakeModel
+    import index
+
+    video_info = {'title': '비동기 프로그래밍 입문'}
+    print(f"스크립트: 약 {estimate_tokens(sample_transcript(args.sentences, 0))}토큰, 실행 {args.runs}회 (두 레벨 생성)")
+    print(f"{'mode':<11}{'requests':<12}{'tokens':>8}{'mean ms':>10}{'p95 ms':>10}  analysis")
+
+    for two_phase in (False, True):
+        index.NOTES_TWO_PHASE = two_phase
+        mode = 'two-phase' if two_phase else 'one-pass'
+        for requests, run in (('sequential', run_sequential), ('concurrent', run_concurrent)):
+            latencies, tokens, analysis = [], [], []
+            for index_run in range(args.runs):
+                # 실행마다 다른 스크립트를 써서 공유 분석 캐시가 첫 요청에서는 비어 있도록 함
+                transcript = sample_transcript(args.sentences, f"{requests}-{index_run}")
+                start = time.perf_counter()
+                infos = run(index, transcript, video_info)
+                latencies.append((time.perf_counter() - start) * 1000)
+                tokens.append(sum(info.get('inputTokens', 0) for info in infos))
+                analysis.append("/".join(info.get('analysis', {}).get('cache', '-') for info in infos))
+            latencies.sort()
+            p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+            print(f"{mode:<11}{requests:<12}{int(statistics.mean(tokens)):>8}{statistics.mean(latencies):>10.1f}"
+                  f"{p95:>10.1f}  {max(set(analysis), key=analysis.count)}")
+
+if __name__ == '__main__':
+    main()